@@ -80,6 +80,8 @@ def create_app(config_class=Config):
     from app.utils import formato_eu, hora_co
     app.add_template_filter(formato_eu, 'eu')
     app.add_template_filter(hora_co, 'hora_co')
+    from app.services.proof_storage import ProofStorage
+    app.add_template_filter(ProofStorage.thumbnail_url, 'miniatura')
     
     # Configurar Flask-Login
     login_manager.login_view = 'auth.login'
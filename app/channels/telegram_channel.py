@@ -1,17 +1,24 @@
 """
 Canal de comunicación de Telegram.
-Implementación completa usando python-telegram-bot.
+Implementación sobre el TelegramSender compartido (app/telegram/sender.py):
+sesión HTTP keep-alive y límites de flood de Telegram (30 msg/s en total,
+1 msg/s por chat, ``retry_after`` en los 429).
 """
 from app.channels.base_channel import BaseChannel
+from app.telegram.sender import TelegramSender
 from typing import Optional, Dict, Any, List
 import os
 
 
 class TelegramChannel(BaseChannel):
     """
-    Canal de Telegram usando python-telegram-bot.
+    Canal de Telegram vía Bot API HTTP.
     
-    Usa el bot existente en app/telegram/bot.py
+    Los envíos pasan por la cola del TelegramSender del token y esperan su
+    resultado (el dispatcher de la outbox necesita saber si reintentar). Un
+    fallo por timeout implica que el mensaje se retiró de la cola sin salir,
+    así que reintentarlo no lo duplica.
+    Con ``wait=False`` el envío queda encolado y se devuelve al instante.
     """
     
     def __init__(self, config: Optional[Dict[str, Any]] = None):
@@ -28,18 +35,27 @@ class TelegramChannel(BaseChannel):
         if not self.bot_token:
             self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         
-        self.bot = None
-        if self.bot_token:
-            self._initialize_bot()
+        self.sender = TelegramSender.for_token(self.bot_token) if self.bot_token else None
     
-    def _initialize_bot(self):
-        """Inicializar bot de Telegram"""
+    def _send(self, method: str, params: Dict[str, Any],
+              wait: bool = True) -> tuple[bool, str]:
+        """
+        Llamar a la Bot API por el sender compartido.
+        
+        Returns:
+            Tupla (success, message_id_or_error); sin esperar, (True, 'encolado').
+        """
+        if not self.sender:
+            return False, "Bot no inicializado"
+        
         try:
-            from telegram import Bot
-            self.bot = Bot(token=self.bot_token)
+            if not wait:
+                self.sender.submit(method, params)
+                return True, "encolado"
+            result = self.sender.call(method, params)
+            return True, str(result.get('message_id', ''))
         except Exception as e:
-            print(f"Error al inicializar Telegram bot: {e}")
-            self.bot = None
+            return False, str(e)
     
     def send_message(self, recipient_id: str, text: str, **kwargs) -> tuple[bool, str]:
         """
@@ -48,27 +64,19 @@ class TelegramChannel(BaseChannel):
         Args:
             recipient_id: Chat ID de Telegram
             text: Texto del mensaje
-            **kwargs: parse_mode, reply_markup, etc.
+            **kwargs: parse_mode, reply_markup, wait, etc.
             
         Returns:
             Tupla (success, message_id_or_error)
         """
-        if not self.bot:
-            return False, "Bot no inicializado"
-        
-        try:
-            # Parámetros por defecto
-            parse_mode = kwargs.get('parse_mode', 'HTML')
-            
-            message = self.bot.send_message(
-                chat_id=recipient_id,
-                text=text,
-                parse_mode=parse_mode,
-                **{k: v for k, v in kwargs.items() if k not in ['parse_mode']}
-            )
-            return True, str(message.message_id)
-        except Exception as e:
-            return False, str(e)
+        wait = kwargs.pop('wait', True)
+        params = {
+            'chat_id': recipient_id,
+            'text': text,
+            'parse_mode': kwargs.pop('parse_mode', 'HTML'),
+            **kwargs
+        }
+        return self._send('sendMessage', params, wait)
     
     def send_image(self, recipient_id: str, image_url: str,
                   caption: Optional[str] = None, **kwargs) -> tuple[bool, str]:
@@ -84,19 +92,9 @@ class TelegramChannel(BaseChannel):
         Returns:
             Tupla (success, message_id_or_error)
         """
-        if not self.bot:
-            return False, "Bot no inicializado"
-        
-        try:
-            message = self.bot.send_photo(
-                chat_id=recipient_id,
-                photo=image_url,
-                caption=caption,
-                **kwargs
-            )
-            return True, str(message.message_id)
-        except Exception as e:
-            return False, str(e)
+        wait = kwargs.pop('wait', True)
+        params = {'chat_id': recipient_id, 'photo': image_url, 'caption': caption, **kwargs}
+        return self._send('sendPhoto', params, wait)
     
     def send_document(self, recipient_id: str, document_url: str,
                      filename: Optional[str] = None, **kwargs) -> tuple[bool, str]:
@@ -106,25 +104,15 @@ class TelegramChannel(BaseChannel):
         Args:
             recipient_id: Chat ID
             document_url: URL del documento
-            filename: Nombre del archivo
+            filename: Nombre del archivo (Telegram lo toma de la URL)
             **kwargs: Parámetros adicionales
             
         Returns:
             Tupla (success, message_id_or_error)
         """
-        if not self.bot:
-            return False, "Bot no inicializado"
-        
-        try:
-            message = self.bot.send_document(
-                chat_id=recipient_id,
-                document=document_url,
-                filename=filename,
-                **kwargs
-            )
-            return True, str(message.message_id)
-        except Exception as e:
-            return False, str(e)
+        wait = kwargs.pop('wait', True)
+        params = {'chat_id': recipient_id, 'document': document_url, **kwargs}
+        return self._send('sendDocument', params, wait)
     
     def send_buttons(self, recipient_id: str, text: str,
                     buttons: List[Dict[str, str]], **kwargs) -> tuple[bool, str]:
@@ -140,33 +128,20 @@ class TelegramChannel(BaseChannel):
         Returns:
             Tupla (success, message_id_or_error)
         """
-        if not self.bot:
-            return False, "Bot no inicializado"
-        
-        try:
-            from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-            
-            # Crear botones inline
-            keyboard = []
-            for button in buttons:
-                keyboard.append([
-                    InlineKeyboardButton(
-                        text=button.get('text', ''),
-                        callback_data=button.get('callback_data', '')
-                    )
-                ])
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            message = self.bot.send_message(
-                chat_id=recipient_id,
-                text=text,
-                reply_markup=reply_markup,
-                parse_mode=kwargs.get('parse_mode', 'HTML')
-            )
-            return True, str(message.message_id)
-        except Exception as e:
-            return False, str(e)
+        keyboard = [
+            [{
+                'text': button.get('text', ''),
+                'callback_data': button.get('callback_data', '')
+            }]
+            for button in buttons
+        ]
+        params = {
+            'chat_id': recipient_id,
+            'text': text,
+            'reply_markup': {'inline_keyboard': keyboard},
+            'parse_mode': kwargs.get('parse_mode', 'HTML')
+        }
+        return self._send('sendMessage', params, kwargs.get('wait', True))
     
     def get_user_info(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -178,18 +153,18 @@ class TelegramChannel(BaseChannel):
         Returns:
             Dict con información del usuario
         """
-        if not self.bot:
+        if not self.sender:
             return None
         
         try:
-            chat = self.bot.get_chat(user_id)
+            chat = self.sender.call('getChat', {'chat_id': user_id})
             
             return {
-                'id': str(chat.id),
-                'username': chat.username or '',
-                'first_name': chat.first_name or '',
-                'last_name': chat.last_name or '',
-                'type': chat.type,
+                'id': str(chat['id']),
+                'username': chat.get('username') or '',
+                'first_name': chat.get('first_name') or '',
+                'last_name': chat.get('last_name') or '',
+                'type': chat.get('type'),
                 'phone': None  # Telegram no expone el teléfono por API
             }
         except Exception as e:
@@ -203,4 +178,4 @@ class TelegramChannel(BaseChannel):
         Returns:
             bool: True si el bot está configurado
         """
-        return self.bot is not None and self.bot_token is not None
+        return self.sender is not None and self.bot_token is not None
@@ -27,6 +27,15 @@ class Config:
     GMAIL_IMAP_USER = os.getenv('GMAIL_IMAP_USER')
     GMAIL_IMAP_PASSWORD = os.getenv('GMAIL_IMAP_PASSWORD')
     DEFAULT_LOCAL_CURRENCY = os.getenv('DEFAULT_LOCAL_CURRENCY', 'VES')
+    # Pagos por transacción en la ingesta (un COMMIT por tramo, no por correo)
+    INGESTA_CHUNK_SIZE = int(os.getenv('INGESTA_CHUNK_SIZE', '100'))
+    # Procesos que parsean en paralelo en la importación histórica (1 = serie)
+    INGESTA_PARSE_WORKERS = int(os.getenv('INGESTA_PARSE_WORKERS', '1'))
+    # Archivo comprimido de los correos descargados (replay offline de los
+    # parsers con scripts/replay_parsers.py). Vacío = no archivar.
+    ARCHIVO_CORREOS_DIR = os.getenv(
+        'ARCHIVO_CORREOS_DIR', str(basedir / 'instance' / 'correos')
+    )
 
     # Cookies / consentimiento (banner + categorías)
     COOKIE_CONSENT_NAME = os.getenv('COOKIE_CONSENT_NAME', 'ceiba21_consent')
@@ -26,6 +26,8 @@ from app.models.web_user import WebUser
 # Pagos (sistema unificado)
 from app.models.payment import Payment, PaymentProvider, PaymentStatus, PaypalSubtipo
 from app.models.payment_source import PaymentSource
+from app.models.ingestion_checkpoint import IngestionCheckpoint
+from app.models.ingestion_run import IngestionRun
 
 # Configuración del sistema
 from app.models.system_config import SystemConfig
@@ -40,6 +42,12 @@ from app.models.push_subscription import PushSubscription
 # Chat web
 from app.models.chat import ChatConversation, ChatMessage
 
+# Comprobantes de pago (índice de archivos)
+from app.models.proof_file import ProofFile
+
+# Bandeja de salida de notificaciones
+from app.models.notification_outbox import NotificationOutbox
+
 # Exportar para facilitar importación
 __all__ = [
     'db',
@@ -66,9 +74,13 @@ __all__ = [
     'PaymentStatus',
     'PaypalSubtipo',
     'PaymentSource',
+    'IngestionCheckpoint',
+    'IngestionRun',
     'PushSubscription',
     'ChatConversation',
     'ChatMessage',
+    'ProofFile',
+    'NotificationOutbox',
     # Configuración del sistema
     'SystemConfig',
     # Módulo SMS
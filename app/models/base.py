@@ -17,7 +17,7 @@ class BaseModel(db.Model):
     
     Proporciona:
     - Campos comunes: id, created_at, updated_at
-    - Métodos CRUD: save(), delete(), update()
+    - Métodos CRUD: save(), save_all(), delete(), update()
     - Métodos de consulta: find_by_id(), find_all()
     - Serialización: to_dict(), from_dict()
     
@@ -71,7 +71,52 @@ class BaseModel(db.Model):
             if raise_on_error:
                 raise
             return False
-    
+
+    @classmethod
+    def save_all(cls, objects: List['BaseModel']) -> List[bool]:
+        """
+        Insertar varios objetos en UNA transacción, con un savepoint por fila.
+
+        Cada fila se escribe dentro de su propio SAVEPOINT: si una viola una
+        restricción, solo se revierte esa fila y el resto del tramo sigue. El
+        COMMIT (y su fsync) se paga una vez por llamada, no una por objeto.
+
+        Args:
+            objects: Objetos nuevos a insertar.
+
+        Returns:
+            Lista paralela a `objects`: True si la fila quedó guardada. Si
+            falla el COMMIT final, todas quedan en False.
+
+        Example:
+            >>> Payment.save_all([pago1, pago2])
+            [True, False]
+        """
+        resultados = []
+        for obj in objects:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(obj)
+                    db.session.flush()
+                resultados.append(True)
+            except Exception as e:
+                logger.error(
+                    "Error al guardar %s en lote: %s",
+                    obj.__class__.__name__, str(e)
+                )
+                resultados.append(False)
+
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(
+                "Error al confirmar lote de %s: %s",
+                cls.__name__, str(e), exc_info=True
+            )
+            return [False] * len(objects)
+        return resultados
+
     def delete(self) -> bool:
         """
         Eliminar el objeto de la base de datos.
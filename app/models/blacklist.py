@@ -11,9 +11,13 @@ from app.models import db
 from app.models.base import BaseModel
 from enum import Enum
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from sqlalchemy import or_
 
+from app.utils.identificadores import (
+    normalizar_dni, normalizar_email, normalizar_telefono, normalizar_telegram_id
+)
+
 
 class BlacklistType(Enum):
     """Tipos de bloqueo"""
@@ -181,8 +185,18 @@ class BlacklistEntry(BaseModel):
             identifiers['dni'] = self.dni
         if self.user_id:
             identifiers['user_id'] = self.user_id
-        
+
         return identifiers
+
+    def get_normalized_pairs(self) -> List[Tuple[str, str]]:
+        """Identificadores en forma canónica, como pares (tipo, valor)."""
+        return BlacklistIdentifier.pares_de(
+            telegram_id=self.telegram_id,
+            phone=self.phone,
+            email=self.email,
+            dni=self.dni,
+            user_id=self.user_id
+        )
     
     def to_dict(self, include_relationships: bool = False) -> Dict[str, Any]:
         """Convertir a diccionario"""
@@ -215,6 +229,80 @@ class BlacklistEntry(BaseModel):
         return data
 
 
+class BlacklistIdentifier(BaseModel):
+    """
+    Identificador normalizado de un reporte de blacklist.
+
+    Cada reporte se descompone en filas (tipo, valor) con el valor en forma
+    canónica (teléfono E.164, email canónico, DNI sin prefijo, ...). Así las
+    verificaciones hacen una sola búsqueda indexada, sin OR sobre columnas
+    crudas, y las variantes de formato coinciden entre sí.
+
+    La tabla se regenera desde BlacklistEntry (ver
+    BlacklistService.sync_identifiers); no se edita a mano.
+    """
+
+    __tablename__ = 'blacklist_identifiers'
+    __table_args__ = (
+        db.Index('ix_blacklist_identifiers_tipo_valor', 'tipo', 'valor'),
+    )
+
+    TIPO_TELEGRAM = 'telegram'
+    TIPO_TELEFONO = 'phone'
+    TIPO_EMAIL = 'email'
+    TIPO_DNI = 'dni'
+    TIPO_USUARIO = 'user'
+
+    blacklist_id = db.Column(
+        db.Integer,
+        db.ForeignKey('blacklist.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True
+    )
+    tipo = db.Column(db.String(10), nullable=False)
+    valor = db.Column(db.String(150), nullable=False)
+
+    entry = db.relationship(
+        'BlacklistEntry',
+        backref=db.backref('identificadores', cascade='all, delete-orphan')
+    )
+
+    def __repr__(self) -> str:
+        return f"<BlacklistIdentifier {self.tipo}:{self.valor} -> #{self.blacklist_id}>"
+
+    @property
+    def clave(self) -> str:
+        """Clave 'tipo:valor' (la que se guarda en el filtro en memoria)."""
+        return f"{self.tipo}:{self.valor}"
+
+    @classmethod
+    def pares_de(
+        cls,
+        telegram_id: Optional[int] = None,
+        phone: Optional[str] = None,
+        email: Optional[str] = None,
+        dni: Optional[str] = None,
+        user_id: Optional[int] = None
+    ) -> List[Tuple[str, str]]:
+        """
+        Pares (tipo, valor) normalizados de un conjunto de identificadores.
+
+        Es la única regla de normalización: la usan tanto el alta del índice
+        como las búsquedas, así que ambos lados siempre coinciden.
+
+        Returns:
+            Lista de pares, sin los identificadores vacíos o inválidos.
+        """
+        candidatos = (
+            (cls.TIPO_TELEGRAM, normalizar_telegram_id(telegram_id)),
+            (cls.TIPO_TELEFONO, normalizar_telefono(phone)),
+            (cls.TIPO_EMAIL, normalizar_email(email)),
+            (cls.TIPO_DNI, normalizar_dni(dni)),
+            (cls.TIPO_USUARIO, str(user_id) if user_id else None),
+        )
+        return [(tipo, valor) for tipo, valor in candidatos if valor]
+
+
 class BlacklistAppeal(BaseModel):
     """
     Apelación de Blacklist - Usuario solicita revisión.
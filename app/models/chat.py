@@ -18,6 +18,13 @@ class ChatConversation(BaseModel):
     """Conversación de chat web de un visitante (anónimo o logueado)."""
 
     __tablename__ = 'chat_conversations'
+    __table_args__ = (
+        # Delta del panel del operador (ChatService.sync_conversations)
+        db.Index('ix_chat_conversations_updated_at', 'updated_at'),
+        # Suma de no leídos: solo las conversaciones que tienen alguno
+        db.Index('ix_chat_conversations_unread', 'unread_for_operator',
+                 postgresql_where=db.text('unread_for_operator > 0')),
+    )
 
     user_id = db.Column(
         db.Integer, db.ForeignKey('users.id'), nullable=True, index=True
@@ -59,6 +66,39 @@ class ChatConversation(BaseModel):
         """Conversación de un visitante anónimo por su anon_id."""
         return cls.query.filter_by(anon_id=anon_id).first()
 
+    @classmethod
+    def get_recent(cls, limit: int = 50) -> List['ChatConversation']:
+        """Conversaciones con actividad más reciente (con su WebUser cargado)."""
+        return (
+            cls.query
+            .options(db.joinedload(cls.web_user))
+            .order_by(cls.last_message_at.desc().nullslast())
+            .limit(limit)
+            .all()
+        )
+
+    @classmethod
+    def get_changed_since(cls, since: datetime, limit: int
+                          ) -> List['ChatConversation']:
+        """Conversaciones modificadas (``updated_at``) después de ``since``."""
+        return (
+            cls.query
+            .options(db.joinedload(cls.web_user))
+            .filter(cls.updated_at > since)
+            .order_by(cls.updated_at.asc())
+            .limit(limit)
+            .all()
+        )
+
+    @classmethod
+    def total_unread(cls) -> int:
+        """No leídos del operador sumados en todas las conversaciones."""
+        return int(
+            db.session.query(db.func.coalesce(db.func.sum(cls.unread_for_operator), 0))
+            .filter(cls.unread_for_operator > 0)
+            .scalar()
+        )
+
 
 class ChatMessage(BaseModel):
     """Mensaje individual dentro de una conversación de chat web."""
@@ -97,3 +137,12 @@ class ChatMessage(BaseModel):
             .order_by(cls.id.asc())
             .all()
         )
+
+    @classmethod
+    def last_staff_id(cls, conversation_id: int) -> int:
+        """Id del último mensaje de operador o bot de la conversación (0 si no hay)."""
+        return (
+            db.session.query(db.func.max(cls.id))
+            .filter(cls.conversation_id == conversation_id, cls.sender != 'client')
+            .scalar()
+        ) or 0
@@ -0,0 +1,160 @@
+"""
+Modelo de checkpoint de la importación histórica de pagos.
+
+La importación desde una fecha recorre los UID IMAP en orden ascendente por
+tramos y, tras cada tramo, persiste hasta qué UID llegó. Si el proceso muere
+(timeout de Gunicorn, corte de luz del Raspberry, Ctrl+C), la siguiente
+corrida retoma desde ahí en vez de empezar de cero.
+
+Los UID solo son válidos junto con el UIDVALIDITY del buzón: si Gmail lo
+cambia, el checkpoint se descarta y se reimporta (la dedup evita duplicados).
+
+Los UID de un tramo que no se pudieron procesar (fallo al bajarlos, error de
+parseo o de BD) quedan en ``pendientes``: el checkpoint los deja atrás, pero
+la corrida los reintenta una vez al terminar el recorrido, aunque se haya
+retomado. ``pendientes_con_error`` dice cuáles ya sumaron en ``errores``,
+para descontar solo esos al reintentar.
+"""
+from typing import Iterable, List, Optional
+
+from app.models import db
+from app.models.base import BaseModel
+
+
+class IngestionCheckpoint(BaseModel):
+    """
+    Progreso de una importación histórica (una fila por fecha de inicio).
+
+    Attributes:
+        clave: Identificador de la importación ('historico:2026-06-01').
+        uidvalidity: UIDVALIDITY del INBOX cuando se guardó el checkpoint.
+        ultimo_uid: Último UID cuyo tramo quedó procesado y confirmado.
+        total: UID que coincidían al arrancar la corrida.
+        procesados: UID recorridos (incluye los de corridas anteriores).
+        nuevos, duplicados, no_reconocidos, errores: Contadores acumulados.
+        pendientes: UID ya recorridos cuyo procesamiento falló; se
+            reintentan al final del recorrido.
+        pendientes_con_error: Los de `pendientes` contados en `errores`.
+        estado: 'en_curso' | 'completado'.
+    """
+
+    __tablename__ = 'ingestion_checkpoints'
+
+    EN_CURSO = 'en_curso'
+    COMPLETADO = 'completado'
+
+    clave = db.Column(db.String(100), unique=True, nullable=False)
+    uidvalidity = db.Column(db.BigInteger, nullable=True)
+    ultimo_uid = db.Column(db.BigInteger, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    procesados = db.Column(db.Integer, nullable=False, default=0)
+    nuevos = db.Column(db.Integer, nullable=False, default=0)
+    duplicados = db.Column(db.Integer, nullable=False, default=0)
+    no_reconocidos = db.Column(db.Integer, nullable=False, default=0)
+    errores = db.Column(db.Integer, nullable=False, default=0)
+    pendientes = db.Column(db.JSON, nullable=False, default=list)
+    pendientes_con_error = db.Column(db.JSON, nullable=False, default=list)
+    estado = db.Column(db.String(20), nullable=False, default=EN_CURSO)
+
+    def __repr__(self) -> str:
+        return (
+            f'<IngestionCheckpoint {self.clave} uid>{self.ultimo_uid} '
+            f'{self.procesados}/{self.total} {self.estado}>'
+        )
+
+    @staticmethod
+    def clave_historico(desde_iso: str) -> str:
+        """Clave de la importación histórica desde una fecha YYYY-MM-DD."""
+        return f'historico:{desde_iso}'
+
+    @classmethod
+    def get_by_clave(cls, clave: str) -> Optional['IngestionCheckpoint']:
+        """Checkpoint de una importación, o None si nunca se corrió."""
+        return cls.query.filter_by(clave=clave).first()
+
+    @classmethod
+    def get_ultimo(cls) -> Optional['IngestionCheckpoint']:
+        """El checkpoint actualizado más recientemente (para el dashboard)."""
+        return cls.query.order_by(cls.updated_at.desc()).first()
+
+    def reiniciar(self, uidvalidity: Optional[int]) -> None:
+        """Vuelve a cero (importación nueva o UIDVALIDITY distinto)."""
+        self.uidvalidity = uidvalidity
+        self.ultimo_uid = 0
+        self.total = self.procesados = 0
+        self.nuevos = self.duplicados = self.no_reconocidos = self.errores = 0
+        self.pendientes = []
+        self.pendientes_con_error = []
+        self.estado = self.EN_CURSO
+
+    def avanzar(self, ultimo_uid: int, recorridos: int, resumen: dict,
+                fallidos: Iterable[int] = (),
+                con_error: Iterable[int] = ()) -> None:
+        """
+        Registra un tramo terminado (no hace commit).
+
+        Args:
+            ultimo_uid: Mayor UID del tramo.
+            recorridos: UID del tramo.
+            resumen: Contadores del tramo (claves del resumen de la ingesta).
+            fallidos: UID del tramo que no se pudieron procesar.
+            con_error: Los de `fallidos` que el tramo contó como error.
+        """
+        self.ultimo_uid = max(self.ultimo_uid or 0, ultimo_uid)
+        self.procesados = (self.procesados or 0) + recorridos
+        self.pendientes = sorted(set(self.pendientes or []) | set(fallidos))
+        self.pendientes_con_error = sorted(
+            set(self.pendientes_con_error or []) | set(con_error)
+        )
+        self._sumar(resumen)
+
+    def reintentados(self, reintentados: Iterable[int], fallidos: Iterable[int],
+                     resumen: dict, con_error: Iterable[int] = ()) -> None:
+        """
+        Registra el reintento de pendientes (no hace commit).
+
+        Args:
+            reintentados: UID pendientes que se volvieron a procesar.
+            fallidos: Los que volvieron a fallar (siguen pendientes).
+            resumen: Contadores del reintento.
+            con_error: Los de `fallidos` que el reintento contó como error.
+        """
+        reintentados = set(reintentados)
+        contados = set(self.pendientes_con_error or [])
+        # Solo esos ya sumaron un error: el reintento lo vuelve a contar si fallan
+        self.errores = max(0, (self.errores or 0) - len(contados & reintentados))
+        self.pendientes = sorted(
+            (set(self.pendientes or []) - reintentados) | set(fallidos)
+        )
+        self.pendientes_con_error = sorted((contados - reintentados) | set(con_error))
+        self._sumar(resumen)
+
+    def uids_pendientes(self) -> List[int]:
+        """UID por reintentar, ascendentes."""
+        return sorted(self.pendientes or [])
+
+    def _sumar(self, resumen: dict) -> None:
+        """Acumula los contadores de un tramo."""
+        self.nuevos = (self.nuevos or 0) + resumen.get('procesados', 0)
+        self.duplicados = (self.duplicados or 0) + resumen.get('duplicados', 0)
+        self.no_reconocidos = (self.no_reconocidos or 0) + resumen.get('no_reconocidos', 0)
+        self.errores = (self.errores or 0) + resumen.get('errores', 0)
+
+    def to_dict(self) -> dict:
+        """Progreso serializable para /dashboard/pagos."""
+        return {
+            'clave': self.clave,
+            'desde': self.clave.split(':', 1)[-1],
+            'uidvalidity': self.uidvalidity,
+            'ultimo_uid': self.ultimo_uid,
+            'total': self.total,
+            'procesados': self.procesados,
+            'porcentaje': round(100 * self.procesados / self.total, 1) if self.total else 0.0,
+            'nuevos': self.nuevos,
+            'duplicados': self.duplicados,
+            'no_reconocidos': self.no_reconocidos,
+            'errores': self.errores,
+            'pendientes': len(self.pendientes or []),
+            'estado': self.estado,
+            'actualizado': self.updated_at.isoformat() if self.updated_at else None,
+        }
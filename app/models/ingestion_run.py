@@ -0,0 +1,184 @@
+"""
+Modelo de métricas por corrida de ingesta de pagos.
+
+Cada corrida (cron / daemon / botón "Verificar correos" / tramo HTTP de la
+importación histórica) deja una fila con su duración total, el tiempo de
+cada etapa (búsqueda IMAP, descarga, parseo, dedup, cotización, guardado,
+conciliación...) y sus contadores. El dashboard /dashboard/pagos/ingestas
+muestra la tendencia para detectar regresiones de las corridas automáticas.
+"""
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.models import db
+from app.models.base import BaseModel
+
+
+class IngestionRun(BaseModel):
+    """
+    Una corrida de ingesta.
+
+    Attributes:
+        tipo: 'nuevos' (UNSEEN) | 'historico' (importación desde fecha).
+        manual: True si la disparó un usuario desde el dashboard.
+        exito: False si la corrida abortó (p. ej. Gmail no respondió).
+        iniciado: Inicio de la corrida (UTC).
+        duracion: Segundos de punta a punta.
+        correos, bytes: Correos descargados y bytes traídos de Gmail.
+        correos_por_segundo: correos / duracion.
+        procesados, duplicados, no_reconocidos, errores: Contadores.
+        etapas: {etapa: segundos}.
+        conciliacion: {resultado: cantidad} de ReconciliationService.conciliar.
+        mensaje: Resumen legible de la corrida.
+    """
+
+    __tablename__ = 'ingestion_runs'
+
+    NUEVOS = 'nuevos'
+    HISTORICO = 'historico'
+
+    #: Días que se conservan las corridas (se purgan al registrar una nueva).
+    RETENCION_DIAS = 90
+
+    tipo = db.Column(db.String(20), nullable=False, default=NUEVOS)
+    manual = db.Column(db.Boolean, nullable=False, default=False)
+    exito = db.Column(db.Boolean, nullable=False, default=True)
+    iniciado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    duracion = db.Column(db.Float, nullable=False, default=0.0)
+    correos = db.Column(db.Integer, nullable=False, default=0)
+    bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    correos_por_segundo = db.Column(db.Float, nullable=False, default=0.0)
+    procesados = db.Column(db.Integer, nullable=False, default=0)
+    duplicados = db.Column(db.Integer, nullable=False, default=0)
+    no_reconocidos = db.Column(db.Integer, nullable=False, default=0)
+    errores = db.Column(db.Integer, nullable=False, default=0)
+    etapas = db.Column(JSONB, nullable=False, default=dict)
+    conciliacion = db.Column(JSONB, nullable=False, default=dict)
+    mensaje = db.Column(db.String(500), nullable=True)
+
+    def __repr__(self) -> str:
+        return (
+            f'<IngestionRun {self.tipo} {self.iniciado:%Y-%m-%d %H:%M} '
+            f'{self.duracion:.1f}s {self.correos} correos>'
+        )
+
+    @classmethod
+    def desde_metricas(
+        cls,
+        tipo: str,
+        manual: bool,
+        metricas: dict,
+        resumen: dict
+    ) -> 'IngestionRun':
+        """
+        Arma la fila de una corrida (sin guardar).
+
+        Args:
+            tipo: NUEVOS o HISTORICO.
+            manual: Si la disparó un usuario.
+            metricas: MetricasCorrida.to_dict() de la corrida.
+            resumen: Resumen que devuelve la ingesta (contadores, success).
+        """
+        return cls(
+            tipo=tipo,
+            manual=manual,
+            exito=bool(resumen.get('success')),
+            iniciado=metricas['iniciado'],
+            duracion=metricas['duracion'],
+            correos=metricas['correos'],
+            bytes=metricas['bytes'],
+            correos_por_segundo=metricas['correos_por_segundo'],
+            procesados=resumen.get('procesados', 0),
+            duplicados=resumen.get('duplicados', 0),
+            no_reconocidos=resumen.get('no_reconocidos', 0),
+            errores=resumen.get('errores', 0),
+            etapas=metricas['etapas'],
+            conciliacion=metricas['conciliacion'],
+            mensaje=(resumen.get('mensaje') or '')[:500] or None,
+        )
+
+    @classmethod
+    def get_recientes(cls, limite: int = 100) -> List['IngestionRun']:
+        """Las últimas corridas, más recientes primero."""
+        return cls.query.order_by(cls.iniciado.desc()).limit(limite).all()
+
+    @classmethod
+    def get_desde(cls, dias: int) -> List['IngestionRun']:
+        """Corridas de los últimos `dias`, en orden cronológico."""
+        desde = datetime.utcnow() - timedelta(days=dias)
+        return cls.query.filter(cls.iniciado >= desde).order_by(cls.iniciado).all()
+
+    @staticmethod
+    def agregar_por_dia(corridas: List['IngestionRun']) -> List[dict]:
+        """
+        Tendencia diaria de las corridas automáticas y manuales.
+
+        Args:
+            corridas: Corridas en orden cronológico (get_desde).
+
+        Returns:
+            Un dict por día con corridas, correos, duración media y máxima,
+            correos/s medio y segundos medios por etapa.
+        """
+        dias: dict = {}
+        for corrida in corridas:
+            dia = dias.setdefault(corrida.iniciado.date().isoformat(), {
+                'dia': corrida.iniciado.date().isoformat(), 'corridas': 0,
+                'fallidas': 0, 'correos': 0, 'procesados': 0,
+                'duracion_total': 0.0, 'duracion_max': 0.0,
+                'cps_total': 0.0, 'etapas': {},
+            })
+            dia['corridas'] += 1
+            dia['fallidas'] += 0 if corrida.exito else 1
+            dia['correos'] += corrida.correos or 0
+            dia['procesados'] += corrida.procesados or 0
+            dia['duracion_total'] += corrida.duracion or 0.0
+            dia['duracion_max'] = max(dia['duracion_max'], corrida.duracion or 0.0)
+            dia['cps_total'] += corrida.correos_por_segundo or 0.0
+            for etapa, segundos in (corrida.etapas or {}).items():
+                dia['etapas'][etapa] = dia['etapas'].get(etapa, 0.0) + segundos
+
+        tendencia = []
+        for dia in dias.values():
+            n = dia['corridas']
+            tendencia.append({
+                'dia': dia['dia'],
+                'corridas': n,
+                'fallidas': dia['fallidas'],
+                'correos': dia['correos'],
+                'procesados': dia['procesados'],
+                'duracion_media': round(dia.pop('duracion_total') / n, 3),
+                'duracion_max': round(dia['duracion_max'], 3),
+                'correos_por_segundo': round(dia.pop('cps_total') / n, 1),
+                'etapas': {e: round(s / n, 3) for e, s in dia['etapas'].items()},
+            })
+        return tendencia
+
+    @classmethod
+    def purgar_antiguas(cls, dias: int = RETENCION_DIAS) -> int:
+        """Borra las corridas de más de `dias` (no hace commit)."""
+        limite = datetime.utcnow() - timedelta(days=dias)
+        return cls.query.filter(cls.iniciado < limite).delete(synchronize_session=False)
+
+    def to_dict(self) -> dict:
+        """Corrida serializable para la API del dashboard."""
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'manual': self.manual,
+            'exito': self.exito,
+            'iniciado': self.iniciado.isoformat() if self.iniciado else None,
+            'duracion': self.duracion,
+            'correos': self.correos,
+            'bytes': self.bytes,
+            'correos_por_segundo': self.correos_por_segundo,
+            'procesados': self.procesados,
+            'duplicados': self.duplicados,
+            'no_reconocidos': self.no_reconocidos,
+            'errores': self.errores,
+            'etapas': self.etapas or {},
+            'conciliacion': self.conciliacion or {},
+            'mensaje': self.mensaje,
+        }
@@ -0,0 +1,157 @@
+"""
+Modelo de la bandeja de salida de notificaciones (outbox transaccional).
+
+NotificationService no envía nada al cambiar el estado de una orden: agrega
+una fila por destinatario y canal a la sesión, y esa fila se guarda en el
+MISMO commit que el cambio de la orden (si la transición falla, no queda
+notificación; si el proceso cae después del commit, la notificación no se
+pierde). El dispatcher (app/services/notification_dispatcher.py) las envía
+por lotes, con reintentos y backoff exponencial.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models import db
+from app.models.base import BaseModel
+
+
+class NotificationOutbox(BaseModel):
+    """
+    Una notificación por enviar (un destinatario en un canal).
+
+    Attributes:
+        order_id: Orden que la originó (si la hay).
+        event: Evento de origen ('order_assigned', 'order_completed'...).
+        channel: Canal de envío: 'telegram', 'whatsapp', 'webchat' o 'push'.
+        recipient: chat_id del canal, o id del WebUser para 'push'.
+        payload: {'text', 'parse_mode'} o, para 'push', {'title', 'body', 'url'}.
+        status: PENDIENTE, ENVIADA o FALLIDA (agotó los intentos).
+        attempts: Intentos hechos.
+        next_attempt_at: Cuándo puede intentarse (también hace de lease
+            mientras un dispatcher la tiene tomada).
+        last_error: Último error devuelto por el canal.
+        sent_at: Momento del envío exitoso.
+    """
+
+    __tablename__ = 'notification_outbox'
+
+    PENDIENTE = 'pending'
+    ENVIADA = 'sent'
+    FALLIDA = 'failed'
+
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True, index=True)
+    event = db.Column(db.String(40), nullable=False)
+    channel = db.Column(db.String(20), nullable=False)
+    recipient = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default=PENDIENTE)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(500), nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Lote del dispatcher: solo las pendientes, por orden de vencimiento
+        db.Index('ix_notification_outbox_pending', 'next_attempt_at',
+                 postgresql_where=db.text("status = 'pending'")),
+    )
+
+    def __repr__(self) -> str:
+        return f'<NotificationOutbox {self.event} {self.channel}:{self.recipient} {self.status}>'
+
+    @classmethod
+    def stage(cls, event: str, channel: str, recipient: str, payload: dict,
+              order_id: Optional[int] = None) -> 'NotificationOutbox':
+        """
+        Agregar una notificación a la sesión SIN hacer commit.
+
+        Se guarda con el próximo commit del llamador (el de la orden); un
+        rollback la descarta junto con el resto del cambio.
+        """
+        fila = cls(event=event, channel=channel, recipient=str(recipient),
+                   payload=payload, order_id=order_id)
+        db.session.add(fila)
+        return fila
+
+    def as_envio(self) -> dict:
+        """Datos planos para enviar fuera de la sesión (hilos del dispatcher)."""
+        return {
+            'id': self.id,
+            'channel': self.channel,
+            'recipient': self.recipient,
+            'payload': dict(self.payload or {}),
+            'attempts': self.attempts,
+        }
+
+    @classmethod
+    def claim_batch(cls, limite: int, lease_seconds: int) -> List[dict]:
+        """
+        Tomar un lote de pendientes vencidas y apartarlas por `lease_seconds`.
+
+        ``FOR UPDATE SKIP LOCKED`` deja correr varios dispatchers sin que dos
+        tomen la misma fila; el lease (next_attempt_at en el futuro) la
+        oculta hasta registrar el resultado, y si el dispatcher muere la
+        fila vuelve sola al vencer.
+
+        Returns:
+            Envíos (ver as_envio), con el intento ya contado.
+        """
+        ahora = datetime.utcnow()
+        try:
+            filas = (
+                cls.query
+                .filter(cls.status == cls.PENDIENTE, cls.next_attempt_at <= ahora)
+                .order_by(cls.next_attempt_at)
+                .limit(limite)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            for fila in filas:
+                fila.attempts += 1
+                fila.next_attempt_at = ahora + timedelta(seconds=lease_seconds)
+            envios = [fila.as_envio() for fila in filas]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return envios
+
+    @classmethod
+    def record_results(cls, resultados: Iterable[Tuple[int, bool, str, Optional[datetime]]]
+                       ) -> Dict[str, int]:
+        """
+        Registrar el resultado de un lote en un solo commit.
+
+        Args:
+            resultados: (id, ok, detalle, proximo_intento); proximo_intento
+                None en una falla significa que se agotaron los intentos.
+
+        Returns:
+            {'sent', 'retry', 'failed'}: filas en cada estado.
+        """
+        resultados = {fila_id: (ok, detalle, proximo)
+                      for fila_id, ok, detalle, proximo in resultados}
+        conteo = {'sent': 0, 'retry': 0, 'failed': 0}
+        if not resultados:
+            return conteo
+        try:
+            for fila in cls.query.filter(cls.id.in_(list(resultados))):
+                ok, detalle, proximo = resultados[fila.id]
+                if ok:
+                    fila.status = cls.ENVIADA
+                    fila.sent_at = datetime.utcnow()
+                    fila.last_error = None
+                    conteo['sent'] += 1
+                else:
+                    fila.last_error = (detalle or '')[:500]
+                    if proximo is None:
+                        fila.status = cls.FALLIDA
+                        conteo['failed'] += 1
+                    else:
+                        fila.next_attempt_at = proximo
+                        conteo['retry'] += 1
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return conteo
@@ -58,6 +58,11 @@ class Order(BaseModel):
     """
     
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Búsqueda de candidatos de la conciliación (ReconciliationService)
+        db.Index('ix_orders_conciliacion', 'status', 'payment_method_from_id',
+                 'created_at', 'amount_usd'),
+    )
     
     # Identificación
     reference = db.Column(db.String(20), unique=True, nullable=False, index=True)
@@ -79,6 +79,11 @@ class Payment(BaseModel):
     """
 
     __tablename__ = 'payments'
+    __table_args__ = (
+        # Pagos sin orden para ReconciliationService.buscar_pago_para_orden
+        db.Index('ix_payments_sin_orden', 'metodo', 'fecha_pago', 'importe_bruto',
+                 postgresql_where=db.text('order_id IS NULL')),
+    )
 
     # ── Identidad del correo y método ─────────────────────────────────
     email_message_id = db.Column(
@@ -342,6 +347,45 @@ class Payment(BaseModel):
         """Busca un pago por referencia externa de transacción."""
         return cls.query.filter_by(transaction_id=transaction_id).first()
 
+    # Tamaño máximo de cada lista IN (...) de las consultas por lote
+    LOTE_IN = 1000
+
+    @classmethod
+    def _valores_existentes(cls, columna, valores) -> set:
+        """Subconjunto de `valores` que ya existe en `columna` (solo IDs)."""
+        pendientes = sorted({v for v in valores if v})
+        existentes = set()
+        for i in range(0, len(pendientes), cls.LOTE_IN):
+            tramo = pendientes[i:i + cls.LOTE_IN]
+            filas = db.session.query(columna).filter(columna.in_(tramo)).all()
+            existentes.update(fila[0] for fila in filas)
+        return existentes
+
+    @classmethod
+    def message_ids_existentes(cls, message_ids) -> set:
+        """De una lista de message_id, los que ya tienen un pago registrado.
+
+        Una sola consulta IN por lote (sin hidratar modelos) en vez de una
+        búsqueda por correo.
+        """
+        return cls._valores_existentes(cls.email_message_id, message_ids)
+
+    @classmethod
+    def transaction_ids_existentes(cls, transaction_ids) -> set:
+        """De una lista de transaction_id, los que ya tienen un pago registrado."""
+        return cls._valores_existentes(cls.transaction_id, transaction_ids)
+
+    @classmethod
+    def get_by_email_message_ids(cls, message_ids) -> Dict[str, 'Payment']:
+        """Pagos de una lista de message_id, indexados por message_id."""
+        pendientes = sorted({m for m in message_ids if m})
+        pagos = {}
+        for i in range(0, len(pendientes), cls.LOTE_IN):
+            tramo = pendientes[i:i + cls.LOTE_IN]
+            for pago in cls.query.filter(cls.email_message_id.in_(tramo)):
+                pagos[pago.email_message_id] = pago
+        return pagos
+
     @classmethod
     def get_pendientes(cls) -> list:
         """Pagos pendientes de procesar, más recientes primero."""
@@ -0,0 +1,70 @@
+"""
+Modelo del índice de comprobantes de pago guardados en disco.
+
+Cada archivo de ``app/static/proofs/`` (subido por el chat web o por el bot
+de Telegram) tiene una fila con su SHA-256: el mismo comprobante subido dos
+veces se guarda una sola vez (ver ProofStorage). El índice también reemplaza
+el recorrido del directorio en scripts/cleanup_proofs.py.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from app.models import db
+from app.models.base import BaseModel
+
+
+class ProofFile(BaseModel):
+    """
+    Un comprobante guardado (contenido único).
+
+    Attributes:
+        sha256: Hash del contenido (hex). Los archivos nuevos no lo
+            repiten; dos comprobantes anteriores al índice sí pueden.
+        filename: Nombre en PROOFS_DIR (derivado del hash + extensión).
+        size: Bytes del archivo.
+
+    ``created_at`` es la ÚLTIMA subida, no la primera: al reutilizarse el
+    archivo se renueva (mark_uploaded), y la limpieza cuenta el plazo desde
+    ahí, como cuando se miraba el mtime.
+    """
+
+    __tablename__ = 'proof_files'
+
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    filename = db.Column(db.String(255), unique=True, nullable=False)
+    size = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Limpieza por antigüedad (scripts/cleanup_proofs.py)
+        db.Index('ix_proof_files_created_at', 'created_at'),
+    )
+
+    def __repr__(self) -> str:
+        return f'<ProofFile {self.filename} {self.size}B>'
+
+    @classmethod
+    def get_by_sha256(cls, sha256: str) -> Optional['ProofFile']:
+        """Comprobante con ese contenido, si ya está guardado."""
+        return cls.query.filter_by(sha256=sha256).order_by(cls.id).first()
+
+    @classmethod
+    def mark_uploaded(cls, filename: str) -> None:
+        """Renovar la antigüedad de un comprobante que se volvió a subir."""
+        cls.query.filter_by(filename=filename).update(
+            {cls.created_at: datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+    @classmethod
+    def indexed_filenames(cls) -> set:
+        """Nombres de todos los archivos indexados."""
+        return {nombre for (nombre,) in cls.query.with_entities(cls.filename)}
+
+    @classmethod
+    def get_older_than(cls, limite: datetime) -> List['ProofFile']:
+        """Comprobantes subidos por última vez antes de `limite` (candidatos a limpieza)."""
+        return (
+            cls.query
+            .filter(cls.created_at < limite)
+            .order_by(cls.created_at)
+            .all()
+        )
@@ -90,3 +90,23 @@ class PushSubscription(BaseModel):
         if sub is not None:
             sub.is_active = False
             sub.save()
+
+    @classmethod
+    def deactivate_endpoints(cls, endpoints: List[str]) -> int:
+        """
+        Desactivar de una vez varias suscripciones muertas (un solo UPDATE).
+
+        Returns:
+            Filas desactivadas.
+        """
+        if not endpoints:
+            return 0
+        try:
+            filas = cls.query.filter(
+                cls.endpoint.in_(endpoints), cls.is_active.is_(True)
+            ).update({'is_active': False}, synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return filas
@@ -6,7 +6,7 @@ Autenticación no requerida: el visitante puede ser anónimo (se le asigna un
 """
 import uuid
 
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, Response, jsonify, request, session
 
 from app.client_auth import current_client
 from app.decorators import rate_limit
@@ -47,26 +47,52 @@ def mensaje():
         'ok': True,
         'conversation_id': conv.id,
         'message': msg.to_dict(),
-        # Respuesta inmediata del bot (vacío si está en pausa: atiende un humano)
+        # Respuesta del bot si se generó en el request (sin worker de la cola);
+        # si no, llega por /chat/stream o /chat/nuevos
         'bot_messages': ChatService.get_new_for_client(conv.id, msg.id),
     })
 
 
 @chat_bp.route('/nuevos', methods=['GET'])
 def nuevos():
-    """Polling: mensajes de operador/bot nuevos para el cliente."""
+    """Polling: mensajes de operador/bot nuevos para el cliente.
+
+    Si no hay nada nuevo contesta desde Redis, sin consultar la BD (ver
+    ChatService.poll_for_client).
+    """
     anon_id = session.get(ANON_KEY)
     if not anon_id:
         return jsonify({'ok': True, 'messages': []})
-    conv = ChatConversation.get_for_anon(anon_id)
-    if conv is None:
-        return jsonify({'ok': True, 'messages': []})
     after_id = request.args.get('after', 0, type=int)
-    return jsonify({
-        'ok': True,
-        'conversation_id': conv.id,
-        'messages': ChatService.get_new_for_client(conv.id, after_id),
-        'typing': ChatService.is_typing(conv.id, 'operator'),
+    nuevos = ChatService.poll_for_client(anon_id, after_id)
+    if nuevos['conversation_id'] is None:
+        return jsonify({'ok': True, 'messages': []})
+    return jsonify({'ok': True, **nuevos})
+
+
+@chat_bp.route('/stream', methods=['GET'])
+@rate_limit('chat_stream', session_rules=((30, 60),), ip_rules=((120, 60),))
+def stream():
+    """
+    Tiempo real (SSE): mensajes de operador/bot y "escribiendo".
+
+    Reanuda desde ``Last-Event-ID`` (reconexión automática del navegador) o
+    desde ``?after=``. Responde 204 si el visitante aún no tiene conversación
+    (EventSource no reintenta) y 503 si Redis no está disponible: en ambos
+    casos el widget sigue con el polling de /chat/nuevos.
+    """
+    anon_id = session.get(ANON_KEY)
+    conv = ChatConversation.get_for_anon(anon_id) if anon_id else None
+    if conv is None:
+        return '', 204
+    after_id = (request.headers.get('Last-Event-ID', type=int)
+                or request.args.get('after', 0, type=int))
+    eventos = ChatService.open_stream(conv.id, after_id)
+    if eventos is None:
+        return '', 503
+    return Response(eventos, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
     })
 
 
@@ -5,6 +5,8 @@ Permite ver las conversaciones apiladas, seguir el hilo en vivo, intervenir
 manualmente y pausar/reanudar el bot (por conversación y de forma global).
 Acceso restringido a administradores.
 """
+from datetime import datetime
+
 from flask import Blueprint, render_template, jsonify, request
 from flask_login import current_user
 
@@ -32,25 +34,51 @@ def index():
     )
 
 
+def _parse_cursor(raw):
+    """Cursor ISO del panel, o None (carga completa) si falta o no es válido."""
+    try:
+        return datetime.fromisoformat(raw) if raw else None
+    except ValueError:
+        return None
+
+
 @chat_admin_bp.route('/api/conversaciones')
 def api_conversaciones():
-    """Listado de conversaciones (polling)."""
-    return jsonify({
-        'ok': True,
-        'bot_paused_global': SystemConfigService.get_webchat_bot_paused(),
-        'conversations': ChatService.list_conversations(),
-    })
+    """
+    Listado de conversaciones (polling con delta).
+
+    ``?cursor=`` es el que devolvió la llamada anterior: sin él se manda el
+    listado completo (y la pausa global); con él, solo lo que cambió.
+    ``?visibles=1,2,3`` son las conversaciones en pantalla, para su
+    "escribiendo".
+    """
+    visibles = [
+        int(x) for x in request.args.get('visibles', '').split(',')[:100]
+        if x.strip().isdigit()
+    ]
+    data = ChatService.sync_conversations(
+        _parse_cursor(request.args.get('cursor')), visibles)
+    if data['full']:
+        data['bot_paused_global'] = SystemConfigService.get_webchat_bot_paused()
+    data['ok'] = True
+    return jsonify(data)
 
 
 @chat_admin_bp.route('/api/<int:conversation_id>/mensajes')
 def api_mensajes(conversation_id: int):
-    """Mensajes de una conversación (hilo completo o solo los nuevos)."""
+    """Mensajes de una conversación (hilo completo o solo los nuevos).
+
+    Con ``?after=`` y ``?leer=1`` (hilo abierto en pantalla) los nuevos
+    quedan además leídos.
+    """
     after_id = request.args.get('after', 0, type=int)
     if after_id:
         msgs = [
             m.to_dict()
             for m in ChatMessage.get_since(conversation_id, after_id)
         ]
+        if msgs and request.args.get('leer'):
+            ChatService.mark_read_by_operator(conversation_id)
     else:
         msgs = ChatService.history(conversation_id)
         ChatService.mark_read_by_operator(conversation_id)
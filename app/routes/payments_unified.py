@@ -21,7 +21,10 @@ from flask_login import login_required, current_user
 from app.models import db
 from app.models.payment import Payment, PaymentStatus, PaymentProvider
 from app.models.currency import Currency
-from app.services.unified_ingestion_service import UnifiedIngestionService
+from app.models.ingestion_run import IngestionRun
+from app.services.unified_ingestion_service import (
+    MetricasCorrida, UnifiedIngestionService
+)
 from app.services.calculator_service import CalculatorService
 from app.services.payment_method_service import PaymentMethodService
 from app.utils import formato_eu
@@ -29,11 +32,10 @@ from sqlalchemy.exc import SQLAlchemyError
 
 logger = logging.getLogger(__name__)
 
-# Import por HTTP acotado: el botón del dashboard solo hace "catch-up" reciente.
-# Un backfill grande por HTTP excede el timeout de Gunicorn (120s) y mata al
-# worker a mitad. Para rangos amplios/antiguos se usa el CLI importar_historico.py.
-MAX_DIAS_IMPORT_HTTP = 7      # no aceptar fechas más viejas que esto por HTTP
-LIMITE_IMPORT_HTTP = 50       # tope de correos (los más recientes) por HTTP
+# Import por HTTP en rebanadas: cada llamada trabaja hasta este tope de tiempo
+# y corta limpio en un borde de tramo, muy por debajo del timeout de Gunicorn
+# (120s). El checkpoint permite que el dashboard siga con otra llamada.
+TIEMPO_IMPORT_HTTP = 60       # segundos de trabajo por llamada HTTP
 
 pagos_bp = Blueprint(
     'pagos',
@@ -369,6 +371,49 @@ def api_resumen():
         return jsonify({'error': 'Error de base de datos'}), 500
 
 
+@pagos_bp.route('/ingestas')
+@login_required
+def ingestas():
+    """
+    Tendencia de las corridas de ingesta: duración, etapas y rendimiento.
+    GET /dashboard/pagos/ingestas?dias=14
+    """
+    dias = min(request.args.get('dias', 14, type=int), IngestionRun.RETENCION_DIAS)
+    try:
+        tendencia = IngestionRun.agregar_por_dia(IngestionRun.get_desde(dias))
+        recientes = IngestionRun.get_recientes(50)
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos en ingestas: {e}")
+        flash('No se pudieron leer las corridas de ingesta', 'danger')
+        tendencia, recientes = [], []
+
+    return render_template(
+        'payments/ingestas.html',
+        tendencia=tendencia,
+        recientes=recientes,
+        dias=dias,
+        etapas=MetricasCorrida.ETAPAS + ('otros',),
+    )
+
+
+@pagos_bp.route('/api/ingestas')
+@login_required
+def api_ingestas():
+    """
+    Corridas de ingesta recientes y su tendencia diaria.
+    GET /dashboard/pagos/api/ingestas?dias=14
+    """
+    dias = min(request.args.get('dias', 14, type=int), IngestionRun.RETENCION_DIAS)
+    try:
+        return jsonify({
+            'tendencia': IngestionRun.agregar_por_dia(IngestionRun.get_desde(dias)),
+            'recientes': [c.to_dict() for c in IngestionRun.get_recientes(50)],
+        }), 200
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos en api_ingestas: {e}")
+        return jsonify({'error': 'Error de base de datos'}), 500
+
+
 @pagos_bp.route('/api/test-gmail')
 @login_required
 def api_test_gmail():
@@ -451,8 +496,12 @@ def api_scheduler_reanudar():
 @login_required
 def api_importar_desde():
     """
-    Importación histórica one-time: procesa TODOS los correos (leídos
-    y no leídos) de las fuentes activas a partir de una fecha dada.
+    Importación histórica: procesa TODOS los correos (leídos y no leídos)
+    de las fuentes activas a partir de una fecha dada.
+
+    Cada llamada trabaja como máximo TIEMPO_IMPORT_HTTP segundos y retoma
+    desde el checkpoint de la anterior; el dashboard repite la llamada
+    mientras la respuesta traiga completado=false.
 
     Body JSON: { "desde_fecha": "2026-06-01" }  (formato HTML date input)
     POST /dashboard/pagos/api/importar_desde
@@ -462,38 +511,37 @@ def api_importar_desde():
     if not desde_iso:
         return jsonify({'success': False, 'error': 'Se requiere desde_fecha (YYYY-MM-DD)'}), 400
 
-    from datetime import datetime as _dt
     try:
-        dt = _dt.strptime(desde_iso, '%Y-%m-%d')
-        desde_imap = dt.strftime('%d-%b-%Y')   # '01-Jun-2026'
+        service = UnifiedIngestionService()
+        result = service.procesar_desde_fecha(
+            desde_iso, current_user.id, tiempo_max=TIEMPO_IMPORT_HTTP
+        )
+        return jsonify(result), 200
     except ValueError:
         return jsonify({'success': False, 'error': 'Formato de fecha inválido (esperado YYYY-MM-DD)'}), 400
+    except SQLAlchemyError as e:
+        logger.error(f"Error DB en api_importar_desde: {e}")
+        return jsonify({'success': False, 'error': 'Error de base de datos'}), 500
 
-    # Blindaje: por HTTP solo se permite un rango reciente y acotado, para no
-    # exceder el timeout de Gunicorn. Rangos amplios -> script CLI.
-    dias_atras = (_dt.now() - dt).days
-    if dias_atras > MAX_DIAS_IMPORT_HTTP:
-        return jsonify({
-            'success': False,
-            'error': (
-                f'Rango demasiado amplio para el dashboard '
-                f'(máximo {MAX_DIAS_IMPORT_HTTP} días). '
-                f'Para importar desde {desde_iso} usa el script por terminal: '
-                f'python scripts/importar_historico.py {desde_iso}'
-            )
-        }), 400
 
+@pagos_bp.route('/api/importar_desde/progreso')
+@login_required
+def api_importar_progreso():
+    """
+    Progreso de la importación histórica más reciente (o de una fecha).
+
+    GET /dashboard/pagos/api/importar_desde/progreso?desde_fecha=2026-06-01
+    """
+    from app.models.ingestion_checkpoint import IngestionCheckpoint
+    desde_iso = request.args.get('desde_fecha', '')
     try:
-        service = UnifiedIngestionService()
-        result = service.procesar_desde_fecha(
-            desde_imap, current_user.id, limite=LIMITE_IMPORT_HTTP
-        )
-        if isinstance(result, dict):
-            result['nota'] = (
-                f'Procesados hasta {LIMITE_IMPORT_HTTP} correos más recientes. '
-                f'Para un backfill completo usa el script CLI.'
+        if desde_iso:
+            checkpoint = IngestionCheckpoint.get_by_clave(
+                IngestionCheckpoint.clave_historico(desde_iso)
             )
-        return jsonify(result), 200
+        else:
+            checkpoint = IngestionCheckpoint.get_ultimo()
+        return jsonify({'progreso': checkpoint.to_dict() if checkpoint else None}), 200
     except SQLAlchemyError as e:
-        logger.error(f"Error DB en api_importar_desde: {e}")
-        return jsonify({'success': False, 'error': 'Error de base de datos'}), 500
\ No newline at end of file
+        logger.error(f"Error DB en api_importar_progreso: {e}")
+        return jsonify({'error': 'Error de base de datos'}), 500
@@ -0,0 +1,168 @@
+"""
+Archivo en disco de los correos de pago descargados de Gmail.
+
+Cada correo que baja la ingesta se guarda comprimido (gzip) en un archivo
+cuyo nombre es el SHA-256 de su Message-ID, repartido en subcarpetas por los
+dos primeros caracteres:
+
+    <ARCHIVO_CORREOS_DIR>/
+        index.jsonl                   # una línea por correo archivado
+        3f/3f9a…e1.json.gz            # el dict `correo` tal como lo ve el parser
+
+Se archiva el dict normalizado que consumen los parsers (cabeceras + HTML),
+no el RFC 822 completo: la ingesta ya no descarga el mensaje entero (ver
+GmailService._fetch_tramo) y el replay solo necesita la entrada del parser.
+
+Guardar es idempotente: un Message-ID ya archivado no se reescribe. Con el
+archivo, scripts/replay_parsers.py re-parsea meses de correo sin tocar Gmail.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class ArchivoCorreos:
+    """
+    Almacén de correos direccionado por el hash del Message-ID.
+
+    Attributes:
+        INDICE: Nombre del índice (JSON Lines) dentro del directorio.
+    """
+
+    INDICE = 'index.jsonl'
+
+    def __init__(self, directorio: str) -> None:
+        """
+        Args:
+            directorio: Raíz del archivo (se crea al guardar el primer correo).
+        """
+        self.directorio = Path(directorio)
+
+    @classmethod
+    def desde_config(cls) -> Optional['ArchivoCorreos']:
+        """Archivo de ARCHIVO_CORREOS_DIR, o None si está deshabilitado ('')."""
+        directorio = current_app.config.get('ARCHIVO_CORREOS_DIR')
+        return cls(directorio) if directorio else None
+
+    @staticmethod
+    def clave(message_id: str) -> str:
+        """SHA-256 hexadecimal del Message-ID (nombre del archivo)."""
+        return hashlib.sha256(message_id.encode('utf-8')).hexdigest()
+
+    def ruta(self, clave: str) -> Path:
+        """Ruta del correo archivado con esa clave."""
+        return self.directorio / clave[:2] / f'{clave}.json.gz'
+
+    def contiene(self, message_id: str) -> bool:
+        """True si el correo ya está archivado."""
+        return self.ruta(self.clave(message_id)).exists()
+
+    def guardar(self, correo: dict) -> bool:
+        """
+        Archiva un correo si no lo estaba.
+
+        El archivo se escribe a un temporal y se renombra (atómico): un
+        proceso que muere a mitad nunca deja un .json.gz truncado.
+
+        Args:
+            correo: Dict de GmailService (debe traer message_id).
+
+        Returns:
+            True si se escribió; False si ya existía o no tiene Message-ID.
+
+        Raises:
+            OSError: Si no se pudo escribir en disco.
+        """
+        message_id = correo.get('message_id')
+        if not message_id:
+            return False
+        clave = self.clave(message_id)
+        ruta = self.ruta(clave)
+        if ruta.exists():
+            return False
+
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        contenido = gzip.compress(
+            json.dumps(dict(correo), ensure_ascii=False).encode('utf-8')
+        )
+        fd, temporal = tempfile.mkstemp(dir=ruta.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(contenido)
+            os.replace(temporal, ruta)
+        except OSError:
+            if os.path.exists(temporal):
+                os.unlink(temporal)
+            raise
+
+        entrada = {
+            'clave': clave,
+            'message_id': message_id,
+            'sender': correo.get('sender', ''),
+            'date': correo.get('date', ''),
+            'archivado': datetime.utcnow().isoformat(timespec='seconds'),
+            'bytes': len(contenido),
+        }
+        # Una línea corta en modo append: el daemon y la importación pueden
+        # archivar a la vez sin pisarse.
+        with open(self.directorio / self.INDICE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+        return True
+
+    def guardar_todos(self, correos: Iterable[dict]) -> int:
+        """Archiva los correos nuevos de una lista; devuelve cuántos escribió."""
+        return sum(1 for correo in correos if self.guardar(correo))
+
+    def leer(self, clave: str) -> Optional[dict]:
+        """El dict `correo` archivado con esa clave, o None si no existe."""
+        try:
+            with gzip.open(self.ruta(clave), 'rb') as f:
+                return json.loads(f.read().decode('utf-8'))
+        except FileNotFoundError:
+            return None
+
+    def indice(self, desde: Optional[str] = None) -> Iterator[dict]:
+        """
+        Entradas del índice, sin repetir claves.
+
+        Args:
+            desde: Fecha YYYY-MM-DD; solo correos archivados desde ese día.
+
+        Yields:
+            dict con clave, message_id, sender, date, archivado, bytes.
+        """
+        ruta = self.directorio / self.INDICE
+        if not ruta.exists():
+            return
+        vistas = set()
+        with open(ruta, encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    # Línea a medio escribir (corte de luz): se ignora
+                    logger.warning(f"Línea inválida en el índice del archivo: {linea[:80]!r}")
+                    continue
+                if entrada['clave'] in vistas:
+                    continue
+                if desde and entrada.get('archivado', '') < desde:
+                    continue
+                vistas.add(entrada['clave'])
+                yield entrada
+
+    def correos(self, desde: Optional[str] = None) -> Iterator[dict]:
+        """Los correos archivados (ver indice), ya descomprimidos."""
+        for entrada in self.indice(desde):
+            correo = self.leer(entrada['clave'])
+            if correo is not None:
+                yield correo
@@ -0,0 +1,114 @@
+"""
+Asignación de peso máximo (emparejamiento bipartito) para la conciliación.
+
+Pagos y órdenes son los dos lados del grafo; el peso de cada arista es el
+puntaje de ReconciliationService.puntuar. Se resuelve con el método húngaro
+(O(n³)) sobre la matriz cuadrada completada con ceros: emparejar con un
+cero equivale a dejar el pago (o la orden) sin pareja.
+
+Los lotes reales son chicos y se parten en componentes conexas antes de
+resolver (ver componentes), así que cada matriz tiene pocas filas.
+"""
+from typing import Dict, Hashable, List, Set, Tuple
+
+Arista = Tuple[Hashable, Hashable]
+
+
+def asignacion_maxima(pesos: Dict[Arista, int]) -> Dict[Hashable, Hashable]:
+    """
+    Emparejamiento de peso total máximo.
+
+    Args:
+        pesos: {(fila, columna): peso > 0}. Los pares ausentes no se pueden
+            emparejar.
+
+    Returns:
+        {fila: columna} solo con aristas existentes; cada fila y cada columna
+        aparece a lo sumo una vez.
+    """
+    if not pesos:
+        return {}
+
+    filas = sorted({f for f, _c in pesos}, key=repr)
+    columnas = sorted({c for _f, c in pesos}, key=repr)
+    n = max(len(filas), len(columnas))
+
+    # Costo = -peso; las celdas sin arista (y las de relleno) cuestan 0
+    costo = [[0] * (n + 1) for _ in range(n + 1)]
+    for i, fila in enumerate(filas, start=1):
+        for j, columna in enumerate(columnas, start=1):
+            costo[i][j] = -pesos.get((fila, columna), 0)
+
+    # Método húngaro con potenciales (filas y columnas indexadas desde 1;
+    # la columna 0 es la ficticia desde la que crece cada camino)
+    infinito = float('inf')
+    u = [0] * (n + 1)
+    v = [0] * (n + 1)
+    dueno = [0] * (n + 1)          # dueno[j] = fila asignada a la columna j
+    camino = [0] * (n + 1)
+    for i in range(1, n + 1):
+        dueno[0] = i
+        j0 = 0
+        minimo = [infinito] * (n + 1)
+        usada = [False] * (n + 1)
+        while True:
+            usada[j0] = True
+            i0, delta, j1 = dueno[j0], infinito, 0
+            for j in range(1, n + 1):
+                if usada[j]:
+                    continue
+                actual = costo[i0][j] - u[i0] - v[j]
+                if actual < minimo[j]:
+                    minimo[j], camino[j] = actual, j0
+                if minimo[j] < delta:
+                    delta, j1 = minimo[j], j
+            for j in range(n + 1):
+                if usada[j]:
+                    u[dueno[j]] += delta
+                    v[j] -= delta
+                else:
+                    minimo[j] -= delta
+            j0 = j1
+            if dueno[j0] == 0:
+                break
+        while j0:
+            j1 = camino[j0]
+            dueno[j0] = dueno[j1]
+            j0 = j1
+
+    asignacion = {}
+    for j in range(1, len(columnas) + 1):
+        i = dueno[j]
+        if 1 <= i <= len(filas) and (filas[i - 1], columnas[j - 1]) in pesos:
+            asignacion[filas[i - 1]] = columnas[j - 1]
+    return asignacion
+
+
+def peso_total(pesos: Dict[Arista, int], asignacion: Dict[Hashable, Hashable]) -> int:
+    """Suma de los pesos de un emparejamiento."""
+    return sum(pesos[(fila, columna)] for fila, columna in asignacion.items())
+
+
+def componentes(aristas: List[Arista]) -> List[Set[Hashable]]:
+    """
+    Filas agrupadas por componente conexa (filas que comparten columnas).
+
+    Dos pagos que no comparten ninguna orden candidata no se influyen: se
+    pueden resolver por separado, con matrices mucho más chicas.
+    """
+    padre: Dict[Hashable, Hashable] = {}
+
+    def raiz(x):
+        while padre.setdefault(x, x) != x:
+            padre[x] = padre[padre[x]]
+            x = padre[x]
+        return x
+
+    for fila, columna in aristas:
+        padre[raiz(('f', fila))] = raiz(('c', columna))
+
+    grupos: Dict[Hashable, Set[Hashable]] = {}
+    for nodo in list(padre):
+        if nodo[0] == 'f':
+            grupos.setdefault(raiz(nodo), set()).add(nodo[1])
+    return list(grupos.values())
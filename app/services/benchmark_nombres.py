@@ -0,0 +1,198 @@
+"""
+Benchmark y concordancia del comparador de nombres de la conciliación.
+
+Compara app/services/nombres.py con el comparador anterior (dos
+SequenceMatcher por par, renormalizando en cada llamada), que se conserva
+aquí como referencia, sobre un corpus sintético y reproducible de pares de
+nombres venezolanos:
+
+    - misma persona: mayúsculas, apellidos primero, sin segundo nombre o
+      apellido, inicial, errores de tipeo, sufijos tipo "LLC"
+    - personas distintas: al azar, con el mismo nombre o el mismo apellido
+
+Reporta pares/segundo de ambos sobre una matriz pagadores × titulares como
+la de un lote de conciliación (el nuevo con la caché fría y caliente) y la
+concordancia por franja de los umbrales de ReconciliationService (alto
+>= 0.85, medio >= 0.65, bajo). Corre offline; lo ejecuta
+scripts/bench_nombres.py y lo usa el test de concordancia.
+"""
+import random
+import time
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Tuple
+
+from app.services import nombres
+
+_NOMBRES = [
+    'José', 'María', 'Luis', 'Ana', 'Carlos', 'Carmen', 'Jesús', 'Rosa',
+    'Pedro', 'Luisa', 'Juan', 'Elena', 'Miguel', 'Daniela', 'Andrés',
+    'Gabriela', 'Rafael', 'Valentina', 'Jorge', 'Mariana', 'Ricardo',
+    'Patricia', 'Alejandro', 'Yolanda', 'Fernando', 'Beatriz', 'Eduardo',
+    'Isabel', 'Víctor', 'Adriana', 'Orlando', 'Yusmary', 'Wilmer', 'Yorman',
+    'Franklin', 'Katherine', 'Johan', 'Yelitza', 'Nelson', 'Milagros',
+]
+_APELLIDOS = [
+    'Mora', 'Rodríguez', 'González', 'Pérez', 'Hernández', 'García',
+    'Martínez', 'López', 'Sánchez', 'Ramírez', 'Torres', 'Flores', 'Rivera',
+    'Gómez', 'Díaz', 'Reyes', 'Morales', 'Cruz', 'Ortiz', 'Gutiérrez',
+    'Chávez', 'Ramos', 'Ruiz', 'Álvarez', 'Mendoza', 'Castillo', 'Jiménez',
+    'Moreno', 'Romero', 'Herrera', 'Medina', 'Aguilar', 'Vargas', 'Castro',
+    'Guzmán', 'Fernández', 'Salazar', 'Suárez', 'Rojas', 'Barrios',
+    'Briceño', 'Villalobos', 'Zambrano', 'Marcano', 'Quintero',
+]
+
+# Franjas de _puntuar_nombre: 2 = nombre coincide, 1 = parecido, 0 = nada
+UMBRAL_ALTO = 0.85
+UMBRAL_MEDIO = 0.65
+
+
+def franja(similitud: float) -> int:
+    """Franja de puntaje de una similitud (2 alto, 1 medio, 0 bajo)."""
+    if similitud >= UMBRAL_ALTO:
+        return 2
+    return 1 if similitud >= UMBRAL_MEDIO else 0
+
+
+def similitud_referencia(uno: str, otro: str) -> float:
+    """Comparador anterior: SequenceMatcher directo y con palabras ordenadas."""
+    a, b = nombres.normalizar_nombre(uno), nombres.normalizar_nombre(otro)
+    if not a or not b:
+        return 0.0
+    directa = SequenceMatcher(None, a, b).ratio()
+    ordenada = SequenceMatcher(
+        None, ' '.join(sorted(a.split())), ' '.join(sorted(b.split()))
+    ).ratio()
+    return max(directa, ordenada)
+
+
+def pares_de_prueba(cantidad: int = 5000, semilla: int = 7) -> List[Tuple[str, str]]:
+    """
+    Corpus reproducible de pares (pagador, titular).
+
+    Tres de cada cinco pares son la misma persona escrita de otra forma; el
+    resto, personas distintas (un tercio con el mismo nombre de pila y otro
+    tercio con el mismo apellido).
+    """
+    azar = random.Random(semilla)
+
+    def persona():
+        nombre = [azar.choice(_NOMBRES)]
+        if azar.random() < 0.5:
+            nombre.append(azar.choice(_NOMBRES))
+        apellido = [azar.choice(_APELLIDOS)]
+        if azar.random() < 0.6:
+            apellido.append(azar.choice(_APELLIDOS))
+        return nombre, apellido
+
+    def tipeo(texto):
+        i = azar.randrange(1, len(texto) - 1)
+        dado = azar.random()
+        if dado < 0.33:
+            return texto[:i] + texto[i + 1:]
+        if dado < 0.66:
+            return texto[:i] + azar.choice('aeiourslnm') + texto[i + 1:]
+        return texto[:i - 1] + texto[i] + texto[i - 1] + texto[i + 1:]
+
+    def variante(nombre, apellido):
+        completo = ' '.join(nombre + apellido)
+        dado = azar.random()
+        if dado < 0.12:
+            return completo.upper()
+        if dado < 0.24:
+            return ' '.join(apellido + nombre)
+        if dado < 0.36:
+            return f'{nombre[0]} {apellido[0]}'
+        if dado < 0.48:
+            return tipeo(completo)
+        if dado < 0.56:
+            return f"{nombre[0][0]}. {' '.join(apellido)}"
+        if dado < 0.64:
+            return f'{completo} LLC'
+        if dado < 0.72:
+            return f'{apellido[0]} {nombre[0]}'.lower()
+        if dado < 0.80:
+            return tipeo(f'{nombre[0]} {apellido[0]}')
+        return completo
+
+    pares = []
+    for _ in range(cantidad * 3 // 5):
+        nombre, apellido = persona()
+        pares.append((' '.join(nombre + apellido), variante(nombre, apellido)))
+    while len(pares) < cantidad:
+        (nombre, apellido), (otro_nombre, otro_apellido) = persona(), persona()
+        dado = azar.random()
+        if dado < 0.3:
+            otro_nombre = nombre
+        elif dado < 0.6:
+            otro_apellido = apellido
+        pares.append((' '.join(nombre + apellido), ' '.join(otro_nombre + otro_apellido)))
+    return pares
+
+
+class BenchmarkNombres:
+    """Velocidad y concordancia del comparador nuevo frente al anterior."""
+
+    def __init__(self, pares: List[Tuple[str, str]]) -> None:
+        self.pares = pares
+
+    def concordancia(self) -> dict:
+        """
+        Franjas del comparador nuevo frente a las del anterior.
+
+        Returns:
+            {'pares', 'concordancia' (fracción con la misma franja),
+            'saltos' (pares que pasan de alto a bajo o al revés) y
+            'matriz' {'anterior->nuevo': cantidad}}.
+        """
+        matriz: Dict[str, int] = {}
+        iguales = saltos = 0
+        for uno, otro in self.pares:
+            antes = franja(similitud_referencia(uno, otro))
+            ahora = franja(nombres.similitud(uno, otro))
+            clave = f'{antes}->{ahora}'
+            matriz[clave] = matriz.get(clave, 0) + 1
+            iguales += antes == ahora
+            saltos += abs(antes - ahora) == 2
+        return {
+            'pares': len(self.pares),
+            'concordancia': round(iguales / len(self.pares), 4) if self.pares else 1.0,
+            'saltos': saltos,
+            'matriz': dict(sorted(matriz.items())),
+        }
+
+    @staticmethod
+    def _medir(comparador: Callable[[str, str], float], pagadores: List[str],
+               titulares: List[str]) -> float:
+        """Pares por segundo de `comparador` sobre pagadores × titulares."""
+        inicio = time.perf_counter()
+        for pagador in pagadores:
+            for titular in titulares:
+                comparador(pagador, titular)
+        segundos = time.perf_counter() - inicio
+        return round(len(pagadores) * len(titulares) / segundos, 1)
+
+    def velocidad(self, filas: int = 100) -> dict:
+        """
+        Pares/segundo del anterior y del nuevo (caché fría y caliente).
+
+        Args:
+            filas: Pagadores y titulares de la matriz (filas × filas pares):
+                como en un lote, cada nombre aparece en muchos pares.
+        """
+        pagadores = [uno for uno, _otro in self.pares[:filas]]
+        titulares = [otro for _uno, otro in self.pares[:filas]]
+        anterior = self._medir(similitud_referencia, pagadores, titulares)
+        nombres.forma_nombre.cache_clear()
+        fria = self._medir(nombres.similitud, pagadores, titulares)
+        caliente = self._medir(nombres.similitud, pagadores, titulares)
+        return {
+            'pares': len(pagadores) * len(titulares),
+            'anterior': anterior,
+            'nuevo_cache_fria': fria,
+            'nuevo_cache_caliente': caliente,
+            'aceleracion': round(caliente / anterior, 1) if anterior else None,
+        }
+
+    def correr(self) -> dict:
+        """Concordancia y velocidad en un solo informe."""
+        return {'concordancia': self.concordancia(), 'velocidad': self.velocidad()}
@@ -8,24 +8,37 @@ RESPONSABILIDADES:
 - Validaciones y verificaciones
 """
 from app.services.base_service import BaseService
+from app.services.cache_service import get_redis_client
 from app.models.blacklist import (
-    BlacklistEntry, BlacklistAppeal,
+    BlacklistEntry, BlacklistAppeal, BlacklistIdentifier,
     BlacklistType, BlacklistCategory, BlacklistStatus, AppealStatus
 )
 from app.models.user import User
 from app.models.order import Order, OrderStatus
 from app.models import db
+from app.utils.bloom import BloomFilter
 from datetime import datetime
 from typing import Optional, Dict, Any, List, Tuple
-from sqlalchemy import or_
+from sqlalchemy import or_, tuple_
 import json
+import threading
 
 
 class BlacklistService(BaseService):
     """
     Servicio para gestión completa de blacklist.
     """
-    
+
+    # Clave Redis con la versión del índice de identificadores. Cada cambio en
+    # la blacklist la incrementa; cada worker reconstruye su filtro en memoria
+    # cuando ve una versión distinta de la que tiene cargada.
+    FILTER_VERSION_KEY = 'blacklist:filter_version'
+
+    # Filtro de Bloom de identificadores activos (uno por proceso/worker)
+    _filter: Optional[BloomFilter] = None
+    _filter_version: Optional[str] = None
+    _filter_lock = threading.Lock()
+
     # ==========================================
     # CRUD BLACKLIST
     # ==========================================
@@ -236,6 +249,7 @@ class BlacklistService(BaseService):
 
             if not entry.save():
                 return False, "Error al guardar el reporte en la base de datos", None
+            cls._on_entry_changed(entry)
 
             # 6. Efectos secundarios si hay user_id
             if user_id and user:
@@ -346,7 +360,8 @@ class BlacklistService(BaseService):
             
             if not entry.save():
                 return False, "Error al actualizar el reporte"
-            
+            cls._on_entry_changed(entry)
+
             cls.log_action('blacklist_status_updated', {
                 'entry_id': blacklist_id,
                 'old_status': old_status.value,
@@ -558,14 +573,11 @@ class BlacklistService(BaseService):
             (is_blacklisted, reason)
         """
         try:
-            active_block = BlacklistEntry.query.filter(
-                BlacklistEntry.user_id == user_id,
-                BlacklistEntry.status == BlacklistStatus.ACTIVE
-            ).first()
-            
-            if active_block and active_block.is_active_block():
-                return True, active_block.reason
-            
+            pairs = BlacklistIdentifier.pares_de(user_id=user_id)
+            for entry in cls._find_by_pairs(pairs):
+                if entry.is_active_block():
+                    return True, entry.reason
+
             return False, None
             
         except Exception as e:
@@ -580,38 +592,141 @@ class BlacklistService(BaseService):
                                      dni: Optional[str] = None) -> Tuple[bool, Optional[BlacklistEntry]]:
         """
         Verificar si algún identificador está en blacklist.
+
+        Los identificadores se normalizan antes de comparar, así que
+        "0414-123.45.67" encuentra un reporte guardado como "+584141234567".
+        Si el filtro en memoria descarta todos, no se consulta PostgreSQL.
         
         Returns:
             (is_blacklisted, blacklist_entry)
         """
         try:
-            or_conditions = []
-            
-            if telegram_id:
-                or_conditions.append(BlacklistEntry.telegram_id == telegram_id)
-            if phone:
-                or_conditions.append(BlacklistEntry.phone == phone)
-            if email:
-                or_conditions.append(BlacklistEntry.email == email)
-            if dni:
-                or_conditions.append(BlacklistEntry.dni == dni)
-            
-            if not or_conditions:
-                return False, None
-            
-            entry = BlacklistEntry.query.filter(
-                BlacklistEntry.status == BlacklistStatus.ACTIVE,
-                or_(*or_conditions)
-            ).first()
-            
-            if entry and entry.is_active_block():
-                return True, entry
-            
+            pairs = BlacklistIdentifier.pares_de(
+                telegram_id=telegram_id, phone=phone, email=email, dni=dni
+            )
+            for entry in cls._find_by_pairs(pairs):
+                if entry.is_active_block():
+                    return True, entry
+
             return False, None
             
         except Exception as e:
             cls.log_error('check_identifiers_failed', {'error': str(e)})
             return False, None
+
+    # ==========================================
+    # ÍNDICE NORMALIZADO Y FILTRO EN MEMORIA
+    # ==========================================
+
+    @classmethod
+    def sync_identifiers(cls, entry: BlacklistEntry) -> None:
+        """
+        Regenerar las filas de blacklist_identifiers de un reporte.
+
+        Args:
+            entry: Reporte ya guardado (con id).
+        """
+        BlacklistIdentifier.query.filter_by(blacklist_id=entry.id).delete()
+        for tipo, valor in entry.get_normalized_pairs():
+            db.session.add(BlacklistIdentifier(
+                blacklist_id=entry.id, tipo=tipo, valor=valor
+            ))
+        db.session.commit()
+
+    @classmethod
+    def rebuild_identifier_index(cls) -> int:
+        """
+        Reconstruir el índice normalizado completo desde la tabla blacklist.
+
+        Lo usa el script de migración para poblar los reportes existentes.
+
+        Returns:
+            Cantidad de reportes indexados.
+        """
+        entries = BlacklistEntry.query.all()
+        for entry in entries:
+            cls.sync_identifiers(entry)
+        cls._bump_filter_version()
+        return len(entries)
+
+    @classmethod
+    def _on_entry_changed(cls, entry: BlacklistEntry) -> None:
+        """Reindexar un reporte e invalidar los filtros de todos los workers."""
+        try:
+            cls.sync_identifiers(entry)
+        except Exception as e:
+            db.session.rollback()
+            cls.log_error('sync_identifiers_failed', {'error': str(e), 'entry_id': entry.id})
+        cls._bump_filter_version()
+
+    @classmethod
+    def _bump_filter_version(cls) -> None:
+        """Publicar una versión nueva del índice (los workers reconstruyen)."""
+        with cls._filter_lock:
+            cls._filter = None
+        try:
+            get_redis_client().incr(cls.FILTER_VERSION_KEY)
+        except Exception as e:
+            cls.log_error('filter_version_bump_failed', {'error': str(e)})
+
+    @classmethod
+    def _build_filter(cls) -> BloomFilter:
+        """Filtro de Bloom con las claves 'tipo:valor' de los reportes ACTIVE."""
+        rows = db.session.query(
+            BlacklistIdentifier.tipo, BlacklistIdentifier.valor
+        ).join(BlacklistEntry).filter(
+            BlacklistEntry.status == BlacklistStatus.ACTIVE
+        ).all()
+        return BloomFilter.desde(f"{tipo}:{valor}" for tipo, valor in rows)
+
+    @classmethod
+    def _get_filter(cls) -> Optional[BloomFilter]:
+        """
+        Filtro en memoria del worker, reconstruido si cambió la versión.
+
+        Returns:
+            El filtro vigente, o None si no se puede saber si está al día
+            (Redis caído): en ese caso se consulta siempre la base de datos.
+        """
+        try:
+            version = get_redis_client().get(cls.FILTER_VERSION_KEY) or '0'
+        except Exception as e:
+            cls.log_warning(f"Versión del filtro no disponible, se consulta la BD: {e}")
+            return None
+
+        with cls._filter_lock:
+            if cls._filter is None or cls._filter_version != version:
+                cls._filter = cls._build_filter()
+                cls._filter_version = version
+            return cls._filter
+
+    @classmethod
+    def _find_by_pairs(cls, pairs: List[Tuple[str, str]]) -> List[BlacklistEntry]:
+        """
+        Reportes con status ACTIVE que contienen alguno de los pares dados.
+
+        Si el filtro en memoria descarta todos los pares no toca PostgreSQL;
+        si no, hace una sola búsqueda por el índice (tipo, valor).
+
+        Returns:
+            Reportes coincidentes, el más reciente primero.
+        """
+        if not pairs:
+            return []
+
+        bloom = cls._get_filter()
+        if bloom is not None and not any(
+            f"{tipo}:{valor}" in bloom for tipo, valor in pairs
+        ):
+            return []
+
+        entries = BlacklistEntry.query.join(BlacklistIdentifier).filter(
+            BlacklistEntry.status == BlacklistStatus.ACTIVE,
+            tuple_(BlacklistIdentifier.tipo, BlacklistIdentifier.valor).in_(pairs)
+        ).order_by(BlacklistEntry.blocked_at.desc()).all()
+        # Un reporte que coincide por varios identificadores viene repetido
+        # (sin DISTINCT: la columna JSON no admite comparación en PostgreSQL)
+        return list(dict.fromkeys(entries))
     
     # ==========================================
     # APELACIONES
@@ -685,7 +800,8 @@ class BlacklistService(BaseService):
                 return False, "Error al guardar la apelación", None
 
             entry.status = BlacklistStatus.APPEALED
-            entry.save()
+            if entry.save():
+                cls._on_entry_changed(entry)
 
             cls._notify_new_appeal(entry, appellant_name)
 
@@ -727,7 +843,8 @@ class BlacklistService(BaseService):
         else:
             entry = appeal.blacklist_entry
             entry.status = BlacklistStatus.ACTIVE
-            entry.save()
+            if entry.save():
+                cls._on_entry_changed(entry)
 
         return True, ""
 
@@ -846,26 +963,13 @@ class BlacklistService(BaseService):
                          phone: Optional[str],
                          email: Optional[str],
                          dni: Optional[str]) -> Optional[BlacklistEntry]:
-        """Verificar si ya existe un reporte activo con estos datos"""
+        """Verificar si ya existe un reporte activo con estos datos (normalizados)"""
         try:
-            or_conditions = []
-            
-            if telegram_id:
-                or_conditions.append(BlacklistEntry.telegram_id == telegram_id)
-            if phone:
-                or_conditions.append(BlacklistEntry.phone == phone)
-            if email:
-                or_conditions.append(BlacklistEntry.email == email)
-            if dni:
-                or_conditions.append(BlacklistEntry.dni == dni)
-            
-            if not or_conditions:
-                return None
-            
-            return BlacklistEntry.query.filter(
-                BlacklistEntry.status == BlacklistStatus.ACTIVE,
-                or_(*or_conditions)
-            ).first()
+            pairs = BlacklistIdentifier.pares_de(
+                telegram_id=telegram_id, phone=phone, email=email, dni=dni
+            )
+            matches = cls._find_by_pairs(pairs)
+            return matches[0] if matches else None
             
         except Exception as e:
             cls.log_error('check_duplicates_failed', {'error': str(e)})
@@ -2,8 +2,10 @@
 Calculator Service - Cálculos de conversión de divisas.
 Calcula montos, comisiones y tasas aplicando las fórmulas del sistema.
 """
+from datetime import datetime
 from decimal import Decimal
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+from app.models import db
 from app.models.currency import Currency
 from app.models.payment_method import PaymentMethod
 from app.models.exchange_rate import ExchangeRate
@@ -398,3 +400,117 @@ class CalculatorService:
             'resultado': resultado,
             'tipo': 'method_to_fiat',
         }
+
+
+class PricingSnapshot:
+    """
+    Foto en memoria de todo lo que necesita calcular_pago_recibido.
+
+    Se captura UNA vez al inicio de una corrida de ingesta (3 consultas de
+    columnas, sin hidratar modelos) y después cada pago se cotiza desde
+    memoria. Además de ahorrar ~3 consultas por correo, garantiza que todos
+    los pagos de la corrida se cotizan con la misma matriz, aunque un operador
+    cambie una tasa a mitad de la corrida.
+
+    Attributes:
+        capturado_en: Momento (UTC) en que se tomó la foto.
+    """
+
+    def __init__(
+        self,
+        metodos: List[Tuple[int, str, str]],
+        monedas: Dict[str, int],
+        cotizaciones: Dict[Tuple[int, int], Tuple[int, Decimal]],
+        capturado_en: Optional[datetime] = None
+    ) -> None:
+        """
+        Args:
+            metodos: Tuplas (id, code, name) de PaymentMethod, ordenadas por id.
+            monedas: Código (tal cual está en la BD) -> id de las monedas ACTIVAS.
+            cotizaciones: (payment_method_id, currency_id) -> (quote_id,
+                final_value).
+            capturado_en: Momento de la captura (por defecto, ahora).
+        """
+        self._metodos = metodos
+        # Claves tal cual en la BD: se buscan con el código del llamador en
+        # mayúsculas, como el filter_by(code=...upper()) exacto del calculador
+        self._metodos_por_code = {}
+        for metodo_id, code, _ in metodos:
+            self._metodos_por_code.setdefault(code, metodo_id)
+        self._monedas = monedas
+        self._cotizaciones = cotizaciones
+        self.capturado_en = capturado_en or datetime.utcnow()
+
+    @classmethod
+    def capturar(cls) -> 'PricingSnapshot':
+        """Carga métodos, monedas activas y valores finales de la matriz."""
+        metodos = [
+            (m.id, m.code, m.name)
+            for m in db.session.query(
+                PaymentMethod.id, PaymentMethod.code, PaymentMethod.name
+            ).order_by(PaymentMethod.id).all()
+        ]
+        monedas = {}
+        for c in (db.session.query(Currency.id, Currency.code)
+                  .filter(Currency.active.is_(True)).order_by(Currency.id).all()):
+            monedas.setdefault(c.code, c.id)
+        cotizaciones = {}
+        for q in db.session.query(
+            Quote.id, Quote.payment_method_id, Quote.currency_id, Quote.final_value
+        ).order_by(Quote.id).all():
+            # Igual que Quote.query.filter_by(...).first(): gana la primera
+            cotizaciones.setdefault(
+                (q.payment_method_id, q.currency_id), (q.id, q.final_value)
+            )
+        return cls(metodos, monedas, cotizaciones)
+
+    def _metodo_id(self, metodo_code: str) -> Optional[int]:
+        """Id del método por código exacto (en mayúsculas), con el mismo respaldo por nombre."""
+        metodo_id = self._metodos_por_code.get(metodo_code.upper())
+        if metodo_id is not None:
+            return metodo_id
+        buscado = metodo_code.lower()
+        for candidato_id, _code, name in self._metodos:
+            if buscado in (name or '').lower():
+                return candidato_id
+        return None
+
+    def calcular_pago_recibido(
+        self,
+        monto_base: float,
+        currency_code: str,
+        metodo_code: str
+    ) -> dict:
+        """
+        Mismo contrato que CalculatorService.calcular_pago_recibido, en memoria.
+
+        Args:
+            monto_base: Monto neto en USD.
+            currency_code: Codigo de moneda local (VES, COP, ...).
+            metodo_code: Codigo del metodo ('paypal', 'zelle', 'wise', ...).
+
+        Returns:
+            dict con valor_a_pagar, tasa_aplicada, cotizacion_id, moneda_local,
+            o dict con 'error' si no hay metodo/moneda/cotizacion.
+        """
+        metodo_id = self._metodo_id(metodo_code)
+        if metodo_id is None:
+            return {'error': f'Metodo {metodo_code} no encontrado'}
+
+        currency_id = self._monedas.get(currency_code.upper())
+        if currency_id is None:
+            return {'error': f'Moneda {currency_code} no encontrada o inactiva'}
+
+        quote_id, final_value = self._cotizaciones.get(
+            (metodo_id, currency_id), (None, None)
+        )
+        if quote_id is None or not final_value:
+            return {'error': f'No hay cotizacion {metodo_code} para {currency_code}'}
+
+        tasa = float(final_value)
+        return {
+            'valor_a_pagar': round(monto_base * tasa, 2),
+            'tasa_aplicada': tasa,
+            'cotizacion_id': quote_id,
+            'moneda_local': currency_code.upper(),
+        }
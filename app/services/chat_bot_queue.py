@@ -0,0 +1,189 @@
+"""
+Cola de turnos del bot del chat web (Redis), fuera del request HTTP.
+
+El mensaje del cliente se guarda y se confirma al instante; el turno del bot
+(ConversationHandler.handle_message: varias consultas, estado en Redis,
+borradores de orden) lo corre un worker aparte, y la respuesta le llega al
+widget por el canal de siempre (SSE / marca de agua del polling, ver
+ChatService._announce_message).
+
+Orden estricto por conversación, en paralelo entre conversaciones:
+
+    chat:bot:q:<id>     lista FIFO de turnos de la conversación
+    chat:bot:ready      conversaciones con turnos por atender
+    chat:bot:lock:<id>  worker que está drenando la conversación
+    chat:bot:worker     latido de los workers
+
+Un worker saca una conversación de ``ready``, toma su lock y drena su lista
+de a un turno; si el lock lo tiene otro, la suelta (el dueño drena también
+ese turno). Al soltar el lock, si quedaron turnos, la vuelve a anunciar. Un
+barrido periódico re-anuncia las listas huérfanas (p. ej. de un worker que
+murió con el lock tomado, cuando este vence).
+
+Si no hay latido (ningún worker corriendo, o Redis caído) no se encola:
+ChatService responde en el request como antes.
+
+Lo ejecuta scripts/chat_bot_worker.py (systemd).
+"""
+import json
+import logging
+import secrets
+import threading
+import time
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _redis():
+    """Cliente Redis de la app (importado tarde, como en cache_service)."""
+    from app.services.cache_service import get_redis_client
+    return get_redis_client()
+
+
+class ChatBotQueue:
+    """
+    Productor (encolar) y consumidor (correr) de turnos del bot.
+
+    Attributes:
+        TTL_LATIDO: Segundos que un worker se da por vivo sin renovar.
+        TTL_LOCK: Tope de un turno; si el worker muere, la conversación se
+            libera al vencer.
+        ESPERA: Timeout del BLPOP (también marca el ritmo del latido).
+        INTERVALO_BARRIDO: Segundos entre barridos de listas huérfanas.
+    """
+
+    PREFIJO_COLA = 'chat:bot:q:'
+    LISTOS = 'chat:bot:ready'
+    PREFIJO_LOCK = 'chat:bot:lock:'
+    LATIDO = 'chat:bot:worker'
+
+    TTL_LATIDO = 30
+    TTL_LOCK = 120
+    ESPERA = 5
+    INTERVALO_BARRIDO = 30
+
+    def __init__(self, procesar: Callable[[int, dict], None], redis_client=None,
+                 hilos: int = 1) -> None:
+        """
+        Args:
+            procesar: Corre un turno: procesar(conversation_id, turno).
+            redis_client: Cliente Redis (por defecto el de la app).
+            hilos: Conversaciones que se atienden en paralelo.
+        """
+        self.procesar = procesar
+        self.redis = redis_client or _redis()
+        self.hilos = max(1, hilos)
+        self._ultimo_barrido = 0.0
+
+    # ── Productor (request HTTP) ──────────────────────────────────────────
+
+    @classmethod
+    def encolar(cls, conversation_id: int, turno: dict, redis_client=None) -> bool:
+        """
+        Encolar un turno del bot para la conversación.
+
+        Args:
+            conversation_id: Conversación del chat web.
+            turno: {'kind': 'text' | 'proof', 'payload': texto o URL}.
+            redis_client: Cliente Redis (tests).
+
+        Returns:
+            True si quedó encolado; False si no hay worker vivo o Redis
+            falló (el llamador corre el turno en el request).
+        """
+        try:
+            r = redis_client or _redis()
+            if not r.exists(cls.LATIDO):
+                return False
+            turno = dict(turno, enqueued_at=time.time())
+            r.rpush(f'{cls.PREFIJO_COLA}{conversation_id}', json.dumps(turno))
+            r.rpush(cls.LISTOS, conversation_id)
+            return True
+        except Exception as exc:
+            logger.error(f"No se pudo encolar el turno del bot: {exc}")
+            return False
+
+    # ── Consumidor (worker) ───────────────────────────────────────────────
+
+    def correr(self, detener: Optional[threading.Event] = None) -> None:
+        """
+        Atender la cola con ``hilos`` hilos hasta que `detener` se active.
+
+        Args:
+            detener: Evento de parada (SIGTERM en el script). None = infinito.
+        """
+        detener = detener or threading.Event()
+        hilos = [
+            threading.Thread(target=self._bucle, args=(detener,),
+                             name=f'chat-bot-{i}', daemon=True)
+            for i in range(self.hilos)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+    def _bucle(self, detener: threading.Event) -> None:
+        """Bucle de un hilo: latido, siguiente conversación y barrido."""
+        while not detener.is_set():
+            try:
+                self.redis.set(self.LATIDO, 1, ex=self.TTL_LATIDO)
+                llegada = self.redis.blpop([self.LISTOS], timeout=self.ESPERA)
+                if llegada:
+                    self.atender(int(llegada[1]))
+                if time.monotonic() - self._ultimo_barrido > self.INTERVALO_BARRIDO:
+                    self._ultimo_barrido = time.monotonic()
+                    self.barrer()
+            except Exception as exc:
+                logger.error(f"Cola del bot: {exc}; reintento en {self.ESPERA}s")
+                detener.wait(self.ESPERA)
+
+    def atender(self, conversation_id: int) -> int:
+        """
+        Drenar en orden los turnos de una conversación, si nadie la tiene.
+
+        Returns:
+            Turnos procesados (0 si otro worker la está atendiendo).
+        """
+        lock = f'{self.PREFIJO_LOCK}{conversation_id}'
+        cola = f'{self.PREFIJO_COLA}{conversation_id}'
+        dueno = secrets.token_hex(8)
+        if not self.redis.set(lock, dueno, nx=True, ex=self.TTL_LOCK):
+            return 0
+
+        procesados = 0
+        try:
+            while True:
+                crudo = self.redis.lpop(cola)
+                if crudo is None:
+                    break
+                self.redis.expire(lock, self.TTL_LOCK)
+                try:
+                    self.procesar(conversation_id, json.loads(crudo))
+                except Exception as exc:
+                    # Un turno que falla no frena a los siguientes
+                    logger.error(f"Turno del bot en conversación {conversation_id}: {exc}")
+                procesados += 1
+        finally:
+            if self.redis.get(lock) == dueno:
+                self.redis.delete(lock)
+            # Un turno encolado mientras se soltaba el lock: su anuncio pudo
+            # haberlo descartado otro worker al no conseguir el lock.
+            if self.redis.llen(cola):
+                self.redis.rpush(self.LISTOS, conversation_id)
+        return procesados
+
+    def barrer(self) -> List[int]:
+        """Re-anunciar las conversaciones con turnos y sin dueño."""
+        huerfanas = []
+        for clave in self.redis.scan_iter(match=f'{self.PREFIJO_COLA}*', count=100):
+            conversation_id = int(str(clave).rsplit(':', 1)[1])
+            if self.redis.exists(f'{self.PREFIJO_LOCK}{conversation_id}'):
+                continue
+            if self.redis.llen(clave):
+                self.redis.rpush(self.LISTOS, conversation_id)
+                huerfanas.append(conversation_id)
+        if huerfanas:
+            logger.warning(f"Cola del bot: re-anunciadas {huerfanas}")
+        return huerfanas
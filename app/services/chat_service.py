@@ -2,17 +2,24 @@
 Lógica del chat web operador-cliente.
 
 Resuelve (o crea) el ``User`` de canal webchat y la ``ChatConversation`` del
-visitante, guarda mensajes y expone lo nuevo para el polling. En la Fase 1 el
-bot no responde: el operador atiende manualmente desde el dashboard.
+visitante, guarda mensajes y expone lo nuevo para el polling. Los mensajes de
+operador y bot (y el "escribiendo") se publican además en un canal Redis por
+conversación, que el widget escucha por SSE (``/chat/stream``), y suben su
+marca de agua en Redis, con la que el polling de ``/chat/nuevos`` contesta "no
+hay nada" sin tocar Postgres. Los turnos del bot corren fuera del request, en
+el worker de app/services/chat_bot_queue.py. En la Fase 1 el bot no responde:
+el operador atiende manualmente desde el dashboard.
 """
 import html as html_lib
+import json
 import os
 import re
-import secrets
-from datetime import datetime
-from typing import List, Optional, Tuple
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from app.services.base_service import BaseService
+from app.services.proof_storage import ProofStorage, ProofStorageError
 from app.models import db
 from app.models.user import User
 from app.models.chat import ChatConversation, ChatMessage
@@ -61,6 +68,7 @@ class ChatService(BaseService):
                 web_user.save()
 
         conv.save()
+        cls._remember_conversation(anon_id, conv.id)
         return conv
 
     @classmethod
@@ -99,7 +107,7 @@ class ChatService(BaseService):
         conv.save()
 
         if cls.is_bot_active_for(conv):
-            cls._bot_reply(conv, text)
+            cls._bot_turn(conv, 'text', text)
         else:
             cls._notify_operators(conv, text)
 
@@ -113,6 +121,48 @@ class ChatService(BaseService):
         msgs = ChatMessage.get_since(conversation_id, after_id)
         return [m.to_dict() for m in msgs if m.sender != 'client']
 
+    @classmethod
+    def poll_for_client(cls, anon_id: str, after_id: int) -> dict:
+        """
+        Respuesta del polling del widget (``/chat/nuevos``).
+
+        Camino rápido: una sola lectura de Redis (ver _poll_state) trae la
+        conversación del visitante, su marca de agua y el "escribiendo" del
+        operador. Si la marca no supera ``after_id`` no hay nada nuevo y se
+        responde sin tocar Postgres. Solo si la supera, o si a Redis le falta
+        algún dato, se consulta la BD (y se repone lo que faltaba).
+
+        Args:
+            anon_id: Id de sesión anónima del visitante.
+            after_id: Último mensaje que ya tiene el widget.
+
+        Returns:
+            Dict con conversation_id (None si el visitante aún no escribió),
+            messages y typing.
+        """
+        estado = cls._poll_state(anon_id)
+        if estado is not None:
+            conversation_id, marca, typing = estado
+            if conversation_id == 0:
+                return {'conversation_id': None, 'messages': [], 'typing': False}
+            if marca is not None and marca <= after_id:
+                return {'conversation_id': conversation_id, 'messages': [],
+                        'typing': typing}
+
+        conv = ChatConversation.get_for_anon(anon_id)
+        if conv is None:
+            cls._remember_conversation(anon_id, 0)
+            return {'conversation_id': None, 'messages': [], 'typing': False}
+
+        if estado is None or estado[1] is None:
+            cls._remember_conversation(anon_id, conv.id)
+            cls._raise_high_water(conv.id, ChatMessage.last_staff_id(conv.id))
+        return {
+            'conversation_id': conv.id,
+            'messages': cls.get_new_for_client(conv.id, after_id),
+            'typing': cls.is_typing(conv.id, 'operator'),
+        }
+
     @classmethod
     def history(cls, conversation_id: int) -> List[dict]:
         """Todos los mensajes de una conversación (para abrir el hilo)."""
@@ -121,16 +171,21 @@ class ChatService(BaseService):
 
     # ── Operador ───────────────────────────────────────────────────────────
 
+    # Margen hacia atrás del cursor del panel: una fila cuyo updated_at se fijó
+    # antes del cursor pero cuyo commit llegó después igual se vuelve a enviar
+    # (el panel las fusiona por id, repetir no cuesta nada).
+    SYNC_OVERLAP = timedelta(seconds=5)
+
     @classmethod
     def list_conversations(cls, limit: int = 50) -> List[dict]:
         """Conversaciones ordenadas por actividad reciente (para el panel)."""
-        convs = (
-            ChatConversation.query
-            .order_by(ChatConversation.last_message_at.desc().nullslast())
-            .limit(limit)
-            .all()
-        )
-        return [{
+        return [cls._conversation_row(c)
+                for c in ChatConversation.get_recent(limit)]
+
+    @classmethod
+    def _conversation_row(cls, c: ChatConversation) -> dict:
+        """Fila del listado de conversaciones del panel."""
+        return {
             'id': c.id,
             'name': c.display_name,
             'country': c.country,
@@ -138,7 +193,54 @@ class ChatService(BaseService):
             'bot_paused': c.bot_paused,
             'is_client': c.web_user_id is not None,
             'last_time': cls._short_time(c.last_message_at),
-        } for c in convs]
+            'last_message_at': (c.last_message_at.isoformat()
+                                if c.last_message_at else None),
+        }
+
+    @classmethod
+    def sync_conversations(cls, since: Optional[datetime],
+                           visible_ids: Iterable[int] = (),
+                           limit: int = 50) -> dict:
+        """
+        Delta del listado de conversaciones para el panel del operador.
+
+        Sin cursor (primera carga o resincronización) devuelve las ``limit``
+        más recientes; con cursor, solo las modificadas desde entonces
+        (``updated_at`` cambia con cada mensaje, lectura o pausa), con una
+        consulta por índice. Si cambiaron más de ``limit`` se responde como
+        carga completa. El "escribiendo" de todas las conversaciones visibles
+        sale de un solo MGET a Redis.
+
+        Args:
+            since: Cursor que devolvió la sincronización anterior, o None.
+            visible_ids: Conversaciones que el panel tiene en pantalla.
+            limit: Tamaño del listado.
+
+        Returns:
+            Dict con cursor (ISO, para la próxima llamada), full (True si
+            ``conversations`` reemplaza el listado), conversations (filas
+            nuevas o cambiadas), unread_total (solo si hubo cambios) y typing
+            {id: bool}.
+        """
+        cursor = datetime.utcnow()
+        full = since is None
+        if not full:
+            convs = ChatConversation.get_changed_since(
+                since - cls.SYNC_OVERLAP, limit + 1)
+            full = len(convs) > limit
+        if full:
+            convs = ChatConversation.get_recent(limit)
+
+        respuesta = {
+            'cursor': cursor.isoformat(),
+            'full': full,
+            'conversations': [cls._conversation_row(c) for c in convs],
+            'typing': cls.typing_states(
+                set(visible_ids) | {c.id for c in convs}, 'client'),
+        }
+        if full or convs:
+            respuesta['unread_total'] = ChatConversation.total_unread()
+        return respuesta
 
     @classmethod
     def mark_read_by_operator(cls, conversation_id: int) -> None:
@@ -183,6 +285,7 @@ class ChatService(BaseService):
         conv.bot_paused = True
         conv.save()
 
+        cls._announce_message(msg)
         cls._notify_client(conv, text)
         return msg
 
@@ -261,6 +364,7 @@ class ChatService(BaseService):
         from app.services.cache_service import CacheService
         CacheService.set(cls._typing_key(conversation_id, who), 1,
                          ttl=cls._TYPING_TTL)
+        cls._publish(conversation_id, 'typing', {'who': who})
 
     @classmethod
     def is_typing(cls, conversation_id: int, who: str) -> bool:
@@ -268,7 +372,253 @@ class ChatService(BaseService):
         from app.services.cache_service import CacheService
         return bool(CacheService.get(cls._typing_key(conversation_id, who)))
 
+    @classmethod
+    def typing_states(cls, conversation_ids: Iterable[int], who: str
+                      ) -> Dict[int, bool]:
+        """"Escribiendo" de varias conversaciones en un solo MGET (fail-open)."""
+        ids = sorted(conversation_ids)
+        if not ids:
+            return {}
+        try:
+            from app.services.cache_service import get_redis_client
+            valores = get_redis_client().mget(
+                [cls._typing_key(i, who) for i in ids])
+        except Exception as exc:
+            cls.log_error("No se pudo leer el estado de escritura", exc)
+            valores = [None] * len(ids)
+        return {i: bool(v) for i, v in zip(ids, valores)}
+
+    # ── Tiempo real: canal Redis por conversación y stream SSE ─────────────
+
+    # Latido del stream (mantiene viva la conexión y detecta al cliente que se
+    # fue) y vida máxima de cada stream: al cerrarse, el navegador reconecta
+    # solo y manda Last-Event-ID, así ningún hilo queda tomado indefinidamente.
+    STREAM_HEARTBEAT = 15
+    STREAM_MAX_SECONDS = 300
+    STREAM_RETRY_MS = 3000
+
+    @staticmethod
+    def _channel(conversation_id: int) -> str:
+        """Canal pub/sub de una conversación."""
+        return f"chat:channel:{conversation_id}"
+
+    @classmethod
+    def _publish(cls, conversation_id: int, kind: str, data: dict) -> None:
+        """Publicar un evento ('message' o 'typing') en el canal. Best-effort."""
+        try:
+            from app.services.cache_service import get_redis_client
+            get_redis_client().publish(
+                cls._channel(conversation_id),
+                json.dumps({'kind': kind, 'data': data}, ensure_ascii=False),
+            )
+        except Exception as exc:
+            cls.log_error("No se pudo publicar el evento de chat", exc)
+
+    @classmethod
+    def _announce_message(cls, msg: ChatMessage) -> None:
+        """
+        Difundir un mensaje de operador/bot recién guardado.
 
+        Sube la marca de agua de la conversación (polling) y lo publica en su
+        canal (SSE). Se llama después del commit: la marca nunca anuncia un
+        mensaje que la BD todavía no muestra.
+        """
+        cls._raise_high_water(msg.conversation_id, msg.id)
+        cls._publish(msg.conversation_id, 'message', msg.to_dict())
+
+    # ── Marca de agua del polling (Redis) ──────────────────────────────────
+
+    # chat:hwm:<id> guarda el id del último mensaje de operador/bot de la
+    # conversación (lo único que el polling le devuelve al widget) y
+    # chat:anon:<anon_id> el id de la conversación del visitante, o 0 si aún
+    # no escribió (con TTL corto y NX: al escribir se sobrescribe, pero el 0
+    # nunca pisa un id real).
+    _HWM_TTL = 86400
+    _ANON_TTL = 7 * 86400
+    _ANON_NONE_TTL = 300
+
+    # Solo sube la marca (dos mensajes guardados a la vez pueden llegar aquí
+    # en cualquier orden) y renueva su TTL.
+    _RAISE_LUA = """
+local actual = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tonumber(ARGV[1]) > actual then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+else
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+    # Conversación del visitante + su marca + "escribiendo" del operador, en
+    # un solo viaje a Redis. Devuelve nil si no se conoce la conversación.
+    _POLL_LUA = """
+local conv = redis.call('GET', KEYS[1])
+if not conv then
+    return nil
+end
+if conv == '0' then
+    return {'0', '', 0}
+end
+local marca = redis.call('GET', 'chat:hwm:' .. conv) or ''
+return {conv, marca, redis.call('EXISTS', 'chat:typing:' .. conv .. ':operator')}
+"""
+
+    @staticmethod
+    def _hwm_key(conversation_id: int) -> str:
+        """Clave de la marca de agua de una conversación."""
+        return f"chat:hwm:{conversation_id}"
+
+    @staticmethod
+    def _anon_key(anon_id: str) -> str:
+        """Clave del mapeo anon_id → conversación."""
+        return f"chat:anon:{anon_id}"
+
+    @classmethod
+    def _raise_high_water(cls, conversation_id: int, message_id: int) -> None:
+        """
+        Subir la marca de agua de la conversación hasta ``message_id``.
+
+        Si Redis falla se intenta borrar la marca: sin marca, el polling va a
+        la BD; con una marca vieja, el widget no vería el mensaje.
+        """
+        from app.services.cache_service import get_redis_client
+        clave = cls._hwm_key(conversation_id)
+        try:
+            redis_client = get_redis_client()
+            redis_client.register_script(cls._RAISE_LUA)(
+                keys=[clave], args=[int(message_id), cls._HWM_TTL])
+        except Exception as exc:
+            cls.log_error("No se pudo actualizar la marca de agua del chat", exc)
+            try:
+                get_redis_client().delete(clave)
+            except Exception:
+                pass
+
+    @classmethod
+    def _remember_conversation(cls, anon_id: str, conversation_id: int) -> None:
+        """
+        Cachear anon_id → conversación (0 = el visitante aún no escribió).
+
+        El 0 se escribe con SET NX: un polling que leyó la BD justo antes de
+        que se creara la conversación no debe pisar el id real ya cacheado
+        (el widget perdería las respuestas durante _ANON_NONE_TTL).
+        """
+        from app.services.cache_service import CacheService, get_redis_client
+        if conversation_id:
+            CacheService.set(cls._anon_key(anon_id), conversation_id, ttl=cls._ANON_TTL)
+            return
+        try:
+            get_redis_client().set(cls._anon_key(anon_id), 0,
+                                   ex=cls._ANON_NONE_TTL, nx=True)
+        except Exception as exc:
+            cls.log_error("No se pudo cachear la conversación del visitante", exc)
+
+    @classmethod
+    def _poll_state(cls, anon_id: str
+                    ) -> Optional[Tuple[int, Optional[int], bool]]:
+        """
+        Estado del polling de un visitante, leído de Redis en un solo viaje.
+
+        Returns:
+            Tupla (conversation_id, marca, typing); conversation_id 0 si el
+            visitante aún no escribió y marca None si no está en Redis. None si
+            no se conoce la conversación o Redis no responde.
+        """
+        try:
+            from app.services.cache_service import get_redis_client
+            redis_client = get_redis_client()
+            fila = redis_client.register_script(cls._POLL_LUA)(
+                keys=[cls._anon_key(anon_id)])
+        except Exception as exc:
+            cls.log_error("Estado del polling de chat no disponible", exc)
+            return None
+        if not fila:
+            return None
+        conv, marca, typing = fila
+        return int(conv), (int(marca) if marca else None), bool(typing)
+
+    @staticmethod
+    def sse_event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+        """Serializar un evento en formato Server-Sent Events."""
+        lineas = [f"id: {event_id}"] if event_id is not None else []
+        lineas.append(f"event: {event}")
+        lineas.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+        return '\n'.join(lineas) + '\n\n'
+
+    @classmethod
+    def open_stream(cls, conversation_id: int, after_id: int
+                    ) -> Optional[Iterator[str]]:
+        """
+        Abrir el stream SSE de una conversación para el widget.
+
+        Se suscribe al canal ANTES de leer lo pendiente en la BD, para no
+        perder un mensaje publicado entre ambas cosas (si llega por los dos
+        lados, se descarta por id). La consulta corre aquí, dentro del
+        request; el generador devuelto solo escucha Redis, así la conexión de
+        BD vuelve al pool mientras el stream sigue abierto.
+
+        Args:
+            conversation_id: Conversación del visitante.
+            after_id: Último mensaje que ya tiene el widget (Last-Event-ID).
+
+        Returns:
+            Generador de eventos SSE, o None si Redis no está disponible (el
+            widget vuelve al polling).
+        """
+        try:
+            from app.services.cache_service import get_redis_client
+            pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(cls._channel(conversation_id))
+        except Exception as exc:
+            cls.log_error("No se pudo abrir el canal de chat", exc)
+            return None
+
+        try:
+            pending = cls.get_new_for_client(conversation_id, after_id)
+        except Exception:
+            pubsub.close()
+            raise
+        return cls._stream_events(pubsub, pending, after_id)
+
+    @classmethod
+    def _stream_events(cls, pubsub, pending: List[dict], after_id: int,
+                       clock=time.monotonic) -> Iterator[str]:
+        """
+        Eventos del stream: lo pendiente y luego lo que llegue por el canal.
+
+        Emite ``message`` (mensajes de operador/bot, con su id como id de
+        evento) y ``typing`` (el operador escribe); un comentario de latido
+        cada STREAM_HEARTBEAT segundos sin novedades. Termina a los
+        STREAM_MAX_SECONDS o si se cae Redis; el navegador reconecta solo.
+        """
+        sent = set()
+        deadline = clock() + cls.STREAM_MAX_SECONDS
+        try:
+            yield f"retry: {cls.STREAM_RETRY_MS}\n\n"
+            for m in pending:
+                sent.add(m['id'])
+                yield cls.sse_event('message', m, m['id'])
+
+            while clock() < deadline:
+                llegada = pubsub.get_message(timeout=cls.STREAM_HEARTBEAT)
+                if llegada is None:
+                    yield ": ping\n\n"
+                    continue
+                evento = json.loads(llegada['data'])
+                data = evento.get('data') or {}
+                if evento.get('kind') == 'message':
+                    msg_id = data.get('id') or 0
+                    if (data.get('sender') == 'client' or msg_id <= after_id
+                            or msg_id in sent):
+                        continue
+                    sent.add(msg_id)
+                    yield cls.sse_event('message', data, msg_id)
+                elif evento.get('kind') == 'typing' and data.get('who') == 'operator':
+                    yield cls.sse_event('typing', {'typing': True})
+        except Exception as exc:
+            cls.log_error("Stream de chat interrumpido", exc)
+        finally:
+            pubsub.close()
 
     # ── Bot (Fase 2) ───────────────────────────────────────────────────────
 
@@ -284,6 +634,52 @@ class ChatService(BaseService):
         from app.bot.formatters import formatter_for
         return formatter_for('web').format(text)
 
+    @classmethod
+    def _bot_turn(cls, conv: ChatConversation, kind: str, payload: str) -> None:
+        """
+        Turno del bot para un mensaje ('text') o comprobante ('proof').
+
+        Se encola para el worker (ver app/services/chat_bot_queue.py) y el
+        request responde sin esperar: el widget ve "escribiendo" hasta que la
+        respuesta llega por su canal. Sin worker vivo, se corre aquí mismo.
+        """
+        from app.services.chat_bot_queue import ChatBotQueue
+        if ChatBotQueue.encolar(conv.id, {'kind': kind, 'payload': payload}):
+            cls.set_typing(conv.id, 'operator')
+            return
+        cls._run_bot_turn(conv, kind, payload)
+
+    @classmethod
+    def _run_bot_turn(cls, conv: ChatConversation, kind: str, payload: str
+                      ) -> Optional[ChatMessage]:
+        """Correr un turno del bot y guardar (y difundir) su respuesta."""
+        if kind == 'proof':
+            return cls._bot_proof_reply(conv, payload)
+        return cls._bot_reply(conv, payload)
+
+    @classmethod
+    def process_bot_turn(cls, conversation_id: int, turno: dict
+                         ) -> Optional[ChatMessage]:
+        """
+        Turno encolado, del lado del worker.
+
+        Si mientras esperaba un operador tomó la conversación (o se pausó el
+        bot), el mensaje pasa a los operadores en vez de al bot.
+
+        Args:
+            conversation_id: Conversación del turno.
+            turno: {'kind', 'payload'} tal como se encoló.
+        """
+        conv = ChatConversation.find_by_id(conversation_id)
+        if conv is None:
+            return None
+        kind, payload = turno.get('kind'), turno.get('payload') or ''
+        if not cls.is_bot_active_for(conv):
+            cls._notify_operators(
+                conv, 'Envió un comprobante de pago' if kind == 'proof' else payload)
+            return None
+        return cls._run_bot_turn(conv, kind, payload)
+
     @classmethod
     def _bot_reply(cls, conv: ChatConversation, text: str
                    ) -> Optional[ChatMessage]:
@@ -326,6 +722,7 @@ class ChatService(BaseService):
 
             conv.last_message_at = bot_msg.created_at
             conv.save()
+            cls._announce_message(bot_msg)
             return bot_msg
 
         except Exception as exc:
@@ -335,10 +732,7 @@ class ChatService(BaseService):
     # ── Comprobantes de pago ───────────────────────────────────────────────
 
     # Mismo directorio y convención de URL que usa el bot de Telegram.
-    PROOFS_DIR = os.path.join('app', 'static', 'proofs')
-    PROOF_URL_PREFIX = '/static/proofs/'
     ALLOWED_PROOF_EXT = frozenset({'.jpg', '.jpeg', '.png', '.webp', '.pdf'})
-    MAX_PROOF_BYTES = 5 * 1024 * 1024  # 5 MB
 
     @classmethod
     def _save_proof_file(cls, file_storage, reference: str
@@ -346,9 +740,13 @@ class ChatService(BaseService):
         """
         Validar y guardar el archivo del comprobante en disco.
 
+        El guardado (por bloques, deduplicado por contenido y con miniatura
+        en segundo plano) lo hace ProofStorage.
+
         Args:
             file_storage: Archivo recibido (werkzeug FileStorage).
-            reference: Referencia de la orden (o de la conversación).
+            reference: Referencia de la orden (o de la conversación), para
+                el log.
 
         Returns:
             Tupla (ok, mensaje, url) con la URL pública del comprobante.
@@ -358,19 +756,13 @@ class ChatService(BaseService):
         if ext not in cls.ALLOWED_PROOF_EXT:
             return False, 'Formato no admitido (usa JPG, PNG, WEBP o PDF)', None
 
-        file_storage.stream.seek(0, os.SEEK_END)
-        size = file_storage.stream.tell()
-        file_storage.stream.seek(0)
-        if size == 0:
-            return False, 'El archivo está vacío', None
-        if size > cls.MAX_PROOF_BYTES:
-            return False, 'El archivo supera los 5 MB', None
-
-        os.makedirs(cls.PROOFS_DIR, exist_ok=True)
-        filename = f"{reference}_{secrets.token_hex(8)}{ext}"
-        file_storage.save(os.path.join(cls.PROOFS_DIR, filename))
+        try:
+            url = ProofStorage.store(file_storage.stream, ext)
+        except ProofStorageError as exc:
+            return False, str(exc), None
 
-        return True, 'Comprobante recibido', f"{cls.PROOF_URL_PREFIX}{filename}"
+        cls.log_info(f"Comprobante de {reference} guardado en {url}")
+        return True, 'Comprobante recibido', url
 
     @classmethod
     def _order_reference_for(cls, conv: ChatConversation) -> str:
@@ -419,7 +811,7 @@ class ChatService(BaseService):
         conv.save()
 
         if cls.is_bot_active_for(conv):
-            cls._bot_proof_reply(conv, url)
+            cls._bot_turn(conv, 'proof', url)
         else:
             cls._notify_operators(conv, 'Envió un comprobante de pago')
 
@@ -452,6 +844,7 @@ class ChatService(BaseService):
 
             conv.last_message_at = bot_msg.created_at
             conv.save()
+            cls._announce_message(bot_msg)
             return bot_msg
 
         except Exception as exc:
@@ -533,6 +926,7 @@ class ChatService(BaseService):
 
         conv.last_message_at = msg.created_at
         conv.save()
+        cls._announce_message(msg)
         cls._notify_client(conv, text)
         return msg
 
@@ -257,13 +257,13 @@ class FraudCheckService(BaseService):
             # - Etc.
             
             # Por ahora, solo check básico
-            from app.models.blacklist import BlacklistEntry, BlacklistStatus
+            from app.services.blacklist_service import BlacklistService
             
             # Verificar si este telegram_id ya está en blacklist activa
-            existing_block = BlacklistEntry.query.filter(
-                BlacklistEntry.telegram_id == telegram_id,
-                BlacklistEntry.status == BlacklistStatus.ACTIVE
-            ).first()
+            # (índice normalizado + filtro en memoria: sin BD si no aparece)
+            existing_block, _ = BlacklistService.check_identifiers_blacklisted(
+                telegram_id=telegram_id
+            )
             
             if existing_block:
                 risk_points += 100  # Máximo riesgo
@@ -352,12 +352,12 @@ class FraudCheckService(BaseService):
                 risk_points += 10
                 flags.append('suspicious_format')
             
-            # Check contra blacklist de emails
-            from app.models.blacklist import BlacklistEntry, BlacklistStatus
-            existing_block = BlacklistEntry.query.filter(
-                BlacklistEntry.email == email,
-                BlacklistEntry.status == BlacklistStatus.ACTIVE
-            ).first()
+            # Check contra blacklist de emails (forma canónica: mayúsculas,
+            # etiquetas +algo y puntos de Gmail no evitan la coincidencia)
+            from app.services.blacklist_service import BlacklistService
+            existing_block, _ = BlacklistService.check_identifiers_blacklisted(
+                email=email
+            )
             
             if existing_block:
                 risk_points += 100
@@ -5,12 +5,21 @@ Lee correos de PayPal no procesados y los marca como leídos.
 import imaplib
 import email
 import logging
+import re
+import select
+import ssl
+import time
 from email.header import decode_header
-from typing import Optional
+from typing import Iterator, Optional, Tuple
 from flask import current_app
 
+from app.utils.imap import buscar_parte_html, decodificar_parte, parsear_fetch
+
 logger = logging.getLogger(__name__)
 
+# Aviso de correo nuevo durante IDLE: b'* 12 EXISTS'
+NOVEDAD_RE = re.compile(rb'\* (\d+) (EXISTS|RECENT)', re.IGNORECASE)
+
 
 class GmailService:
     """
@@ -32,12 +41,29 @@ class GmailService:
     IMAP_HOST = 'imap.gmail.com'
     IMAP_PORT = 993
     IMAP_TIMEOUT = 30  # segundos: evita que una conexión trabada cuelgue el worker
+    FETCH_CHUNK = 50   # UID por comando FETCH (una ida y vuelta por tramo)
+    # Cabeceras que usan los parsers; se piden junto al BODYSTRUCTURE
+    HEADERS_FETCH = 'BODY.PEEK[HEADER.FIELDS (MESSAGE-ID SUBJECT FROM TO DATE)]'
 
     def __init__(self) -> None:
         """Inicializa con credenciales desde variables de entorno."""
         self.user = current_app.config.get('GMAIL_IMAP_USER')
         self.password = current_app.config.get('GMAIL_IMAP_PASSWORD')
         self._connection: Optional[imaplib.IMAP4_SSL] = None
+        # Rendimiento de la última descarga (ver _fetch_en_tramos)
+        self.ultima_descarga: dict = {}
+        # Correos que cumplían el criterio pero quedaron fuera por el límite
+        # de la última get_emails_de_remitentes (el daemon sigue mientras > 0)
+        self.quedan = 0
+        # UID de la última descarga que se omitieron por no traer parte HTML
+        self.sin_html: list = []
+        # Sesión persistente (daemon IDLE): _connect/_disconnect la reutilizan
+        self._sesion = False
+        self._idle_n = 0
+        # Último total de mensajes del INBOX que anunció el servidor (EXISTS)
+        self._mensajes: Optional[int] = None
+        # UIDVALIDITY del INBOX de la sesión abierta (ver abrir_sesion)
+        self.uidvalidity: Optional[int] = None
 
     def _connect(self) -> bool:
         """
@@ -46,12 +72,10 @@ class GmailService:
         Returns:
             bool: True si conectó exitosamente
         """
+        if self._sesion and self._connection is not None:
+            return True
         try:
-            self._connection = imaplib.IMAP4_SSL(
-                self.IMAP_HOST,
-                self.IMAP_PORT,
-                timeout=self.IMAP_TIMEOUT
-            )
+            self._connection = self._nueva_conexion()
             # El timeout de IMAP4_SSL() solo cubre el connect en Python 3.13.
             # Setearlo en el socket subyacente lo extiende a fetch/search/store.
             self._connection.socket().settimeout(self.IMAP_TIMEOUT)
@@ -65,8 +89,18 @@ class GmailService:
             logger.error(f"Error de red conectando a Gmail IMAP: {e}")
             return False
 
+    def _nueva_conexion(self) -> imaplib.IMAP4:
+        """Abre el socket TLS contra Gmail (sin autenticar)."""
+        return imaplib.IMAP4_SSL(
+            self.IMAP_HOST,
+            self.IMAP_PORT,
+            timeout=self.IMAP_TIMEOUT
+        )
+
     def _disconnect(self) -> None:
-        """Cierra la conexión IMAP de forma segura."""
+        """Cierra la conexión IMAP de forma segura (salvo sesión persistente)."""
+        if self._sesion:
+            return
         if self._connection:
             try:
                 self._connection.close()
@@ -128,31 +162,24 @@ class GmailService:
 
         return None
 
-    def _fetch_email_by_uid(self, uid: bytes) -> Optional[dict]:
+    def _armar_correo(
+        self,
+        uid: str,
+        cabeceras: email.message.Message,
+        html_body: Optional[str]
+    ) -> Optional[dict]:
         """
-        Obtiene y parsea un correo individual por su UID IMAP.
+        Arma el dict de correo que consumen los parsers.
 
         Args:
-            uid: UID del mensaje en el servidor IMAP
+            uid: UID del mensaje en el servidor IMAP.
+            cabeceras: Mensaje (completo o solo cabeceras) ya parseado.
+            html_body: Cuerpo HTML decodificado.
 
         Returns:
-            dict con los datos del correo, o None si falló el fetch
+            dict con los datos del correo, o None si no tiene cuerpo HTML.
         """
-        status, msg_data = self._connection.uid('FETCH', uid, '(RFC822)')
-
-        if status != 'OK':
-            return None
-
-        raw_email = msg_data[0][1]
-        msg = email.message_from_bytes(raw_email)
-
-        message_id = msg.get('Message-ID', '').strip()
-        subject = self._decode_header_value(msg.get('Subject', ''))
-        sender = msg.get('From', '')
-        date_str = msg.get('Date', '')
-        to_raw = msg.get('To', '')
-
-        html_body = self._get_email_body_html(msg)
+        message_id = cabeceras.get('Message-ID', '').strip()
 
         if not html_body:
             logger.warning(f"Correo {message_id} sin cuerpo HTML, omitiendo")
@@ -160,14 +187,162 @@ class GmailService:
 
         return {
             'message_id': message_id,
-            'subject': subject,
-            'sender': sender,
-            'to_raw': to_raw,
-            'date': date_str,
+            'subject': self._decode_header_value(cabeceras.get('Subject', '')),
+            'sender': cabeceras.get('From', ''),
+            'to_raw': cabeceras.get('To', ''),
+            'date': cabeceras.get('Date', ''),
             'html_body': html_body,
-            'imap_uid': uid.decode() if isinstance(uid, bytes) else uid
+            'imap_uid': uid
         }
 
+    def _correo_desde_bytes(self, uid: str, raw_email: bytes) -> Optional[dict]:
+        """Parsea un mensaje completo (RFC 822) al dict de correo."""
+        msg = email.message_from_bytes(raw_email)
+        return self._armar_correo(uid, msg, self._get_email_body_html(msg))
+
+    def _fetch_en_tramos(self, uids: list) -> Iterator[dict]:
+        """
+        Descarga y parsea los correos de `uids` en tramos de FETCH_CHUNK.
+
+        Pocos UID FETCH por tramo (ida y vuelta a Gmail por cada 50 correos,
+        no por correo), siempre con BODY.PEEK, que a diferencia de RFC822 no
+        marca el correo como leído: el marcado lo decide la ingesta. Ver
+        _fetch_tramo. Al terminar deja el rendimiento en `self.ultima_descarga`
+        y en `self.sin_html` los UID omitidos por no traer parte HTML (a
+        diferencia de los que fallaron al bajar, no cambian al reintentar).
+
+        Args:
+            uids: UID IMAP (bytes o str), en el orden en que se procesarán.
+
+        Yields:
+            dict de cada correo con cuerpo HTML, en el orden de `uids`.
+        """
+        inicio = time.monotonic()
+        total_bytes = 0
+        descargados = 0
+        self.sin_html = []
+        uids = [u.decode() if isinstance(u, bytes) else str(u) for u in uids]
+
+        for i in range(0, len(uids), self.FETCH_CHUNK):
+            tramo = uids[i:i + self.FETCH_CHUNK]
+            try:
+                correos, nbytes = self._fetch_tramo(tramo)
+            except ValueError as e:
+                # Respuesta que no se pudo interpretar: mensaje completo
+                logger.warning(f"FETCH parcial ilegible ({e}); descargo completos")
+                correos, nbytes = self._fetch_completos(tramo)
+            total_bytes += nbytes
+            descargados += len(correos)
+
+            # El servidor puede responder en otro orden: respetar el pedido
+            for uid in tramo:
+                correo = correos.get(uid)
+                if correo:
+                    yield correo
+                elif uid in correos:
+                    self.sin_html.append(uid)
+
+        segundos = time.monotonic() - inicio
+        self.ultima_descarga = {
+            'correos': descargados,
+            'bytes': total_bytes,
+            'segundos': round(segundos, 3),
+            'correos_por_segundo': round(descargados / segundos, 1) if segundos else 0.0,
+        }
+        if descargados:
+            logger.info(
+                f"Descargados {descargados} correos "
+                f"({total_bytes / 1024:.0f} KB) en {segundos:.2f}s — "
+                f"{self.ultima_descarga['correos_por_segundo']} correos/s"
+            )
+
+    def _fetch_tramo(self, tramo: list) -> Tuple[dict, int]:
+        """
+        Descarga un tramo trayendo SOLO las cabeceras y la parte HTML.
+
+        1. BODYSTRUCTURE + cabeceras de todo el tramo en un comando.
+        2. La sección text/html de cada correo (BODY.PEEK[n]), un comando por
+           número de sección distinto (casi siempre uno solo por remitente).
+        Logos, imágenes en línea y adjuntos nunca viajan.
+
+        Returns:
+            ({uid: correo o None}, bytes descargados).
+
+        Raises:
+            ValueError: Si una respuesta FETCH está mal formada.
+        """
+        status, data = self._connection.uid(
+            'FETCH', ','.join(tramo), f'(UID BODYSTRUCTURE {self.HEADERS_FETCH})'
+        )
+        if status != 'OK':
+            logger.error(f"FETCH falló para el tramo {tramo[0]}..{tramo[-1]}")
+            return {}, 0
+
+        correos = {}
+        nbytes = 0
+        cabeceras = {}
+        partes = {}
+        por_seccion = {}
+        for atributos in parsear_fetch(data):
+            uid = atributos.get('UID')
+            crudas = next(
+                (v for k, v in atributos.items() if k.startswith('BODY[HEADER')), b''
+            ) or b''
+            nbytes += len(crudas)
+            cabeceras[uid] = email.message_from_bytes(crudas)
+            parte = buscar_parte_html(atributos.get('BODYSTRUCTURE') or [])
+            if parte is None:
+                correos[uid] = self._armar_correo(uid, cabeceras[uid], None)
+                continue
+            partes[uid] = parte
+            por_seccion.setdefault(parte[0], []).append(uid)
+
+        for seccion, uids in por_seccion.items():
+            status, data = self._connection.uid(
+                'FETCH', ','.join(uids), f'(UID BODY.PEEK[{seccion}])'
+            )
+            if status != 'OK':
+                logger.error(f"FETCH de la sección {seccion} falló")
+                continue
+            for atributos in parsear_fetch(data):
+                uid = atributos.get('UID')
+                if uid not in partes:
+                    continue
+                contenido = atributos.get(f'BODY[{seccion}]') or b''
+                if isinstance(contenido, str):
+                    contenido = contenido.encode()
+                nbytes += len(contenido)
+                _seccion, codificacion, charset = partes[uid]
+                try:
+                    html_body = decodificar_parte(contenido, codificacion, charset)
+                except ValueError as e:
+                    logger.error(f"Error decodificando correo UID {uid}: {e}")
+                    continue
+                correos[uid] = self._armar_correo(uid, cabeceras[uid], html_body)
+
+        return correos, nbytes
+
+    def _fetch_completos(self, tramo: list) -> Tuple[dict, int]:
+        """Descarga un tramo con el mensaje completo (BODY.PEEK[]). Respaldo."""
+        status, data = self._connection.uid(
+            'FETCH', ','.join(tramo), '(UID BODY.PEEK[])'
+        )
+        if status != 'OK':
+            logger.error(f"FETCH falló para el tramo {tramo[0]}..{tramo[-1]}")
+            return {}, 0
+
+        correos = {}
+        nbytes = 0
+        for atributos in parsear_fetch(data):
+            uid = atributos.get('UID')
+            raw_email = atributos.get('BODY[]') or b''
+            nbytes += len(raw_email)
+            try:
+                correos[uid] = self._correo_desde_bytes(uid, raw_email)
+            except (UnicodeDecodeError, KeyError, AttributeError) as e:
+                logger.error(f"Error procesando correo UID {uid}: {e}")
+        return correos, nbytes
+
     def get_new_paypal_payments(self) -> list[dict]:
         """
         Obtiene correos de pago PayPal no leídos del inbox.
@@ -209,14 +384,8 @@ class GmailService:
             uid_list = message_ids[0].split()
             logger.info(f"Encontrados {len(uid_list)} correos PayPal nuevos")
 
-            for uid in uid_list:
-                try:
-                    correo = self._fetch_email_by_uid(uid)
-                    if correo:
-                        emails.append(correo)
-                except (UnicodeDecodeError, KeyError, AttributeError) as e:
-                    logger.error(f"Error procesando correo UID {uid}: {e}")
-                    continue
+            # Lo ya descargado se conserva aunque un tramo posterior falle
+            emails.extend(self._fetch_en_tramos(uid_list))
 
         except imaplib.IMAP4.error as e:
             logger.error(f"Error IMAP buscando correos: {e}")
@@ -284,6 +453,199 @@ class GmailService:
         finally:
             self._disconnect()
 
+    # ── Sesión persistente e IDLE (ver IngestaDaemon) ─────────────────
+
+    def abrir_sesion(self) -> bool:
+        """
+        Abre UNA conexión autenticada con INBOX seleccionado que sobrevive
+        entre llamadas: mientras esté abierta, los métodos de lectura y
+        marcado la reutilizan en vez de hacer login por llamada.
+
+        Returns:
+            bool: True si la sesión quedó abierta.
+        """
+        self.cerrar_sesion()
+        if not self._connect():
+            return False
+        try:
+            self._connection.select('INBOX')
+            _nombre, valores = self._connection.response('UIDVALIDITY')
+            self.uidvalidity = int(valores[0]) if valores and valores[0] else None
+        except (imaplib.IMAP4.error, OSError) as e:
+            logger.error(f"Error seleccionando INBOX: {e}")
+            self._disconnect()
+            return False
+        self._sesion = True
+        # El EXISTS del SELECT es la línea de base, no una novedad
+        self._mensajes = None
+        self.hay_novedades_pendientes()
+        return True
+
+    def cerrar_sesion(self) -> None:
+        """Cierra la sesión persistente (si la hay)."""
+        self._sesion = False
+        self._disconnect()
+
+    def soporta_idle(self) -> bool:
+        """True si el servidor anuncia la extensión IDLE (RFC 2177)."""
+        return bool(self._connection) and 'IDLE' in self._connection.capabilities
+
+    def esperar_novedades(self, segundos: float) -> bool:
+        """
+        Espera en IDLE hasta `segundos` a que llegue correo nuevo.
+
+        imaplib (Python < 3.14) no implementa IDLE, así que se habla el
+        protocolo a mano sobre la misma conexión: IDLE, esperar un
+        ``* n EXISTS`` con select() (sin timeouts en el socket, que lo
+        inutilizarían; antes se revisa lo ya leído, ver _hay_datos_leidos),
+        DONE y leer hasta la respuesta etiquetada.
+
+        Args:
+            segundos: Tope de la espera; debe quedar por debajo del corte de
+                29 minutos de Gmail.
+
+        Returns:
+            bool: True si el servidor avisó de correo nuevo.
+
+        Raises:
+            imaplib.IMAP4.error: Si el servidor rechaza IDLE.
+            OSError: Si la conexión se cayó.
+        """
+        conn = self._connection
+        self._idle_n += 1
+        tag = f'C21I{self._idle_n}'.encode()
+        conn.send(tag + b' IDLE\r\n')
+        linea = conn.readline()
+        if not linea.startswith(b'+'):
+            raise imaplib.IMAP4.error(f"IDLE rechazado: {linea!r}")
+
+        hay_correo = False
+        sock = conn.socket()
+        limite = time.monotonic() + segundos
+        while not hay_correo:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            if not self._hay_datos_leidos(conn):
+                listos, _, _ = select.select([sock], [], [], restante)
+                if not listos:
+                    break
+            linea = conn.readline()
+            if not linea:
+                raise OSError("El servidor IMAP cerró la conexión")
+            hay_correo = self._anotar_aviso(linea)
+
+        conn.send(b'DONE\r\n')
+        while True:
+            linea = conn.readline()
+            if not linea:
+                raise OSError("El servidor IMAP cerró la conexión")
+            if linea.startswith(tag + b' '):
+                if not linea[len(tag) + 1:].upper().startswith(b'OK'):
+                    raise imaplib.IMAP4.error(f"IDLE terminó mal: {linea!r}")
+                return hay_correo
+            hay_correo = self._anotar_aviso(linea) or hay_correo
+
+    def _anotar_aviso(self, linea: bytes) -> bool:
+        """True si `linea` avisa de correo nuevo; anota el total de un EXISTS."""
+        aviso = NOVEDAD_RE.match(linea)
+        if not aviso:
+            return False
+        if aviso.group(2).upper() == b'EXISTS':
+            self._mensajes = int(aviso.group(1))
+        return True
+
+    def hay_novedades_pendientes(self) -> bool:
+        """
+        True si llegó correo mientras la sesión corría otros comandos.
+
+        Un ``* n EXISTS`` que llega durante SELECT/SEARCH/FETCH/STORE no se
+        vuelve a anunciar en el siguiente IDLE: imaplib lo guarda en
+        ``untagged_responses``. Acá se consumen EXISTS, RECENT y EXPUNGE.
+        Como cada SELECT repite el total del buzón, la novedad no es que haya
+        un EXISTS sino que el total supere al último conocido (descontando
+        los EXPUNGE intermedios).
+
+        Returns:
+            bool: True si hay correo que el próximo IDLE no avisaría.
+        """
+        conn = self._connection
+        if conn is None:
+            return False
+        respuestas = conn.untagged_responses
+        totales = [int(v) for v in respuestas.pop('EXISTS', []) if v and v.isdigit()]
+        borrados = len(respuestas.pop('EXPUNGE', []))
+        respuestas.pop('RECENT', None)
+        if not totales:
+            if self._mensajes is not None:
+                self._mensajes = max(0, self._mensajes - borrados)
+            return False
+        anterior, self._mensajes = self._mensajes, totales[-1]
+        if anterior is None:
+            return False
+        return max(totales) > anterior - borrados
+
+    @staticmethod
+    def _hay_datos_leidos(conn) -> bool:
+        """
+        True si ya hay bytes leídos del socket que select() no ve.
+
+        Pueden estar descifrados en la capa TLS (``pending()``) o en el
+        buffer de ``conn.file``: readline() lee por bloques, y un
+        ``* n EXISTS`` que llegó junto con el ``+ idling`` queda ahí. Para
+        mirar el buffer sin bloquear, peek() se hace con el socket en modo
+        no bloqueante.
+        """
+        sock = conn.socket()
+        if getattr(sock, 'pending', lambda: 0)():
+            return True
+        timeout = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            return bool(conn.file.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            sock.settimeout(timeout)
+
+    def buscar_uids_desde_fecha(
+        self,
+        remitentes: list,
+        desde_imap: str,
+        desde_uid: int = 0
+    ) -> list:
+        """
+        UID (ascendentes) de los correos de `remitentes` desde una fecha,
+        sobre la sesión abierta. Solo la lista de UID: los correos se bajan
+        después, tramo a tramo, con descargar().
+
+        Args:
+            remitentes: Direcciones a vigilar.
+            desde_imap: Fecha en formato IMAP, ej. '01-Jun-2026'.
+            desde_uid: Devolver solo UID mayores que este (reanudación).
+
+        Returns:
+            Lista de UID como str, en orden ascendente.
+        """
+        from_criteria = self._build_from_criteria(remitentes, solo_no_leidos=False)
+        criteria = f'(SINCE "{desde_imap}" {from_criteria})'
+        if desde_uid:
+            criteria = f'(UID {desde_uid + 1}:* {criteria[1:]}'
+        status, message_ids = self._connection.uid('SEARCH', None, criteria)
+        if status != 'OK' or not message_ids[0]:
+            return []
+        # 'UID n:*' siempre incluye el último mensaje aunque su UID sea menor
+        uids = sorted(int(u) for u in message_ids[0].split())
+        return [str(u) for u in uids if u > desde_uid]
+
+    def descargar(self, uids: list) -> list:
+        """Descarga (cabeceras + HTML) los correos de `uids` en la sesión abierta."""
+        return list(self._fetch_en_tramos(uids))
+
+    def noop(self) -> None:
+        """NOOP sobre la sesión: mantiene viva la conexión al hacer polling."""
+        self._connection.noop()
+
     def test_connection(self) -> dict:
         """
         Prueba la conexión IMAP y retorna el estado.
@@ -323,8 +685,12 @@ class GmailService:
 
         NO filtra por asunto (para no perder variantes como los payouts); el
         filtrado fino lo hace cada parser via puede_parsear(). Para no descargar
-        un backlog enorme de golpe, procesa solo los `limite` mas recientes.
+        un backlog enorme de golpe, procesa solo los `limite` mas recientes;
+        cuántos quedaron fuera queda en `self.quedan`.
         """
+        # Sin correos no hay descarga: no arrastrar la de la corrida anterior
+        self.ultima_descarga = {}
+        self.quedan = 0
         if not remitentes or not self._connect():
             return []
         emails = []
@@ -341,17 +707,11 @@ class GmailService:
             # IMAP devuelve los UID en orden ascendente: los mas recientes al final.
             if limite and total > limite:
                 uids = uids[-limite:]
+                self.quedan = total - limite
                 logger.info(f"{total} correos coinciden; proceso los {limite} mas recientes")
             else:
                 logger.info(f"Encontrados {total} correos nuevos de fuentes vigiladas")
-            for uid in uids:
-                try:
-                    correo = self._fetch_email_by_uid(uid)
-                    if correo:
-                        emails.append(correo)
-                except (UnicodeDecodeError, KeyError, AttributeError) as e:
-                    logger.error(f"Error procesando correo UID {uid}: {e}")
-                    continue
+            emails.extend(self._fetch_en_tramos(uids))
         except imaplib.IMAP4.error as e:
             logger.error(f"Error IMAP buscando correos: {e}")
         except OSError as e:
@@ -419,14 +779,7 @@ class GmailService:
             else:
                 logger.info(f"Importación histórica: {total} correos desde {desde_imap}")
 
-            for uid in uids:
-                try:
-                    correo = self._fetch_email_by_uid(uid)
-                    if correo:
-                        emails.append(correo)
-                except (UnicodeDecodeError, KeyError, AttributeError, OSError) as e:
-                    logger.error(f"Error procesando correo UID {uid}: {e}")
-                    continue
+            emails.extend(self._fetch_en_tramos(uids))
 
         except imaplib.IMAP4.error as e:
             logger.error(f"Error IMAP en get_emails_desde_fecha: {e}")
@@ -0,0 +1,133 @@
+"""
+Daemon de ingesta por IMAP IDLE (push) en vez de cron cada 5 minutos.
+
+Mantiene UNA sesión autenticada con Gmail y se queda en IDLE: cuando el
+servidor avisa de correo nuevo, corre la ingesta al instante (y con ella la
+conciliación), sin pagar un login TLS por corrida. Gmail corta un IDLE a los
+29 minutos, así que se reemite antes, y cada ventana que vence sin aviso
+también corre la ingesta (red de seguridad ante un aviso perdido). Si la conexión se cae, reconecta con
+backoff exponencial; si el servidor no soporta IDLE, hace polling sobre la
+misma sesión.
+
+Lo ejecuta scripts/ingesta_daemon.py (systemd); ver ahí cómo retirar el cron.
+"""
+import imaplib
+import logging
+import threading
+from typing import Callable, Optional
+
+from app.services.gmail_service import GmailService
+
+logger = logging.getLogger(__name__)
+
+
+class IngestaDaemon:
+    """
+    Bucle de IDLE → ingesta con reconexión y polling de respaldo.
+
+    Attributes:
+        VENTANA_IDLE: Segundos de cada IDLE antes de reemitirlo (< 29 min).
+        INTERVALO_POLLING: Segundos entre corridas sin IDLE.
+        BACKOFF_INICIAL: Primera espera tras un fallo de conexión.
+        BACKOFF_MAXIMO: Tope de la espera entre reintentos.
+        MAX_TANDAS: Corridas seguidas como máximo mientras `procesar` diga
+            que quedó backlog (el resto espera al próximo aviso o ventana).
+    """
+
+    VENTANA_IDLE = 25 * 60
+    INTERVALO_POLLING = 5 * 60
+    BACKOFF_INICIAL = 5
+    BACKOFF_MAXIMO = 5 * 60
+    MAX_TANDAS = 20
+
+    def __init__(
+        self,
+        gmail: GmailService,
+        procesar: Callable[[], Optional[bool]],
+        ventana_idle: Optional[float] = None,
+        intervalo_polling: Optional[float] = None,
+        forzar_polling: bool = False
+    ) -> None:
+        """
+        Args:
+            gmail: Cliente cuya sesión persistente usa el daemon (y la ingesta).
+            procesar: Corre una ingesta; la llama el daemon al conectar, ante
+                cada aviso de correo nuevo y al vencer cada ventana de IDLE.
+                Retorna True si dejó correos sin procesar (página llena), y
+                entonces se la vuelve a llamar enseguida.
+            ventana_idle: Sobrescribe VENTANA_IDLE (tests).
+            intervalo_polling: Sobrescribe INTERVALO_POLLING.
+            forzar_polling: Ignorar IDLE aunque el servidor lo soporte.
+        """
+        self.gmail = gmail
+        self.procesar = procesar
+        self.ventana_idle = ventana_idle or self.VENTANA_IDLE
+        self.intervalo_polling = intervalo_polling or self.INTERVALO_POLLING
+        self.forzar_polling = forzar_polling
+
+    @classmethod
+    def siguiente_espera(cls, espera: float) -> float:
+        """Backoff exponencial: duplica la espera hasta BACKOFF_MAXIMO."""
+        return min(espera * 2, cls.BACKOFF_MAXIMO)
+
+    def correr(self, detener: Optional[threading.Event] = None) -> None:
+        """
+        Bucle principal; vuelve cuando `detener` se activa.
+
+        Args:
+            detener: Evento de parada (SIGTERM en el script). None = infinito.
+        """
+        detener = detener or threading.Event()
+        espera = self.BACKOFF_INICIAL
+        while not detener.is_set():
+            if not self.gmail.abrir_sesion():
+                logger.warning(f"Sin conexión IMAP; reintento en {espera}s")
+                detener.wait(espera)
+                espera = self.siguiente_espera(espera)
+                continue
+
+            espera = self.BACKOFF_INICIAL
+            try:
+                self._sesion(detener)
+            except (imaplib.IMAP4.error, OSError) as e:
+                logger.warning(f"Sesión IMAP caída ({e}); reconectando en {espera}s")
+                detener.wait(espera)
+                espera = self.siguiente_espera(espera)
+            finally:
+                self.gmail.cerrar_sesion()
+        logger.info("Daemon de ingesta detenido")
+
+    def _sesion(self, detener: threading.Event) -> None:
+        """Atiende una sesión IMAP hasta que se caiga o se pida parar."""
+        # Al (re)conectar: lo que haya llegado mientras no se escuchaba
+        self._procesar()
+
+        if self.forzar_polling or not self.gmail.soporta_idle():
+            logger.info(f"Ingesta por polling cada {self.intervalo_polling}s")
+            while not detener.wait(self.intervalo_polling):
+                self.gmail.noop()
+                self._procesar()
+            return
+
+        logger.info("Ingesta en IMAP IDLE")
+        while not detener.is_set():
+            # Correo que llegó durante la corrida: el IDLE no lo avisaría
+            if self.gmail.hay_novedades_pendientes():
+                self._procesar()
+                continue
+            # Con aviso o sin él (ventana vencida), se corre la ingesta
+            self.gmail.esperar_novedades(self.ventana_idle)
+            self._procesar()
+
+    def _procesar(self) -> None:
+        """
+        Corre la ingesta, repitiendo mientras quede backlog (hasta
+        MAX_TANDAS), sin dejar que un fallo tumbe al daemon.
+        """
+        for _ in range(self.MAX_TANDAS):
+            try:
+                if not self.procesar():
+                    return
+            except Exception as exc:
+                logger.error(f"Error en la ingesta del daemon: {exc}", exc_info=True)
+                return
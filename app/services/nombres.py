@@ -0,0 +1,127 @@
+"""
+Comparación rápida de nombres de titulares para la conciliación.
+
+La conciliación compara el pagador de cada pago con el titular de cada orden
+candidata, y un mismo nombre se repite en muchos pares (el del pago contra
+todas sus órdenes, el titular de una orden contra varios pagos del lote). Por
+eso cada nombre se prepara UNA vez y queda en caché (forma_nombre):
+
+    - forma normalizada: sin acentos, signos ni mayúsculas
+    - clave fonética: sus palabras ordenadas, con las grafías que suenan
+      igual en español unificadas (v/b, z/s, ce/se, ll/y, h muda...)
+    - bigramas de letras por palabra, con sus bordes, como conjunto (un
+      bigrama repetido se numera: 'ra', 'ra#2'), así la intersección de
+      multiconjuntos es una intersección de frozenset, que corre en C
+
+La similitud es el coeficiente de Dice entre los bigramas (lineal en el largo
+del nombre, y por construcción independiente del orden de las palabras:
+"Mora Jose" = "Jose Mora"), llevado a la escala del comparador anterior
+(SequenceMatcher) con una calibración lineal por tramos, de modo que los
+umbrales 0.85 / 0.65 de ReconciliationService significan lo mismo. La
+concordancia con el comparador anterior se mide en
+app/services/benchmark_nombres.py.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+# Calibración Dice -> escala anterior: el Dice que equivale a 0.85 y a 0.65
+# (ajustado sobre el corpus de benchmark_nombres; ver su concordancia).
+DICE_ALTO, SIMILITUD_ALTA = 0.84, 0.85
+DICE_MEDIO, SIMILITUD_MEDIA = 0.56, 0.65
+
+# Reglas fonéticas (español), en orden de aplicación sobre cada palabra
+_REGLAS_FONETICAS = [
+    (re.compile(r'ch'), 'x'),
+    (re.compile(r'h'), ''),
+    (re.compile(r'qu'), 'k'),
+    (re.compile(r'c(?=[ei])'), 's'),
+    (re.compile(r'c'), 'k'),
+    (re.compile(r'z'), 's'),
+    (re.compile(r'[vw]'), 'b'),
+    (re.compile(r'll'), 'y'),
+    (re.compile(r'g(?=[ei])'), 'j'),
+    (re.compile(r'(.)\1+'), r'\1'),
+]
+_NO_LETRAS = re.compile(r'[^a-z ]')
+
+
+def normalizar_nombre(nombre: str) -> str:
+    """Quitar acentos, signos y mayúsculas para poder comparar nombres."""
+    if not nombre:
+        return ''
+    sin_acentos = ''.join(
+        c for c in unicodedata.normalize('NFD', nombre)
+        if unicodedata.category(c) != 'Mn'
+    )
+    return ' '.join(_NO_LETRAS.sub(' ', sin_acentos.lower()).split())
+
+
+def _fonetica(palabra: str) -> str:
+    """Clave fonética de una palabra ya normalizada."""
+    for patron, reemplazo in _REGLAS_FONETICAS:
+        palabra = patron.sub(reemplazo, palabra)
+    return palabra
+
+
+class FormaNombre:
+    """
+    Un nombre preparado para compararse (ver forma_nombre).
+
+    Attributes:
+        normalizado: Forma normalizada ('' si el nombre no tiene letras).
+        fonetica: Palabras fonéticas, ordenadas y unidas por espacios.
+        bigramas: Bigramas de letras de cada palabra (con bordes), con las
+            repeticiones numeradas.
+    """
+
+    __slots__ = ('normalizado', 'fonetica', 'bigramas')
+
+    def __init__(self, nombre: str) -> None:
+        self.normalizado = normalizar_nombre(nombre)
+        palabras = self.normalizado.split()
+        self.fonetica = ' '.join(sorted(_fonetica(p) for p in palabras))
+        vistos: dict = {}
+        bigramas = []
+        for palabra in palabras:
+            borde = f' {palabra} '
+            for i in range(len(borde) - 1):
+                bigrama = borde[i:i + 2]
+                vistos[bigrama] = vistos.get(bigrama, 0) + 1
+                bigramas.append(bigrama if vistos[bigrama] == 1
+                                else f'{bigrama}#{vistos[bigrama]}')
+        self.bigramas = frozenset(bigramas)
+
+
+@lru_cache(maxsize=8192)
+def forma_nombre(nombre: str) -> FormaNombre:
+    """FormaNombre de `nombre`, calculada una sola vez por nombre."""
+    return FormaNombre(nombre)
+
+
+def _calibrar(dice: float) -> float:
+    """Llevar un Dice a la escala del comparador anterior (lineal por tramos)."""
+    if dice >= DICE_ALTO:
+        return SIMILITUD_ALTA + (dice - DICE_ALTO) * (1 - SIMILITUD_ALTA) / (1 - DICE_ALTO)
+    if dice >= DICE_MEDIO:
+        return SIMILITUD_MEDIA + (dice - DICE_MEDIO) * (
+            (SIMILITUD_ALTA - SIMILITUD_MEDIA) / (DICE_ALTO - DICE_MEDIO)
+        )
+    return dice * SIMILITUD_MEDIA / DICE_MEDIO
+
+
+def similitud(uno: str, otro: str) -> float:
+    """
+    Similitud entre dos nombres, de 0 a 1.
+
+    La misma clave fonética (mismas palabras en cualquier orden, o que
+    suenan igual) vale 1.0; si no, Dice de bigramas calibrado. Un nombre
+    vacío da 0.0.
+    """
+    a, b = forma_nombre(uno or ''), forma_nombre(otro or '')
+    if not a.bigramas or not b.bigramas:
+        return 0.0
+    if a.fonetica == b.fonetica:
+        return 1.0
+    comunes = len(a.bigramas & b.bigramas)
+    return _calibrar(2 * comunes / (len(a.bigramas) + len(b.bigramas)))
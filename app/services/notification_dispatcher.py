@@ -0,0 +1,182 @@
+"""
+Dispatcher de la bandeja de salida de notificaciones (notification_outbox).
+
+Los cambios de estado de una orden dejan sus notificaciones en la outbox, en
+el mismo commit (ver NotificationService). Este dispatcher las saca por
+lotes y las envía fuera del request:
+
+    1. toma un lote de pendientes vencidas (FOR UPDATE SKIP LOCKED) y las
+       aparta con un lease, contando el intento
+    2. las envía en paralelo, con un pool de hilos POR CANAL: un canal lento
+       (la API de Telegram) no frena a los demás, y cada canal tiene su
+       propio tope de envíos simultáneos (LIMITES). Un envío que no arrancó
+       dentro de PLAZO no se hace: la fila vuelve a pendiente de inmediato.
+       Así el lote termina antes de que venza el lease (PLAZO + ENVIO_MAX <
+       LEASE) y otro dispatcher nunca toma una fila que se está enviando
+    3. registra el lote en un solo commit: enviada, reintento con backoff
+       exponencial (BACKOFF_BASE · 2^(intento-1), con tope) o fallida al
+       agotar MAX_INTENTOS
+
+Cada canal es un callable ``enviar(recipient, payload) -> (ok, detalle)``
+(NotificationService.outbox_senders); los tests pasan sustitutos locales.
+
+Lo ejecuta scripts/notification_dispatcher.py (systemd).
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Sender = Callable[[str, dict], Tuple[bool, str]]
+
+
+class NotificationDispatcher:
+    """
+    Envía la outbox por lotes con reintentos y topes por canal.
+
+    Attributes:
+        LIMITES: Envíos simultáneos por canal (DEFAULT_LIMITE para el resto).
+        LOTE: Filas por lote.
+        PLAZO: Segundos desde que se toma el lote en que un envío aún puede
+            arrancar; los que no arrancaron vuelven a pendiente.
+        ENVIO_MAX: Lo más que tarda un envío ya arrancado (TelegramChannel:
+            hasta 120 s en la cola del TelegramSender más el HTTP en vuelo).
+        LEASE: Segundos que una fila tomada queda oculta a otros dispatchers;
+            cubre el lote entero (PLAZO + ENVIO_MAX) con margen.
+        ESPERA: Segundos entre consultas cuando la outbox está vacía.
+        MAX_INTENTOS: Intentos antes de marcarla fallida.
+        BACKOFF_BASE, BACKOFF_MAX: Espera del primer reintento y tope (s).
+    """
+
+    LIMITES = {'telegram': 4, 'push': 8, 'whatsapp': 2, 'webchat': 2}
+    DEFAULT_LIMITE = 2
+    LOTE = 50
+    PLAZO = 60
+    ENVIO_MAX = 190
+    LEASE = PLAZO + ENVIO_MAX + 50
+    ESPERA = 2
+    MAX_INTENTOS = 6
+    BACKOFF_BASE = 10
+    BACKOFF_MAX = 1800
+
+    def __init__(self, senders: Dict[str, Sender],
+                 limites: Optional[Dict[str, int]] = None,
+                 contexto: Optional[Callable] = None) -> None:
+        """
+        Args:
+            senders: {canal: enviar(recipient, payload) -> (ok, detalle)}.
+            limites: Topes por canal (por defecto LIMITES).
+            contexto: Fábrica de context manager que envuelve cada envío
+                (el script pasa el app context de Flask). None en tests.
+        """
+        self.senders = senders
+        self.limites = dict(self.LIMITES, **(limites or {}))
+        self.contexto = contexto or nullcontext
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+
+    @classmethod
+    def proximo_intento(cls, intentos: int, ahora: Optional[datetime] = None
+                        ) -> Optional[datetime]:
+        """
+        Cuándo reintentar tras `intentos` fallidos (None = no reintentar).
+
+        Backoff exponencial: 10 s, 20 s, 40 s... hasta BACKOFF_MAX.
+        """
+        if intentos >= cls.MAX_INTENTOS:
+            return None
+        espera = min(cls.BACKOFF_BASE * 2 ** (intentos - 1), cls.BACKOFF_MAX)
+        return (ahora or datetime.utcnow()) + timedelta(seconds=espera)
+
+    def _pool(self, canal: str) -> ThreadPoolExecutor:
+        """Pool de hilos del canal (uno por canal, creado al primer uso)."""
+        if canal not in self._pools:
+            self._pools[canal] = ThreadPoolExecutor(
+                max_workers=self.limites.get(canal, self.DEFAULT_LIMITE),
+                thread_name_prefix=f'outbox-{canal}',
+            )
+        return self._pools[canal]
+
+    def _enviar_uno(self, envio: dict, plazo: float) -> Optional[Tuple[bool, str]]:
+        """
+        Enviar una fila por su canal (corre en el pool del canal).
+
+        Returns:
+            (ok, detalle), o None si le tocó turno pasado el plazo del lote
+            (monotónico) y no se envió.
+        """
+        if time.monotonic() > plazo:
+            return None
+        sender = self.senders.get(envio['channel'])
+        if sender is None:
+            return False, f"Canal sin sender: {envio['channel']}"
+        try:
+            with self.contexto():
+                return sender(envio['recipient'], envio['payload'])
+        except Exception as exc:
+            return False, str(exc)
+
+    def enviar(self, envios: List[dict]
+               ) -> List[Tuple[int, bool, str, Optional[datetime]]]:
+        """
+        Enviar un lote en paralelo (topes por canal) y calcular su destino.
+
+        Returns:
+            (id, ok, detalle, proximo_intento) por envío, para record_results.
+            Los que no arrancaron dentro de PLAZO quedan para ya mismo.
+        """
+        plazo = time.monotonic() + self.PLAZO
+        futuros: List[Tuple[dict, Future]] = [
+            (envio, self._pool(envio['channel']).submit(self._enviar_uno, envio, plazo))
+            for envio in envios
+        ]
+        resultados = []
+        for envio, futuro in futuros:
+            resultado = futuro.result()
+            if resultado is None:
+                resultados.append((envio['id'], False, 'Sin turno dentro del plazo del lote',
+                                   datetime.utcnow()))
+                continue
+            ok, detalle = resultado
+            proximo = None if ok else self.proximo_intento(envio['attempts'])
+            if not ok:
+                logger.warning(
+                    f"Outbox {envio['id']} ({envio['channel']}) intento "
+                    f"{envio['attempts']}: {detalle}"
+                )
+            resultados.append((envio['id'], ok, str(detalle), proximo))
+        return resultados
+
+    def drenar_lote(self) -> int:
+        """Tomar, enviar y registrar un lote. Devuelve las filas tomadas."""
+        from app.models.notification_outbox import NotificationOutbox
+
+        envios = NotificationOutbox.claim_batch(self.LOTE, self.LEASE)
+        if not envios:
+            return 0
+        conteo = NotificationOutbox.record_results(self.enviar(envios))
+        logger.info(f"Outbox: {len(envios)} filas -> {conteo}")
+        return len(envios)
+
+    def correr(self, detener: Optional[threading.Event] = None) -> None:
+        """
+        Drenar la outbox hasta que `detener` se active.
+
+        Con lote lleno sigue de inmediato; si no, espera ESPERA segundos.
+        """
+        detener = detener or threading.Event()
+        try:
+            while not detener.is_set():
+                try:
+                    if self.drenar_lote() < self.LOTE:
+                        detener.wait(self.ESPERA)
+                except Exception as exc:
+                    logger.error(f"Outbox: {exc}; reintento en {self.ESPERA}s")
+                    detener.wait(self.ESPERA)
+        finally:
+            for pool in self._pools.values():
+                pool.shutdown(wait=True)
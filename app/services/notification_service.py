@@ -1,11 +1,18 @@
 """
 Servicio de notificaciones.
 Maneja envío de notificaciones a usuarios y operadores usando canales.
+
+Las notificaciones de cambio de estado de una orden no se envían en el
+request: se agregan a la outbox (NotificationOutbox.stage) para que se
+guarden en el mismo commit que la orden, y las envía el dispatcher
+(app/services/notification_dispatcher.py) con los senders de
+``outbox_senders``.
 """
 from app.services.base_service import BaseService
 from app.models import User, Operator, Order, Message
+from app.models.notification_outbox import NotificationOutbox
 from app.channels import ChannelFactory
-from typing import Optional, Dict, Any, Tuple
+from typing import Callable, Optional, Dict, Any, List, Tuple
 
 
 class NotificationService(BaseService):
@@ -20,6 +27,10 @@ class NotificationService(BaseService):
     Nota: las notificaciones al cliente se despachan de forma agnóstica al
     canal mediante ``ChannelFactory`` (telegram, whatsapp, webchat, ...).
     La notificación a operadores sigue pendiente de integración con su canal.
+
+    Los ``notify_order_*`` de cambio de estado NO hacen commit: el llamador
+    (OrderService) los invoca antes de ``order.transition_to`` para que la
+    outbox se guarde junto con la orden.
     """
 
     @classmethod
@@ -64,18 +75,19 @@ class NotificationService(BaseService):
             return False, f"Error al crear mensaje: {str(e)}", None
 
     @classmethod
-    def _send_to_order_channel(cls, order: Order, message_text: str) -> Tuple[bool, str]:
+    def _send_to_order_channel(cls, order: Order, message_text: str,
+                               event: str = 'order_update') -> Tuple[bool, str]:
         """
-        Enviar un mensaje al cliente por el canal de la orden.
+        Encolar un mensaje al cliente por el canal de la orden.
 
-        Despacha al canal correcto (telegram, whatsapp, webchat, ...) usando
-        ``ChannelFactory``, de modo que el servicio no quede acoplado a un canal
-        específico. Valida que la orden tenga canal y chat_id, y que el canal
-        esté disponible.
+        El canal (telegram, whatsapp, webchat, ...) lo resuelve el dispatcher
+        con ``ChannelFactory`` al enviar. Valida que la orden tenga canal y
+        chat_id.
 
         Args:
             order: Orden cuyo ``channel`` y ``channel_chat_id`` definen el destino.
             message_text: Texto del mensaje a enviar.
+            event: Evento de origen (queda en la fila de la outbox).
 
         Returns:
             Tupla (success, message).
@@ -86,56 +98,92 @@ class NotificationService(BaseService):
             )
             return False, "Canal no disponible"
 
-        try:
-            channel = ChannelFactory.get_channel(order.channel)
-        except ValueError as e:
-            cls.log_error(f"Canal desconocido para orden {order.reference}", e)
-            return False, f"Canal desconocido: {order.channel}"
-
-        if not channel or not channel.is_available():
-            cls.log_warning(
-                f"Canal '{order.channel}' no disponible para orden {order.reference}"
-            )
-            return False, "Canal no disponible"
-
-        success, result = channel.send_message(
-            recipient_id=order.channel_chat_id,
-            text=message_text,
-            parse_mode='HTML'
+        NotificationOutbox.stage(
+            event=event, channel=order.channel.lower(),
+            recipient=order.channel_chat_id,
+            payload={'text': message_text, 'parse_mode': 'HTML'},
+            order_id=order.id,
         )
+        return True, "Notificación encolada"
 
-        if success:
-            cls.log_info(
-                f"Notificación enviada para orden {order.reference} vía '{order.channel}'"
-            )
-            return True, "Notificación enviada"
-
-        cls.log_error(f"Error al enviar notificación: {result}", None)
-        return False, f"Error al enviar: {result}"
+    @classmethod
+    def _web_user_ids(cls, user_id: int) -> List[int]:
+        """Ids de los WebUser activos vinculados a un usuario de canal."""
+        from app.models.web_user import WebUser
+        return [
+            web_user_id for (web_user_id,) in
+            WebUser.query.with_entities(WebUser.id)
+            .filter_by(user_id=user_id, is_active=True)
+        ]
 
     @classmethod
-    def _push_to_order_client(cls, order: Order, title: str, body: str) -> None:
+    def _push_to_order_client(cls, order: Order, title: str, body: str,
+                              event: str = 'order_update') -> None:
         """
-        Enviar Web Push a los clientes (WebUser) vinculados al usuario de la orden.
+        Encolar Web Push a los clientes (WebUser) vinculados al usuario de la orden.
 
-        Best-effort: si no hay WebUser vinculado o el envío falla, no interrumpe
-        el flujo de notificación por canal conversacional.
+        Best-effort: si no hay WebUser vinculado o la consulta falla, no
+        interrumpe el flujo de notificación por canal conversacional.
 
         Args:
             order: Orden cuyo cambio de estado se notifica.
             title: Título de la notificación push.
             body: Cuerpo de la notificación push.
+            event: Evento de origen (queda en la fila de la outbox).
         """
         try:
-            from app.models.web_user import WebUser
-            from app.services.push_service import PushService
-            web_users = WebUser.query.filter_by(
-                user_id=order.user_id, is_active=True
-            ).all()
-            for web_user in web_users:
-                PushService.send_to_user(web_user.id, title, body, url='/cuenta')
+            for web_user_id in cls._web_user_ids(order.user_id):
+                NotificationOutbox.stage(
+                    event=event, channel='push', recipient=web_user_id,
+                    payload={'title': title, 'body': body, 'url': '/cuenta'},
+                    order_id=order.id,
+                )
         except Exception as exc:
-            cls.log_error("Error al enviar push de orden", exc)
+            cls.log_error("Error al encolar push de orden", exc)
+
+    # ── Envío (dispatcher de la outbox) ───────────────────────────────────
+
+    @classmethod
+    def _channel_sender(cls, channel_type: str) -> Callable[[str, dict], Tuple[bool, str]]:
+        """Sender de la outbox para un canal conversacional."""
+        def enviar(recipient: str, payload: dict) -> Tuple[bool, str]:
+            channel = ChannelFactory.get_channel(channel_type)
+            if not channel or not channel.is_available():
+                return False, f"Canal '{channel_type}' no disponible"
+            return channel.send_message(
+                recipient_id=recipient,
+                text=payload['text'],
+                parse_mode=payload.get('parse_mode', 'HTML'),
+            )
+        return enviar
+
+    @staticmethod
+    def _push_sender(recipient: str, payload: dict) -> Tuple[bool, str]:
+        """
+        Sender de la outbox para Web Push (los endpoints muertos se desactivan ahí).
+
+        Falla, y la outbox reintenta, si ningún dispositivo lo recibió por
+        una falla transitoria (5xx, timeout, VAPID sin configurar). Si al
+        menos uno lo recibió no se reintenta: repetiría el aviso en ese.
+        """
+        from app.services.push_service import PushService
+        enviados, fallidos = PushService.deliver_to_user(
+            int(recipient), payload['title'], payload['body'],
+            url=payload.get('url', '/cuenta'),
+        )
+        if fallidos and not enviados:
+            return False, f"{fallidos} push sin entregar"
+        return True, f"{enviados} push enviados"
+
+    @classmethod
+    def outbox_senders(cls) -> Dict[str, Callable[[str, dict], Tuple[bool, str]]]:
+        """Senders por canal para NotificationDispatcher."""
+        senders = {
+            channel_type: cls._channel_sender(channel_type)
+            for channel_type in ('telegram', 'whatsapp', 'webchat')
+        }
+        senders['push'] = cls._push_sender
+        return senders
 
     @classmethod
     def notify_order_created(cls, order: Order) -> Tuple[bool, str]:
@@ -175,27 +223,31 @@ class NotificationService(BaseService):
                 order,
                 'Ceiba21',
                 f"Recibimos tu orden {order.reference}, está en verificación.",
+                event='order_submitted',
             )
-            cls.log_info(f"Notificación de orden enviada: {order.reference}")
-            return True, "Notificación enviada"
+            cls.log_info(f"Notificación de orden encolada: {order.reference}")
+            return True, "Notificación encolada"
 
         except Exception as e:
             cls.log_error("Error al notificar orden enviada", e)
             return False, f"Error: {str(e)}"
 
     @classmethod
-    def notify_order_assigned(cls, order: Order) -> Tuple[bool, str]:
+    def notify_order_assigned(cls, order: Order,
+                              operator: Optional[Operator] = None) -> Tuple[bool, str]:
         """
         Notificar que orden fue asignada a operador.
 
         Args:
             order: Orden asignada
+            operator: Operador que la toma (si aún no quedó en la orden)
 
         Returns:
             Tupla (success, message)
         """
         try:
-            operator_name = order.operator.full_name if order.operator else "un operador"
+            operator = operator or order.operator
+            operator_name = operator.full_name if operator else "un operador"
             currency_code = order.currency.code if order.currency else ''
 
             message_text = f"""
@@ -214,8 +266,9 @@ Te notificaremos cuando esté completada.
                 order,
                 'Ceiba21',
                 f"Tu orden {order.reference} está siendo procesada ✅",
+                event='order_assigned',
             )
-            return cls._send_to_order_channel(order, message_text)
+            return cls._send_to_order_channel(order, message_text, event='order_assigned')
 
         except Exception as e:
             cls.log_error("Error al notificar orden asignada", e)
@@ -255,8 +308,9 @@ Tu orden <b>{order.reference}</b> ha sido procesada.
                 order,
                 'Ceiba21',
                 f"🎉 Tu orden {order.reference} fue completada.",
+                event='order_completed',
             )
-            return cls._send_to_order_channel(order, message_text)
+            return cls._send_to_order_channel(order, message_text, event='order_completed')
 
         except Exception as e:
             cls.log_error("Error al notificar orden completada", e)
@@ -294,8 +348,9 @@ Puedes crear una nueva orden cuando desees. 🌳
                 order,
                 'Ceiba21',
                 f"Tu orden {order.reference} fue cancelada.",
+                event='order_cancelled',
             )
-            return cls._send_to_order_channel(order, message_text)
+            return cls._send_to_order_channel(order, message_text, event='order_cancelled')
 
         except Exception as e:
             cls.log_error("Error al notificar orden cancelada", e)
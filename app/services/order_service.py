@@ -146,14 +146,17 @@ class OrderService(BaseService):
             if not operator.is_active:
                 return False, "Operador no está activo", None
             
+            # Notificar al cliente: la outbox se guarda en el mismo commit
+            # que la transición (si falla, el rollback la descarta)
+            from app.services.notification_service import NotificationService
+            if order.can_transition_to(OrderStatus.IN_PROCESS):
+                NotificationService.notify_order_assigned(order, operator)
+            
             # Transicionar a IN_PROCESS
             success, message = order.transition_to(OrderStatus.IN_PROCESS, operator)
             
             if success:
                 cls.log_info(f"Orden {order.reference} asignada a operador {operator.username}")
-                # Notificar al cliente
-                from app.services.notification_service import NotificationService
-                NotificationService.notify_order_assigned(order)
             
             return success, message, order
             
@@ -198,14 +201,16 @@ class OrderService(BaseService):
             if notes:
                 order.operator_notes = notes
             
+            # Notificar al cliente (outbox, en el mismo commit que la transición)
+            from app.services.notification_service import NotificationService
+            if order.can_transition_to(OrderStatus.COMPLETED):
+                NotificationService.notify_order_completed(order)
+            
             # Transicionar a COMPLETED (crea transacciones automáticamente)
             success, message = order.transition_to(OrderStatus.COMPLETED, operator)
             
             if success:
                 cls.log_info(f"Orden {order.reference} completada por operador {operator.username}")
-                # Notificar al cliente
-                from app.services.notification_service import NotificationService
-                NotificationService.notify_order_completed(order)
             
             return success, message, order
             
@@ -239,14 +244,16 @@ class OrderService(BaseService):
             if operator_id:
                 operator = Operator.find_by_id(operator_id)
             
+            # Notificar al cliente (outbox, en el mismo commit que la transición)
+            from app.services.notification_service import NotificationService
+            if order.can_transition_to(OrderStatus.CANCELLED):
+                NotificationService.notify_order_cancelled(order, reason)
+            
             # Transicionar a CANCELLED
             success, message = order.transition_to(OrderStatus.CANCELLED, operator, reason)
             
             if success:
                 cls.log_info(f"Orden {order.reference} cancelada: {reason}")
-                # Notificar al cliente
-                from app.services.notification_service import NotificationService
-                NotificationService.notify_order_cancelled(order, reason)
             
             return success, message, order
             
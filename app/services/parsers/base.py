@@ -25,11 +25,41 @@ los rellena la ingesta desde el dict `correo` (message_id, to_raw).
 
 El dict `correo` que recibe cada parser viene de GmailService con las claves:
     message_id, subject, sender, to_raw, date, html_body, imap_uid
+
+El registry lo envuelve en un CorreoParseado: el HTML se convierte en DOM una
+sola vez (a demanda) y todos los parsers usan ese mismo arbol vía _sopa().
 """
 from abc import ABC, abstractmethod
 from datetime import datetime, timezone
 from email.utils import parsedate_to_datetime
-from typing import Optional
+from typing import Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+# lxml es bastante más rápido que html.parser; es opcional (si no está
+# instalado, BeautifulSoup usa el parser de la stdlib).
+try:
+    import lxml  # noqa: F401
+    PARSER_HTML = 'lxml'
+except ImportError:
+    PARSER_HTML = 'html.parser'
+
+
+class CorreoParseado(dict):
+    """
+    Dict `correo` con el DOM del cuerpo construido a demanda y una sola vez.
+
+    Se comporta como el dict original (los parsers siguen leyendo claves);
+    sopa() parsea html_body la primera vez que alguien lo pide y devuelve el
+    mismo arbol en las siguientes llamadas. Los parsers no deben modificarlo.
+    """
+
+    def sopa(self) -> Optional[BeautifulSoup]:
+        """DOM de html_body, o None si el correo no trae HTML."""
+        if not hasattr(self, '_sopa'):
+            html = self.get('html_body')
+            self._sopa = BeautifulSoup(html, PARSER_HTML) if html else None
+        return self._sopa
 
 
 class EmailPaymentParser(ABC):
@@ -38,6 +68,11 @@ class EmailPaymentParser(ABC):
     #: Metodo al que pertenece el parser (valor de PaymentProvider).
     metodo: str = ''
 
+    #: Dominios remitentes que atiende (incluye subdominios). El registry
+    #: solo consulta al parser para correos de estos dominios; vacio = se le
+    #: pregunta por todos los correos.
+    remitentes: Tuple[str, ...] = ()
+
     @abstractmethod
     def puede_parsear(self, correo: dict) -> bool:
         """
@@ -65,6 +100,22 @@ class EmailPaymentParser(ABC):
             dict con el shape canonico, o None si no se pudo extraer.
         """
 
+    @staticmethod
+    def _sopa(correo: dict) -> Optional[BeautifulSoup]:
+        """
+        DOM del cuerpo del correo, compartido si viene del registry.
+
+        Args:
+            correo: Dict del correo; si es un CorreoParseado se reutiliza su
+                arbol, si es un dict suelto (tests, scripts) se parsea aqui.
+
+        Returns:
+            BeautifulSoup de html_body, o None si no hay HTML.
+        """
+        if not isinstance(correo, CorreoParseado):
+            correo = CorreoParseado(correo)
+        return correo.sopa()
+
     @staticmethod
     def _fecha_desde_header(correo: dict) -> Optional[datetime]:
         """
@@ -0,0 +1,197 @@
+"""
+Benchmark de los parsers de correos de pago sobre el corpus anonimizado.
+
+El corpus (app/tests/corpus/parsers/*.json) tiene un correo por caso real
+de cada proveedor (PayPal F&F, G&S y payout, Wise, Zelle, Skrill, Binance y
+un correo de PayPal que NO es pago), con la maqueta completa del correo para
+que el costo de armar el DOM sea el de producción, y el resultado esperado.
+Los tests lo usan como corpus de regresión; este módulo mide velocidad:
+
+    - por parser: parse() de sus casos, DOM incluido
+    - end to end: ParserRegistry.parse() de todo el corpus (ruteo incluido)
+
+Para cada uno reporta correos/segundo, latencia p50/p99 y memoria pico, y
+compara contra una línea base guardada. Corre offline (sin Gmail ni BD);
+lo ejecuta scripts/bench_parsers.py.
+"""
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.services.parsers.base import PARSER_HTML, CorreoParseado
+from app.services.parsers.registry import ParserRegistry
+
+CORPUS_DIR = Path(__file__).resolve().parents[2] / 'tests' / 'corpus' / 'parsers'
+BASELINE = CORPUS_DIR.parent / 'bench_parsers_baseline.json'
+
+
+def cargar_corpus(directorio: Path = CORPUS_DIR) -> List[dict]:
+    """
+    Lee el corpus de correos.
+
+    Returns:
+        Lista de {'caso', 'correo', 'esperado'} ordenada por caso; esperado
+        es el shape canónico (fecha_pago en ISO) o None si nadie lo reclama.
+    """
+    corpus = []
+    for ruta in sorted(Path(directorio).glob('*.json')):
+        with open(ruta, encoding='utf-8') as f:
+            corpus.append(json.load(f))
+    return corpus
+
+
+class BenchmarkParsers:
+    """
+    Mide los parsers sobre el corpus y lo compara con una línea base.
+
+    Attributes:
+        ITERACIONES: Pasadas por el corpus en la medición de tiempos.
+        TOLERANCIA: Empeoramiento relativo admitido antes de marcar regresión.
+    """
+
+    ITERACIONES = 100
+    TOLERANCIA = 0.25
+
+    def __init__(self, corpus: List[dict], iteraciones: Optional[int] = None) -> None:
+        """
+        Args:
+            corpus: Casos de cargar_corpus().
+            iteraciones: Sobrescribe ITERACIONES (tests, corridas rápidas).
+        """
+        self.corpus = corpus
+        self.iteraciones = iteraciones or self.ITERACIONES
+        self.registry = ParserRegistry()
+
+    @staticmethod
+    def entorno() -> dict:
+        """Datos de la máquina: la línea base solo vale en el mismo entorno."""
+        return {
+            'python': platform.python_version(),
+            'maquina': platform.machine(),
+            'parser_html': PARSER_HTML,
+        }
+
+    @staticmethod
+    def percentil(valores: List[float], p: float) -> float:
+        """Percentil p (0-100) por rango más cercano de una lista no vacía."""
+        ordenados = sorted(valores)
+        indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+        return ordenados[indice]
+
+    def correr(self) -> dict:
+        """
+        Mide cada parser y el registry completo.
+
+        Returns:
+            {'entorno': {...}, 'iteraciones': N, 'resultados': {nombre:
+            métricas}} con un nombre por clase de parser más 'registry'.
+        """
+        por_parser: Dict[str, tuple] = {}
+        for caso in self.corpus:
+            parser = self.registry.seleccionar(caso['correo'])
+            if parser is not None:
+                nombre = parser.__class__.__name__
+                por_parser.setdefault(nombre, (parser, []))[1].append(caso['correo'])
+
+        resultados = {}
+        for nombre, (parser, correos) in sorted(por_parser.items()):
+            # CorreoParseado nuevo por llamada: el DOM se arma dentro de la medida
+            resultados[nombre] = self._medir(
+                lambda correo, p=parser: p.parse(CorreoParseado(correo)), correos
+            )
+        resultados['registry'] = self._medir(
+            self.registry.parse, [caso['correo'] for caso in self.corpus]
+        )
+        return {
+            'entorno': self.entorno(),
+            'iteraciones': self.iteraciones,
+            'resultados': resultados,
+        }
+
+    def _medir(self, funcion: Callable[[dict], object], correos: List[dict]) -> dict:
+        """
+        Tiempos y memoria de `funcion` sobre `correos`.
+
+        Una pasada de calentamiento, `iteraciones` pasadas cronometradas
+        correo a correo (con el GC apagado, como timeit, para que una pausa
+        de recolección no infle el p99) y una pasada aparte con tracemalloc
+        (que ralentiza, por eso no se mezcla con los tiempos). Los correos/s
+        salen de la pasada más rápida: como en timeit, las lentas miden más
+        la carga de la máquina que al parser.
+        """
+        for correo in correos:
+            funcion(correo)
+
+        latencias = []
+        mejor_pasada = float('inf')
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(self.iteraciones):
+                pasada = 0.0
+                for correo in correos:
+                    t0 = time.perf_counter()
+                    funcion(correo)
+                    latencia = time.perf_counter() - t0
+                    latencias.append(latencia)
+                    pasada += latencia
+                mejor_pasada = min(mejor_pasada, pasada)
+        finally:
+            gc.enable()
+
+        tracemalloc.start()
+        try:
+            for correo in correos:
+                funcion(correo)
+            _actual, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'correos': len(correos),
+            'correos_por_segundo': round(len(correos) / mejor_pasada, 1),
+            'p50_ms': round(self.percentil(latencias, 50) * 1000, 3),
+            'p99_ms': round(self.percentil(latencias, 99) * 1000, 3),
+            'memoria_pico_kb': round(pico / 1024, 1),
+        }
+
+    @classmethod
+    def comparar(
+        cls,
+        actual: dict,
+        baseline: dict,
+        tolerancia: Optional[float] = None
+    ) -> List[str]:
+        """
+        Regresiones de una corrida respecto de la línea base.
+
+        Args:
+            actual: Resultado de correr().
+            baseline: Resultado guardado con el que comparar.
+            tolerancia: Sobrescribe TOLERANCIA (0.25 = hasta 25% peor).
+
+        Returns:
+            Una descripción por métrica que empeoró más de la tolerancia
+            (lista vacía = sin regresiones).
+        """
+        tolerancia = cls.TOLERANCIA if tolerancia is None else tolerancia
+        regresiones = []
+        for nombre, base in baseline.get('resultados', {}).items():
+            medido = actual.get('resultados', {}).get(nombre)
+            if medido is None:
+                continue
+            if medido['correos_por_segundo'] < base['correos_por_segundo'] * (1 - tolerancia):
+                regresiones.append(
+                    f"{nombre}: {medido['correos_por_segundo']} correos/s "
+                    f"(base {base['correos_por_segundo']})"
+                )
+            for metrica in ('p99_ms', 'memoria_pico_kb'):
+                if medido[metrica] > base[metrica] * (1 + tolerancia):
+                    regresiones.append(
+                        f"{nombre}: {metrica} {medido[metrica]} (base {base[metrica]})"
+                    )
+        return regresiones
@@ -41,6 +41,7 @@ class BinanceParser(EmailPaymentParser):
     metodo = PaymentProvider.BINANCE
 
     _REMITENTE = 'ses.binance.com'
+    remitentes = (_REMITENTE,)
     _MARCADORES = ('pago recibido', 'payment received')
 
     def puede_parsear(self, correo: dict) -> bool:
@@ -57,7 +58,7 @@ class BinanceParser(EmailPaymentParser):
             logger.error(f"Correo Binance sin HTML: {message_id}")
             return None
 
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = self._sopa(correo)
         lineas = self._lineas(soup)
 
         monto, activo = self._monto_activo(self._valor_tras(lineas, 'Monto'))
@@ -60,6 +60,7 @@ class PaypalParser(EmailPaymentParser):
     metodo = PaymentProvider.PAYPAL
 
     _REMITENTE = 'intl.paypal.com'
+    remitentes = (_REMITENTE,)
     # Los correos de pago real tienen el nombre del remitente en el asunto:
     # "[Nombre] le ha enviado $X.XX" / "[Name] sent you $X.XX"
     # Discriminar por ASUNTO primero evita que notificaciones (resúmenes,
@@ -95,7 +96,7 @@ class PaypalParser(EmailPaymentParser):
             logger.error(f"Correo PayPal sin HTML: {message_id}")
             return None
 
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = self._sopa(correo)
 
         titulo = self._extraer_titulo(soup)
         if not titulo.get('importe_bruto'):
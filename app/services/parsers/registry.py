@@ -4,11 +4,18 @@ Registro/runner de parsers de correos de pago.
 Mantiene la lista de parsers disponibles y, dado un correo, devuelve el primero
 que lo reconoce (puede_parsear). Agregar un metodo nuevo = registrar su parser
 aqui; nada mas cambia en la ingesta.
+
+Para no preguntarle a todos los parsers por cada correo, el registry arma un
+indice dominio remitente -> parsers a partir de los `remitentes` que declara
+cada uno; un correo solo se evalua con los parsers de su dominio (mas los que
+no declaran remitentes). El HTML se parsea una vez por correo (CorreoParseado)
+y ese DOM lo comparten todos los parsers.
 """
 import logging
-from typing import List, Optional, Tuple
+from email.utils import parseaddr
+from typing import Dict, List, Optional, Tuple, Union
 
-from app.services.parsers.base import EmailPaymentParser
+from app.services.parsers.base import CorreoParseado, EmailPaymentParser
 from app.services.parsers.paypal_parser import PaypalParser
 from app.services.parsers.wise_parser import WiseParser
 from app.services.parsers.zelle_parser import ZelleParser
@@ -27,6 +34,13 @@ class ParserRegistry:
             parsers: Lista de parsers a usar. Si es None, usa los por defecto.
         """
         self._parsers: List[EmailPaymentParser] = parsers or self._default_parsers()
+        self._por_dominio: Dict[str, List[EmailPaymentParser]] = {}
+        for parser in self._parsers:
+            for dominio in parser.remitentes:
+                self._por_dominio.setdefault(dominio.lower(), []).append(parser)
+        # Sin remitentes declarados: se le pregunta por todos los correos
+        self._comodines = [p for p in self._parsers if not p.remitentes]
+        self._candidatos_cache: Dict[str, List[EmailPaymentParser]] = {}
 
     @staticmethod
     def _default_parsers() -> List[EmailPaymentParser]:
@@ -34,17 +48,59 @@ class ParserRegistry:
         return [PaypalParser(), WiseParser(), ZelleParser(),
                 SkrillParser(), BinanceParser()]
 
+    @staticmethod
+    def dominio_remitente(sender: str) -> str:
+        """
+        Dominio de la direccion del header From, en minusculas.
+
+        Args:
+            sender: Header From crudo ('PayPal <service@intl.paypal.com>').
+
+        Returns:
+            'intl.paypal.com', o '' si no hay direccion reconocible.
+        """
+        direccion = parseaddr(sender or '')[1]
+        return direccion.rpartition('@')[2].strip().lower() if '@' in direccion else ''
+
+    def candidatos(self, correo: dict) -> List[EmailPaymentParser]:
+        """
+        Parsers a consultar para un correo, en orden de registro.
+
+        Los del dominio remitente (o de un dominio padre: 'mail.wise.com'
+        cae en 'wise.com') mas los parsers sin remitentes declarados. El
+        resultado se cachea por dominio.
+
+        Args:
+            correo: Dict del correo (claves de GmailService).
+
+        Returns:
+            Lista de parsers (vacia si el dominio no es de ningun proveedor).
+        """
+        dominio = self.dominio_remitente(correo.get('sender') or '')
+        candidatos = self._candidatos_cache.get(dominio)
+        if candidatos is None:
+            elegidos = set(map(id, self._comodines))
+            partes = dominio.split('.') if dominio else []
+            for i in range(len(partes)):
+                for parser in self._por_dominio.get('.'.join(partes[i:]), ()):
+                    elegidos.add(id(parser))
+            candidatos = [p for p in self._parsers if id(p) in elegidos]
+            self._candidatos_cache[dominio] = candidatos
+        return candidatos
+
     def seleccionar(self, correo: dict) -> Optional[EmailPaymentParser]:
         """
         Devuelve el primer parser que reconoce el correo, o None.
 
+        Solo se evaluan los candidatos del dominio remitente (ver candidatos).
+
         Args:
             correo: Dict del correo (claves de GmailService).
 
         Returns:
             El parser que reclama el correo, o None si ninguno lo reconoce.
         """
-        for parser in self._parsers:
+        for parser in self.candidatos(correo):
             try:
                 if parser.puede_parsear(correo):
                     return parser
@@ -67,6 +123,8 @@ class ParserRegistry:
             Tupla (metodo, datos) si algun parser lo proceso, o None si ninguno
             lo reconocio o el parseo fallo.
         """
+        if not isinstance(correo, CorreoParseado):
+            correo = CorreoParseado(correo)
         parser = self.seleccionar(correo)
         if parser is None:
             logger.info(
@@ -78,4 +136,31 @@ class ParserRegistry:
         datos = parser.parse(correo)
         if datos is None:
             return None
-        return parser.metodo, datos
\ No newline at end of file
+        return parser.metodo, datos
+
+
+# Registry propio de cada proceso del pool de parseo (ver parsear_en_proceso)
+_registry_del_proceso: Optional[ParserRegistry] = None
+
+
+def parsear_en_proceso(correo: dict) -> Union[Optional[Tuple[str, dict]], ValueError]:
+    """
+    Parsea un correo con el registry por defecto de ESTE proceso.
+
+    Es la función que corre cada worker del ProcessPoolExecutor de la
+    importación histórica: recibe el dict crudo del correo y devuelve lo
+    mismo que ParserRegistry.parse. Debe vivir a nivel de módulo para poder
+    enviarse al worker; el registry se crea una vez por proceso.
+
+    Returns:
+        (metodo, datos), None si nadie lo reconoce, o el ValueError que
+        levantó el parser (se devuelve en vez de propagarse para que el
+        proceso padre lo cuente como error de ese correo).
+    """
+    global _registry_del_proceso
+    if _registry_del_proceso is None:
+        _registry_del_proceso = ParserRegistry()
+    try:
+        return _registry_del_proceso.parse(correo)
+    except ValueError as e:
+        return e
@@ -22,8 +22,6 @@ import re
 import logging
 from typing import Optional
 
-from bs4 import BeautifulSoup
-
 from app.models.payment import PaymentProvider
 from app.services.parsers.base import EmailPaymentParser
 
@@ -43,6 +41,7 @@ class SkrillParser(EmailPaymentParser):
     metodo = PaymentProvider.SKRILL
 
     _REMITENTE = 'email.skrill.com'
+    remitentes = (_REMITENTE,)
     # Skrill manda muchos correos; discriminar por asunto evita falsos positivos.
     _MARCADORES = ('dinero recibido', 'money received')
 
@@ -60,7 +59,7 @@ class SkrillParser(EmailPaymentParser):
             logger.error(f"Correo Skrill sin HTML: {message_id}")
             return None
 
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = self._sopa(correo)
         texto = soup.get_text(separator='\n')
 
         monto, moneda = self._monto_moneda(texto)
@@ -37,6 +37,7 @@ class WiseParser(EmailPaymentParser):
     metodo = PaymentProvider.WISE
 
     _REMITENTE = 'wise.com'
+    remitentes = (_REMITENTE,)
     # Wise tiene muchos tipos de correo (confirmaciones de envío, recibos, etc.)
     # que contienen "has recibido" en el cuerpo pero NO son pagos recibidos.
     # Discriminar SOLO por asunto evita falsos positivos y el log noise de parse().
@@ -56,7 +57,7 @@ class WiseParser(EmailPaymentParser):
             logger.error(f"Correo Wise sin HTML: {message_id}")
             return None
 
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = self._sopa(correo)
         detalles = self._parsear_dl(soup)
 
         monto = moneda = None
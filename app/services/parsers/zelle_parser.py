@@ -41,6 +41,7 @@ class ZelleParser(EmailPaymentParser):
     metodo = PaymentProvider.ZELLE
 
     _REMITENTE = 'ealerts.bankofamerica.com'
+    remitentes = (_REMITENTE,)
 
     def puede_parsear(self, correo: dict) -> bool:
         sender = (correo.get('sender') or '').lower()
@@ -56,7 +57,7 @@ class ZelleParser(EmailPaymentParser):
     def parse(self, correo: dict) -> Optional[dict]:
         html = correo.get('html_body') or ''
         message_id = correo.get('message_id', '')
-        soup = BeautifulSoup(html, 'html.parser') if html else None
+        soup = self._sopa(correo)
 
         pagador, monto = self._desde_asunto(correo.get('subject') or '')
         if monto is None and soup is not None:
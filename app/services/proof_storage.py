@@ -0,0 +1,297 @@
+"""
+Almacenamiento de comprobantes de pago (chat web y bot de Telegram).
+
+El archivo subido se copia a disco de a bloques mientras se calcula su
+SHA-256, sin medirlo antes ni cargarlo entero en memoria. El nombre final
+sale del hash: el mismo comprobante subido dos veces (por el chat y por
+Telegram, o reenviado) queda guardado una sola vez, y cada archivo tiene su
+fila en ``proof_files`` (ProofFile), que usa scripts/cleanup_proofs.py en vez
+de recorrer el directorio.
+
+Las vistas del operador muestran una miniatura WebP (``thumbs/<nombre>.webp``)
+que se genera en segundo plano después de guardar; mientras no exista, la
+vista cae a la imagen original.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import BinaryIO, Optional, Tuple
+
+from app.services.base_service import BaseService
+
+PROOFS_DIR = os.path.join('app', 'static', 'proofs')
+PROOF_URL_PREFIX = '/static/proofs/'
+THUMBS_SUBDIR = 'thumbs'
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class ProofStorageError(ValueError):
+    """Archivo de comprobante rechazado (vacío o demasiado grande)."""
+
+
+class ProofStorage(BaseService):
+    """
+    Guardar comprobantes deduplicados por contenido y sus miniaturas.
+
+    Attributes:
+        CHUNK_BYTES: Tamaño de cada bloque copiado y hasheado.
+        MAX_BYTES: Tope del archivo; se corta al pasarlo, sin leer el resto.
+        THUMB_SIZE: Lado mayor de la miniatura, en píxeles.
+        IMAGE_EXT: Extensiones que llevan miniatura (los PDF no).
+    """
+
+    CHUNK_BYTES = 64 * 1024
+    MAX_BYTES = 5 * 1024 * 1024  # 5 MB
+    THUMB_SIZE = 480
+    THUMB_QUALITY = 70
+    IMAGE_EXT = frozenset({'.jpg', '.png', '.webp'})
+
+    @staticmethod
+    def normalize_ext(ext: str) -> str:
+        """Extensión en minúsculas y con '.jpeg' unificado a '.jpg'."""
+        ext = (ext or '').lower()
+        return '.jpg' if ext == '.jpeg' else ext
+
+    @staticmethod
+    def filename_for(sha256: str, ext: str) -> str:
+        """Nombre en disco de un contenido (los primeros 40 hex del hash)."""
+        return f"{sha256[:40]}{ext}"
+
+    # ── Guardado ──────────────────────────────────────────────────────────
+
+    @classmethod
+    def _copy_hashing(cls, stream: BinaryIO, directory: str) -> Tuple[str, str, int]:
+        """
+        Copiar `stream` a un temporal en `directory` calculando su SHA-256.
+
+        Returns:
+            Tupla (ruta_temporal, sha256, bytes).
+
+        Raises:
+            ProofStorageError: Si el archivo está vacío o pasa de MAX_BYTES
+                (el temporal se borra).
+        """
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.subida-')
+        try:
+            with os.fdopen(fd, 'wb') as destino:
+                while True:
+                    bloque = stream.read(cls.CHUNK_BYTES)
+                    if not bloque:
+                        break
+                    size += len(bloque)
+                    if size > cls.MAX_BYTES:
+                        raise ProofStorageError('El archivo supera los 5 MB')
+                    sha.update(bloque)
+                    destino.write(bloque)
+            if size == 0:
+                raise ProofStorageError('El archivo está vacío')
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return tmp_path, sha.hexdigest(), size
+
+    @classmethod
+    def store(cls, stream: BinaryIO, ext: str, directory: str = PROOFS_DIR) -> str:
+        """
+        Guardar un comprobante y devolver su URL pública.
+
+        Si ya hay un archivo con el mismo contenido se reutiliza (el temporal
+        se descarta) y su antigüedad se renueva: la limpieza le da el plazo
+        completo desde esta subida. Un fallo al indexar no pierde el
+        comprobante: el archivo queda guardado y scripts/migrate_proof_files.py
+        lo indexa.
+
+        Args:
+            stream: Contenido, leído desde la posición actual.
+            ext: Extensión ya validada por el llamador ('.jpg', '.pdf'...).
+            directory: Carpeta de comprobantes (tests).
+
+        Returns:
+            URL bajo /static/proofs/.
+
+        Raises:
+            ProofStorageError: Archivo vacío o demasiado grande.
+        """
+        ext = cls.normalize_ext(ext)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path, sha256, size = cls._copy_hashing(stream, directory)
+
+        existente = cls._find_indexed(sha256)
+        filename = existente or cls.filename_for(sha256, ext)
+        destino = os.path.join(directory, filename)
+        if os.path.exists(destino):
+            os.unlink(tmp_path)
+            cls.log_info(f"Comprobante repetido, se reutiliza {filename}")
+        else:
+            os.replace(tmp_path, destino)
+
+        if existente is None:
+            cls._index(sha256, filename, size)
+        else:
+            cls._mark_uploaded(filename)
+        if cls.normalize_ext(os.path.splitext(filename)[1]) in cls.IMAGE_EXT:
+            cls.enqueue_thumbnail(destino)
+        return f"{PROOF_URL_PREFIX}{filename}"
+
+    @classmethod
+    def _find_indexed(cls, sha256: str) -> Optional[str]:
+        """Nombre del archivo ya indexado con ese hash, si lo hay."""
+        from app.models.proof_file import ProofFile
+        try:
+            fila = ProofFile.get_by_sha256(sha256)
+            return fila.filename if fila else None
+        except Exception as exc:
+            cls.log_error("No se pudo consultar el índice de comprobantes", exc)
+            return None
+
+    @classmethod
+    def _mark_uploaded(cls, filename: str) -> None:
+        """Renovar la antigüedad en el índice de un comprobante reutilizado."""
+        from app.models import db
+        from app.models.proof_file import ProofFile
+        try:
+            ProofFile.mark_uploaded(filename)
+        except Exception as exc:
+            db.session.rollback()
+            cls.log_error(f"No se pudo renovar la fecha de {filename}", exc)
+
+    @classmethod
+    def _index(cls, sha256: str, filename: str, size: int,
+               created_at: Optional[datetime] = None) -> None:
+        """Registrar el archivo en proof_files (una subida simultánea gana)."""
+        from sqlalchemy.exc import IntegrityError
+        from app.models import db
+        from app.models.proof_file import ProofFile
+        try:
+            db.session.add(ProofFile(sha256=sha256, filename=filename, size=size,
+                                     created_at=created_at or datetime.utcnow()))
+            db.session.commit()
+        except IntegrityError:
+            # La misma imagen subida a la vez: el archivo es idéntico
+            db.session.rollback()
+        except Exception as exc:
+            db.session.rollback()
+            cls.log_error(f"No se pudo indexar el comprobante {filename}", exc)
+
+    @classmethod
+    def index_existing(cls, directory: str = PROOFS_DIR) -> Tuple[int, int]:
+        """
+        Indexar los comprobantes del directorio que aún no tienen fila.
+
+        Para los guardados antes del índice (o cuyo indexado falló). Conserva
+        su nombre, toma la fecha del archivo como antigüedad y genera las
+        miniaturas que falten. Idempotente.
+
+        Returns:
+            Tupla (indexados, miniaturas generadas).
+        """
+        from app.models.proof_file import ProofFile
+
+        if not os.path.isdir(directory):
+            return 0, 0
+        ya_indexados = ProofFile.indexed_filenames()
+        indexados = miniaturas = 0
+        for entrada in os.scandir(directory):
+            if not entrada.is_file() or entrada.name.startswith('.'):
+                continue
+            if entrada.name not in ya_indexados:
+                sha = hashlib.sha256()
+                with open(entrada.path, 'rb') as origen:
+                    for bloque in iter(lambda: origen.read(cls.CHUNK_BYTES), b''):
+                        sha.update(bloque)
+                estado = entrada.stat()
+                cls._index(sha.hexdigest(), entrada.name, estado.st_size,
+                           created_at=datetime.utcfromtimestamp(estado.st_mtime))
+                indexados += 1
+            ext = cls.normalize_ext(os.path.splitext(entrada.name)[1])
+            if ext in cls.IMAGE_EXT and not os.path.exists(cls.thumbnail_path(entrada.path)):
+                miniaturas += cls.make_thumbnail(entrada.path) is not None
+        return indexados, miniaturas
+
+    @classmethod
+    def delete(cls, proof_file, directory: str = PROOFS_DIR) -> None:
+        """Borrar un comprobante indexado: archivo, miniatura y fila."""
+        from app.models import db
+
+        ruta = os.path.join(directory, proof_file.filename)
+        for archivo in (ruta, cls.thumbnail_path(ruta)):
+            if os.path.exists(archivo):
+                os.remove(archivo)
+        db.session.delete(proof_file)
+        db.session.commit()
+
+    # ── Miniaturas ────────────────────────────────────────────────────────
+
+    @staticmethod
+    def thumbnail_path(path: str) -> str:
+        """Ruta de la miniatura de un comprobante: thumbs/<nombre>.webp."""
+        directory, filename = os.path.split(path)
+        stem = os.path.splitext(filename)[0]
+        return os.path.join(directory, THUMBS_SUBDIR, f"{stem}.webp")
+
+    @classmethod
+    def thumbnail_url(cls, url: Optional[str]) -> Optional[str]:
+        """
+        URL de la miniatura de un comprobante local (filtro Jinja ``miniatura``).
+
+        Devuelve `url` sin cambios si no es una imagen de /static/proofs/
+        (PDF, URL externa o vacío).
+        """
+        if not url or not url.startswith(PROOF_URL_PREFIX):
+            return url
+        filename = url[len(PROOF_URL_PREFIX):]
+        if '/' in filename or cls.normalize_ext(os.path.splitext(filename)[1]) not in cls.IMAGE_EXT:
+            return url
+        return f"{PROOF_URL_PREFIX}{THUMBS_SUBDIR}/{os.path.splitext(filename)[0]}.webp"
+
+    @classmethod
+    def make_thumbnail(cls, path: str) -> Optional[str]:
+        """
+        Generar la miniatura WebP de un comprobante (si aún no existe).
+
+        Returns:
+            Ruta de la miniatura, o None si la imagen no se pudo leer.
+        """
+        from PIL import Image, ImageOps
+
+        destino = cls.thumbnail_path(path)
+        if os.path.exists(destino):
+            return destino
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        tmp_path = None
+        try:
+            with Image.open(path) as img:
+                # JPEG: decodificar ya reducido (mucho más rápido que a tamaño real)
+                img.draft('RGB', (cls.THUMB_SIZE * 2, cls.THUMB_SIZE * 2))
+                img = ImageOps.exif_transpose(img)
+                if img.mode not in ('RGB', 'RGBA'):
+                    img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+                img.thumbnail((cls.THUMB_SIZE, cls.THUMB_SIZE))
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(destino),
+                                                prefix='.mini-', suffix='.webp')
+                os.close(fd)
+                img.save(tmp_path, 'WEBP', quality=cls.THUMB_QUALITY, method=4)
+            os.replace(tmp_path, destino)
+            return destino
+        except Exception as exc:
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            cls.log_error(f"No se pudo generar la miniatura de {path}", exc)
+            return None
+
+    @classmethod
+    def enqueue_thumbnail(cls, path: str) -> None:
+        """Generar la miniatura en un hilo de fondo, sin demorar la subida."""
+        global _executor
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1,
+                                               thread_name_prefix='proof-thumbs')
+        _executor.submit(cls.make_thumbnail, path)
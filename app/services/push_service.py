@@ -3,9 +3,22 @@ Envío de notificaciones Web Push (pywebpush + VAPID).
 
 Destinatarios soportados: clientes logueados (WebUser), visitantes anónimos
 (anon_id del chat) y operadores/admins (avisos del panel).
+
+El envío a varias suscripciones (p. ej. todos los operadores, desde el
+request de un mensaje del chat) va en paralelo por un pool acotado de hilos
+que comparte una sesión HTTP (conexiones keep-alive por servicio de push), así
+el request espera lo que tarda el envío más lento y no la suma. La clave VAPID
+se parsea una vez por proceso, y los endpoints muertos (404/410) se desactivan
+al final con un solo UPDATE.
 """
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
+import requests
+from requests.adapters import HTTPAdapter
 from flask import current_app
 from py_vapid import Vapid01
 from pywebpush import webpush, WebPushException
@@ -13,51 +26,125 @@ from pywebpush import webpush, WebPushException
 from app.services.base_service import BaseService
 from app.models.push_subscription import PushSubscription
 
+_pool: Optional[ThreadPoolExecutor] = None
+_session: Optional[requests.Session] = None
+_pool_lock = threading.Lock()
+
 
 class PushService(BaseService):
     """Envía notificaciones Web Push."""
 
+    MAX_WORKERS = 8
+    TIMEOUT = 10  # segundos por envío
+    DEAD_STATUSES = (404, 410)
+
     @staticmethod
-    def _vapid_private_key() -> Vapid01:
-        """Reconstruir la clave VAPID privada (raw base64url) desde la config."""
-        raw = current_app.config.get('VAPID_PRIVATE_KEY')
+    @lru_cache(maxsize=4)
+    def _vapid_key(raw: str) -> Vapid01:
+        """Clave VAPID privada (raw base64url), parseada una vez por proceso."""
         return Vapid01.from_raw(raw.encode())
 
     @classmethod
-    def _send_one(cls, sub: PushSubscription, payload: str) -> bool:
-        """Enviar a una suscripción; desactivarla si el endpoint está muerto."""
+    def _dispatcher(cls) -> Tuple[ThreadPoolExecutor, requests.Session]:
+        """Pool de envío y sesión HTTP compartidos por el proceso."""
+        global _pool, _session
+        with _pool_lock:
+            if _pool is None:
+                _session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4, pool_maxsize=cls.MAX_WORKERS
+                )
+                _session.mount('https://', adapter)
+                _pool = ThreadPoolExecutor(max_workers=cls.MAX_WORKERS,
+                                           thread_name_prefix='webpush')
+        return _pool, _session
+
+    @classmethod
+    def _send_one(cls, subscription_info: dict, payload: str, vapid_key: Vapid01,
+                  claim_email: str, session: Optional[requests.Session] = None
+                  ) -> Optional[int]:
+        """
+        Enviar a una suscripción (corre en un hilo del pool: sin BD ni app).
+
+        Returns:
+            None si se entregó; si no, el status HTTP (0 si no hubo respuesta).
+        """
         try:
             webpush(
-                subscription_info=sub.to_subscription_info(),
+                subscription_info=subscription_info,
                 data=payload,
-                vapid_private_key=cls._vapid_private_key(),
-                vapid_claims={
-                    'sub': f"mailto:{current_app.config.get('VAPID_CLAIM_EMAIL')}"
-                },
+                vapid_private_key=vapid_key,
+                # pywebpush completa 'aud' y 'exp' en el dict: uno por envío
+                vapid_claims={'sub': f"mailto:{claim_email}"},
+                timeout=cls.TIMEOUT,
+                requests_session=session,
             )
-            return True
+            return None
         except WebPushException as exc:
-            status = getattr(exc.response, 'status_code', None)
-            if status in (404, 410):
-                PushSubscription.deactivate_by_endpoint(sub.endpoint)
+            status = getattr(exc.response, 'status_code', None) or 0
             cls.log_error(f"Error enviando push (status={status})", exc)
-            return False
+            return status
         except Exception as exc:
             cls.log_error("Error inesperado enviando push", exc)
-            return False
+            return 0
 
     @classmethod
-    def _send_to_subs(cls, subs, title: str, body: str, url: str) -> int:
-        """Enviar un payload a una lista de suscripciones."""
-        if not current_app.config.get('VAPID_PRIVATE_KEY'):
+    def _deliver(cls, subs: List[PushSubscription], title: str, body: str,
+                 url: str) -> Tuple[int, int]:
+        """
+        Enviar un payload a una lista de suscripciones, en paralelo.
+
+        Returns:
+            (entregados, fallidos): fallidos cuenta solo las fallas que vale
+            la pena reintentar (5xx, timeout, VAPID sin configurar); los
+            endpoints muertos (404/410) se desactivan y no cuentan.
+        """
+        if not subs:
+            return 0, 0
+        raw_key = current_app.config.get('VAPID_PRIVATE_KEY')
+        if not raw_key:
             cls.log_error("VAPID no configurado: no se envían push")
-            return 0
+            return 0, len(subs)
+        try:
+            vapid_key = cls._vapid_key(raw_key)
+        except Exception as exc:
+            cls.log_error("Clave VAPID inválida: no se envían push", exc)
+            return 0, len(subs)
+
         payload = json.dumps({'title': title, 'body': body, 'url': url})
-        sent = 0
-        for sub in subs:
-            if cls._send_one(sub, payload):
+        claim_email = current_app.config.get('VAPID_CLAIM_EMAIL')
+        # Los hilos no tocan la BD: se les pasa la info ya leída
+        destinos = [(sub.endpoint, sub.to_subscription_info()) for sub in subs]
+
+        pool, session = cls._dispatcher()
+        futuros = [
+            (endpoint, pool.submit(cls._send_one, info, payload, vapid_key,
+                                   claim_email, session))
+            for endpoint, info in destinos
+        ]
+
+        sent, fallidos, muertos = 0, 0, []
+        for endpoint, futuro in futuros:
+            status = futuro.result()
+            if status is None:
                 sent += 1
-        return sent
+            elif status in cls.DEAD_STATUSES:
+                muertos.append(endpoint)
+            else:
+                fallidos += 1
+
+        if muertos:
+            try:
+                PushSubscription.deactivate_endpoints(muertos)
+            except Exception as exc:
+                cls.log_error(f"No se pudieron desactivar {len(muertos)} endpoints", exc)
+        return sent, fallidos
+
+    @classmethod
+    def _send_to_subs(cls, subs: List[PushSubscription], title: str, body: str,
+                      url: str) -> int:
+        """Enviar a una lista de suscripciones; devuelve las entregadas."""
+        return cls._deliver(subs, title, body, url)[0]
 
     @classmethod
     def send_to_user(cls, web_user_id: int, title: str, body: str,
@@ -67,6 +154,14 @@ class PushService(BaseService):
             PushSubscription.get_active_for_user(web_user_id), title, body, url
         )
 
+    @classmethod
+    def deliver_to_user(cls, web_user_id: int, title: str, body: str,
+                        url: str = '/cuenta') -> Tuple[int, int]:
+        """Como send_to_user, pero devuelve (entregados, fallidos); ver _deliver."""
+        return cls._deliver(
+            PushSubscription.get_active_for_user(web_user_id), title, body, url
+        )
+
     @classmethod
     def send_to_anon(cls, anon_id: str, title: str, body: str,
                      url: str = '/') -> int:
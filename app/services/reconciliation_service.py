@@ -12,20 +12,28 @@ tarjeta— no afecta la comparación: el bruto es lo que el cliente tecleó.
 
 Ante la duda, NUNCA se adivina: si hay dos candidatos parejos, el pago se marca
 para revisión manual.
+
+Los pagos de un mismo lote de ingesta se concilian juntos (conciliar_lote):
+la matriz pago × orden se resuelve como una asignación de peso máximo, para
+que un pago temprano no se quede con la orden que otro casa mejor.
 """
-import re
-import unicodedata
-from datetime import timedelta
+from datetime import datetime, timedelta
 from decimal import Decimal
-from difflib import SequenceMatcher
 from typing import List, Optional, Tuple
 
+from sqlalchemy import exists, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import contains_eager
+
+from app.models import db
+from app.services import nombres
+from app.services.asignacion import asignacion_maxima, componentes, peso_total
 from app.services.base_service import BaseService
 from app.models.order import Order, OrderStatus
 from app.models.payment import Payment, PaymentStatus
+from app.models.payment_method import PaymentMethod
 
 # Filtros duros
-VENTANA_ORDENES_DIAS = 7      # antigüedad máxima de la orden candidata
 VENTANA_PAGO_HORAS = 24       # separación máxima entre el pago y la orden
 TOLERANCIA_DE_MAS = Decimal('1.00')   # el cliente puede redondear hacia arriba
 TOLERANCIA_EXACTA = Decimal('0.01')
@@ -46,37 +54,18 @@ MARGEN_EMPATE = 10            # si dos candidatos difieren menos: revisión manu
 class ReconciliationService(BaseService):
     """Casa pagos entrantes con órdenes pendientes."""
 
-    # ── Normalización y comparación de nombres ─────────────────────────────
+    # ── Comparación de nombres ─────────────────────────────────────────────
 
     @staticmethod
-    def _normalizar(nombre: str) -> str:
-        """Quitar acentos, signos y mayúsculas para poder comparar nombres."""
-        if not nombre:
-            return ''
-        sin_acentos = ''.join(
-            c for c in unicodedata.normalize('NFD', nombre)
-            if unicodedata.category(c) != 'Mn'
-        )
-        limpio = re.sub(r'[^a-z ]', ' ', sin_acentos.lower())
-        return ' '.join(limpio.split())
-
-    @classmethod
-    def similitud_nombres(cls, uno: str, otro: str) -> float:
+    def similitud_nombres(uno: str, otro: str) -> float:
         """
         Similitud entre dos nombres, de 0 a 1.
 
-        Compara también los nombres con las palabras ordenadas, para que
-        "Mora Jose" y "Jose Mora" se reconozcan como la misma persona.
+        Independiente de acentos, mayúsculas y del orden de las palabras, para
+        que "Mora Jose" y "Jose Mora" se reconozcan como la misma persona.
+        Cada nombre se prepara una sola vez (ver app/services/nombres.py).
         """
-        a, b = cls._normalizar(uno), cls._normalizar(otro)
-        if not a or not b:
-            return 0.0
-
-        directa = SequenceMatcher(None, a, b).ratio()
-        ordenada = SequenceMatcher(
-            None, ' '.join(sorted(a.split())), ' '.join(sorted(b.split()))
-        ).ratio()
-        return max(directa, ordenada)
+        return nombres.similitud(uno, otro)
 
     # ── Puntaje de un candidato ────────────────────────────────────────────
 
@@ -157,7 +146,11 @@ class ReconciliationService(BaseService):
 
     @staticmethod
     def _metodo_de_orden(orden: Order) -> str:
-        """Código normalizado del método con el que paga el cliente."""
+        """
+        Código normalizado del método con el que paga el cliente.
+
+        _filtros_candidatos repite esta regla en SQL: si cambia aquí, allá.
+        """
         metodo = orden.payment_method_from
         return (metodo.code or metodo.name or '').lower() if metodo else ''
 
@@ -169,36 +162,68 @@ class ReconciliationService(BaseService):
         distancia = abs(pago.fecha_pago - orden.created_at)
         return distancia <= timedelta(hours=VENTANA_PAGO_HORAS)
 
+    @staticmethod
+    def _filtros_candidatos(pago: Payment) -> Optional[list]:
+        """
+        Filtros duros de buscar_candidatos como condiciones SQL.
+
+        - orden en PENDING (con comprobante subido)
+        - mismo método: el de _metodo_de_orden (código del método de
+          origen, o su nombre si no tiene código; sin mayúsculas)
+        - creada dentro de las 24 h del pago (filtro DURO: fuera de la
+          ventana no es candidata, por mucho que coincidan monto y nombre)
+        - el bruto del pago entre amount_usd - 0.01 y amount_usd + 1.00
+          (exacto o redondeado hacia arriba; de menos nunca concilia solo)
+        - sin otro pago ya vinculado a la orden
+
+        Los resuelve el índice ix_orders_conciliacion.
+
+        Returns:
+            Lista de condiciones, o None si el pago no tiene fecha, monto o
+            método (sin ellos ninguna orden puede ser candidata).
+        """
+        if not pago.fecha_pago or pago.importe_bruto is None or not pago.metodo:
+            return None
+
+        bruto = Decimal(str(pago.importe_bruto))
+        ventana = timedelta(hours=VENTANA_PAGO_HORAS)
+        return [
+            Order.status == OrderStatus.PENDING,
+            func.lower(func.coalesce(func.nullif(PaymentMethod.code, ''),
+                                     PaymentMethod.name)) == pago.metodo.lower(),
+            Order.created_at.between(pago.fecha_pago - ventana,
+                                     pago.fecha_pago + ventana),
+            Order.amount_usd.between(bruto - TOLERANCIA_DE_MAS,
+                                     bruto + TOLERANCIA_EXACTA),
+            ~exists().where(Payment.order_id == Order.id).correlate(Order),
+        ]
+
     @classmethod
     def buscar_candidatos(cls, pago: Payment) -> List[dict]:
         """
         Órdenes que podrían corresponder a un pago, ordenadas por puntaje.
 
-        Filtros duros: mismo método, orden en PENDING (con comprobante subido),
-        de los últimos días y con el pago dentro de la ventana temporal.
+        Los filtros duros (ver _filtros_candidatos) van en UNA consulta
+        indexada que trae también el método de cada orden, así que solo las
+        órdenes plausibles llegan al puntaje: el costo depende de cuántas
+        coinciden, no del tamaño de la cola de pendientes.
 
         Returns:
             Lista de dicts con la orden, su puntaje y los motivos.
         """
-        from app.models import db  # noqa: F401  (asegura el registro de modelos)
-
-        desde = pago.fecha_pago - timedelta(days=VENTANA_ORDENES_DIAS) \
-            if pago.fecha_pago else None
-
-        consulta = Order.query.filter(Order.status == OrderStatus.PENDING)
-        if desde is not None:
-            consulta = consulta.filter(Order.created_at >= desde)
+        filtros = cls._filtros_candidatos(pago)
+        if filtros is None:
+            return []
+
+        consulta = (
+            Order.query
+            .join(Order.payment_method_from)
+            .options(contains_eager(Order.payment_method_from))
+            .filter(*filtros)
+        )
 
         candidatos = []
         for orden in consulta.all():
-            if cls._metodo_de_orden(orden) != (pago.metodo or '').lower():
-                continue
-
-            # Filtro DURO de ventana temporal: un pago fuera de las 24 h de la
-            # orden no es candidato, por mucho que coincidan monto y nombre.
-            if not cls._dentro_de_ventana(pago, orden):
-                continue
-
             puntos, motivos = cls.puntuar(pago, orden)
             if puntos <= 0:
                 continue
@@ -235,78 +260,235 @@ class ReconciliationService(BaseService):
 
         Vincula solo si hay un candidato claro. Si dos candidatos están
         empatados, marca el pago para revisión: con dinero de por medio, ante la
-        duda no se adivina.
+        duda no se adivina. Es conciliar_lote con un lote de un pago.
 
         Returns:
             Dict con el resultado ('vinculado' / 'revision' / 'sin_candidatos').
         """
-        if pago.order_id:
-            return {'resultado': 'ya_conciliado'}
-
-        candidatos = cls.buscar_candidatos(pago)
-        if not candidatos:
-            return {'resultado': 'sin_candidatos'}
-
-        mejor = candidatos[0]
-        if mejor['score'] < UMBRAL_VINCULACION:
-            return {'resultado': 'sin_candidatos', 'mejor_score': mejor['score']}
-
-        # ¿Hay un segundo candidato demasiado parecido? -> no adivinar
-        if len(candidatos) > 1:
-            segundo = candidatos[1]
-            if (mejor['score'] - segundo['score']) < MARGEN_EMPATE:
-                cls._marcar_revision(pago, candidatos[:3])
-                return {
-                    'resultado': 'revision',
-                    'candidatos': [c['reference'] for c in candidatos[:3]],
-                }
+        return cls.conciliar_lote([pago])[0]
+
+    @classmethod
+    def decidir_lote(cls, candidatos_por_pago: List[List[dict]]) -> List[dict]:
+        """
+        Decidir la conciliación de un lote de pagos como asignación global.
+
+        Se arma el grafo pago × orden con los puntajes de buscar_candidatos y
+        se busca el emparejamiento de peso máximo usando solo los pares que
+        alcanzan UMBRAL_VINCULACION. Cada vínculo tiene que ganar por al
+        menos MARGEN_EMPATE: se compara el peso total con el de la mejor
+        asignación que prescinde de ese par (donde el pago puede tomar
+        cualquier otro candidato, aunque no llegue al umbral). Si la
+        diferencia es menor, el pago va a revisión junto con los que
+        cambiarían de orden en esa alternativa. Con un solo pago es la regla
+        de siempre: mejor candidato >= umbral y segundo a >= MARGEN_EMPATE.
 
-        if cls.vincular(pago, mejor['order']):
-            return {
-                'resultado': 'vinculado',
-                'reference': mejor['reference'],
-                'score': mejor['score'],
-                'motivos': mejor['motivos'],
+        Args:
+            candidatos_por_pago: buscar_candidatos() de cada pago del lote.
+
+        Returns:
+            Una decisión por pago, en el mismo orden:
+            {'resultado': 'vinculado', 'candidato': {...}},
+            {'resultado': 'revision', 'candidatos': [...hasta 3]} o
+            {'resultado': 'sin_candidatos'[, 'mejor_score': N]}.
+        """
+        puntajes = {
+            (fila, c['reference']): c['score']
+            for fila, candidatos in enumerate(candidatos_por_pago)
+            for c in candidatos
+        }
+        vinculos, revision = {}, set()
+        for grupo in componentes(list(puntajes)):
+            fuertes = {
+                (fila, ref): score for (fila, ref), score in puntajes.items()
+                if fila in grupo and score >= UMBRAL_VINCULACION
             }
-        return {'resultado': 'error'}
+            asignacion = asignacion_maxima(fuertes)
+            total = peso_total(fuertes, asignacion)
+            for fila, ref in asignacion.items():
+                alternativa = {a: s for a, s in fuertes.items() if a != (fila, ref)}
+                alternativa.update({
+                    (fila, c['reference']): c['score']
+                    for c in candidatos_por_pago[fila] if c['reference'] != ref
+                })
+                otra = asignacion_maxima(alternativa)
+                if total - peso_total(alternativa, otra) < MARGEN_EMPATE:
+                    revision.add(fila)
+                    revision.update(
+                        f for f in set(asignacion) | set(otra)
+                        if asignacion.get(f) != otra.get(f)
+                    )
+            vinculos.update(asignacion)
+
+        decisiones = []
+        for fila, candidatos in enumerate(candidatos_por_pago):
+            if fila in revision:
+                decisiones.append({'resultado': 'revision', 'candidatos': candidatos[:3]})
+            elif fila in vinculos:
+                elegido = next(c for c in candidatos if c['reference'] == vinculos[fila])
+                decisiones.append({'resultado': 'vinculado', 'candidato': elegido})
+            elif candidatos:
+                decisiones.append({
+                    'resultado': 'sin_candidatos', 'mejor_score': candidatos[0]['score']
+                })
+            else:
+                decisiones.append({'resultado': 'sin_candidatos'})
+        return decisiones
+
+    @classmethod
+    def conciliar_lote(cls, pagos: List[Payment]) -> List[dict]:
+        """
+        Conciliar juntos los pagos de un lote (ver decidir_lote).
+
+        Todos los vínculos y marcas de revisión se escriben en UNA
+        transacción: o queda la asignación completa o no queda nada.
+
+        Args:
+            pagos: Pagos ya guardados (con id).
+
+        Returns:
+            Un dict de resultado por pago, en el mismo orden ('vinculado',
+            'revision', 'sin_candidatos', 'ya_conciliado' o 'error').
+        """
+        resultados: List[Optional[dict]] = [
+            {'resultado': 'ya_conciliado'} if pago.order_id else None for pago in pagos
+        ]
+        pendientes = [i for i, r in enumerate(resultados) if r is None]
+        decisiones = cls.decidir_lote(
+            [cls.buscar_candidatos(pagos[i]) for i in pendientes]
+        )
+
+        escritos = []
+        for i, decision in zip(pendientes, decisiones):
+            pago = pagos[i]
+            if decision['resultado'] == 'vinculado':
+                elegido = decision['candidato']
+                pago.order_id = elegido['order'].id
+                pago.set_dato_extra('conciliacion', 'automatica')
+                resultados[i] = {
+                    'resultado': 'vinculado',
+                    'reference': elegido['reference'],
+                    'score': elegido['score'],
+                    'motivos': elegido['motivos'],
+                }
+            elif decision['resultado'] == 'revision':
+                cls._marcar_revision(pago, decision['candidatos'])
+                resultados[i] = {
+                    'resultado': 'revision',
+                    'candidatos': [c['reference'] for c in decision['candidatos']],
+                }
+            else:
+                resultados[i] = decision
+                continue
+            db.session.add(pago)
+            escritos.append(i)
+
+        if not escritos:
+            return resultados
+        try:
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            cls.log_error(f"No se pudo guardar la conciliación del lote: {e}")
+            for i in escritos:
+                resultados[i] = {'resultado': 'error'}
+            return resultados
+
+        for i in escritos:
+            if resultados[i]['resultado'] == 'vinculado':
+                cls.log_info(
+                    f"Pago {pagos[i].id} vinculado a la orden "
+                    f"{resultados[i]['reference']} (auto)"
+                )
+        return resultados
 
     @classmethod
     def _marcar_revision(cls, pago: Payment, candidatos: List[dict]) -> None:
-        """Dejar el pago en revisión manual, con los candidatos empatados."""
+        """Dejar el pago en revisión manual, con los candidatos empatados (sin commit)."""
         pago.estado = PaymentStatus.REVISION
         pago.set_dato_extra(
             'conciliacion_candidatos',
             [{'reference': c['reference'], 'score': c['score']} for c in candidatos]
         )
-        pago.save()
         cls.log_info(
             f"Pago {pago.id} en revisión: candidatos empatados "
             f"({[c['reference'] for c in candidatos]})"
         )
 
     @classmethod
-    def buscar_pago_para_orden(cls, orden: Order) -> Optional[Payment]:
+    def conciliar_pendientes(cls, dias: int = 3) -> dict:
         """
-        Buscar un pago ya recibido que corresponda a una orden recién creada.
+        Barrido (nocturno) de los pagos recientes que siguen sin orden.
 
-        Cubre el caso real de que el cliente pague ANTES de terminar el flujo
-        del bot (o de que el correo llegue primero).
-        """
-        desde = orden.created_at - timedelta(hours=VENTANA_PAGO_HORAS)
+        Cubre los pagos que llegaron antes que su orden o cuya orden se
+        liberó después. Los que están en REVISION o ya PAGADO no se tocan:
+        esos los resuelve el operador.
+
+        Args:
+            dias: Antigüedad máxima (por fecha de pago) de los pagos a barrer.
 
+        Returns:
+            {resultado: cantidad} del lote.
+        """
+        desde = datetime.utcnow() - timedelta(days=dias)
         pagos = (
             Payment.query
             .filter(Payment.order_id.is_(None))
+            .filter(Payment.estado.notin_([PaymentStatus.REVISION, PaymentStatus.PAGADO]))
             .filter(Payment.fecha_pago >= desde)
+            .order_by(Payment.fecha_pago)
             .all()
         )
+        conteo: dict = {}
+        for resultado in cls.conciliar_lote(pagos):
+            conteo[resultado['resultado']] = conteo.get(resultado['resultado'], 0) + 1
+        cls.log_info(f"Barrido de conciliación: {len(pagos)} pagos -> {conteo}")
+        return conteo
+
+    @classmethod
+    def _filtros_pagos(cls, orden: Order) -> Optional[list]:
+        """
+        Filtros duros de buscar_pago_para_orden como condiciones SQL.
+
+        Los mismos de _filtros_candidatos vistos desde la orden: pago sin
+        orden, del mismo método, dentro de las 24 h de la orden y con el
+        bruto entre amount_usd - 0.01 y amount_usd + 1.00. Los resuelve el
+        índice parcial ix_payments_sin_orden.
+
+        Returns:
+            Lista de condiciones, o None si a la orden le falta fecha, monto
+            o método.
+        """
+        metodo = cls._metodo_de_orden(orden)
+        if not orden.created_at or orden.amount_usd is None or not metodo:
+            return None
+
+        esperado = Decimal(str(orden.amount_usd))
+        ventana = timedelta(hours=VENTANA_PAGO_HORAS)
+        return [
+            Payment.order_id.is_(None),
+            Payment.metodo == metodo,
+            Payment.fecha_pago.between(orden.created_at - ventana,
+                                       orden.created_at + ventana),
+            Payment.importe_bruto.between(esperado - TOLERANCIA_EXACTA,
+                                          esperado + TOLERANCIA_DE_MAS),
+        ]
+
+    @classmethod
+    def buscar_pago_para_orden(cls, orden: Order) -> Optional[Payment]:
+        """
+        Buscar un pago ya recibido que corresponda a una orden recién creada.
+
+        Cubre el caso real de que el cliente pague ANTES de terminar el flujo
+        del bot (o de que el correo llegue primero). Solo se leen los pagos
+        que pasan los filtros duros (ver _filtros_pagos), por muchos pagos
+        sin orden que haya dejado una importación histórica.
+        """
+        filtros = cls._filtros_pagos(orden)
+        if filtros is None:
+            return None
 
         mejor, mejor_score = None, 0
-        for pago in pagos:
-            if cls._metodo_de_orden(orden) != (pago.metodo or '').lower():
-                continue
-            if not cls._dentro_de_ventana(pago, orden):
-                continue
+        for pago in Payment.query.filter(*filtros).all():
             puntos, _ = cls.puntuar(pago, orden)
             if puntos > mejor_score:
                 mejor, mejor_score = pago, puntos
@@ -0,0 +1,188 @@
+"""
+Replay offline de los parsers sobre el archivo de correos.
+
+Re-ejecuta el ParserRegistry ACTUAL sobre los correos archivados (ver
+ArchivoCorreos) y compara lo que extrae hoy con lo que quedó guardado en
+`payments`. Sirve para medir el efecto de un arreglo de parser antes de
+corregir datos: qué pagos cambiarían, cuáles se reconocerían por primera vez
+y cuáles dejarían de reconocerse. No escribe en la base de datos.
+
+Lo ejecuta scripts/replay_parsers.py.
+"""
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Optional
+
+from app.models.payment import Payment
+from app.services.archivo_correos import ArchivoCorreos
+from app.services.parsers.registry import ParserRegistry, parsear_en_proceso
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayParsers:
+    """
+    Compara el parseo actual del archivo contra las filas de `payments`.
+
+    Attributes:
+        CAMPOS: Columnas de Payment que llena el parser y se comparan.
+        TRAMO: Correos por tramo (un IN a la BD y un map al pool por tramo).
+    """
+
+    CAMPOS = (
+        'metodo', 'pagador_nombre', 'importe_bruto', 'moneda', 'comision',
+        'importe_neto', 'transaction_id', 'fecha_pago',
+    )
+    TRAMO = 500
+
+    def __init__(self, archivo: ArchivoCorreos, workers: int = 1) -> None:
+        """
+        Args:
+            archivo: Archivo de correos a re-parsear.
+            workers: Procesos de parseo (1 = en serie, en este proceso).
+        """
+        self.archivo = archivo
+        self.workers = max(1, int(workers))
+        self.registry = ParserRegistry()
+
+    @staticmethod
+    def _normalizar(valor: Any) -> Any:
+        """Lleva valores de BD y del parser a una forma comparable y serializable."""
+        if isinstance(valor, (Decimal, float)):
+            return round(float(valor), 2)
+        if isinstance(valor, datetime):
+            return valor.replace(microsecond=0).isoformat()
+        if isinstance(valor, str):
+            return valor.strip() or None
+        return valor
+
+    @classmethod
+    def comparar(cls, pago: Payment, datos: dict) -> dict:
+        """
+        Diferencias entre un pago guardado y el parseo actual de su correo.
+
+        Args:
+            pago: Fila de `payments`.
+            datos: Shape canónico que devuelve hoy el parser.
+
+        Returns:
+            {campo: [guardado, actual]} solo con los campos distintos. Los
+            datos_extra se comparan clave a clave ('datos_extra.subtipo').
+        """
+        actuales = dict(datos)
+        # Mismo default que UnifiedIngestionService._crear_pago
+        actuales['moneda'] = datos.get('moneda') or 'USD'
+
+        diferencias = {}
+        for campo in cls.CAMPOS:
+            antes = cls._normalizar(getattr(pago, campo))
+            ahora = cls._normalizar(actuales.get(campo))
+            if antes != ahora:
+                diferencias[campo] = [antes, ahora]
+
+        guardados = pago.datos_extra or {}
+        for clave, valor in (datos.get('datos_extra') or {}).items():
+            antes = cls._normalizar(guardados.get(clave))
+            ahora = cls._normalizar(valor)
+            if antes != ahora:
+                diferencias[f'datos_extra.{clave}'] = [antes, ahora]
+        return diferencias
+
+    def correr(self, desde: Optional[str] = None) -> dict:
+        """
+        Re-parsea el archivo completo (o desde una fecha) y arma el informe.
+
+        Args:
+            desde: Fecha YYYY-MM-DD de archivado desde la que re-parsear.
+
+        Returns:
+            dict con: correos, iguales, ignorados, errores, segundos y las
+            listas cambios (pagos cuyos campos cambiarían), nuevos (correos
+            que hoy generarían un pago y no lo tienen) y perdidos (pagos
+            cuyo correo hoy no se reconoce o falla al parsear).
+        """
+        informe = {
+            'correos': 0, 'iguales': 0, 'ignorados': 0, 'errores': 0,
+            'cambios': [], 'nuevos': [], 'perdidos': [], 'segundos': 0.0,
+        }
+        inicio = time.monotonic()
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            tramo = []
+            for correo in self.archivo.correos(desde):
+                tramo.append(correo)
+                if len(tramo) >= self.TRAMO:
+                    self._replay_tramo(tramo, pool, informe)
+                    tramo = []
+            if tramo:
+                self._replay_tramo(tramo, pool, informe)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        informe['segundos'] = round(time.monotonic() - inicio, 2)
+        return informe
+
+    def _parsear(self, correos: list, pool: Optional[ProcessPoolExecutor]) -> list:
+        """Resultados de parsear_en_proceso para cada correo, en orden."""
+        if pool is not None:
+            tamano = max(1, len(correos) // (self.workers * 4))
+            return list(pool.map(parsear_en_proceso, correos, chunksize=tamano))
+        resultados = []
+        for correo in correos:
+            try:
+                resultados.append(self.registry.parse(correo))
+            except ValueError as e:
+                resultados.append(e)
+        return resultados
+
+    def _replay_tramo(
+        self,
+        correos: list,
+        pool: Optional[ProcessPoolExecutor],
+        informe: dict
+    ) -> None:
+        """Parsea un tramo, trae sus pagos en un IN y acumula el informe."""
+        resultados = self._parsear(correos, pool)
+        pagos = Payment.get_by_email_message_ids(c.get('message_id') for c in correos)
+
+        for correo, resultado in zip(correos, resultados):
+            informe['correos'] += 1
+            message_id = correo.get('message_id')
+            pago = pagos.get(message_id)
+
+            if isinstance(resultado, ValueError) or resultado is None:
+                if isinstance(resultado, ValueError):
+                    informe['errores'] += 1
+                if pago is None:
+                    informe['ignorados'] += 1
+                    continue
+                informe['perdidos'].append({
+                    'message_id': message_id,
+                    'payment_id': pago.id,
+                    'motivo': str(resultado) if resultado is not None else 'no_reconocido',
+                })
+                continue
+
+            metodo, datos = resultado
+            if pago is None:
+                informe['nuevos'].append({
+                    'message_id': message_id,
+                    'metodo': metodo,
+                    'importe_bruto': self._normalizar(datos.get('importe_bruto')),
+                    'moneda': datos.get('moneda'),
+                    'transaction_id': datos.get('transaction_id'),
+                })
+                continue
+
+            diferencias = self.comparar(pago, datos)
+            if not diferencias:
+                informe['iguales'] += 1
+                continue
+            informe['cambios'].append({
+                'message_id': message_id,
+                'payment_id': pago.id,
+                'diferencias': diferencias,
+            })
@@ -5,9 +5,11 @@ Orquesta el flujo completo escribiendo en la tabla `payments`:
     1. Lee las fuentes activas (payment_sources) y arma la lista de remitentes.
     2. Trae los correos UNSEEN de esos remitentes via GmailService.
     3. Rutea cada correo al parser correcto (ParserRegistry).
-    4. Deduplica por email_message_id y por transaction_id (si lo trae).
+    4. Deduplica por email_message_id y por transaction_id (si lo trae),
+       con una consulta IN por lote (DeduplicadorLote).
     5. Aplica cotizacion automatica si es USD y la fuente lo permite.
-    6. Guarda el Payment y marca el correo como leido.
+    6. Guarda los Payment por tramos (un COMMIT por tramo) y marca los
+       correos como leidos.
 
 Convive con el PaymentIngestionService legacy (que sigue escribiendo en
 paypal_payments). El corte definitivo -repuntar scheduler/rutas/dashboard a
@@ -15,31 +17,182 @@ este servicio y a la tabla payments- es un paso posterior y deliberado.
 """
 import imaplib
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from typing import Optional, Union, Tuple
 from uuid import uuid4
 
-from flask import current_app
+from flask import current_app, has_app_context
 from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.models import db
+from app.models.ingestion_checkpoint import IngestionCheckpoint
+from app.models.ingestion_run import IngestionRun
 from app.models.payment import Payment, PaymentStatus
 from app.models.payment_source import PaymentSource
+from app.services.archivo_correos import ArchivoCorreos
 from app.services.gmail_service import GmailService
-from app.services.parsers.registry import ParserRegistry
-from app.services.calculator_service import CalculatorService
+from app.services.parsers.registry import ParserRegistry, parsear_en_proceso
+from app.services.calculator_service import CalculatorService, PricingSnapshot
 
 logger = logging.getLogger(__name__)
 
 
+class DeduplicadorLote:
+    """
+    Deduplicación de un lote de correos contra `payments` y contra sí mismo.
+
+    Resuelve los IDs existentes con una consulta IN por tipo (message_id y
+    transaction_id, solo la columna) en vez de dos búsquedas por correo, y
+    recuerda los IDs ya aceptados en el lote para atrapar repetidos dentro
+    del mismo lote.
+    """
+
+    def __init__(self, message_ids=(), transaction_ids=()) -> None:
+        self._mensajes = set(message_ids)
+        self._transacciones = set(transaction_ids)
+
+    @classmethod
+    def para_correos(cls, correos: list) -> 'DeduplicadorLote':
+        """Deduplicador con los message_id del lote ya registrados (un IN)."""
+        return cls(message_ids=Payment.message_ids_existentes(
+            c.get('message_id') for c in correos
+        ))
+
+    def cargar_transacciones(self, transaction_ids) -> None:
+        """Agrega los transaction_id del lote ya registrados (un IN)."""
+        self._transacciones.update(
+            Payment.transaction_ids_existentes(transaction_ids)
+        )
+
+    def mensaje_visto(self, message_id: Optional[str]) -> bool:
+        return bool(message_id) and message_id in self._mensajes
+
+    def transaccion_vista(self, transaction_id: Optional[str]) -> bool:
+        return bool(transaction_id) and transaction_id in self._transacciones
+
+    def registrar_mensaje(self, message_id: Optional[str]) -> None:
+        if message_id:
+            self._mensajes.add(message_id)
+
+    def registrar_transaccion(self, transaction_id: Optional[str]) -> None:
+        if transaction_id:
+            self._transacciones.add(transaction_id)
+
+
+class MetricasCorrida:
+    """
+    Tiempos por etapa y contadores de una corrida de ingesta.
+
+    Las etapas se acumulan (un lote con varios tramos suma sus tiempos de
+    guardado); lo que no cae en ninguna etapa queda en 'otros'. Se persisten
+    en ingestion_runs al terminar la corrida.
+
+    Attributes:
+        ETAPAS: Etapas medidas, en el orden del flujo.
+    """
+
+    ETAPAS = (
+        'busqueda', 'descarga', 'archivo', 'dedup', 'parseo',
+        'cotizacion', 'guardado', 'conciliacion', 'marcado',
+    )
+
+    def __init__(self) -> None:
+        self.iniciado = datetime.utcnow()
+        self._inicio = time.perf_counter()
+        self.etapas: dict = {}
+        self.correos = 0
+        self.bytes = 0
+        self.conciliacion: dict = {}
+
+    @contextmanager
+    def etapa(self, nombre: str):
+        """Cronometra el bloque y lo suma a la etapa `nombre`."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar_etapa(nombre, time.perf_counter() - inicio)
+
+    def sumar_etapa(self, nombre: str, segundos: float) -> None:
+        """Suma segundos medidos por fuera (p. ej. la descarga de Gmail)."""
+        self.etapas[nombre] = self.etapas.get(nombre, 0.0) + max(0.0, segundos)
+
+    def registrar_descarga(self, descarga: dict) -> None:
+        """Suma el rendimiento de una descarga (GmailService.ultima_descarga)."""
+        self.correos += descarga.get('correos', 0)
+        self.bytes += descarga.get('bytes', 0)
+        self.sumar_etapa('descarga', descarga.get('segundos', 0.0))
+
+    def contar_conciliacion(self, resultado: Optional[str]) -> None:
+        """Cuenta un resultado de conciliación ('vinculado', 'revision', ...)."""
+        if resultado:
+            self.conciliacion[resultado] = self.conciliacion.get(resultado, 0) + 1
+
+    def to_dict(self) -> dict:
+        """Métricas de la corrida hasta ahora (duración incluida)."""
+        duracion = time.perf_counter() - self._inicio
+        etapas = {
+            nombre: round(self.etapas[nombre], 3)
+            for nombre in self.ETAPAS if nombre in self.etapas
+        }
+        etapas['otros'] = round(max(0.0, duracion - sum(self.etapas.values())), 3)
+        return {
+            'iniciado': self.iniciado,
+            'duracion': round(duracion, 3),
+            'correos': self.correos,
+            'bytes': self.bytes,
+            'correos_por_segundo': round(self.correos / duracion, 1) if duracion else 0.0,
+            'etapas': etapas,
+            'conciliacion': dict(self.conciliacion),
+        }
+
+
 class UnifiedIngestionService:
     """Ingesta de pagos multi-metodo hacia la tabla unificada `payments`."""
 
-    def __init__(self) -> None:
-        self.gmail = GmailService()
+    # UID por tramo de la importación histórica (uno por checkpoint); con
+    # tope de tiempo (dashboard) se usan tramos más chicos para no pasarse
+    IMPORT_CHUNK = 200
+    IMPORT_CHUNK_HTTP = 50
+
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        gmail: Optional[GmailService] = None,
+        parse_workers: Optional[int] = None,
+        archivo: Optional[ArchivoCorreos] = None
+    ) -> None:
+        """
+        Args:
+            chunk_size: Pagos nuevos por transacción al guardar. None = usar
+                INGESTA_CHUNK_SIZE de la config.
+            gmail: Cliente Gmail a usar (el daemon IDLE pasa el suyo, con la
+                sesión ya abierta). None = uno nuevo, con login por llamada.
+            parse_workers: Procesos que parsean en paralelo durante la
+                importación histórica. None = INGESTA_PARSE_WORKERS de la
+                config; 1 = en serie, en el mismo proceso.
+            archivo: Dónde archivar los correos descargados. None = el de
+                ARCHIVO_CORREOS_DIR (si está configurado).
+        """
+        self.gmail = gmail or GmailService()
         self.registry = ParserRegistry()
+        self.chunk_size = chunk_size
+        self.parse_workers = parse_workers
+        self.archivo = archivo
+        # Pool de parseo activo (solo dentro de la importación histórica)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_workers = 1
+        # Foto de la matriz de cotizaciones de la corrida en curso (ver
+        # _capturar_precios). None = se cotiza consultando la BD por pago.
+        self._precios: Optional[PricingSnapshot] = None
+        # Tiempos y contadores de la corrida en curso (ver _registrar_corrida)
+        self.metricas = MetricasCorrida()
 
     def procesar_nuevos_pagos(
         self,
@@ -60,7 +213,8 @@ class UnifiedIngestionService:
         """
         resumen = {
             'success': False, 'procesados': 0, 'duplicados': 0,
-            'no_reconocidos': 0, 'errores': 0, 'nuevos': [], 'mensaje': ''
+            'no_reconocidos': 0, 'errores': 0, 'nuevos': [], 'mensaje': '',
+            'quedan': 0
         }
 
         fuentes = PaymentSource.get_activos()
@@ -69,6 +223,21 @@ class UnifiedIngestionService:
             resumen['mensaje'] = "No hay fuentes de pago activas configuradas"
             return resumen
 
+        self.metricas = MetricasCorrida()
+        try:
+            self._ingestar_nuevos(fuentes, web_user_id, marcar_leidos, resumen)
+        finally:
+            self._registrar_corrida(IngestionRun.NUEVOS, web_user_id, resumen)
+        return resumen
+
+    def _ingestar_nuevos(
+        self,
+        fuentes: list,
+        web_user_id: Optional[int],
+        marcar_leidos: bool,
+        resumen: dict
+    ) -> None:
+        """Cuerpo de procesar_nuevos_pagos: llena `resumen` y las métricas."""
         remitentes = [f.remitente for f in fuentes]
         logger.info(
             f"Iniciando ingesta unificada "
@@ -76,50 +245,39 @@ class UnifiedIngestionService:
             f"{len(remitentes)} remitentes"
         )
 
+        inicio = time.perf_counter()
         try:
             correos = self.gmail.get_emails_de_remitentes(remitentes)
         except (imaplib.IMAP4.error, OSError) as e:
             logger.error(f"Error conectando a Gmail: {e}")
             resumen['mensaje'] = f"Error conectando a Gmail: {str(e)}"
-            return resumen
+            return
+        finally:
+            # Login + SEARCH = lo que tardó Gmail menos la descarga en sí
+            descarga = self.gmail.ultima_descarga or {}
+            self.metricas.registrar_descarga(descarga)
+            self.metricas.sumar_etapa(
+                'busqueda',
+                time.perf_counter() - inicio - descarga.get('segundos', 0.0)
+            )
+
+        resumen['descarga'] = self.gmail.ultima_descarga
+        # Backlog que no entró en esta corrida (el daemon vuelve a correr)
+        resumen['quedan'] = self.gmail.quedan
 
         if not correos:
             resumen['success'] = True
             resumen['mensaje'] = "No hay correos nuevos"
-            return resumen
+            return
 
-        uids_a_marcar = []
-        for correo in correos:
-            try:
-                resultado = self._procesar_correo(correo, fuentes, web_user_id)
-                if resultado == 'duplicado':
-                    resumen['duplicados'] += 1
-                elif resultado == 'no_reconocido':
-                    resumen['no_reconocidos'] += 1
-                    logger.warning(
-                        f"Correo no reconocido por ningún parser: "
-                        f"sender={correo.get('sender')} "
-                        f"msg_id={correo.get('message_id')}"
-                    )
-                elif resultado == 'error':
-                    resumen['errores'] += 1
-                else:  # es un Payment guardado
-                    resumen['procesados'] += 1
-                    resumen['nuevos'].append(self._resumen_pago(resultado))
-
-                if marcar_leidos:
-                    uids_a_marcar.append(correo['imap_uid'])
-
-            except (ValueError, SQLAlchemyError) as e:
-                logger.error(
-                    f"Error procesando correo {correo.get('message_id', '?')}: {e}"
-                )
-                resumen['errores'] += 1
+        self._capturar_precios()
+        uids_a_marcar = self._procesar_lote(correos, fuentes, web_user_id, resumen)
 
         # Marcar como leídos en UNA sola conexión IMAP (antes era una
         # reconexión por correo, que excedía el timeout del worker).
         if marcar_leidos and uids_a_marcar:
-            self.gmail.mark_multiple_as_read(uids_a_marcar)
+            with self.metricas.etapa('marcado'):
+                self.gmail.mark_multiple_as_read(uids_a_marcar)
 
         resumen['success'] = True
         resumen['mensaje'] = (
@@ -129,65 +287,310 @@ class UnifiedIngestionService:
             f"{resumen['errores']} errores"
         )
         logger.info(resumen['mensaje'])
-        return resumen
 
-    def _procesar_correo(
+    def _registrar_corrida(
         self,
-        correo: dict,
+        tipo: str,
+        web_user_id: Optional[int],
+        resumen: dict
+    ) -> None:
+        """
+        Deja las métricas en el resumen y las persiste en ingestion_runs.
+
+        Best-effort: si la tabla no existe o la BD falla, la corrida no se
+        da por fallida (los pagos ya están guardados).
+        """
+        metricas = self.metricas.to_dict()
+        resumen['metricas'] = dict(metricas, iniciado=metricas['iniciado'].isoformat())
+        logger.info(
+            f"Corrida de ingesta en {metricas['duracion']}s: "
+            + ', '.join(f"{etapa}={seg}s" for etapa, seg in metricas['etapas'].items())
+        )
+        if not has_app_context():
+            return
+        try:
+            IngestionRun.purgar_antiguas()
+            db.session.add(IngestionRun.desde_metricas(
+                tipo, bool(web_user_id), metricas, resumen
+            ))
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"No se pudieron guardar las métricas de la corrida: {e}")
+
+    def _procesar_lote(
+        self,
+        correos: list,
         fuentes: list,
-        web_user_id: Optional[int]
-    ) -> Union[Payment, str]:
+        web_user_id: Optional[int],
+        resumen: dict
+    ) -> list:
         """
-        Procesa un correo: dedup, ruteo, creacion y guardado.
+        Procesa un lote de correos con la dedup resuelta en dos consultas.
+
+        Fase 1: descarta los message_id ya registrados (un IN) y parsea el
+        resto (en paralelo si hay pool de parseo, ver _parsear_todos). Fase 2: descarta los transaction_id ya registrados (otro IN),
+        crea los pagos nuevos y los inserta por tramos de `chunk_size`, un
+        COMMIT por tramo. Los repetidos DENTRO del lote también se detectan
+        (DeduplicadorLote lleva los vistos).
+
+        Args:
+            correos: Correos normalizados por GmailService.
+            fuentes: Fuentes de pago activas.
+            web_user_id: ID del WebUser que disparó la ejecución.
+            resumen: dict de la corrida; se actualizan sus contadores.
 
         Returns:
-            El Payment guardado, o un string de estado:
-            'duplicado' | 'no_reconocido' | 'error'.
+            Lista de UID IMAP procesados (los que se pueden marcar leídos).
         """
-        message_id = correo.get('message_id', '')
+        with self.metricas.etapa('archivo'):
+            self._archivar(correos)
 
-        if Payment.get_by_email_message_id(message_id):
-            logger.debug(f"Correo duplicado (message_id): {message_id}")
-            return 'duplicado'
+        try:
+            with self.metricas.etapa('dedup'):
+                dedup = DeduplicadorLote.para_correos(correos)
+        except SQLAlchemyError as e:
+            logger.error(f"Error consultando duplicados del lote: {e}")
+            resumen['errores'] += len(correos)
+            return []
+
+        uids = []
+        por_parsear = []
+        for correo in correos:
+            message_id = correo.get('message_id', '')
+            if dedup.mensaje_visto(message_id):
+                logger.debug(f"Correo duplicado (message_id): {message_id}")
+                self._contar(resumen, correo, 'duplicado')
+                uids.append(correo['imap_uid'])
+                continue
+            dedup.registrar_mensaje(message_id)
+            por_parsear.append(correo)
+
+        with self.metricas.etapa('parseo'):
+            resultados = self._parsear_todos(por_parsear)
+
+        parseados = []
+        for correo, parsed in zip(por_parsear, resultados):
+            if isinstance(parsed, ValueError):
+                logger.error(
+                    f"Error procesando correo {correo.get('message_id', '?')}: {parsed}"
+                )
+                resumen['errores'] += 1
+                continue
+            if parsed is None:
+                self._contar(resumen, correo, 'no_reconocido')
+                uids.append(correo['imap_uid'])
+                continue
+            _metodo, datos = parsed
+            parseados.append((correo, datos))
+
+        try:
+            with self.metricas.etapa('dedup'):
+                dedup.cargar_transacciones(
+                    datos.get('transaction_id') for _correo, datos in parseados
+                )
+        except SQLAlchemyError as e:
+            logger.error(f"Error consultando transacciones del lote: {e}")
+            resumen['errores'] += len(parseados)
+            return uids
 
-        parsed = self.registry.parse(correo)
-        if parsed is None:
-            return 'no_reconocido'
-        _metodo, datos = parsed
+        aceptados = []
+        for correo, datos in parseados:
+            try:
+                resultado = self._preparar_pago(
+                    correo, datos, fuentes, web_user_id, dedup
+                )
+            except (ValueError, SQLAlchemyError) as e:
+                logger.error(
+                    f"Error procesando correo {correo.get('message_id', '?')}: {e}"
+                )
+                resumen['errores'] += 1
+                continue
+            if isinstance(resultado, str):
+                self._contar(resumen, correo, resultado)
+                uids.append(correo['imap_uid'])
+            else:
+                aceptados.append((correo, resultado))
+
+        tramo = self._tamano_tramo()
+        for i in range(0, len(aceptados), tramo):
+            uids.extend(self._guardar_tramo(aceptados[i:i + tramo], resumen))
 
+        return uids
+
+    def _archivar(self, correos: list) -> None:
+        """
+        Guarda los correos descargados en el archivo en disco (ver
+        ArchivoCorreos). Un fallo de disco se registra y no frena la ingesta.
+        """
+        if self.archivo is None and has_app_context():
+            self.archivo = ArchivoCorreos.desde_config()
+        if self.archivo is None:
+            return
+        try:
+            nuevos = self.archivo.guardar_todos(correos)
+        except OSError as e:
+            logger.error(f"No se pudo archivar el lote de correos: {e}")
+            return
+        if nuevos:
+            logger.debug(f"{nuevos} correos archivados en {self.archivo.directorio}")
+
+    def _parsear_todos(self, correos: list) -> list:
+        """
+        Parsea los correos en serie o, si hay pool activo, en paralelo.
+
+        Executor.map conserva el orden de entrada, así que el resultado es
+        el mismo (y en el mismo orden) con 1 o con N procesos: el proceso
+        padre sigue haciendo la dedup y los INSERT en orden de UID.
+
+        Returns:
+            Lista paralela a `correos`: (metodo, datos), None si ningún
+            parser lo reconoce, o el ValueError que levantó el parser.
+        """
+        if self._pool is not None and len(correos) > 1:
+            tamano = max(1, len(correos) // (self._pool_workers * 4))
+            try:
+                return list(self._pool.map(parsear_en_proceso, correos, chunksize=tamano))
+            except BrokenProcessPool as e:
+                logger.warning(f"Pool de parseo caído ({e}); sigo en serie")
+                self._pool = None
+
+        resultados = []
+        for correo in correos:
+            try:
+                resultados.append(self.registry.parse(correo))
+            except ValueError as e:
+                resultados.append(e)
+        return resultados
+
+    @contextmanager
+    def _pool_de_parseo(self):
+        """Abre el pool de procesos de parseo durante el bloque (si N > 1)."""
+        workers = self.parse_workers
+        if workers is None:
+            workers = current_app.config.get('INGESTA_PARSE_WORKERS', 1)
+        if int(workers) <= 1:
+            yield
+            return
+        logger.info(f"Parseo en paralelo con {workers} procesos")
+        with ProcessPoolExecutor(max_workers=int(workers)) as pool:
+            self._pool, self._pool_workers = pool, int(workers)
+            try:
+                yield
+            finally:
+                self._pool = None
+
+    def _preparar_pago(
+        self,
+        correo: dict,
+        datos: dict,
+        fuentes: list,
+        web_user_id: Optional[int],
+        dedup: 'DeduplicadorLote'
+    ) -> Union[Payment, str]:
+        """
+        Fase 2 de un correo: dedup por transaction_id y creación del pago.
+
+        El pago queda en memoria; se inserta junto con su tramo en
+        _guardar_tramo.
+
+        Returns:
+            El Payment sin guardar, o 'duplicado'.
+        """
         transaction_id = datos.get('transaction_id')
-        if transaction_id and Payment.get_by_transaction_id(transaction_id):
+        if dedup.transaccion_vista(transaction_id):
             logger.debug(f"Transaccion duplicada: {transaction_id}")
             return 'duplicado'
+        dedup.registrar_transaccion(transaction_id)
 
         fuente = self._fuente_de(correo, fuentes)
-        pago = self._crear_pago(correo, datos, fuente, web_user_id)
+        return self._crear_pago(correo, datos, fuente, web_user_id)
 
-        if not pago.save():
-            logger.error(f"Error guardando pago: {message_id}")
-            return 'error'
+    def _guardar_tramo(self, tramo: list, resumen: dict) -> list:
+        """
+        Inserta un tramo de pagos en una transacción y luego los concilia.
 
-        logger.info(
-            f"Pago guardado: {pago.metodo} | {pago.pagador_nombre} | "
-            f"{pago.importe_bruto} {pago.moneda} | ID: {pago.id} | {pago.estado}"
-        )
+        Payment.save_all usa un savepoint por fila: un pago que viola una
+        restricción se cuenta como error sin revertir al resto del tramo.
+        La conciliación corre después del COMMIT, con los pagos ya firmes, y
+        trata el tramo como un lote (ver ReconciliationService.conciliar_lote).
 
-        self._conciliar(pago)
-        return pago
+        Args:
+            tramo: Pares (correo, Payment) aceptados.
+            resumen: dict de la corrida; se actualizan sus contadores.
+
+        Returns:
+            UID IMAP de los correos del tramo.
+        """
+        with self.metricas.etapa('guardado'):
+            guardados = Payment.save_all([pago for _correo, pago in tramo])
+
+        uids, firmes = [], []
+        for (correo, pago), guardado in zip(tramo, guardados):
+            uids.append(correo['imap_uid'])
+            if not guardado:
+                logger.error(f"Error guardando pago: {correo.get('message_id', '')}")
+                self._contar(resumen, correo, 'error')
+                continue
+
+            logger.info(
+                f"Pago guardado: {pago.metodo} | {pago.pagador_nombre} | "
+                f"{pago.importe_bruto} {pago.moneda} | ID: {pago.id} | {pago.estado}"
+            )
+            firmes.append((correo, pago))
+
+        if firmes:
+            with self.metricas.etapa('conciliacion'):
+                resultados = self._conciliar_lote([pago for _correo, pago in firmes])
+            for (correo, pago), resultado in zip(firmes, resultados):
+                self.metricas.contar_conciliacion(resultado)
+                self._contar(resumen, correo, pago)
+        return uids
+
+    def _tamano_tramo(self) -> int:
+        """Pagos por transacción: el del constructor o INGESTA_CHUNK_SIZE."""
+        tamano = self.chunk_size or current_app.config.get('INGESTA_CHUNK_SIZE', 100)
+        return max(1, int(tamano))
+
+    def _contar(self, resumen: dict, correo: dict, resultado) -> None:
+        """Suma el resultado de un correo a los contadores del resumen."""
+        if resultado == 'duplicado':
+            resumen['duplicados'] += 1
+        elif resultado == 'no_reconocido':
+            resumen['no_reconocidos'] += 1
+            logger.warning(
+                f"Correo no reconocido por ningún parser: "
+                f"sender={correo.get('sender')} "
+                f"msg_id={correo.get('message_id')}"
+            )
+        elif resultado == 'error':
+            resumen['errores'] += 1
+        else:  # es un Payment guardado
+            resumen['procesados'] += 1
+            resumen['nuevos'].append(self._resumen_pago(resultado))
 
     @staticmethod
-    def _conciliar(pago: Payment) -> None:
-        """Intentar casar el pago con una orden pendiente. Best-effort.
+    def _conciliar_lote(pagos: list) -> list:
+        """Intentar casar los pagos del tramo con órdenes pendientes. Best-effort.
+
+        Un fallo aquí no debe abortar la ingesta: los pagos ya están guardados
+        y quedan el barrido nocturno y la conciliación manual del dashboard.
 
-        Un fallo aquí no debe abortar la ingesta: el pago ya está guardado y
-        siempre queda la conciliación manual desde el dashboard.
+        Returns:
+            El resultado de cada pago ('vinculado', 'revision',
+            'sin_candidatos', ...) o 'error', en el mismo orden.
         """
         try:
             from app.services.reconciliation_service import ReconciliationService
-            resultado = ReconciliationService.conciliar(pago)
-            logger.info(f"Conciliación del pago {pago.id}: {resultado}")
+            resultados = ReconciliationService.conciliar_lote(pagos)
         except Exception as exc:
-            logger.error(f"Error conciliando el pago {pago.id}: {exc}", exc_info=True)
+            logger.error(f"Error conciliando el lote: {exc}", exc_info=True)
+            db.session.rollback()
+            return ['error'] * len(pagos)
+
+        for pago, resultado in zip(pagos, resultados):
+            logger.info(f"Conciliación del pago {pago.id}: {resultado}")
+        return [r.get('resultado') for r in resultados]
 
     def crear_pago_manual(
         self,
@@ -318,10 +721,25 @@ class UnifiedIngestionService:
         )
 
         if cotizable:
-            self._aplicar_cotizacion(pago, fuente, web_user_id)
+            with self.metricas.etapa('cotizacion'):
+                self._aplicar_cotizacion(pago, fuente, web_user_id)
 
         return pago
 
+    def _capturar_precios(self) -> None:
+        """Toma la foto de cotizaciones con la que se cotiza toda la corrida.
+
+        Una sola captura al inicio del lote: todos los pagos de la corrida se
+        cotizan con la misma matriz y sin ~3 consultas por correo. Si la
+        captura falla, se cotiza pago a pago contra la BD como antes.
+        """
+        try:
+            with self.metricas.etapa('cotizacion'):
+                self._precios = PricingSnapshot.capturar()
+        except SQLAlchemyError as e:
+            logger.warning(f"No se pudo capturar la matriz de cotizaciones: {e}")
+            self._precios = None
+
     def _aplicar_cotizacion(
         self,
         pago: Payment,
@@ -337,8 +755,10 @@ class UnifiedIngestionService:
             (fuente.moneda_local_default if fuente else None)
             or current_app.config.get('DEFAULT_LOCAL_CURRENCY', 'VES')
         )
+        # Misma firma y contrato: la foto de la corrida o, sin ella, la BD
+        cotizador = self._precios or CalculatorService
         try:
-            resultado = CalculatorService.calcular_pago_recibido(
+            resultado = cotizador.calcular_pago_recibido(
                 monto_base=monto_base,
                 currency_code=moneda_local,
                 metodo_code=pago.metodo
@@ -445,31 +865,46 @@ class UnifiedIngestionService:
 
     def procesar_desde_fecha(
         self,
-        desde_imap: str,
+        desde_iso: str,
         web_user_id: Optional[int],
-        limite: Optional[int] = None
+        tiempo_max: Optional[float] = None,
+        reanudar: bool = True
     ) -> dict:
         """
-        Importación histórica one-time: procesa TODOS los correos (leídos y
-        no leídos) de los remitentes activos a partir de `desde_imap`.
-
-        La dedup por message_id y transaction_id evita registros duplicados
-        si el correo ya fue procesado previamente. Todos los correos procesados
-        se marcan como leídos al finalizar.
+        Importación histórica: procesa TODOS los correos (leídos y no leídos)
+        de los remitentes activos a partir de una fecha, en streaming.
+
+        Recorre los UID en orden ascendente por tramos de IMPORT_CHUNK: baja
+        el tramo, lo ingesta, lo marca como leído y guarda un checkpoint
+        (UIDVALIDITY + último UID) en ingestion_checkpoints. La memoria queda
+        acotada a un tramo sin importar cuántos meses se importen, y una
+        corrida interrumpida se retoma desde el checkpoint. La dedup por
+        message_id y transaction_id cubre cualquier solape. Los UID que
+        fallaron quedan como pendientes del checkpoint y se reintentan una
+        vez al terminar el recorrido.
 
         Args:
-            desde_imap: Fecha en formato IMAP, ej. '01-Jun-2026'.
+            desde_iso: Fecha de inicio 'YYYY-MM-DD'.
             web_user_id: ID del WebUser que disparó la ejecución.
-            limite: Máximo de correos a procesar (los más recientes). None =
-                sin límite (backfill completo por CLI). Se acota desde el
-                dashboard para no exceder el timeout de Gunicorn.
+            tiempo_max: Segundos de trabajo antes de cortar limpio en un
+                borde de tramo (el dashboard lo usa para no exceder el
+                timeout de Gunicorn; se continúa con otra llamada). Con tope,
+                los tramos son de IMPORT_CHUNK_HTTP y no se arranca uno que,
+                a la velocidad del anterior, terminaría pasado el tope. None =
+                hasta terminar (CLI).
+            reanudar: False = ignorar el checkpoint y empezar de cero.
 
         Returns:
-            dict con el resumen de la importación.
+            dict con el resumen de esta llamada y el progreso acumulado.
+
+        Raises:
+            ValueError: Si `desde_iso` no es una fecha YYYY-MM-DD.
         """
+        desde_imap = datetime.strptime(desde_iso, '%Y-%m-%d').strftime('%d-%b-%Y')
         resumen = {
             'success': False, 'procesados': 0, 'duplicados': 0,
-            'no_reconocidos': 0, 'errores': 0, 'nuevos': [], 'mensaje': ''
+            'no_reconocidos': 0, 'errores': 0, 'nuevos': [], 'mensaje': '',
+            'completado': False, 'progreso': None
         }
 
         fuentes = PaymentSource.get_activos()
@@ -478,64 +913,157 @@ class UnifiedIngestionService:
             resumen['mensaje'] = "No hay fuentes de pago activas configuradas"
             return resumen
 
+        self.metricas = MetricasCorrida()
+        try:
+            self._importar(desde_iso, desde_imap, fuentes, web_user_id,
+                           tiempo_max, reanudar, resumen)
+        finally:
+            self._registrar_corrida(IngestionRun.HISTORICO, web_user_id, resumen)
+        return resumen
+
+    def _importar(
+        self,
+        desde_iso: str,
+        desde_imap: str,
+        fuentes: list,
+        web_user_id: Optional[int],
+        tiempo_max: Optional[float],
+        reanudar: bool,
+        resumen: dict
+    ) -> None:
+        """Cuerpo de procesar_desde_fecha: llena `resumen` y las métricas."""
         remitentes = [f.remitente for f in fuentes]
-        logger.info(
-            f"Importación histórica desde {desde_imap} — "
-            f"{len(remitentes)} remitentes"
-        )
+        with self.metricas.etapa('busqueda'):
+            conectado = self.gmail.abrir_sesion()
+        if not conectado:
+            resumen['mensaje'] = "Error conectando a Gmail"
+            return
 
         try:
-            correos = self.gmail.get_emails_desde_fecha(
-                remitentes, desde_imap, limite=limite
+            checkpoint = self._checkpoint(desde_iso, reanudar)
+            with self.metricas.etapa('busqueda'):
+                uids = self.gmail.buscar_uids_desde_fecha(
+                    remitentes, desde_imap, desde_uid=checkpoint.ultimo_uid
+                )
+            checkpoint.total = checkpoint.procesados + len(uids)
+            db.session.commit()
+            logger.info(
+                f"Importación histórica desde {desde_iso}: {len(uids)} correos "
+                f"pendientes (ya recorridos: {checkpoint.procesados})"
             )
-        except (imaplib.IMAP4.error, OSError) as e:
-            logger.error(f"Error conectando a Gmail: {e}")
-            resumen['mensaje'] = f"Error conectando a Gmail: {str(e)}"
-            return resumen
 
-        if not correos:
-            resumen['success'] = True
-            resumen['mensaje'] = f"No hay correos desde {desde_imap}"
-            return resumen
-
-        uids_a_marcar = []
-        for correo in correos:
-            try:
-                resultado = self._procesar_correo(correo, fuentes, web_user_id)
-                if resultado == 'duplicado':
-                    resumen['duplicados'] += 1
-                elif resultado == 'no_reconocido':
-                    resumen['no_reconocidos'] += 1
-                elif resultado == 'error':
-                    resumen['errores'] += 1
+            self._capturar_precios()
+            tamano = self.IMPORT_CHUNK
+            if tiempo_max:
+                tamano = min(tamano, self.IMPORT_CHUNK_HTTP)
+            pendientes = [str(u) for u in checkpoint.uids_pendientes()]
+            # (tramo, reintento): los fallidos van al final, con el recorrido hecho
+            tramos = ([(uids[i:i + tamano], False) for i in range(0, len(uids), tamano)]
+                      + [(pendientes[i:i + tamano], True)
+                         for i in range(0, len(pendientes), tamano)])
+
+            limite = time.monotonic() + tiempo_max if tiempo_max else None
+            ultimo = 0.0
+            with self._pool_de_parseo():
+                for tramo, reintento in tramos:
+                    antes = time.monotonic()
+                    if limite is not None and antes + ultimo > limite:
+                        logger.info("Tiempo agotado; la importación sigue en otra llamada")
+                        break
+                    self._importar_tramo(tramo, fuentes, web_user_id, resumen,
+                                         checkpoint, reintento)
+                    ultimo = time.monotonic() - antes
                 else:
-                    resumen['procesados'] += 1
-                    resumen['nuevos'].append(self._resumen_pago(resultado))
-                # Importación histórica: marcar como leído (en lote al final)
-                uids_a_marcar.append(correo['imap_uid'])
-            except (ValueError, SQLAlchemyError) as e:
-                logger.error(
-                    f"Error procesando correo "
-                    f"{correo.get('message_id', '?')}: {e}"
-                )
-                resumen['errores'] += 1
+                    checkpoint.estado = IngestionCheckpoint.COMPLETADO
+                    db.session.commit()
+                    resumen['completado'] = True
 
-        # Marcado en lote: una sola conexión IMAP para todos los UID, en vez de
-        # reconectar (login completo) por cada correo, lo que excedía el timeout
-        # de Gunicorn (120s) y mataba al worker en la fase de marcado.
-        if uids_a_marcar:
-            self.gmail.mark_multiple_as_read(uids_a_marcar)
+        except (imaplib.IMAP4.error, OSError) as e:
+            logger.error(f"Error de Gmail en la importación histórica: {e}")
+            resumen['mensaje'] = f"Error de Gmail: {e}. Se puede reanudar."
+            return
+        finally:
+            self.gmail.cerrar_sesion()
 
         resumen['success'] = True
+        resumen['progreso'] = checkpoint.to_dict()
         resumen['mensaje'] = (
-            f"Importación desde {desde_imap}: "
+            f"Importación desde {desde_iso}: "
             f"{resumen['procesados']} nuevos, "
             f"{resumen['duplicados']} duplicados, "
             f"{resumen['no_reconocidos']} no reconocidos, "
-            f"{resumen['errores']} errores"
+            f"{resumen['errores']} errores "
+            f"({checkpoint.procesados}/{checkpoint.total}"
+            f"{'' if resumen['completado'] else ', continúa'})"
         )
         logger.info(resumen['mensaje'])
-        return resumen
+
+    def _checkpoint(self, desde_iso: str, reanudar: bool) -> IngestionCheckpoint:
+        """Checkpoint de la importación, reiniciado si no sirve para reanudar."""
+        clave = IngestionCheckpoint.clave_historico(desde_iso)
+        checkpoint = IngestionCheckpoint.get_by_clave(clave)
+        if checkpoint is None:
+            checkpoint = IngestionCheckpoint(clave=clave)
+            checkpoint.reiniciar(self.gmail.uidvalidity)
+            db.session.add(checkpoint)
+        elif (not reanudar
+              or checkpoint.estado == IngestionCheckpoint.COMPLETADO
+              or checkpoint.uidvalidity != self.gmail.uidvalidity):
+            if checkpoint.uidvalidity != self.gmail.uidvalidity:
+                logger.warning("UIDVALIDITY cambió: la importación empieza de cero")
+            checkpoint.reiniciar(self.gmail.uidvalidity)
+        return checkpoint
+
+    def _importar_tramo(
+        self,
+        tramo: list,
+        fuentes: list,
+        web_user_id: Optional[int],
+        resumen: dict,
+        checkpoint: IngestionCheckpoint,
+        reintento: bool = False
+    ) -> None:
+        """
+        Baja, ingesta y marca un tramo de UID; luego avanza el checkpoint.
+
+        Los correos sin parte HTML cuentan como no reconocidos y se marcan.
+        Los demás UID del tramo que no quedaron procesados (fallo al bajarlos
+        o de BD/parseo) pasan a pendientes del checkpoint, que recuerda cuáles
+        ya sumaron un error. Con ``reintento`` el tramo ES de pendientes: no
+        avanza el recorrido, solo actualiza cuáles siguen.
+        """
+        parcial = {
+            'procesados': 0, 'duplicados': 0, 'no_reconocidos': 0,
+            'errores': 0, 'nuevos': []
+        }
+        correos = self.gmail.descargar(tramo)
+        sin_html = list(self.gmail.sin_html)
+        self.metricas.registrar_descarga(self.gmail.ultima_descarga or {})
+        uids_a_marcar = self._procesar_lote(correos, fuentes, web_user_id, parcial)
+        parcial['no_reconocidos'] += len(sin_html)
+        uids_a_marcar = list(uids_a_marcar) + sin_html
+        if uids_a_marcar:
+            with self.metricas.etapa('marcado'):
+                self.gmail.mark_multiple_as_read(uids_a_marcar)
+
+        for clave in ('procesados', 'duplicados', 'no_reconocidos', 'errores'):
+            resumen[clave] += parcial[clave]
+        resumen['nuevos'].extend(parcial['nuevos'])
+
+        fallidos = ({int(u) for u in tramo}
+                    - {int(u) for u in uids_a_marcar})
+        # Los que se bajaron y no se marcaron sumaron un error en el lote;
+        # los que ni se bajaron, no
+        con_error = fallidos & {int(c['imap_uid']) for c in correos}
+        if reintento:
+            checkpoint.reintentados(
+                (int(u) for u in tramo), fallidos, parcial, con_error
+            )
+        else:
+            checkpoint.avanzar(
+                int(tramo[-1]), len(tramo), parcial, fallidos, con_error
+            )
+        db.session.commit()
 
 
 def inicializar_scheduler_unificado(app) -> None:
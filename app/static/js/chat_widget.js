@@ -3,12 +3,20 @@
   'use strict';
 
   const POLL_MS = 4000;
+  const TYPING_MS = 6000;  // igual que el TTL del "escribiendo" en el servidor
 
   let panel, list, input, form, reminder, btnReminder, btnClose, btnChat;
   let lastId = 0;
   let pollTimer = null;
   let isOpen = false;
   let typingSentAt = 0;
+  let conversationId = null;
+  let stream = null;         // EventSource de /chat/stream
+  let streamFailed = false;  // el servidor no ofrece SSE: se queda el polling
+  let sending = false;       // hay un envío en curso
+  let held = [];             // mensajes del stream que llegan durante el envío
+  let typingTimer = null;
+  const seen = new Set();    // ids ya pintados (llegan por stream y por POST)
 
   function setTypingIndicator(on) {
     if (!list) return;
@@ -39,6 +47,10 @@
 
   function addMessage(msg) {
     if (!list) return;
+    if (msg.id) {
+      if (seen.has(msg.id)) return;
+      seen.add(msg.id);
+    }
     const isClient = msg.sender === 'client';
     const row = document.createElement('div');
     row.className = 'chat-row ' + (isClient ? 'chat-row--client' : 'chat-row--staff');
@@ -119,6 +131,7 @@
     try {
       const r = await fetch('/chat/historial');
       const data = await r.json();
+      if (data.conversation_id) conversationId = data.conversation_id;
       (data.messages || []).forEach(addMessage);
       showEmptyHint();
     } catch (e) {
@@ -153,6 +166,62 @@
     pollTimer = null;
   }
 
+  function showIncoming(msg) {
+    clearEmptyHint();
+    clearTimeout(typingTimer);
+    setTypingIndicator(false);
+    addMessage(msg);
+  }
+
+  // Tiempo real por SSE; sin conversación todavía, sin EventSource o si el
+  // servidor no lo ofrece (204/503), se usa el polling de siempre.
+  function startLive() {
+    if (stream) return;
+    if (!conversationId || streamFailed || typeof EventSource === 'undefined') {
+      startPolling();
+      return;
+    }
+    stopPolling();
+    stream = new EventSource('/chat/stream?after=' + lastId);
+    stream.addEventListener('message', function (e) {
+      const msg = JSON.parse(e.data);
+      // Durante un envío se espera a pintar primero el mensaje del cliente
+      if (sending) { held.push(msg); } else { showIncoming(msg); }
+    });
+    stream.addEventListener('typing', function () {
+      setTypingIndicator(true);
+      clearTimeout(typingTimer);
+      typingTimer = setTimeout(function () { setTypingIndicator(false); }, TYPING_MS);
+    });
+    stream.onerror = function () {
+      // CONNECTING: el navegador reintenta solo (con Last-Event-ID)
+      if (stream && stream.readyState === EventSource.CLOSED) {
+        stream = null;
+        streamFailed = true;
+        startPolling();
+      }
+    };
+  }
+
+  function stopLive() {
+    if (stream) {
+      stream.close();
+      stream = null;
+    }
+    stopPolling();
+  }
+
+  function releaseHeld() {
+    sending = false;
+    held.splice(0).forEach(showIncoming);
+  }
+
+  function adoptConversation(data) {
+    if (conversationId || !data.conversation_id) return;
+    conversationId = data.conversation_id;
+    if (isOpen) startLive();
+  }
+
 
   // Un mensaje de comprobante trae la URL del archivo en /static/proofs/
   const PROOF_RE = /(\/static\/proofs\/[^\s]+)/;
@@ -186,6 +255,7 @@
     clearEmptyHint();
     const fd = new FormData();
     fd.append('archivo', file);
+    sending = true;
     try {
       const r = await fetch('/chat/comprobante', { method: 'POST', body: fd });
       if (r.status === 413) {
@@ -200,9 +270,12 @@
       }
       addMessage(data.message);
       (data.bot_messages || []).forEach(addMessage);
+      adoptConversation(data);
       maybeShowReminder();
     } catch (e) {
       alert('No se pudo enviar el comprobante. Reintenta.');
+    } finally {
+      releaseHeld();
     }
   }
 
@@ -215,6 +288,7 @@
 
   async function sendMessage(text, label) {
     clearEmptyHint();
+    sending = true;
     try {
       const r = await fetch('/chat/mensaje', {
         method: 'POST',
@@ -226,11 +300,17 @@
       if (data.ok && data.message) {
         addMessage(data.message);
         (data.bot_messages || []).forEach(addMessage);
+        adoptConversation(data);
         maybeShowReminder();
+        // La respuesta del bot se genera aparte: sin stream, no esperar al
+        // siguiente ciclo de polling
+        if (!stream && !(data.bot_messages || []).length) setTimeout(poll, 1000);
       }
     } catch (e) {
       // El mensaje no salió: se lo indicamos al usuario sin romper el widget
       addMessage({ sender: 'bot', body: 'No pudimos enviar tu mensaje. Reintenta.' });
+    } finally {
+      releaseHeld();
     }
   }
 
@@ -251,8 +331,7 @@
     if (!panel) return;
     isOpen = true;
     panel.style.display = 'flex';
-    if (lastId === 0) loadHistory();
-    startPolling();
+    if (lastId === 0) { loadHistory().then(startLive); } else { startLive(); }
     if (input) input.focus();
     scrollToEnd();
   }
@@ -261,7 +340,7 @@
     if (!panel) return;
     isOpen = false;
     panel.style.display = 'none';
-    stopPolling();
+    stopLive();
   }
 
   document.addEventListener('DOMContentLoaded', function () {
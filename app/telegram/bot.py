@@ -1,20 +1,24 @@
 """
 Bot de Telegram para publicación automática de cotizaciones.
 Versión síncrona usando requests HTTP para evitar conflicto con event loops.
+Los llamados pasan por el TelegramSender compartido (sesión keep-alive y
+límites de flood de Telegram).
 """
 import os
 import requests
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from datetime import datetime
 
+from app.telegram.sender import TelegramSender, TelegramSendError
+
 
 class TelegramPublisher:
     """
     Maneja la publicación en el canal de Telegram.
     
-    IMPORTANTE: Esta clase usa requests HTTP directo en lugar de 
-    python-telegram-bot async para evitar conflictos con el event loop
-    del bot conversacional que corre en background.
+    IMPORTANTE: Esta clase usa requests HTTP directo (TelegramSender) en
+    lugar de python-telegram-bot async para evitar conflictos con el event
+    loop del bot conversacional que corre en background.
     """
     
     def __init__(self, token, channel_id):
@@ -99,9 +103,6 @@ class TelegramPublisher:
                 - error (str): Mensaje de error (si falló)
         """
         try:
-            # Preparar URL de la API
-            url = f"{self.api_base_url}/sendPhoto"
-            
             # Preparar mensaje
             caption = custom_message if custom_message else self._get_default_message()
             
@@ -110,49 +111,34 @@ class TelegramPublisher:
                 'chat_id': self.channel_id,
                 'caption': caption,
                 'parse_mode': 'Markdown',
-                'reply_markup': str(self._get_inline_keyboard()).replace("'", '"')
+                'reply_markup': self._get_inline_keyboard()
             }
             
-            # Abrir y enviar imagen
+            # Leer la imagen: el envío sale de la cola del sender
             with open(image_path, 'rb') as photo:
-                files = {'photo': photo}
-                
-                # Hacer request HTTP
-                response = requests.post(
-                    url,
-                    data=data,
-                    files=files,
-                    timeout=(5, 60)
-                )
+                files = {'photo': (os.path.basename(image_path), photo.read())}
             
-            # Procesar respuesta
-            if response.status_code == 200:
-                result = response.json()
-                
-                if result.get('ok'):
-                    message_id = result['result']['message_id']
-                    return {
-                        'success': True,
-                        'message_id': message_id,
-                        'url': f"https://t.me/ceiba21channel/{message_id}"
-                    }
-                else:
-                    return {
-                        'success': False,
-                        'error': result.get('description', 'Error desconocido')
-                    }
-            else:
-                return {
-                    'success': False,
-                    'error': f"HTTP {response.status_code}: {response.text}"
-                }
+            result = TelegramSender.for_token(self.token).call(
+                'sendPhoto', data, files=files
+            )
+            message_id = result['message_id']
+            return {
+                'success': True,
+                'message_id': message_id,
+                'url': f"https://t.me/ceiba21channel/{message_id}"
+            }
                 
         except FileNotFoundError:
             return {
                 'success': False,
                 'error': f'Imagen no encontrada: {image_path}'
             }
-        except requests.exceptions.Timeout:
+        except TelegramSendError as e:
+            return {
+                'success': False,
+                'error': e.description
+            }
+        except (requests.exceptions.Timeout, TimeoutError):
             return {
                 'success': False,
                 'error': 'Timeout al conectar con Telegram API'
@@ -7,6 +7,7 @@ VERSIÓN CORREGIDA - SOLUCIÓN AL ERROR:
 - Serialización de objetos ANTES de salir del contexto
 - Uso de datos primitivos en handlers async
 """
+import io
 import os
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -21,6 +22,7 @@ from app.bot.responses import Responses
 from app.models.user import User
 from app.models.operator import Operator, OperatorRole
 from app.models.order import Order
+from app.services.proof_storage import ProofStorage
 import redis
 
 # Crear app Flask para contexto
@@ -88,16 +90,21 @@ def get_or_create_user_from_telegram(telegram_user) -> User:
 
 
 async def save_proof_to_storage(photo_file, order_reference: str) -> str:
-    """Guardar comprobante en almacenamiento local"""
-    proofs_dir = os.path.join('app', 'static', 'proofs')
-    os.makedirs(proofs_dir, exist_ok=True)
-    
-    filename = f"{order_reference}_{photo_file.file_unique_id}.jpg"
-    filepath = os.path.join(proofs_dir, filename)
-    
-    await photo_file.download_to_drive(filepath)
-    
-    return f"/static/proofs/{filename}"
+    """
+    Guardar comprobante en almacenamiento local.
+
+    La foto se descarga a memoria y la guarda ProofStorage (deduplicada por
+    contenido: si el cliente ya la mandó por el chat web, se reutiliza).
+    """
+    buffer = io.BytesIO()
+    await photo_file.download_to_memory(out=buffer)
+    buffer.seek(0)
+
+    with flask_app.app_context():
+        proof_url = ProofStorage.store(buffer, '.jpg')
+
+    logger.info(f"Proof for {order_reference} stored at {proof_url}")
+    return proof_url
 
 
 # ==========================================
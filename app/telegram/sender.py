@@ -0,0 +1,332 @@
+"""
+Cliente saliente compartido de la Bot API de Telegram.
+
+Un solo ``TelegramSender`` por token y por proceso (``for_token``) para todo
+lo que le habla a Telegram por HTTP: la publicación de cotizaciones
+(TelegramPublisher) y las notificaciones de órdenes (TelegramChannel).
+
+    - una ``requests.Session`` persistente: keep-alive, sin un handshake TLS
+      por mensaje
+    - una cola con planificador de token buckets: 30 msg/s en total y
+      1 msg/s por chat (los límites de flood de Telegram); un chat que
+      espera su turno no frena a los demás
+    - un 429 respeta su ``retry_after``: el chat queda en pausa ese tiempo y
+      el mensaje vuelve al frente de su cola
+
+``submit`` encola y devuelve un Future al instante; ``call`` espera el
+resultado (lo usan quienes necesitan el message_id o registrar el fallo). Si
+la espera de ``call`` vence con el envío todavía en cola, se retira de la
+cola y falla: quien reintenta (la outbox) nunca duplica un mensaje que salió
+tarde. Un envío ya en vuelo no se corta: se espera su HTTP.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+API_URL = 'https://api.telegram.org/bot{token}/{method}'
+
+
+class TelegramSendError(Exception):
+    """Telegram rechazó el envío (ok=false) o no hubo respuesta válida."""
+
+    def __init__(self, description: str, error_code: Optional[int] = None):
+        super().__init__(description)
+        self.description = description
+        self.error_code = error_code
+
+
+class TokenBucket:
+    """
+    Token bucket con reloj explícito (segundos monotónicos).
+
+    Attributes:
+        rate: Tokens por segundo.
+        capacity: Ráfaga máxima.
+    """
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Segundos hasta que haya un token (0 si ya lo hay)."""
+        if now < self.updated:
+            # En pausa (retry_after) hasta `updated`
+            return self.updated - now
+        self._refill(now)
+        return max(0.0, 1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        """Consumir un token (el llamador ya vio wait_time == 0)."""
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause_until(self, until: float) -> None:
+        """No entregar tokens hasta `until` (retry_after); ahí, uno solo."""
+        self.tokens = min(1.0, self.capacity)
+        self.updated = max(self.updated, until)
+
+    def is_idle(self, now: float) -> bool:
+        """Lleno y sin pausa: se puede descartar sin perder estado."""
+        self._refill(now)
+        return now >= self.updated and self.tokens >= self.capacity
+
+
+class _Envio:
+    """Un llamado a la Bot API en cola."""
+
+    __slots__ = ('chat_id', 'method', 'params', 'files', 'future', 'intentos')
+
+    def __init__(self, chat_id: str, method: str, params: dict,
+                 files: Optional[dict]) -> None:
+        self.chat_id = chat_id
+        self.method = method
+        self.params = params
+        self.files = files
+        self.future: Future = Future()
+        self.intentos = 0
+
+
+class TelegramSender:
+    """
+    Cola de envíos a la Bot API con límites de Telegram.
+
+    Attributes:
+        GLOBAL_RATE: Mensajes por segundo del bot en total.
+        CHAT_RATE: Mensajes por segundo a un mismo chat.
+        HILOS: Llamados HTTP simultáneos (y tamaño del pool de conexiones).
+        TIMEOUT: (conexión, lectura) de cada llamado.
+        MAX_429: Reintentos por mensaje tras un 429 antes de fallar.
+    """
+
+    GLOBAL_RATE = 30
+    CHAT_RATE = 1.0
+    HILOS = 4
+    TIMEOUT = (5, 60)
+    MAX_429 = 3
+
+    _instances: Dict[str, 'TelegramSender'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, token: str, session: Optional[requests.Session] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Args:
+            token: Token del bot.
+            session: Sesión HTTP (tests); por defecto una propia con keep-alive.
+            clock: Reloj monotónico (tests).
+        """
+        self.token = token
+        self.clock = clock
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=1,
+                                                  pool_maxsize=self.HILOS))
+        self.session = session
+
+        self._cond = threading.Condition()
+        self._colas: Dict[str, Deque[_Envio]] = {}
+        self._chats: Dict[str, TokenBucket] = {}
+        self._global = TokenBucket(self.GLOBAL_RATE, self.GLOBAL_RATE, clock())
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._planificador: Optional[threading.Thread] = None
+
+    @classmethod
+    def for_token(cls, token: str) -> 'TelegramSender':
+        """Sender compartido del proceso para ese token."""
+        with cls._instances_lock:
+            if token not in cls._instances:
+                cls._instances[token] = cls(token)
+            return cls._instances[token]
+
+    # ── API pública ───────────────────────────────────────────────────────
+
+    def submit(self, method: str, params: dict, files: Optional[dict] = None) -> Future:
+        """
+        Encolar un llamado y volver al instante.
+
+        Args:
+            method: Método de la Bot API ('sendMessage', 'sendPhoto'...).
+            params: Parámetros; ``chat_id`` define la cola y el límite por chat.
+                Los dict/list (reply_markup) se serializan a JSON.
+            files: Archivos multipart {campo: (nombre, bytes)}; deben ser
+                bytes ya leídos, el envío ocurre más tarde.
+
+        Returns:
+            Future con el ``result`` de Telegram, o TelegramSendError /
+            requests.RequestException.
+        """
+        return self._encolar(method, params, files).future
+
+    def call(self, method: str, params: dict, files: Optional[dict] = None,
+             timeout: Optional[float] = 120) -> dict:
+        """
+        Encolar y esperar el resultado (ver submit).
+
+        Args:
+            timeout: Espera máxima para que el envío SALGA. Si vence y sigue
+                en cola (p. ej. un chat en pausa por retry_after), se retira
+                y no se envía; si ya está en vuelo, se espera su respuesta.
+
+        Raises:
+            TelegramSendError: Si falló, o si se retiró de la cola por timeout.
+        """
+        envio = self._encolar(method, params, files)
+        espera = timeout
+        while True:
+            try:
+                return envio.future.result(timeout=espera)
+            except FuturesTimeout:
+                if self._retirar(envio):
+                    raise TelegramSendError(
+                        f"Sin turno en {timeout}s: envío cancelado sin salir")
+                # En vuelo (o volviendo a la cola tras un 429): reintentar
+                # retirarlo en un momento, o recibir su resultado
+                espera = 1
+
+    def _encolar(self, method: str, params: dict, files: Optional[dict]) -> _Envio:
+        """Serializar los parámetros y poner el envío en la cola de su chat."""
+        params = {
+            clave: json.dumps(valor) if isinstance(valor, (dict, list)) else valor
+            for clave, valor in params.items() if valor is not None
+        }
+        envio = _Envio(str(params.get('chat_id', '')), method, params, files)
+        with self._cond:
+            self._iniciar()
+            self._colas.setdefault(envio.chat_id, deque()).append(envio)
+            self._cond.notify()
+        return envio
+
+    def _retirar(self, envio: _Envio) -> bool:
+        """
+        Sacar un envío de su cola si todavía no salió.
+
+        Returns:
+            True si se retiró (nunca se enviará); False si está en vuelo.
+        """
+        with self._cond:
+            cola = self._colas.get(envio.chat_id)
+            if not cola or envio not in cola:
+                return False
+            cola.remove(envio)
+            envio.future.cancel()
+            return True
+
+    # ── Planificación ─────────────────────────────────────────────────────
+
+    def _iniciar(self) -> None:
+        """Arrancar el planificador y el pool HTTP al primer envío."""
+        if self._planificador is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.HILOS,
+                                            thread_name_prefix='telegram-send')
+            self._planificador = threading.Thread(
+                target=self._planificar, name='telegram-sched', daemon=True)
+            self._planificador.start()
+
+    def _siguiente(self, now: float) -> Tuple[Optional[_Envio], Optional[float]]:
+        """
+        Elegir el próximo envío que ya puede salir (llamar con el lock).
+
+        Returns:
+            (envío, 0) si hay uno listo (ya consumió sus tokens), o
+            (None, segundos hasta el próximo) / (None, None) si no hay cola.
+        """
+        espera_min: Optional[float] = None
+        elegido = None
+        for chat_id, cola in list(self._colas.items()):
+            if not cola:
+                del self._colas[chat_id]
+                continue
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                bucket = self._chats[chat_id] = TokenBucket(self.CHAT_RATE, 1, now)
+            espera = bucket.wait_time(now)
+            if espera <= 0:
+                elegido = chat_id
+                break
+            espera_min = espera if espera_min is None else min(espera_min, espera)
+
+        if elegido is None:
+            return None, espera_min
+
+        espera_global = self._global.wait_time(now)
+        if espera_global > 0:
+            return None, espera_global
+
+        self._global.take(now)
+        self._chats[elegido].take(now)
+        envio = self._colas[elegido].popleft()
+        # Round-robin: el chat atendido pasa al final
+        self._colas[elegido] = self._colas.pop(elegido)
+        self._podar(now)
+        return envio, 0
+
+    def _podar(self, now: float) -> None:
+        """Descartar buckets de chats sin cola que ya se rellenaron."""
+        if len(self._chats) > 1000:
+            for chat_id in [c for c, b in self._chats.items()
+                            if c not in self._colas and b.is_idle(now)]:
+                del self._chats[chat_id]
+
+    def _planificar(self) -> None:
+        """Bucle del planificador: despacha cada envío cuando le toca."""
+        while True:
+            with self._cond:
+                envio, espera = self._siguiente(self.clock())
+                if envio is None:
+                    self._cond.wait(espera)
+                    continue
+            self._pool.submit(self._ejecutar, envio)
+
+    def _ejecutar(self, envio: _Envio) -> None:
+        """Hacer el llamado HTTP y resolver el Future (o reprogramar un 429)."""
+        envio.intentos += 1
+        try:
+            respuesta = self.session.post(
+                API_URL.format(token=self.token, method=envio.method),
+                data=envio.params, files=envio.files, timeout=self.TIMEOUT,
+            )
+            cuerpo = respuesta.json()
+        except Exception as exc:
+            envio.future.set_exception(exc)
+            return
+
+        if cuerpo.get('ok'):
+            envio.future.set_result(cuerpo.get('result'))
+            return
+
+        retry_after = (cuerpo.get('parameters') or {}).get('retry_after')
+        if cuerpo.get('error_code') == 429 and retry_after and envio.intentos <= self.MAX_429:
+            logger.warning(
+                f"Telegram 429 en chat {envio.chat_id}: reintento en {retry_after}s"
+            )
+            with self._cond:
+                bucket = self._chats.setdefault(
+                    envio.chat_id, TokenBucket(self.CHAT_RATE, 1, self.clock()))
+                bucket.pause_until(self.clock() + float(retry_after))
+                self._colas.setdefault(envio.chat_id, deque()).appendleft(envio)
+                self._cond.notify()
+            return
+
+        envio.future.set_exception(TelegramSendError(
+            cuerpo.get('description', 'Error desconocido'), cuerpo.get('error_code')
+        ))
@@ -0,0 +1,106 @@
+"""
+Tests del índice normalizado de la blacklist y de su filtro en memoria.
+
+Lo crítico: que las variantes de formato de un mismo dato coincidan (si no, un
+estafador bloqueado entra de nuevo escribiendo el teléfono con guiones) y que
+el filtro NUNCA dé un falso negativo.
+"""
+import pytest
+
+from app.models.blacklist import BlacklistIdentifier
+from app.services.blacklist_service import BlacklistService
+from app.utils.bloom import BloomFilter
+from app.utils.identificadores import (
+    normalizar_dni, normalizar_email, normalizar_telefono, normalizar_telegram_id
+)
+
+
+class TestNormalizacionDeTelefono:
+    """Todas las formas de escribir un número terminan en E.164."""
+
+    @pytest.mark.parametrize('variante', [
+        '+58 414 1234567', '+58-414-123.45.67', '0414-1234567',
+        '04141234567', '4141234567', '00584141234567', '584141234567',
+    ])
+    def test_variantes_venezolanas(self, variante):
+        assert normalizar_telefono(variante) == '+584141234567'
+
+    def test_respeta_el_codigo_de_pais_explicito(self):
+        assert normalizar_telefono('+57 300 123 4567') == '+573001234567'
+
+    def test_sin_digitos_da_none(self):
+        assert normalizar_telefono('sin número') is None
+        assert normalizar_telefono(None) is None
+
+
+class TestNormalizacionDeEmail:
+    """El email canónico ignora mayúsculas, etiquetas y puntos de Gmail."""
+
+    def test_mayusculas_y_espacios(self):
+        assert normalizar_email('  Jose@Example.COM ') == 'jose@example.com'
+
+    def test_quita_la_etiqueta_mas(self):
+        assert normalizar_email('jose+ceiba@example.com') == 'jose@example.com'
+
+    def test_gmail_ignora_puntos_y_alias_de_dominio(self):
+        assert normalizar_email('J.Mora@GoogleMail.com') == 'jmora@gmail.com'
+
+    def test_fuera_de_gmail_los_puntos_cuentan(self):
+        assert normalizar_email('j.mora@outlook.com') == 'j.mora@outlook.com'
+
+
+class TestNormalizacionDeDni:
+    """Se quitan prefijos de tipo de documento y signos."""
+
+    @pytest.mark.parametrize('variante', [
+        'V-12.345.678', 'v12345678', 'C.I. 12345678', 'CC 12345678',
+        '12345678', '012345678',
+    ])
+    def test_variantes(self, variante):
+        assert normalizar_dni(variante) == '12345678'
+
+    def test_vacio_da_none(self):
+        assert normalizar_dni(' .-') is None
+
+
+class TestPares:
+    """pares_de es la regla única que usan el índice y las búsquedas."""
+
+    def test_omite_vacios_y_normaliza(self):
+        pares = BlacklistIdentifier.pares_de(
+            telegram_id='123', phone='0414-1234567', email=None, dni=''
+        )
+        assert pares == [('telegram', '123'), ('phone', '+584141234567')]
+
+    def test_telegram_invalido_se_descarta(self):
+        assert normalizar_telegram_id('abc') is None
+
+
+class TestFiltroDeBloom:
+    """Sin falsos negativos y con pocos falsos positivos."""
+
+    def test_sin_falsos_negativos(self):
+        claves = [f'phone:+58414{i:07d}' for i in range(2000)]
+        filtro = BloomFilter.desde(claves)
+        assert all(clave in filtro for clave in claves)
+
+    def test_tasa_de_falsos_positivos_acotada(self):
+        filtro = BloomFilter.desde(f'email:user{i}@x.com' for i in range(2000))
+        falsos = sum(f'email:otro{i}@y.com' in filtro for i in range(5000))
+        assert falsos / 5000 < 0.03
+
+    def test_filtro_vacio_no_contiene_nada(self):
+        assert 'dni:12345678' not in BloomFilter.desde([])
+
+
+class TestAtajoSinBaseDeDatos:
+    """Si el filtro descarta los identificadores, no se consulta PostgreSQL."""
+
+    def test_negativo_no_toca_la_bd(self, monkeypatch):
+        monkeypatch.setattr(
+            BlacklistService, '_get_filter',
+            classmethod(lambda cls: BloomFilter.desde(['phone:+584141234567']))
+        )
+        pares = BlacklistIdentifier.pares_de(email='limpio@example.com')
+        # Sin contexto de app: si intentara consultar la BD, reventaría.
+        assert BlacklistService._find_by_pairs(pares) == []
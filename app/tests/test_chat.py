@@ -5,6 +5,9 @@ Los tests usan el bot en PAUSA para ser deterministas (si el bot respondiera,
 dependeríamos del estado conversacional en Redis).
 """
 import io
+import json
+from datetime import datetime
+from types import SimpleNamespace
 
 import pytest
 
@@ -136,6 +139,291 @@ class TestPolling:
         assert historial[0]['body'] == 'hola'
 
 
+class TestPollingSinBD:
+    """Marca de agua en Redis: /chat/nuevos sin consultar Postgres."""
+
+    @pytest.fixture
+    def estado(self, monkeypatch):
+        """Fija lo que devuelve Redis y hace fallar cualquier consulta a la BD."""
+        consultas = []
+
+        def sin_bd(*args, **kwargs):
+            consultas.append(args)
+            raise AssertionError('no debía consultar la BD')
+
+        monkeypatch.setattr(ChatConversation, 'get_for_anon', sin_bd)
+        monkeypatch.setattr(ChatService, 'get_new_for_client', sin_bd)
+
+        def fijar(valor):
+            monkeypatch.setattr(ChatService, '_poll_state',
+                                classmethod(lambda cls, anon_id: valor))
+        return fijar
+
+    def test_sin_novedades_responde_desde_redis(self, estado):
+        """Marca <= after: vacío, con el "escribiendo" leído en el mismo viaje."""
+        estado((5, 10, True))
+        r = ChatService.poll_for_client('anon', after_id=10)
+        assert r == {'conversation_id': 5, 'messages': [], 'typing': True}
+
+    def test_visitante_sin_conversacion(self, estado):
+        """El 0 cacheado evita buscar en la BD a quien todavía no escribió."""
+        estado((0, None, False))
+        r = ChatService.poll_for_client('anon', after_id=0)
+        assert r['conversation_id'] is None and r['messages'] == []
+
+    def test_marca_por_encima_consulta_la_bd(self, monkeypatch):
+        """Si la marca supera after, se traen los mensajes de la BD."""
+        monkeypatch.setattr(ChatService, '_poll_state',
+                            classmethod(lambda cls, anon_id: (5, 12, False)))
+        monkeypatch.setattr(ChatConversation, 'get_for_anon',
+                            lambda anon_id: SimpleNamespace(id=5))
+        monkeypatch.setattr(ChatService, 'get_new_for_client', classmethod(
+            lambda cls, conv_id, after_id: [{'id': 12, 'sender': 'operator'}]))
+        monkeypatch.setattr(ChatService, 'is_typing',
+                            classmethod(lambda cls, conv_id, who: False))
+
+        r = ChatService.poll_for_client('anon', after_id=10)
+        assert [m['id'] for m in r['messages']] == [12]
+
+    def test_sin_marca_la_repone_desde_la_bd(self, monkeypatch):
+        """Redis vacío: se consulta la BD y se cachean mapeo y marca."""
+        repuesto = {}
+        monkeypatch.setattr(ChatService, '_poll_state',
+                            classmethod(lambda cls, anon_id: None))
+        monkeypatch.setattr(ChatConversation, 'get_for_anon',
+                            lambda anon_id: SimpleNamespace(id=7))
+        monkeypatch.setattr(ChatMessage, 'last_staff_id', lambda conv_id: 30)
+        monkeypatch.setattr(ChatService, '_remember_conversation', classmethod(
+            lambda cls, anon_id, conv_id: repuesto.update(conv=conv_id)))
+        monkeypatch.setattr(ChatService, '_raise_high_water', classmethod(
+            lambda cls, conv_id, msg_id: repuesto.update(marca=msg_id)))
+        monkeypatch.setattr(ChatService, 'get_new_for_client',
+                            classmethod(lambda cls, conv_id, after_id: []))
+        monkeypatch.setattr(ChatService, 'is_typing',
+                            classmethod(lambda cls, conv_id, who: False))
+
+        ChatService.poll_for_client('anon', after_id=30)
+        assert repuesto == {'conv': 7, 'marca': 30}
+
+    def test_el_cero_no_pisa_la_conversacion_recien_creada(self, monkeypatch):
+        """
+        El polling lee la BD (nada), el primer mensaje se guarda y cachea su
+        conversación, y recién entonces el polling cachea el 0: gana el id.
+        """
+        claves = {}
+
+        class RedisFalso:
+            def setex(self, clave, ttl, valor):
+                claves[clave] = valor
+
+            def set(self, clave, valor, ex=None, nx=False):
+                if nx and clave in claves:
+                    return None
+                claves[clave] = valor
+                return True
+
+        from app.services import cache_service
+        monkeypatch.setattr(cache_service, 'get_redis_client', lambda: RedisFalso())
+        monkeypatch.setattr(ChatService, '_poll_state',
+                            classmethod(lambda cls, anon_id: None))
+
+        def primer_mensaje_en_medio(anon_id):
+            ChatService._remember_conversation(anon_id, 9)
+            return None
+
+        monkeypatch.setattr(ChatConversation, 'get_for_anon', primer_mensaje_en_medio)
+
+        r = ChatService.poll_for_client('anon', after_id=0)
+        assert r['conversation_id'] is None
+        assert claves == {'chat:anon:anon': 9}
+
+
+class TestDeltaDelPanel:
+    """Listado del operador por delta y "escribiendo" en un MGET."""
+
+    @staticmethod
+    def _conv(id_, unread=0):
+        return SimpleNamespace(
+            id=id_, display_name=f'Visitante {id_}', country='VE',
+            unread_for_operator=unread, bot_paused=False, web_user_id=None,
+            last_message_at=datetime(2026, 1, 1, 12, id_),
+        )
+
+    @pytest.fixture
+    def redis_falso(self, monkeypatch):
+        """MGET de mentira: registra las claves pedidas; escribe la 2."""
+        pedidas = []
+
+        class RedisFalso:
+            def mget(self, claves):
+                pedidas.append(list(claves))
+                return ['1' if c == 'chat:typing:2:client' else None for c in claves]
+
+        from app.services import cache_service
+        monkeypatch.setattr(cache_service, 'get_redis_client', lambda: RedisFalso())
+        return pedidas
+
+    def test_sin_cursor_es_carga_completa(self, monkeypatch, redis_falso):
+        """La primera llamada trae el listado entero y el total de no leídos."""
+        monkeypatch.setattr(ChatConversation, 'get_recent',
+                            lambda limit: [self._conv(1, 2), self._conv(2)])
+        monkeypatch.setattr(ChatConversation, 'total_unread', lambda: 2)
+
+        r = ChatService.sync_conversations(None)
+        assert r['full'] is True
+        assert [c['id'] for c in r['conversations']] == [1, 2]
+        assert r['unread_total'] == 2
+        assert r['typing'] == {1: False, 2: True}
+        assert len(redis_falso) == 1
+
+    def test_con_cursor_solo_lo_cambiado(self, monkeypatch, redis_falso):
+        """Con cursor solo viajan las cambiadas; el typing cubre las visibles."""
+        pedidos = []
+
+        def cambiadas(since, limit):
+            pedidos.append(since)
+            return [self._conv(3, 1)]
+
+        monkeypatch.setattr(ChatConversation, 'get_changed_since', cambiadas)
+        monkeypatch.setattr(ChatConversation, 'get_recent', lambda limit: 1 / 0)
+        monkeypatch.setattr(ChatConversation, 'total_unread', lambda: 1)
+
+        cursor = datetime(2026, 1, 1, 12, 0, 10)
+        r = ChatService.sync_conversations(cursor, visible_ids=[1, 2])
+        assert r['full'] is False
+        assert [c['id'] for c in r['conversations']] == [3]
+        assert pedidos == [cursor - ChatService.SYNC_OVERLAP]
+        assert redis_falso == [['chat:typing:1:client', 'chat:typing:2:client',
+                                'chat:typing:3:client']]
+
+    def test_sin_cambios_no_suma_no_leidos(self, monkeypatch, redis_falso):
+        """Si nada cambió, el total no pudo cambiar: no se consulta."""
+        monkeypatch.setattr(ChatConversation, 'get_changed_since',
+                            lambda since, limit: [])
+        monkeypatch.setattr(ChatConversation, 'total_unread', lambda: 1 / 0)
+
+        r = ChatService.sync_conversations(datetime(2026, 1, 1), visible_ids=[2])
+        assert r['conversations'] == [] and 'unread_total' not in r
+        assert r['typing'] == {2: True}
+
+    def test_demasiados_cambios_recarga_todo(self, monkeypatch, redis_falso):
+        """Más cambios que el límite: se responde como carga completa."""
+        monkeypatch.setattr(ChatConversation, 'get_changed_since',
+                            lambda since, limit: [self._conv(i) for i in range(1, 4)])
+        monkeypatch.setattr(ChatConversation, 'get_recent',
+                            lambda limit: [self._conv(1), self._conv(2)])
+        monkeypatch.setattr(ChatConversation, 'total_unread', lambda: 0)
+
+        r = ChatService.sync_conversations(datetime(2026, 1, 1), limit=2)
+        assert r['full'] is True and len(r['conversations']) == 2
+
+    def test_typing_sin_redis_no_rompe(self, monkeypatch):
+        """Sin Redis, nadie figura escribiendo."""
+        from app.services import cache_service
+        monkeypatch.setattr(cache_service, 'get_redis_client', lambda: 1 / 0)
+        assert ChatService.typing_states([4, 5], 'client') == {4: False, 5: False}
+
+
+class _PubSubFalso:
+    """Suscripción Redis de mentira: entrega los eventos en orden."""
+
+    def __init__(self, eventos):
+        self.eventos = list(eventos)
+        self.cerrada = False
+
+    def get_message(self, timeout=None):
+        if not self.eventos:
+            return None
+        return {'data': json.dumps(self.eventos.pop(0))}
+
+    def close(self):
+        self.cerrada = True
+
+
+class _RelojFalso:
+    """Avanza un segundo por lectura: acota el bucle del stream."""
+
+    def __init__(self):
+        self.t = 0
+
+    def __call__(self):
+        self.t += 1
+        return self.t
+
+
+class TestStreamSSE:
+    """Eventos del stream /chat/stream (sin Redis ni BD)."""
+
+    @staticmethod
+    def _correr(pubsub, pendientes, after_id, monkeypatch, vida=6):
+        monkeypatch.setattr(ChatService, 'STREAM_MAX_SECONDS', vida)
+        return ''.join(ChatService._stream_events(
+            pubsub, pendientes, after_id, clock=_RelojFalso()))
+
+    def test_formato_sse(self):
+        """id, event y data en líneas separadas y línea en blanco al final."""
+        evento = ChatService.sse_event('message', {'id': 5, 'body': 'ñ'}, 5)
+        assert evento == 'id: 5\nevent: message\ndata: {"id": 5, "body": "ñ"}\n\n'
+        assert ChatService.sse_event('typing', {'typing': True}).startswith('event: typing')
+
+    def test_pendientes_y_luego_el_canal(self, monkeypatch):
+        """Primero lo pendiente de la BD, luego lo publicado (sin repetir)."""
+        pubsub = _PubSubFalso([
+            {'kind': 'message', 'data': {'id': 11, 'sender': 'bot', 'body': 'a'}},
+            {'kind': 'message', 'data': {'id': 12, 'sender': 'operator', 'body': 'b'}},
+        ])
+        salida = self._correr(
+            pubsub, [{'id': 11, 'sender': 'bot', 'body': 'a'}], 10, monkeypatch)
+
+        assert salida.startswith('retry: ')
+        assert salida.count('id: 11\n') == 1
+        assert 'id: 12\n' in salida
+        assert pubsub.cerrada
+
+    def test_descarta_cliente_y_lo_ya_visto(self, monkeypatch):
+        """Ni los mensajes del propio cliente ni los anteriores a Last-Event-ID."""
+        pubsub = _PubSubFalso([
+            {'kind': 'message', 'data': {'id': 20, 'sender': 'client', 'body': 'x'}},
+            {'kind': 'message', 'data': {'id': 7, 'sender': 'bot', 'body': 'viejo'}},
+        ])
+        salida = self._correr(pubsub, [], 10, monkeypatch)
+        assert 'event: message' not in salida
+
+    def test_typing_solo_del_operador(self, monkeypatch):
+        """El widget solo ve el "escribiendo" del operador."""
+        pubsub = _PubSubFalso([
+            {'kind': 'typing', 'data': {'who': 'client'}},
+            {'kind': 'typing', 'data': {'who': 'operator'}},
+        ])
+        salida = self._correr(pubsub, [], 0, monkeypatch)
+        assert salida.count('event: typing') == 1
+
+    def test_latido_sin_novedades_y_cierre(self, monkeypatch):
+        """Sin eventos manda latidos y termina al vencer la vida del stream."""
+        pubsub = _PubSubFalso([])
+        salida = self._correr(pubsub, [], 0, monkeypatch, vida=4)
+        assert ': ping' in salida
+        assert pubsub.cerrada
+
+    def test_publica_en_el_canal_de_la_conversacion(self, monkeypatch):
+        """set_typing publica en chat:channel:<id> además de guardar el TTL."""
+        publicados = []
+
+        class RedisFalso:
+            def publish(self, canal, datos):
+                publicados.append((canal, json.loads(datos)))
+
+        from app.services import cache_service
+        monkeypatch.setattr(cache_service, 'get_redis_client', lambda: RedisFalso())
+        monkeypatch.setattr(cache_service.CacheService, 'set',
+                            classmethod(lambda cls, *a, **k: True))
+
+        ChatService.set_typing(42, 'operator')
+        assert publicados == [
+            ('chat:channel:42', {'kind': 'typing', 'data': {'who': 'operator'}})
+        ]
+
+
 class TestComprobantes:
     """Validación de los archivos subidos por el cliente."""
 
@@ -184,6 +472,11 @@ class TestRutasDelChat:
         assert r.status_code == 200
         assert r.get_json()['messages'] == []
 
+    def test_stream_sin_conversacion_responde_204(self, client):
+        """Sin conversación no hay stream: el widget se queda con el polling."""
+        r = client.get('/chat/stream')
+        assert r.status_code == 204
+
     def test_panel_de_operador_exige_admin(self, client):
         """El panel del chat no es público."""
         r = client.get('/dashboard/chat/', follow_redirects=False)
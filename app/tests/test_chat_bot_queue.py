@@ -0,0 +1,216 @@
+"""
+Tests de la cola de turnos del bot del chat web.
+
+Corren contra un Redis de juguete en memoria (solo los comandos que usa
+ChatBotQueue), sin servidor ni BD.
+"""
+import fnmatch
+import json
+from types import SimpleNamespace
+
+from app.models.chat import ChatConversation
+from app.services.chat_bot_queue import ChatBotQueue
+from app.services.chat_service import ChatService
+
+
+class _RedisFalso:
+    """Strings y listas en memoria, con decode_responses como la app."""
+
+    def __init__(self):
+        self.datos = {}
+
+    def exists(self, clave):
+        return int(clave in self.datos)
+
+    def get(self, clave):
+        return self.datos.get(clave)
+
+    def set(self, clave, valor, nx=False, ex=None):
+        if nx and clave in self.datos:
+            return None
+        self.datos[clave] = str(valor)
+        return True
+
+    def delete(self, clave):
+        self.datos.pop(clave, None)
+
+    def expire(self, clave, segundos):
+        return clave in self.datos
+
+    def rpush(self, clave, valor):
+        self.datos.setdefault(clave, []).append(str(valor))
+
+    def lpop(self, clave):
+        lista = self.datos.get(clave) or []
+        valor = lista.pop(0) if lista else None
+        if not lista:
+            self.datos.pop(clave, None)
+        return valor
+
+    def blpop(self, claves, timeout=0):
+        for clave in claves:
+            valor = self.lpop(clave)
+            if valor is not None:
+                return clave, valor
+        return None
+
+    def llen(self, clave):
+        return len(self.datos.get(clave) or [])
+
+    def scan_iter(self, match='*', count=None):
+        return [c for c in list(self.datos) if fnmatch.fnmatch(c, match)]
+
+
+def _con_worker(redis):
+    """Latido de un worker vivo."""
+    redis.set(ChatBotQueue.LATIDO, 1)
+    return redis
+
+
+class TestEncolar:
+    """Lado del request: encolar solo si hay quien atienda."""
+
+    def test_sin_worker_no_encola(self):
+        """Sin latido, el llamador corre el turno en el request."""
+        redis = _RedisFalso()
+        assert ChatBotQueue.encolar(7, {'kind': 'text', 'payload': 'hola'},
+                                    redis_client=redis) is False
+        assert redis.llen('chat:bot:q:7') == 0
+
+    def test_con_worker_encola_y_anuncia(self):
+        """El turno va a la lista de su conversación y esta a 'ready'."""
+        redis = _con_worker(_RedisFalso())
+        assert ChatBotQueue.encolar(7, {'kind': 'text', 'payload': 'hola'},
+                                    redis_client=redis) is True
+        turno = json.loads(redis.datos['chat:bot:q:7'][0])
+        assert turno['payload'] == 'hola' and 'enqueued_at' in turno
+        assert redis.datos[ChatBotQueue.LISTOS] == ['7']
+
+    def test_redis_caido_no_encola(self):
+        """Si Redis falla, se responde en el request (fail-open)."""
+        class Caido:
+            def exists(self, clave):
+                raise ConnectionError('sin redis')
+
+        assert ChatBotQueue.encolar(7, {}, redis_client=Caido()) is False
+
+
+class TestAtender:
+    """Lado del worker: orden por conversación y lock."""
+
+    @staticmethod
+    def _cola(redis, procesados, falla=None):
+        def procesar(conversation_id, turno):
+            if turno['payload'] == falla:
+                raise RuntimeError('turno roto')
+            procesados.append((conversation_id, turno['payload']))
+        return ChatBotQueue(procesar, redis_client=redis)
+
+    def test_drena_en_orden(self):
+        """Los turnos de una conversación salen en el orden en que llegaron."""
+        redis, procesados = _con_worker(_RedisFalso()), []
+        for texto in ('uno', 'dos', 'tres'):
+            ChatBotQueue.encolar(3, {'payload': texto}, redis_client=redis)
+
+        cola = self._cola(redis, procesados)
+        assert cola.atender(3) == 3
+        assert procesados == [(3, 'uno'), (3, 'dos'), (3, 'tres')]
+        assert not redis.exists('chat:bot:lock:3')
+
+    def test_un_turno_roto_no_frena_los_siguientes(self):
+        """Si un turno falla, se sigue con el próximo de la conversación."""
+        redis, procesados = _con_worker(_RedisFalso()), []
+        for texto in ('uno', 'roto', 'tres'):
+            ChatBotQueue.encolar(3, {'payload': texto}, redis_client=redis)
+
+        self._cola(redis, procesados, falla='roto').atender(3)
+        assert procesados == [(3, 'uno'), (3, 'tres')]
+
+    def test_conversacion_tomada_no_se_toca(self):
+        """Si otro worker tiene el lock, no se consume ningún turno."""
+        redis, procesados = _con_worker(_RedisFalso()), []
+        ChatBotQueue.encolar(3, {'payload': 'uno'}, redis_client=redis)
+        redis.set('chat:bot:lock:3', 'otro')
+
+        assert self._cola(redis, procesados).atender(3) == 0
+        assert procesados == [] and redis.llen('chat:bot:q:3') == 1
+        assert redis.get('chat:bot:lock:3') == 'otro'
+
+    def test_turno_llegado_al_soltar_se_reanuncia(self):
+        """Un turno que llega entre el último LPOP y soltar el lock no queda varado."""
+        redis, procesados = _con_worker(_RedisFalso()), []
+        ChatBotQueue.encolar(3, {'payload': 'uno'}, redis_client=redis)
+        redis.delete(ChatBotQueue.LISTOS)
+        cola = ChatBotQueue(lambda c, turno: procesados.append(turno['payload']),
+                            redis_client=redis)
+
+        # Carrera: el LPOP que encuentra la lista vacía ocurre justo antes de
+        # que llegue 'dos', cuyo anuncio descarta otro worker (no tiene lock)
+        original = redis.lpop
+
+        def lpop_con_carrera(clave):
+            valor = original(clave)
+            if valor is None:
+                redis.rpush(clave, json.dumps({'payload': 'dos'}))
+            return valor
+
+        redis.lpop = lpop_con_carrera
+        cola.atender(3)
+        redis.lpop = original
+
+        assert procesados == ['uno']
+        assert redis.datos[ChatBotQueue.LISTOS] == ['3']
+        cola.atender(int(redis.blpop([ChatBotQueue.LISTOS])[1]))
+        assert procesados == ['uno', 'dos']
+
+    def test_barrido_reanuncia_huerfanas(self):
+        """Listas con turnos y sin dueño vuelven a 'ready'; las tomadas no."""
+        redis = _con_worker(_RedisFalso())
+        redis.rpush('chat:bot:q:4', '{}')
+        redis.rpush('chat:bot:q:5', '{}')
+        redis.set('chat:bot:lock:5', 'otro')
+
+        cola = ChatBotQueue(lambda *a: None, redis_client=redis)
+        assert cola.barrer() == [4]
+
+
+class TestTurnosDelChat:
+    """ChatService: encolar el turno o correrlo en el request."""
+
+    @staticmethod
+    def _espiar(monkeypatch, encolado):
+        llamadas = []
+        monkeypatch.setattr(ChatBotQueue, 'encolar', classmethod(
+            lambda cls, conv_id, turno, redis_client=None: encolado))
+        monkeypatch.setattr(ChatService, 'set_typing', classmethod(
+            lambda cls, conv_id, who: llamadas.append(('typing', who))))
+        monkeypatch.setattr(ChatService, '_bot_reply', classmethod(
+            lambda cls, conv, text: llamadas.append(('reply', text))))
+        monkeypatch.setattr(ChatService, '_bot_proof_reply', classmethod(
+            lambda cls, conv, url: llamadas.append(('proof', url))))
+        return llamadas
+
+    def test_con_worker_no_responde_en_el_request(self, monkeypatch):
+        """Encolado: solo se avisa "escribiendo"; la respuesta la da el worker."""
+        llamadas = self._espiar(monkeypatch, encolado=True)
+        ChatService._bot_turn(SimpleNamespace(id=1), 'text', 'hola')
+        assert llamadas == [('typing', 'operator')]
+
+    def test_sin_worker_responde_en_el_request(self, monkeypatch):
+        """Sin cola disponible, el turno corre como antes."""
+        llamadas = self._espiar(monkeypatch, encolado=False)
+        ChatService._bot_turn(SimpleNamespace(id=1), 'proof', '/static/proofs/x.png')
+        assert llamadas == [('proof', '/static/proofs/x.png')]
+
+    def test_operador_tomo_la_conversacion_mientras_esperaba(self, monkeypatch):
+        """Si el bot se pausó antes de atender el turno, avisa a los operadores."""
+        llamadas = self._espiar(monkeypatch, encolado=True)
+        conv = SimpleNamespace(id=1, bot_paused=True)
+        monkeypatch.setattr(ChatConversation, 'find_by_id', lambda conv_id: conv)
+        monkeypatch.setattr(ChatService, 'is_bot_active_for',
+                            classmethod(lambda cls, c: False))
+        monkeypatch.setattr(ChatService, '_notify_operators', classmethod(
+            lambda cls, c, text: llamadas.append(('operadores', text))))
+
+        assert ChatService.process_bot_turn(1, {'kind': 'text', 'payload': 'hola'}) is None
+        assert llamadas == [('operadores', 'hola')]
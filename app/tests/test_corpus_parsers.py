@@ -0,0 +1,77 @@
+"""
+Corpus de regresión de los parsers y harness de benchmark.
+
+Cada archivo de app/tests/corpus/parsers/ es un correo anonimizado completo
+(maqueta incluida) con el resultado esperado de ParserRegistry.parse. Si un
+cambio de parser altera la extracción de algún caso, falla aquí.
+"""
+import pytest
+
+from app.services.parsers.benchmark import BenchmarkParsers, cargar_corpus
+from app.services.parsers.registry import ParserRegistry
+
+CORPUS = cargar_corpus()
+
+
+def _comparable(datos: dict) -> dict:
+    """Shape canónico con la fecha en ISO, como se guarda en el corpus."""
+    datos = dict(datos)
+    if datos.get('fecha_pago') is not None:
+        datos['fecha_pago'] = datos['fecha_pago'].isoformat()
+    return datos
+
+
+def test_corpus_cubre_todos_los_proveedores():
+    casos = {caso['caso'] for caso in CORPUS}
+    assert {'paypal_ff', 'paypal_gs', 'paypal_payout', 'wise', 'zelle',
+            'skrill', 'binance'} <= casos
+
+
+@pytest.mark.parametrize('caso', CORPUS, ids=[c['caso'] for c in CORPUS])
+def test_registry_extrae_lo_esperado(caso):
+    resultado = ParserRegistry().parse(caso['correo'])
+    if caso['esperado'] is None:
+        assert resultado is None
+        return
+    metodo, datos = resultado
+    assert metodo == caso['esperado']['metodo']
+    assert _comparable(datos) == caso['esperado']
+
+
+class TestBenchmarkParsers:
+
+    def test_mide_cada_parser_y_el_registry(self):
+        informe = BenchmarkParsers(CORPUS, iteraciones=1).correr()
+        resultados = informe['resultados']
+        assert set(resultados) == {
+            'PaypalParser', 'WiseParser', 'ZelleParser', 'SkrillParser',
+            'BinanceParser', 'registry',
+        }
+        assert resultados['PaypalParser']['correos'] == 3
+        assert resultados['registry']['correos'] == len(CORPUS)
+        for metricas in resultados.values():
+            assert metricas['correos_por_segundo'] > 0
+            assert 0 < metricas['p50_ms'] <= metricas['p99_ms']
+            assert metricas['memoria_pico_kb'] > 0
+
+    def test_percentil_rango_mas_cercano(self):
+        valores = list(range(1, 101))
+        assert BenchmarkParsers.percentil(valores, 50) == 50
+        assert BenchmarkParsers.percentil(valores, 99) == 99
+        assert BenchmarkParsers.percentil([7], 99) == 7
+
+    def test_comparar_marca_solo_lo_que_empeora_mas_que_la_tolerancia(self):
+        base = {'resultados': {'registry': {
+            'correos_por_segundo': 100.0, 'p99_ms': 10.0, 'memoria_pico_kb': 500.0,
+        }}}
+        parecido = {'resultados': {'registry': {
+            'correos_por_segundo': 90.0, 'p99_ms': 11.0, 'memoria_pico_kb': 520.0,
+        }}}
+        peor = {'resultados': {'registry': {
+            'correos_por_segundo': 60.0, 'p99_ms': 20.0, 'memoria_pico_kb': 500.0,
+        }}}
+        assert BenchmarkParsers.comparar(parecido, base, 0.25) == []
+        regresiones = BenchmarkParsers.comparar(peor, base, 0.25)
+        assert len(regresiones) == 2
+        assert any('correos/s' in r for r in regresiones)
+        assert any('p99_ms' in r for r in regresiones)
@@ -0,0 +1,169 @@
+"""
+Tests de la descarga por tramos de GmailService.
+
+Sin red: la conexión IMAP es un doble que responde con la misma forma de
+lista que imaplib (tuplas con el literal y un b')' de cierre) y calcula el
+BODYSTRUCTURE de cada mensaje de prueba.
+"""
+import re
+from email import message_from_bytes
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import pytest
+from flask import Flask
+
+from app.services.gmail_service import GmailService
+from app.utils.imap import buscar_parte_html, decodificar_parte, parsear_fetch
+
+LOGO = b'\x89PNG' + b'\x00' * 20000
+
+
+def _mensaje(uid: int) -> bytes:
+    """Pago típico: alternative(texto, html) + logo incrustado de 20 KB."""
+    cuerpo = MIMEMultipart('alternative')
+    cuerpo.attach(MIMEText('texto plano', 'plain'))
+    cuerpo.attach(MIMEText(f'<p>pago {uid} — ñandú</p>', 'html', 'utf-8'))
+    msg = MIMEMultipart('related')
+    msg.attach(cuerpo)
+    msg.attach(MIMEImage(LOGO, 'png'))
+    msg['Message-ID'] = f'<m{uid}@paypal.com>'
+    msg['Subject'] = 'Ha recibido un pago'
+    msg['From'] = 'service@paypal.com'
+    return msg.as_bytes()
+
+
+def _bodystructure(parte) -> str:
+    if parte.is_multipart():
+        hijas = ''.join(_bodystructure(p) for p in parte.get_payload())
+        return f'({hijas} "{parte.get_content_subtype().upper()}")'
+    charset = parte.get_content_charset()
+    parametros = f'("CHARSET" "{charset}")' if charset else 'NIL'
+    codificacion = parte.get('Content-Transfer-Encoding', '7bit')
+    return (f'("{parte.get_content_maintype()}" "{parte.get_content_subtype()}" '
+            f'{parametros} NIL NIL "{codificacion}" {len(parte.get_payload())} 1)')
+
+
+def _seccion(msg, seccion: str) -> bytes:
+    parte = msg
+    for numero in seccion.split('.'):
+        parte = parte.get_payload()[int(numero) - 1]
+    return parte.get_payload().encode()
+
+
+class _ConexionFalsa:
+    """Servidor IMAP mínimo para UID FETCH; cuenta comandos y bytes."""
+
+    def __init__(self, uid_al_final=False):
+        self.comandos = []
+        self.bytes_enviados = 0
+        self.uid_al_final = uid_al_final
+
+    def uid(self, comando, conjunto, partes):
+        self.comandos.append(partes)
+        data = []
+        # Orden inverso: el servicio debe devolver el orden pedido
+        for seq, uid in enumerate(reversed(conjunto.split(',')), start=1):
+            crudo = _mensaje(int(uid))
+            msg = message_from_bytes(crudo)
+            if 'BODYSTRUCTURE' in partes:
+                cabeceras = b''.join(
+                    f'{k}: {msg[k]}\r\n'.encode() for k in ('Message-ID', 'Subject', 'From')
+                ) + b'\r\n'
+                clave = partes[partes.index('BODY.PEEK[') + 10:-2]
+                prefijo = (f'{seq} (UID {uid} BODYSTRUCTURE {_bodystructure(msg)} '
+                           f'BODY[{clave}] {{{len(cabeceras)}}}')
+                literal = cabeceras
+            else:
+                seccion = re.search(r'BODY\.PEEK\[([\d.]*)\]', partes).group(1)
+                literal = _seccion(msg, seccion) if seccion else crudo
+                if self.uid_al_final:
+                    data.append((f'{seq} (BODY[{seccion}] {{{len(literal)}}}'.encode(), literal))
+                    data.append(f' UID {uid})'.encode())
+                    self.bytes_enviados += len(literal)
+                    continue
+                prefijo = f'{seq} (UID {uid} BODY[{seccion}] {{{len(literal)}}}'
+            data.append((prefijo.encode(), literal))
+            data.append(b')')
+            self.bytes_enviados += len(literal)
+        return 'OK', data
+
+
+@pytest.fixture
+def gmail():
+    with Flask(__name__).app_context():
+        servicio = GmailService()
+    return servicio
+
+
+class TestFetchEnTramos:
+
+    def test_pocos_comandos_por_tramo_y_siempre_peek(self, gmail):
+        gmail._connection = _ConexionFalsa()
+        correos = list(gmail._fetch_en_tramos([str(u) for u in range(1, 121)]))
+        assert len(correos) == 120
+        # 3 tramos (50 + 50 + 20) x (estructura + sección HTML)
+        assert len(gmail._connection.comandos) == 6
+        assert all('PEEK' in partes for partes in gmail._connection.comandos)
+
+    def test_respeta_el_orden_pedido(self, gmail):
+        gmail._connection = _ConexionFalsa()
+        correos = list(gmail._fetch_en_tramos([b'7', b'3', b'9']))
+        assert [c['imap_uid'] for c in correos] == ['7', '3', '9']
+        assert correos[0]['message_id'] == '<m7@paypal.com>'
+        assert correos[0]['subject'] == 'Ha recibido un pago'
+
+    def test_solo_baja_la_parte_html(self, gmail):
+        gmail._connection = _ConexionFalsa()
+        correos = list(gmail._fetch_en_tramos(['4']))
+        assert correos[0]['html_body'].strip() == '<p>pago 4 — ñandú</p>'
+        assert gmail._connection.bytes_enviados < len(_mensaje(4)) / 10
+
+    def test_respaldo_completo_con_uid_despues_del_literal(self, gmail):
+        gmail._connection = _ConexionFalsa(uid_al_final=True)
+        correos, _nbytes = gmail._fetch_completos(['4', '5'])
+        assert sorted(correos) == ['4', '5']
+        assert 'pago 4' in correos['4']['html_body']
+
+    def test_anota_los_correos_sin_html(self, gmail):
+        """Sin HTML: se omite pero se anota; lo que no volvió, no."""
+        gmail._fetch_tramo = lambda tramo: ({'1': {'imap_uid': '1'}, '2': None}, 0)
+        correos = list(gmail._fetch_en_tramos(['1', '2', '3']))
+        assert [c['imap_uid'] for c in correos] == ['1']
+        assert gmail.sin_html == ['2']
+
+    def test_reporta_rendimiento(self, gmail):
+        gmail._connection = _ConexionFalsa()
+        list(gmail._fetch_en_tramos(['1', '2']))
+        assert gmail.ultima_descarga['correos'] == 2
+        assert gmail.ultima_descarga['bytes'] > 0
+        assert 'correos_por_segundo' in gmail.ultima_descarga
+
+
+class TestBodystructure:
+    """Ubicar la parte HTML y deshacer su codificación."""
+
+    def test_seccion_anidada(self):
+        [atributos] = parsear_fetch([
+            b'1 (UID 9 BODYSTRUCTURE ((("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL '
+            b'"7BIT" 10 1)("TEXT" "HTML" ("CHARSET" "iso-8859-1") NIL NIL '
+            b'"QUOTED-PRINTABLE" 200 4) "ALTERNATIVE" ("BOUNDARY" "b1") NIL NIL)'
+            b'("IMAGE" "PNG" NIL "<logo>" NIL "BASE64" 9000) "RELATED"))'
+        ])
+        assert atributos['UID'] == '9'
+        assert buscar_parte_html(atributos['BODYSTRUCTURE']) == (
+            '1.2', 'quoted-printable', 'iso-8859-1'
+        )
+
+    def test_mensaje_simple_es_la_seccion_1(self):
+        estructura = ['TEXT', 'HTML', ['CHARSET', 'UTF-8'], None, None, 'BASE64', '80']
+        assert buscar_parte_html(estructura) == ('1', 'base64', 'utf-8')
+
+    def test_sin_html(self):
+        estructura = ['TEXT', 'PLAIN', None, None, None, '7BIT', '80', '2']
+        assert buscar_parte_html(estructura) is None
+
+    def test_decodifica_base64_y_quoted_printable(self):
+        assert decodificar_parte(b'PHA+w7E8L3A+\r\n', 'base64', 'utf-8') == '<p>ñ</p>'
+        assert decodificar_parte(b'<p>=F1</p>', 'quoted-printable', 'iso-8859-1') == '<p>ñ</p>'
@@ -0,0 +1,277 @@
+"""
+Tests del daemon de ingesta IDLE contra un servidor IMAP local de juguete.
+
+El servidor habla lo justo del protocolo (CAPABILITY, LOGIN, SELECT, NOOP,
+UID SEARCH/STORE, IDLE/DONE, CLOSE, LOGOUT) sobre TCP sin TLS en 127.0.0.1;
+la ingesta es un callback que cuenta corridas.
+"""
+import imaplib
+import select
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from app.services.gmail_service import GmailService
+from app.services.ingesta_daemon import IngestaDaemon
+
+
+class _ManejadorIMAP(socketserver.StreamRequestHandler):
+
+    def _enviar(self, linea: str) -> None:
+        self.wfile.write(linea.encode() + b'\r\n')
+
+    def handle(self):
+        srv = self.server
+        srv.clientes.append(self.request)
+        capacidades = 'IMAP4rev1 IDLE' if srv.con_idle else 'IMAP4rev1'
+        self._enviar('* OK servidor de prueba listo')
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            tag, comando, *resto = linea.decode().strip().split(' ', 2)
+            comando = comando.upper()
+            if srv.correo_nuevo.is_set() and comando != 'IDLE':
+                # Correo que llega en medio de otro comando: EXISTS sin etiqueta
+                srv.correo_nuevo.clear()
+                srv.existentes += 1
+                self._enviar(f'* {srv.existentes} EXISTS')
+            if comando == 'CAPABILITY':
+                self._enviar(f'* CAPABILITY {capacidades}')
+            elif comando == 'SELECT':
+                self._enviar(f'* {srv.existentes} EXISTS')
+            elif comando == 'UID':
+                subcomando, *argumentos = resto[0].split()
+                if subcomando.upper() == 'SEARCH':
+                    self._enviar('* SEARCH ' + ' '.join(map(str, srv.no_leidos)))
+                elif subcomando.upper() == 'STORE':
+                    marcados = {int(u) for u in argumentos[0].split(',')}
+                    srv.no_leidos = [u for u in srv.no_leidos if u not in marcados]
+            elif comando == 'IDLE':
+                srv.idles += 1
+                if srv.exists_junto_al_idle:
+                    # Un solo segmento: readline() deja el EXISTS en su buffer
+                    srv.existentes += 1
+                    self.wfile.write(f'+ idling\r\n* {srv.existentes} EXISTS\r\n'.encode())
+                else:
+                    self._enviar('+ idling')
+                self._idle(tag)
+                continue
+            elif comando == 'LOGOUT':
+                self._enviar('* BYE')
+                self._enviar(f'{tag} OK LOGOUT')
+                return
+            self._enviar(f'{tag} OK {comando}')
+
+    def _idle(self, tag: str) -> None:
+        """Espera DONE; si mientras tanto 'llega' un correo, avisa EXISTS."""
+        srv = self.server
+        while True:
+            if srv.correo_nuevo.is_set():
+                srv.correo_nuevo.clear()
+                srv.existentes += 1
+                self._enviar(f'* {srv.existentes} EXISTS')
+            listos, _, _ = select.select([self.request], [], [], 0.05)
+            if not listos:
+                continue
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            if linea.strip().upper() == b'DONE':
+                self._enviar(f'{tag} OK IDLE terminado')
+                return
+
+
+class _ServidorIMAP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, con_idle=True):
+        super().__init__(('127.0.0.1', 0), _ManejadorIMAP)
+        self.con_idle = con_idle
+        self.existentes = 1
+        self.idles = 0
+        self.exists_junto_al_idle = False
+        self.no_leidos = []
+        self.correo_nuevo = threading.Event()
+        self.clientes = []
+
+    def cortar(self) -> None:
+        """Simula la caída de la conexión del lado de Gmail."""
+        for cliente in self.clientes:
+            cliente.shutdown(socket.SHUT_RDWR)
+
+
+@pytest.fixture
+def servidor(request):
+    srv = _ServidorIMAP(con_idle=getattr(request, 'param', True))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _gmail(puerto: int) -> GmailService:
+    with Flask(__name__).app_context():
+        gmail = GmailService()
+    gmail.user, gmail.password = 'pagos@ceiba21.com', 'secreto'
+    gmail._nueva_conexion = lambda: imaplib.IMAP4('127.0.0.1', puerto, timeout=5)
+    return gmail
+
+
+def _esperar(condicion, segundos=5.0) -> bool:
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        if condicion():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _arrancar(daemon: IngestaDaemon):
+    detener = threading.Event()
+    hilo = threading.Thread(target=daemon.correr, args=(detener,), daemon=True)
+    hilo.start()
+    return detener, hilo
+
+
+class TestEsperarNovedades:
+
+    def test_exists_despierta_y_timeout_no(self, servidor):
+        gmail = _gmail(servidor.server_address[1])
+        assert gmail.abrir_sesion() and gmail.soporta_idle()
+        assert gmail.esperar_novedades(0.2) is False
+        servidor.correo_nuevo.set()
+        assert gmail.esperar_novedades(5) is True
+        gmail.cerrar_sesion()
+
+    def test_exists_en_el_mismo_bloque_que_idling(self, servidor):
+        """El EXISTS que quedó en el buffer de readline() no espera la ventana."""
+        gmail = _gmail(servidor.server_address[1])
+        assert gmail.abrir_sesion()
+        servidor.exists_junto_al_idle = True
+        inicio = time.monotonic()
+        assert gmail.esperar_novedades(5) is True
+        assert time.monotonic() - inicio < 1
+        gmail.cerrar_sesion()
+
+
+class TestIngestaDaemon:
+
+    def test_procesa_al_conectar_y_ante_cada_aviso(self, servidor):
+        corridas = []
+        daemon = IngestaDaemon(
+            _gmail(servidor.server_address[1]), lambda: corridas.append(1),
+            ventana_idle=3,
+        )
+        detener, hilo = _arrancar(daemon)
+        try:
+            assert _esperar(lambda: len(corridas) == 1)       # puesta al día
+            assert _esperar(lambda: servidor.idles == 1)
+            assert len(corridas) == 1                         # sin avisos, nada
+            servidor.correo_nuevo.set()
+            assert _esperar(lambda: len(corridas) == 2, segundos=2)
+        finally:
+            detener.set()
+            hilo.join(5)
+        assert not hilo.is_alive()
+
+    def test_procesa_al_vencer_cada_ventana(self, servidor):
+        """Red de seguridad: una ventana sin aviso también corre la ingesta."""
+        corridas = []
+        daemon = IngestaDaemon(
+            _gmail(servidor.server_address[1]), lambda: corridas.append(1),
+            ventana_idle=0.2,
+        )
+        detener, hilo = _arrancar(daemon)
+        try:
+            assert _esperar(lambda: servidor.idles >= 3)
+            assert _esperar(lambda: len(corridas) >= 3)
+        finally:
+            detener.set()
+            hilo.join(5)
+
+    def test_correo_que_llega_durante_la_corrida(self, servidor):
+        """El EXISTS recibido en medio de la ingesta no espera al IDLE."""
+        gmail = _gmail(servidor.server_address[1])
+        idles_por_corrida = []
+
+        def procesar():
+            idles_por_corrida.append(servidor.idles)
+            if len(idles_por_corrida) == 1:
+                servidor.correo_nuevo.set()
+                gmail.noop()        # el servidor avisa dentro de este comando
+
+        daemon = IngestaDaemon(gmail, procesar, ventana_idle=3)
+        detener, hilo = _arrancar(daemon)
+        try:
+            assert _esperar(lambda: len(idles_por_corrida) == 2, segundos=2)
+            assert idles_por_corrida == [0, 0]
+            assert _esperar(lambda: servidor.idles == 1)
+            assert len(idles_por_corrida) == 2       # el SELECT no es novedad
+        finally:
+            detener.set()
+            hilo.join(5)
+
+    def test_sigue_mientras_la_pagina_viene_llena(self, servidor):
+        """Con más de 50 correos esperando, corre de nuevo sin esperar aviso."""
+        servidor.no_leidos = list(range(1, 121))
+        gmail = _gmail(servidor.server_address[1])
+        gmail._fetch_en_tramos = lambda uids: ({'imap_uid': u.decode()} for u in uids)
+        paginas = []
+
+        def procesar():
+            correos = gmail.get_emails_de_remitentes(['service@paypal.com'])
+            paginas.append(len(correos))
+            gmail.mark_multiple_as_read([c['imap_uid'] for c in correos])
+            return gmail.quedan > 0
+
+        daemon = IngestaDaemon(gmail, procesar, ventana_idle=3)
+        detener, hilo = _arrancar(daemon)
+        try:
+            assert _esperar(lambda: servidor.idles == 1)
+            assert paginas == [50, 50, 20]
+            assert servidor.no_leidos == []
+        finally:
+            detener.set()
+            hilo.join(5)
+
+    @pytest.mark.parametrize('servidor', [False], indirect=True)
+    def test_polling_si_no_hay_idle(self, servidor):
+        corridas = []
+        daemon = IngestaDaemon(
+            _gmail(servidor.server_address[1]), lambda: corridas.append(1),
+            intervalo_polling=0.05,
+        )
+        detener, hilo = _arrancar(daemon)
+        try:
+            assert _esperar(lambda: len(corridas) >= 3)
+            assert servidor.idles == 0
+        finally:
+            detener.set()
+            hilo.join(5)
+
+    def test_reconecta_tras_caida_del_servidor(self, servidor):
+        corridas = []
+        gmail = _gmail(servidor.server_address[1])
+        daemon = IngestaDaemon(gmail, lambda: corridas.append(1), ventana_idle=3)
+        daemon.BACKOFF_INICIAL = 0.05
+        detener, hilo = _arrancar(daemon)
+        try:
+            assert _esperar(lambda: len(corridas) == 1)
+            servidor.cortar()
+            assert _esperar(lambda: len(corridas) == 2)   # nueva sesión
+        finally:
+            detener.set()
+            hilo.join(5)
+
+    def test_backoff_exponencial_con_tope(self):
+        esperas = [IngestaDaemon.BACKOFF_INICIAL]
+        for _ in range(10):
+            esperas.append(IngestaDaemon.siguiente_espera(esperas[-1]))
+        assert esperas[:3] == [5, 10, 20]
+        assert esperas[-1] == IngestaDaemon.BACKOFF_MAXIMO
@@ -0,0 +1,537 @@
+"""
+Tests de la ingesta unificada por lotes.
+
+Son tests puros: la foto de cotizaciones se construye con datos en memoria
+y las consultas de dedup se sustituyen por conjuntos, sin tocar la base de
+datos.
+"""
+from contextlib import contextmanager
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.models import base
+from app.models.ingestion_checkpoint import IngestionCheckpoint
+from app.models.ingestion_run import IngestionRun
+from app.models.payment import Payment
+from app.services import unified_ingestion_service as uis
+from app.services.archivo_correos import ArchivoCorreos
+from app.services.calculator_service import PricingSnapshot
+from app.services.unified_ingestion_service import (
+    DeduplicadorLote, MetricasCorrida, UnifiedIngestionService
+)
+
+PAYPAL_ID, ZELLE_ID = 1, 2
+VES_ID, COP_ID = 10, 11
+
+
+def _foto() -> PricingSnapshot:
+    """Matriz mínima: PayPal y Zelle contra VES; COP activa pero sin cotización."""
+    return PricingSnapshot(
+        metodos=[(PAYPAL_ID, 'PAYPAL', 'PayPal'), (ZELLE_ID, 'ZELLE', 'Zelle USA')],
+        monedas={'VES': VES_ID, 'COP': COP_ID},
+        cotizaciones={
+            (PAYPAL_ID, VES_ID): (100, Decimal('36.50')),
+            (ZELLE_ID, VES_ID): (101, Decimal('38.00')),
+        },
+    )
+
+
+class TestPricingSnapshot:
+    """Mismo contrato que CalculatorService.calcular_pago_recibido."""
+
+    def test_cotiza_con_la_tasa_del_metodo(self):
+        r = _foto().calcular_pago_recibido(10.0, 'ves', 'paypal')
+        assert r == {
+            'valor_a_pagar': 365.0, 'tasa_aplicada': 36.5,
+            'cotizacion_id': 100, 'moneda_local': 'VES',
+        }
+
+    def test_zelle_no_usa_la_tasa_de_paypal(self):
+        r = _foto().calcular_pago_recibido(10.0, 'VES', 'zelle')
+        assert r['cotizacion_id'] == 101
+
+    def test_respaldo_por_nombre_del_metodo(self):
+        """Como el ilike del calculador: 'usa' encuentra 'Zelle USA'."""
+        r = _foto().calcular_pago_recibido(10.0, 'VES', 'usa')
+        assert r['cotizacion_id'] == 101
+
+    def test_metodo_inexistente_retorna_error(self):
+        r = _foto().calcular_pago_recibido(10.0, 'VES', 'metodo_xyz')
+        assert 'error' in r and 'valor_a_pagar' not in r
+
+    def test_moneda_inactiva_retorna_error(self):
+        r = _foto().calcular_pago_recibido(10.0, 'BRL', 'paypal')
+        assert 'error' in r
+
+    def test_sin_cotizacion_retorna_error(self):
+        r = _foto().calcular_pago_recibido(10.0, 'COP', 'paypal')
+        assert 'error' in r
+
+    def test_codigos_como_el_calculador(self):
+        """Un código guardado en minúsculas no coincide (filter_by exacto de
+        CalculatorService con el código en mayúsculas): se cae al nombre."""
+        foto = PricingSnapshot(
+            metodos=[(1, 'paypal', 'Cuenta PP'), (2, 'PAYPAL2', 'PayPal')],
+            monedas={'VES': VES_ID, 'cop': COP_ID},
+            cotizaciones={(1, VES_ID): (100, Decimal('36.5')),
+                          (2, VES_ID): (200, Decimal('37.0'))},
+        )
+        assert foto.calcular_pago_recibido(10.0, 'VES', 'paypal')['cotizacion_id'] == 200
+        assert 'error' in foto.calcular_pago_recibido(10.0, 'cop', 'PAYPAL2')
+
+
+# ── Dedup por lote ──────────────────────────────────────────────────────
+
+class _RegistroFalso:
+    """Parser de prueba: el transaction_id viene en el asunto del correo."""
+
+    def parse(self, correo):
+        if correo['subject'] == 'spam':
+            return None
+        return 'paypal', {
+            'metodo': 'paypal', 'pagador_nombre': 'Ana', 'moneda': 'EUR',
+            'importe_bruto': Decimal('10.00'),
+            'transaction_id': correo['subject'] or None,
+        }
+
+
+def _correo(uid, message_id, transaction_id):
+    return {
+        'imap_uid': uid, 'message_id': message_id, 'subject': transaction_id,
+        'sender': 'service@paypal.com', 'to_raw': '', 'html_body': '',
+    }
+
+
+def _resumen():
+    return {'procesados': 0, 'duplicados': 0, 'no_reconocidos': 0,
+            'errores': 0, 'nuevos': []}
+
+
+@pytest.fixture
+def servicio(monkeypatch):
+    """Ingesta con la BD sustituida por conjuntos en memoria."""
+    consultas = []
+    existentes = {'msg': {'<viejo>'}, 'tx': {'TX-VIEJA'}}
+
+    def _existentes(tipo):
+        def consulta(cls, ids):
+            ids = list(ids)
+            consultas.append((tipo, ids))
+            return existentes[tipo] & set(ids)
+        return classmethod(consulta)
+
+    monkeypatch.setattr(Payment, 'message_ids_existentes', _existentes('msg'))
+    monkeypatch.setattr(Payment, 'transaction_ids_existentes', _existentes('tx'))
+    tramos = []
+
+    def _save_all(cls, pagos):
+        tramos.append(len(pagos))
+        return [True] * len(pagos)
+
+    monkeypatch.setattr(Payment, 'save_all', classmethod(_save_all))
+    monkeypatch.setattr(UnifiedIngestionService, '_conciliar_lote',
+                        staticmethod(lambda pagos: [None] * len(pagos)))
+    monkeypatch.setattr(uis, 'GmailService', lambda: None)
+    svc = UnifiedIngestionService(chunk_size=20)
+    svc.registry = _RegistroFalso()
+    svc.consultas = consultas
+    svc.tramos = tramos
+    return svc
+
+
+FUENTES = [SimpleNamespace(remitente='service@paypal.com', auto_cotizar=False)]
+
+
+class TestDeduplicadorLote:
+    """Vistos en BD y vistos en el mismo lote cuentan igual."""
+
+    def test_detecta_repetidos_del_lote(self):
+        dedup = DeduplicadorLote(transaction_ids={'TX1'})
+        assert dedup.transaccion_vista('TX1')
+        assert not dedup.transaccion_vista('TX2')
+        dedup.registrar_transaccion('TX2')
+        assert dedup.transaccion_vista('TX2')
+
+    def test_ids_vacios_nunca_son_duplicados(self):
+        dedup = DeduplicadorLote()
+        dedup.registrar_transaccion(None)
+        dedup.registrar_mensaje('')
+        assert not dedup.transaccion_vista(None)
+        assert not dedup.mensaje_visto('')
+
+
+class TestProcesarLote:
+    """Dos consultas IN por lote, sin importar cuántos correos traiga."""
+
+    def test_dos_consultas_por_lote(self, servicio):
+        correos = [_correo(i, f'<m{i}>', f'TX{i}') for i in range(50)]
+        resumen = _resumen()
+        uids = servicio._procesar_lote(correos, FUENTES, None, resumen)
+        assert [tipo for tipo, _ids in servicio.consultas] == ['msg', 'tx']
+        assert resumen['procesados'] == 50
+        assert uids == list(range(50))
+
+    def test_duplicados_en_bd_y_dentro_del_lote(self, servicio):
+        correos = [
+            _correo(1, '<viejo>', 'TX-A'),      # message_id ya registrado
+            _correo(2, '<m2>', 'TX-VIEJA'),     # transaction_id ya registrado
+            _correo(3, '<m3>', 'TX-B'),
+            _correo(4, '<m3>', 'TX-B'),         # mismo correo dos veces
+            _correo(5, '<m5>', 'TX-B'),         # misma transacción, otro correo
+            _correo(6, '<m6>', 'spam'),
+            _correo(7, '<m7>', ''),             # sin transaction_id
+        ]
+        resumen = _resumen()
+        uids = servicio._procesar_lote(correos, FUENTES, None, resumen)
+        assert resumen['procesados'] == 2
+        assert resumen['duplicados'] == 4
+        assert resumen['no_reconocidos'] == 1
+        assert sorted(uids) == [1, 2, 3, 4, 5, 6, 7]
+
+    def test_inserta_por_tramos(self, servicio):
+        correos = [_correo(i, f'<m{i}>', f'TX{i}') for i in range(45)]
+        servicio._procesar_lote(correos, FUENTES, None, _resumen())
+        assert servicio.tramos == [20, 20, 5]
+
+    def test_archiva_todos_los_correos_descargados(self, servicio, tmp_path):
+        servicio.archivo = ArchivoCorreos(tmp_path)
+        correos = [_correo(1, '<viejo>', 'TX-A'), _correo(2, '<m2>', 'spam')]
+        servicio._procesar_lote(correos, FUENTES, None, _resumen())
+        assert {e['message_id'] for e in servicio.archivo.indice()} == {'<viejo>', '<m2>'}
+
+
+# ── Inserción por tramos con savepoints ────────────────────────────────
+
+class _SesionFalsa:
+    """Sesión mínima: los flush de objetos 'malos' fallan como un IntegrityError."""
+
+    def __init__(self, falla_commit=False):
+        self.confirmados = []
+        self.pendientes = []
+        self.commits = 0
+        self.falla_commit = falla_commit
+
+    @contextmanager
+    def begin_nested(self):
+        marca = len(self.pendientes)
+        try:
+            yield
+        except Exception:
+            del self.pendientes[marca:]     # ROLLBACK TO SAVEPOINT
+            raise
+
+    def add(self, obj):
+        self.pendientes.append(obj)
+
+    def flush(self):
+        if self.pendientes and self.pendientes[-1] == 'malo':
+            raise IntegrityError('INSERT', {}, Exception('duplicate key'))
+
+    def commit(self):
+        if self.falla_commit:
+            raise OperationalError('COMMIT', {}, Exception('disk I/O'))
+        self.commits += 1
+        self.confirmados.extend(self.pendientes)
+        self.pendientes = []
+
+    def rollback(self):
+        self.pendientes = []
+
+
+class TestSaveAll:
+    """Una fila mala no tumba el tramo, y el COMMIT es uno solo."""
+
+    def test_savepoint_por_fila(self, monkeypatch):
+        sesion = _SesionFalsa()
+        monkeypatch.setattr(base, 'db', SimpleNamespace(session=sesion))
+        resultados = Payment.save_all(['a', 'malo', 'b'])
+        assert resultados == [True, False, True]
+        assert sesion.confirmados == ['a', 'b']
+        assert sesion.commits == 1
+
+    def test_si_falla_el_commit_nada_queda_guardado(self, monkeypatch):
+        sesion = _SesionFalsa(falla_commit=True)
+        monkeypatch.setattr(base, 'db', SimpleNamespace(session=sesion))
+        assert Payment.save_all(['a', 'b']) == [False, False]
+        assert sesion.confirmados == []
+
+
+# ── Importación histórica reanudable ───────────────────────────────────
+
+class _GmailHistorico:
+    """
+    Buzón en memoria: UID 1..n; puede fallar al bajar un tramo dado, traer
+    correos sin HTML (`sin_html`) y perder UID sueltos una vez (`perdidos`).
+    """
+
+    def __init__(self, n, uidvalidity=7, falla_en=None, sin_html=(), perdidos=()):
+        self.uids = [str(u) for u in range(1, n + 1)]
+        self.uidvalidity = uidvalidity
+        self.falla_en = falla_en
+        self.html_faltante = set(sin_html)
+        self.perdidos = set(perdidos)
+        self.marcados = []
+        self.max_tramo = 0
+        self.ultima_descarga = {}
+        self.sin_html = []
+
+    def abrir_sesion(self):
+        return True
+
+    def cerrar_sesion(self):
+        pass
+
+    def buscar_uids_desde_fecha(self, remitentes, desde_imap, desde_uid=0):
+        return [u for u in self.uids if int(u) > desde_uid]
+
+    def descargar(self, uids):
+        if self.falla_en in uids:
+            self.falla_en = None        # el corte ocurre una sola vez
+            raise OSError('conexión reseteada')
+        self.max_tramo = max(self.max_tramo, len(uids))
+        self.ultima_descarga = {'correos': len(uids), 'bytes': 1000 * len(uids),
+                                'segundos': 0.0}
+        self.sin_html = [u for u in uids if u in self.html_faltante]
+        bajados = [u for u in uids
+                   if u not in self.html_faltante and u not in self.perdidos]
+        self.perdidos -= set(uids)
+        return [_correo(u, f'<m{u}>', f'TX{u}') for u in bajados]
+
+    def mark_multiple_as_read(self, uids):
+        self.marcados.extend(uids)
+
+
+@pytest.fixture
+def importador(monkeypatch):
+    """Servicio con Gmail, fuentes, checkpoints y sesión de BD en memoria."""
+    checkpoints = {}
+    monkeypatch.setattr(uis, 'GmailService', lambda: None)
+    monkeypatch.setattr(uis.PaymentSource, 'get_activos', classmethod(lambda cls: FUENTES))
+    monkeypatch.setattr(uis.IngestionCheckpoint, 'get_by_clave',
+                        classmethod(lambda cls, clave: checkpoints.get(clave)))
+    sesion = SimpleNamespace(
+        add=lambda cp: checkpoints.__setitem__(cp.clave, cp), commit=lambda: None
+    )
+    monkeypatch.setattr(uis, 'db', SimpleNamespace(session=sesion))
+    monkeypatch.setattr(UnifiedIngestionService, '_capturar_precios', lambda self: None)
+
+    def _procesar_lote(self, correos, fuentes, web_user_id, resumen):
+        resumen['procesados'] += len(correos)
+        return [c['imap_uid'] for c in correos]
+
+    monkeypatch.setattr(UnifiedIngestionService, '_procesar_lote', _procesar_lote)
+
+    def crear(gmail):
+        svc = UnifiedIngestionService(gmail=gmail, parse_workers=1)
+        svc.IMPORT_CHUNK = 10
+        return svc
+
+    crear.checkpoints = checkpoints
+    return crear
+
+
+class TestImportacionHistorica:
+    """Por tramos, con checkpoint, y retomando tras un corte."""
+
+    def test_recorre_por_tramos_y_completa(self, importador):
+        gmail = _GmailHistorico(25)
+        r = importador(gmail).procesar_desde_fecha('2026-06-01', None)
+        assert r['completado'] and r['procesados'] == 25
+        assert gmail.max_tramo == 10
+        assert r['progreso']['ultimo_uid'] == 25
+        assert r['progreso']['estado'] == 'completado'
+
+    def test_retoma_desde_el_checkpoint_tras_un_corte(self, importador):
+        gmail = _GmailHistorico(25, falla_en='15')
+        r = importador(gmail).procesar_desde_fecha('2026-06-01', None)
+        assert not r['success']
+        cp = importador.checkpoints['historico:2026-06-01']
+        assert cp.ultimo_uid == 10 and cp.estado == 'en_curso'
+
+        r = importador(gmail).procesar_desde_fecha('2026-06-01', None)
+        assert r['completado'] and r['procesados'] == 15   # solo 11..25
+        assert cp.procesados == 25 and cp.total == 25
+        assert sorted(map(int, gmail.marcados)) == list(range(1, 26))
+
+    def test_uidvalidity_distinto_empieza_de_cero(self, importador):
+        gmail = _GmailHistorico(25, falla_en='15')
+        importador(gmail).procesar_desde_fecha('2026-06-01', None)
+        gmail.uidvalidity = 8
+        r = importador(gmail).procesar_desde_fecha('2026-06-01', None)
+        assert r['procesados'] == 25
+
+    def test_corta_por_tiempo_en_un_borde_de_tramo(self, importador, monkeypatch):
+        relojes = iter(range(0, 1000, 50))
+        monkeypatch.setattr(uis.time, 'monotonic', lambda: next(relojes))
+        r = importador(_GmailHistorico(25)).procesar_desde_fecha(
+            '2026-06-01', None, tiempo_max=60
+        )
+        assert r['success'] and not r['completado']
+        assert r['progreso']['ultimo_uid'] in (10, 20)
+
+    def test_no_arranca_un_tramo_que_pasaria_el_tope(self, importador, monkeypatch):
+        """Cada tramo tarda 30 s: con tope 60 entran dos, no un tercero."""
+        reloj = [0.0]
+        monkeypatch.setattr(uis.time, 'monotonic', lambda: reloj[0])
+
+        class _GmailLento(_GmailHistorico):
+            def descargar(self, uids):
+                reloj[0] += 30
+                return super().descargar(uids)
+
+        r = importador(_GmailLento(45)).procesar_desde_fecha(
+            '2026-06-01', None, tiempo_max=60
+        )
+        assert not r['completado'] and r['progreso']['ultimo_uid'] == 20
+
+    @staticmethod
+    def _con_fallas(monkeypatch, fallan, veces=1):
+        """_procesar_lote que no procesa los UID de `fallan` las primeras `veces`."""
+        intentos = {}
+
+        def procesar(self, correos, fuentes, web_user_id, resumen):
+            hechos = []
+            for correo in correos:
+                uid = correo['imap_uid']
+                intentos[uid] = intentos.get(uid, 0) + 1
+                if uid in fallan and intentos[uid] <= veces:
+                    resumen['errores'] += 1
+                else:
+                    resumen['procesados'] += 1
+                    hechos.append(uid)
+            return hechos
+
+        monkeypatch.setattr(UnifiedIngestionService, '_procesar_lote', procesar)
+
+    def test_los_fallidos_se_reintentan_al_retomar(self, importador, monkeypatch):
+        self._con_fallas(monkeypatch, {'3'})
+        gmail = _GmailHistorico(25, falla_en='15')
+        importador(gmail).procesar_desde_fecha('2026-06-01', None)
+        cp = importador.checkpoints['historico:2026-06-01']
+        assert cp.ultimo_uid == 10 and cp.pendientes == [3]
+
+        r = importador(gmail).procesar_desde_fecha('2026-06-01', None)
+        assert r['completado'] and cp.pendientes == [] and cp.errores == 0
+        assert sorted(map(int, gmail.marcados)) == list(range(1, 26))
+
+    def test_sin_html_no_queda_pendiente_y_solo_se_descuentan_errores(
+            self, importador, monkeypatch):
+        """El correo sin HTML es no reconocido; el UID perdido no sumó error."""
+        self._con_fallas(monkeypatch, {'3'})
+        gmail = _GmailHistorico(25, falla_en='15', sin_html={'4'}, perdidos={'6'})
+        importador(gmail).procesar_desde_fecha('2026-06-01', None)
+        cp = importador.checkpoints['historico:2026-06-01']
+        assert cp.pendientes == [3, 6] and cp.pendientes_con_error == [3]
+        assert cp.errores == 1 and cp.no_reconocidos == 1
+        assert '4' in gmail.marcados
+
+        r = importador(gmail).procesar_desde_fecha('2026-06-01', None)
+        assert r['completado'] and cp.pendientes == [] and cp.pendientes_con_error == []
+        assert cp.errores == 0 and cp.no_reconocidos == 1
+        assert sorted(map(int, gmail.marcados)) == list(range(1, 26))
+
+    def test_reintento_descuenta_solo_los_errores_contados(self):
+        cp = IngestionCheckpoint(clave='historico:2026-06-01')
+        cp.reiniciar(7)
+        cp.avanzar(10, 10, {'errores': 1}, fallidos={3, 6}, con_error={3})
+        cp.reintentados([6], set(), {'procesados': 1})
+        assert cp.errores == 1 and cp.pendientes == [3]
+        cp.reintentados([3], {3}, {'errores': 1}, {3})
+        assert cp.errores == 1 and cp.pendientes_con_error == [3]
+
+    def test_fallido_persistente_queda_registrado(self, importador, monkeypatch):
+        self._con_fallas(monkeypatch, {'7'}, veces=99)
+        r = importador(_GmailHistorico(25)).procesar_desde_fecha('2026-06-01', None)
+        assert r['completado'] and r['progreso']['pendientes'] == 1
+        assert r['progreso']['errores'] == 1
+
+    def test_fecha_invalida(self, importador):
+        with pytest.raises(ValueError):
+            importador(_GmailHistorico(1)).procesar_desde_fecha('01/06/2026', None)
+
+
+class TestMetricasCorrida:
+    """Tiempos por etapa y contadores que se guardan en ingestion_runs."""
+
+    def test_acumula_etapas_y_resto_en_otros(self):
+        metricas = MetricasCorrida()
+        with metricas.etapa('parseo'):
+            pass
+        metricas.sumar_etapa('guardado', 0.5)
+        metricas.sumar_etapa('guardado', 0.25)
+        metricas.registrar_descarga({'correos': 3, 'bytes': 2048, 'segundos': 0.2})
+        metricas.contar_conciliacion('vinculado')
+        metricas.contar_conciliacion('vinculado')
+        metricas.contar_conciliacion(None)
+
+        d = metricas.to_dict()
+        assert list(d['etapas']) == ['descarga', 'parseo', 'guardado', 'otros']
+        assert d['etapas']['guardado'] == 0.75
+        assert d['correos'] == 3 and d['bytes'] == 2048
+        assert d['conciliacion'] == {'vinculado': 2}
+
+    def test_procesar_lote_mide_sus_etapas(self, servicio):
+        servicio._procesar_lote(
+            [_correo('1', '<a>', 'TX-A'), _correo('2', '<b>', 'TX-B')],
+            FUENTES, None, _resumen()
+        )
+        etapas = servicio.metricas.to_dict()['etapas']
+        assert {'archivo', 'dedup', 'parseo', 'guardado', 'conciliacion'} <= set(etapas)
+
+    def test_la_importacion_deja_metricas_en_el_resumen(self, importador):
+        r = importador(_GmailHistorico(25)).procesar_desde_fecha('2026-06-01', None)
+        assert r['metricas']['correos'] == 25
+        assert r['metricas']['bytes'] == 25000
+        assert {'busqueda', 'descarga', 'marcado'} <= set(r['metricas']['etapas'])
+
+    def test_fila_de_la_corrida(self):
+        metricas = MetricasCorrida()
+        metricas.registrar_descarga({'correos': 4, 'bytes': 10, 'segundos': 0.1})
+        resumen = {'success': True, 'procesados': 3, 'duplicados': 1,
+                   'mensaje': 'Procesados: 3 nuevos'}
+        run = IngestionRun.desde_metricas(
+            IngestionRun.NUEVOS, False, metricas.to_dict(), resumen
+        )
+        assert run.exito and run.correos == 4 and run.procesados == 3
+        assert run.duplicados == 1 and run.errores == 0
+        assert 'descarga' in run.etapas
+
+
+# ── Parseo en paralelo ─────────────────────────────────────────────────
+
+def _correos_reales(n):
+    """Mezcla de Zelle reconocibles y correos que nadie reclama."""
+    correos = []
+    for i in range(n):
+        if i % 3 == 2:
+            correos.append({**_correo(i, f'<x{i}>', 'Hola'), 'sender': 'otro@example.com'})
+        else:
+            correos.append({
+                **_correo(i, f'<z{i}>', f'Cliente {i} le envió ${i}.50'),
+                'sender': 'customerservice@ealerts.bankofamerica.com',
+                'date': 'Mon, 08 Jun 2026 12:00:00 -0500',
+            })
+    return correos
+
+
+class TestParseoEnParalelo:
+    """Mismo resultado y mismo orden con 1 o con N procesos."""
+
+    def test_pool_equivale_a_serie(self, monkeypatch):
+        monkeypatch.setattr(uis, 'GmailService', lambda: None)
+        correos = _correos_reales(30)
+
+        en_serie = UnifiedIngestionService(parse_workers=1)._parsear_todos(correos)
+
+        svc = UnifiedIngestionService(parse_workers=2)
+        with svc._pool_de_parseo():
+            assert svc._pool is not None
+            en_paralelo = svc._parsear_todos(correos)
+        assert svc._pool is None
+
+        assert en_paralelo == en_serie
+        assert [r is None for r in en_serie] == [i % 3 == 2 for i in range(30)]
+        assert en_serie[4][1]['pagador_nombre'] == 'Cliente 4'
@@ -0,0 +1,305 @@
+"""
+Tests de la outbox de notificaciones y su dispatcher.
+
+Los canales son sustitutos locales (funciones que registran o fallan) y la
+tabla se reemplaza por una lista en memoria: sin BD, red ni Telegram. Solo
+TestAtomicidad usa la BD (fixture ``db``): la outbox se guarda o se descarta
+junto con la transición de la orden.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.models.currency import Currency
+from app.models.notification_outbox import NotificationOutbox
+from app.models.operator import Operator
+from app.models.order import Order, OrderStatus
+from app.models.payment_method import PaymentMethod
+from app.models.user import User
+from app.services.notification_dispatcher import NotificationDispatcher
+from app.services.notification_service import NotificationService
+from app.services.order_service import OrderService
+
+
+def _envio(fila_id, canal='telegram', intentos=1, recipient='100'):
+    return {'id': fila_id, 'channel': canal, 'recipient': recipient,
+            'payload': {'text': f'hola {fila_id}'}, 'attempts': intentos}
+
+
+class _CanalLocal:
+    """Sender de prueba: registra envíos y mide la concurrencia máxima."""
+
+    def __init__(self, falla=(), demora=0.0):
+        self.falla = set(falla)
+        self.demora = demora
+        self.enviados = []
+        self.activos = self.maximo = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, recipient, payload):
+        with self._lock:
+            self.activos += 1
+            self.maximo = max(self.maximo, self.activos)
+        time.sleep(self.demora)
+        with self._lock:
+            self.activos -= 1
+            self.enviados.append((recipient, payload))
+        if recipient in self.falla:
+            return False, 'Too Many Requests'
+        return True, 'ok'
+
+
+class TestBackoff:
+    """Cuándo se reintenta una notificación fallida."""
+
+    def test_exponencial_con_tope(self, monkeypatch):
+        ahora = datetime(2026, 1, 1)
+        esperas = [
+            (NotificationDispatcher.proximo_intento(n, ahora) - ahora).total_seconds()
+            for n in range(1, NotificationDispatcher.MAX_INTENTOS)
+        ]
+        assert esperas == [10, 20, 40, 80, 160]
+
+        monkeypatch.setattr(NotificationDispatcher, 'MAX_INTENTOS', 20)
+        tope = NotificationDispatcher.proximo_intento(15, ahora) - ahora
+        assert tope == timedelta(seconds=NotificationDispatcher.BACKOFF_MAX)
+
+    def test_agotados_no_se_reintentan(self):
+        assert NotificationDispatcher.proximo_intento(NotificationDispatcher.MAX_INTENTOS) is None
+
+
+class TestDispatcher:
+    """Envío de un lote con sustitutos locales de cada canal."""
+
+    def test_cada_fila_sale_por_su_canal(self):
+        telegram, push = _CanalLocal(), _CanalLocal()
+        dispatcher = NotificationDispatcher({'telegram': telegram, 'push': push})
+
+        resultados = dispatcher.enviar([_envio(1), _envio(2, canal='push', recipient='7')])
+
+        assert [r[:2] for r in resultados] == [(1, True), (2, True)]
+        assert telegram.enviados == [('100', {'text': 'hola 1'})]
+        assert push.enviados == [('7', {'text': 'hola 2'})]
+
+    def test_falla_se_reprograma_y_la_ultima_se_abandona(self):
+        telegram = _CanalLocal(falla={'100'})
+        dispatcher = NotificationDispatcher({'telegram': telegram})
+
+        primera, ultima = dispatcher.enviar([
+            _envio(1, intentos=1),
+            _envio(2, intentos=NotificationDispatcher.MAX_INTENTOS),
+        ])
+        assert primera[1] is False and primera[2] == 'Too Many Requests'
+        assert primera[3] is not None
+        assert ultima[1] is False and ultima[3] is None
+
+    def test_canal_desconocido_o_que_explota(self):
+        def explota(recipient, payload):
+            raise ConnectionError('sin red')
+
+        dispatcher = NotificationDispatcher({'telegram': explota})
+        resultados = dispatcher.enviar([_envio(1), _envio(2, canal='sms')])
+        assert resultados[0][1:3] == (False, 'sin red')
+        assert resultados[1][1] is False and 'sms' in resultados[1][2]
+
+    def test_tope_de_concurrencia_por_canal(self):
+        """Telegram no pasa de su tope aunque el lote traiga muchas filas."""
+        telegram, push = _CanalLocal(demora=0.05), _CanalLocal(demora=0.05)
+        dispatcher = NotificationDispatcher({'telegram': telegram, 'push': push},
+                                            limites={'telegram': 2, 'push': 5})
+
+        dispatcher.enviar([_envio(i) for i in range(8)]
+                          + [_envio(100 + i, canal='push') for i in range(10)])
+
+        assert telegram.maximo == 2
+        assert 2 < push.maximo <= 5
+
+    def test_lo_que_no_arranca_en_el_plazo_vuelve_a_pendiente(self, monkeypatch):
+        """Pasado el plazo no se envía más: el lote termina dentro del lease."""
+        monkeypatch.setattr(NotificationDispatcher, 'PLAZO', 0.1)
+        telegram = _CanalLocal(demora=0.2)
+        dispatcher = NotificationDispatcher({'telegram': telegram},
+                                            limites={'telegram': 1})
+
+        antes = datetime.utcnow()
+        primera, segunda, tercera = dispatcher.enviar([_envio(1), _envio(2), _envio(3)])
+
+        assert len(telegram.enviados) == 1 and primera[1] is True
+        for fila in (segunda, tercera):
+            assert fila[1] is False and antes <= fila[3] <= datetime.utcnow()
+
+    def test_lease_cubre_el_lote(self):
+        assert (NotificationDispatcher.PLAZO + NotificationDispatcher.ENVIO_MAX
+                < NotificationDispatcher.LEASE)
+
+    def test_drenar_lote_registra_resultados(self, monkeypatch):
+        """Toma un lote, lo envía y registra todo de una vez."""
+        registrados = []
+        monkeypatch.setattr(NotificationOutbox, 'claim_batch', classmethod(
+            lambda cls, limite, lease: [_envio(1), _envio(2, recipient='caido')]))
+        monkeypatch.setattr(NotificationOutbox, 'record_results', classmethod(
+            lambda cls, resultados: registrados.append(list(resultados)) or {}))
+
+        dispatcher = NotificationDispatcher({'telegram': _CanalLocal(falla={'caido'})})
+        assert dispatcher.drenar_lote() == 2
+        assert [(r[0], r[1]) for r in registrados[0]] == [(1, True), (2, False)]
+
+    def test_contexto_envuelve_cada_envio(self):
+        """El script envuelve cada envío en el app context."""
+        eventos = []
+
+        class Contexto:
+            def __enter__(self):
+                eventos.append('entra')
+
+            def __exit__(self, *exc):
+                eventos.append('sale')
+
+        dispatcher = NotificationDispatcher(
+            {'telegram': lambda r, p: eventos.append('envía') or (True, 'ok')},
+            contexto=Contexto,
+        )
+        dispatcher.enviar([_envio(1)])
+        assert eventos == ['entra', 'envía', 'sale']
+
+
+class TestEncolado:
+    """NotificationService deja filas en la outbox en vez de enviar."""
+
+    @pytest.fixture
+    def outbox(self, monkeypatch):
+        filas = []
+        monkeypatch.setattr(NotificationOutbox, 'stage', classmethod(
+            lambda cls, **fila: filas.append(fila)))
+        monkeypatch.setattr(NotificationService, '_web_user_ids',
+                            classmethod(lambda cls, user_id: [11, 12]))
+        return filas
+
+    @staticmethod
+    def _orden(**extra):
+        datos = dict(id=5, reference='ORD-5', user_id=3, channel='telegram',
+                     channel_chat_id='555', amount_usd=10.0, amount_local=400.0,
+                     currency=SimpleNamespace(code='VES'), operator=None,
+                     payment_method_to=None)
+        datos.update(extra)
+        return SimpleNamespace(**datos)
+
+    def test_asignada_encola_push_y_telegram(self, outbox):
+        operador = SimpleNamespace(full_name='Ana Operadora')
+        ok, mensaje = NotificationService.notify_order_assigned(self._orden(), operador)
+
+        assert ok and mensaje == 'Notificación encolada'
+        assert [(f['channel'], f['recipient']) for f in outbox] == [
+            ('push', 11), ('push', 12), ('telegram', '555')
+        ]
+        assert {f['event'] for f in outbox} == {'order_assigned'}
+        assert 'Ana Operadora' in outbox[-1]['payload']['text']
+
+    def test_sin_chat_id_solo_push(self, outbox):
+        ok, _ = NotificationService.notify_order_cancelled(
+            self._orden(channel_chat_id=None), 'Pago no recibido')
+        assert ok is False
+        assert [f['channel'] for f in outbox] == ['push', 'push']
+
+    @pytest.mark.parametrize('resultado, ok', [
+        ((1, 0), True),
+        ((1, 1), True),     # alguien lo recibió: reintentar lo duplicaría
+        ((0, 2), False),    # 5xx / timeout / sin VAPID: se reintenta
+        ((0, 0), True),     # sin suscripciones vivas
+    ])
+    def test_push_falla_si_nada_se_entrego(self, monkeypatch, resultado, ok):
+        from app.services.push_service import PushService
+        monkeypatch.setattr(PushService, 'deliver_to_user', classmethod(
+            lambda cls, web_user_id, title, body, url: resultado))
+        enviado, _ = NotificationService._push_sender('11', {'title': 'T', 'body': 'B'})
+        assert enviado is ok
+
+    def test_senders_por_canal(self):
+        senders = NotificationService.outbox_senders()
+        assert set(senders) == {'telegram', 'whatsapp', 'webchat', 'push'}
+
+
+class TestAtomicidad:
+    """Las filas de la outbox viajan en el mismo commit que la transición."""
+
+    @pytest.fixture
+    def orden(self, db):
+        """Orden PENDING de Telegram con su operador; se borra todo al final."""
+        user, _ = User.find_or_create_from_channel(
+            'telegram', '990000001', {'first_name': 'Outbox Test'})
+        operador = Operator(username='test_outbox_op', full_name='Op Outbox',
+                            email='test_outbox_op@example.com')
+        operador.set_password('secreto_123')
+        operador.save(raise_on_error=True)
+        metodo = PaymentMethod.query.filter_by(active=True).first()
+        orden = Order(
+            reference=Order.generate_reference(), user_id=user.id,
+            currency_id=Currency.query.filter_by(code='VES').first().id,
+            payment_method_from_id=metodo.id, payment_method_to_id=metodo.id,
+            amount_usd=10, amount_local=400, fee_usd=0, net_usd=10,
+            exchange_rate=40, client_payment_data={}, status=OrderStatus.PENDING,
+            channel='telegram', channel_chat_id='990000001',
+        )
+        orden.save(raise_on_error=True)
+        yield orden, operador
+
+        db.session.rollback()
+        NotificationOutbox.query.filter_by(order_id=orden.id).delete()
+        Order.query.filter_by(id=orden.id).delete()
+        Operator.query.filter_by(id=operador.id).delete()
+        db.session.commit()
+
+    @staticmethod
+    def _filas(orden):
+        return NotificationOutbox.query.filter_by(order_id=orden.id).all()
+
+    def test_asignar_guarda_la_notificacion(self, db, orden):
+        orden, operador = orden
+        ok, _, _ = OrderService.assign_order(orden.id, operador.id)
+
+        assert ok
+        filas = self._filas(orden)
+        assert [(f.channel, f.recipient, f.event, f.status) for f in filas] == [
+            ('telegram', '990000001', 'order_assigned', NotificationOutbox.PENDIENTE)
+        ]
+
+    def test_cancelar_guarda_la_notificacion(self, db, orden):
+        orden, _ = orden
+        ok, _, _ = OrderService.cancel_order(orden.id, 'Pago no recibido')
+
+        assert ok
+        assert [f.event for f in self._filas(orden)] == ['order_cancelled']
+
+    @pytest.mark.parametrize('operacion', ['asignar', 'cancelar'])
+    def test_transicion_fallida_descarta_la_notificacion(self, db, orden,
+                                                         monkeypatch, operacion):
+        orden, operador = orden
+
+        def commit_caido():
+            raise OperationalError('COMMIT', {}, Exception('conexión perdida'))
+
+        with monkeypatch.context() as m:
+            m.setattr(db.session, 'commit', commit_caido)
+            if operacion == 'asignar':
+                ok, _, _ = OrderService.assign_order(orden.id, operador.id)
+            else:
+                ok, _, _ = OrderService.cancel_order(orden.id, 'Pago no recibido')
+
+        assert not ok
+        assert self._filas(orden) == []
+        assert db.session.get(Order, orden.id).status == OrderStatus.PENDING
+
+    def test_transicion_invalida_no_encola(self, db, orden):
+        """Una orden ya cancelada no se asigna ni deja notificación."""
+        orden, operador = orden
+        OrderService.cancel_order(orden.id, 'Duplicada')
+        NotificationOutbox.query.filter_by(order_id=orden.id).delete()
+        db.session.commit()
+
+        ok, _, _ = OrderService.assign_order(orden.id, operador.id)
+        assert not ok
+        assert self._filas(orden) == []
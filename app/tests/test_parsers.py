@@ -14,6 +14,8 @@ from app.services.parsers.wise_parser import WiseParser
 from app.services.parsers.zelle_parser import ZelleParser
 from app.services.parsers.skrill_parser import SkrillParser
 from app.services.parsers.binance_parser import BinanceParser
+from app.services.parsers import base as parsers_base
+from app.services.parsers.base import CorreoParseado, EmailPaymentParser
 from app.services.parsers.registry import ParserRegistry
 
 PAYPAL = 'service@intl.paypal.com'
@@ -321,4 +323,64 @@ class TestRegistrySkrillBinance:
     def test_rutea_binance(self):
         c = _correo(sender=BINANCE,
                     subject='[Binance] Pago recibido correctamente')
-        assert isinstance(self.registry.seleccionar(c), BinanceParser)
\ No newline at end of file
+        assert isinstance(self.registry.seleccionar(c), BinanceParser)
+
+
+class _ParserComodin(EmailPaymentParser):
+    """Parser sin remitentes declarados: reclama cualquier asunto 'comodin'."""
+
+    metodo = 'comodin'
+
+    def puede_parsear(self, correo: dict) -> bool:
+        return 'comodin' in (correo.get('subject') or '')
+
+    def parse(self, correo: dict):
+        return {'sopa': self._sopa(correo)}
+
+
+class TestIndiceRemitentes:
+    """Índice dominio remitente -> parsers y DOM compartido por correo."""
+
+    def setup_method(self):
+        self.registry = ParserRegistry()
+
+    def test_solo_consulta_parsers_del_dominio(self):
+        c = _correo(sender='PayPal <service@intl.paypal.com>')
+        assert [type(p) for p in self.registry.candidatos(c)] == [PaypalParser]
+
+    def test_subdominio_cae_en_el_dominio_registrado(self):
+        c = _correo(sender='Wise <noreply@mail.wise.com>')
+        assert [type(p) for p in self.registry.candidatos(c)] == [WiseParser]
+
+    def test_dominio_desconocido_no_consulta_a_nadie(self):
+        assert self.registry.candidatos(_correo(sender='x@example.com')) == []
+        assert self.registry.candidatos(_correo(sender='')) == []
+
+    def test_dominio_en_el_nombre_visible_no_engana_al_ruteo(self):
+        c = _correo(sender='intl.paypal.com <estafa@example.com>',
+                    subject='Juan le ha enviado $50,00 USD')
+        assert self.registry.seleccionar(c) is None
+
+    def test_parser_sin_remitentes_se_consulta_siempre(self):
+        comodin = _ParserComodin()
+        registry = ParserRegistry([ZelleParser(), comodin])
+        c = _correo(sender='x@example.com', subject='comodin')
+        assert registry.seleccionar(c) is comodin
+        c = _correo(sender=BOA, subject='Luis le envió $50.00')
+        assert registry.candidatos(c) == [registry._parsers[0], comodin]
+
+    def test_html_se_parsea_una_sola_vez(self, monkeypatch):
+        llamadas = []
+        original = parsers_base.BeautifulSoup
+
+        def contar(*args, **kwargs):
+            llamadas.append(1)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(parsers_base, 'BeautifulSoup', contar)
+        correo = CorreoParseado(_correo(html_body='<p>hola</p>'))
+        assert correo.sopa() is correo.sopa()
+        assert ParserRegistry([_ParserComodin()]).parse(
+            _correo(subject='comodin', html_body='<p>hola</p>')
+        )[1]['sopa'] is not None
+        assert len(llamadas) == 2     # una por correo, no una por llamada
@@ -0,0 +1,119 @@
+"""
+Tests del almacenamiento de comprobantes (ProofStorage).
+
+Trabajan sobre un directorio temporal; el índice en BD se reemplaza por un
+diccionario en memoria y las miniaturas se generan en el mismo hilo.
+"""
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app.services.proof_storage import ProofStorage, ProofStorageError
+
+
+@pytest.fixture
+def indice(monkeypatch):
+    """proof_files en memoria: {sha256: filename}; renovados en .renovados."""
+    filas = _Indice()
+    monkeypatch.setattr(ProofStorage, '_find_indexed',
+                        classmethod(lambda cls, sha: filas.get(sha)))
+    monkeypatch.setattr(ProofStorage, '_index', classmethod(
+        lambda cls, sha, filename, size, created_at=None: filas.setdefault(sha, filename)))
+    monkeypatch.setattr(ProofStorage, '_mark_uploaded', classmethod(
+        lambda cls, filename: filas.renovados.append(filename)))
+    monkeypatch.setattr(ProofStorage, 'enqueue_thumbnail',
+                        classmethod(lambda cls, path: cls.make_thumbnail(path)))
+    return filas
+
+
+class _Indice(dict):
+    def __init__(self):
+        super().__init__()
+        self.renovados = []
+
+
+def _png(ancho=1200, alto=900, color=(200, 30, 30)) -> bytes:
+    salida = io.BytesIO()
+    Image.new('RGB', (ancho, alto), color).save(salida, 'PNG')
+    return salida.getvalue()
+
+
+class TestGuardado:
+    """Copia por bloques, hash y deduplicación."""
+
+    def test_nombre_sale_del_contenido(self, tmp_path, indice):
+        """El archivo se nombra por su SHA-256 y queda indexado."""
+        url = ProofStorage.store(io.BytesIO(b'%PDF-1.4 comprobante'), '.pdf',
+                                 directory=str(tmp_path))
+        nombre = url.rsplit('/', 1)[1]
+        assert url.startswith('/static/proofs/') and nombre.endswith('.pdf')
+        assert list(indice.values()) == [nombre]
+        assert (tmp_path / nombre).read_bytes() == b'%PDF-1.4 comprobante'
+
+    def test_mismo_contenido_se_guarda_una_vez(self, tmp_path, indice):
+        """Una resubida (aunque llegue como .jpeg) reutiliza el archivo."""
+        contenido = _png()
+        primera = ProofStorage.store(io.BytesIO(contenido), '.png', directory=str(tmp_path))
+        segunda = ProofStorage.store(io.BytesIO(contenido), '.jpeg', directory=str(tmp_path))
+        assert primera == segunda
+        archivos = [p.name for p in tmp_path.iterdir() if p.is_file()]
+        assert archivos == [primera.rsplit('/', 1)[1]]
+
+    def test_resubida_renueva_la_antiguedad(self, tmp_path, indice):
+        """La limpieza cuenta el plazo desde la última subida, no la primera."""
+        contenido = b'%PDF-1.4 mismo comprobante'
+        url = ProofStorage.store(io.BytesIO(contenido), '.pdf', directory=str(tmp_path))
+        assert indice.renovados == []
+        ProofStorage.store(io.BytesIO(contenido), '.pdf', directory=str(tmp_path))
+        assert indice.renovados == [url.rsplit('/', 1)[1]]
+
+    def test_corta_al_pasar_el_tope(self, tmp_path, indice, monkeypatch):
+        """Pasado MAX_BYTES se rechaza sin dejar temporales."""
+        monkeypatch.setattr(ProofStorage, 'CHUNK_BYTES', 1024)
+        monkeypatch.setattr(ProofStorage, 'MAX_BYTES', 4096)
+        with pytest.raises(ProofStorageError, match='5 MB'):
+            ProofStorage.store(io.BytesIO(b'x' * 5000), '.jpg', directory=str(tmp_path))
+        assert list(tmp_path.iterdir()) == [] and indice == {}
+
+    def test_rechaza_vacio(self, tmp_path, indice):
+        """Un archivo de 0 bytes no se guarda."""
+        with pytest.raises(ProofStorageError, match='vacío'):
+            ProofStorage.store(io.BytesIO(b''), '.png', directory=str(tmp_path))
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestMiniaturas:
+    """Miniatura WebP para las vistas del operador."""
+
+    def test_genera_webp_reducida(self, tmp_path, indice):
+        """La imagen guardada lleva su miniatura en thumbs/ a THUMB_SIZE."""
+        url = ProofStorage.store(io.BytesIO(_png()), '.png', directory=str(tmp_path))
+        ruta = ProofStorage.thumbnail_path(str(tmp_path / url.rsplit('/', 1)[1]))
+        with Image.open(ruta) as mini:
+            assert mini.format == 'WEBP'
+            assert max(mini.size) == ProofStorage.THUMB_SIZE
+
+    def test_pdf_no_lleva_miniatura(self, tmp_path, indice):
+        """Los PDF se guardan tal cual."""
+        ProofStorage.store(io.BytesIO(b'%PDF-1.4'), '.pdf', directory=str(tmp_path))
+        assert not (tmp_path / 'thumbs').exists()
+
+    def test_imagen_ilegible_no_rompe(self, tmp_path):
+        """Un .jpg corrupto queda sin miniatura (la vista usa la original)."""
+        ruta = tmp_path / 'roto.jpg'
+        ruta.write_bytes(b'no es una imagen')
+        assert ProofStorage.make_thumbnail(str(ruta)) is None
+        assert os.listdir(tmp_path / 'thumbs') == []
+
+    @pytest.mark.parametrize('url, esperada', [
+        ('/static/proofs/abc.png', '/static/proofs/thumbs/abc.webp'),
+        ('/static/proofs/ORD-1_f00.JPEG', '/static/proofs/thumbs/ORD-1_f00.webp'),
+        ('/static/proofs/abc.pdf', '/static/proofs/abc.pdf'),
+        ('https://example.com/x.png', 'https://example.com/x.png'),
+        (None, None),
+    ])
+    def test_url_de_la_miniatura(self, url, esperada):
+        """Solo las imágenes locales tienen miniatura."""
+        assert ProofStorage.thumbnail_url(url) == esperada
@@ -1,9 +1,20 @@
 """
 Tests de Web Push: suscripciones de cliente, anónimo y operador.
 """
+import threading
+from types import SimpleNamespace
+
 import pytest
+from flask import Flask, current_app
+from py_vapid import Vapid01
+from pywebpush import WebPushException
 
 from app.models.push_subscription import PushSubscription
+from app.services import push_service
+from app.services.push_service import PushService
+
+# Clave de prueba (generada con scripts/generate_vapid_keys.py)
+VAPID_DE_PRUEBA = 'Y2BgmUO3-1WGmdEc138D_uquFwUoMRTp-0nNMqscdm8'
 
 
 @pytest.fixture
@@ -72,6 +83,18 @@ class TestSuscripciones:
         assert sub.is_active is False
         assert PushSubscription.get_active_for_anon('anon_test_4') == []
 
+    def test_desactivar_varios_endpoints(self, db, limpiar_subs):
+        """Los endpoints muertos de un envío se desactivan en un UPDATE."""
+        endpoints = ['https://push.example.com/test-anon-6',
+                     'https://push.example.com/test-anon-7']
+        limpiar_subs.extend(endpoints)
+        for endpoint in endpoints:
+            PushSubscription.upsert(endpoint=endpoint, p256dh='a', auth='b',
+                                    anon_id='anon_test_6')
+
+        assert PushSubscription.deactivate_endpoints(endpoints) == 2
+        assert PushSubscription.get_active_for_anon('anon_test_6') == []
+
     def test_formato_para_pywebpush(self, db, limpiar_subs):
         """El dict de suscripción tiene la forma que espera pywebpush."""
         endpoint = 'https://push.example.com/test-anon-5'
@@ -99,3 +122,84 @@ class TestRutasPush:
         r = client.post('/push/subscribe', json={'endpoint': 'https://x/y'})
         assert r.status_code == 400
         assert r.get_json()['ok'] is False
+
+
+class TestEnvioEnParalelo:
+    """Fan-out de PushService sin red ni BD (webpush reemplazado)."""
+
+    @pytest.fixture
+    def contexto(self, monkeypatch):
+        """App mínima con VAPID configurado; registra envíos y desactivaciones."""
+        app = Flask(__name__)
+        app.config.update(VAPID_PRIVATE_KEY=VAPID_DE_PRUEBA,
+                          VAPID_CLAIM_EMAIL='test@example.com')
+        registro = SimpleNamespace(enviados=[], hilos=set(), claves=set(),
+                                   desactivados=[])
+
+        def webpush_falso(subscription_info, data, vapid_private_key,
+                          vapid_claims, timeout, requests_session):
+            endpoint = subscription_info['endpoint']
+            registro.hilos.add(threading.current_thread().name)
+            registro.claves.add(id(vapid_private_key))
+            if endpoint.endswith('/muerto'):
+                raise WebPushException('Gone', response=SimpleNamespace(status_code=410))
+            if endpoint.endswith('/caido'):
+                raise WebPushException('Error', response=SimpleNamespace(status_code=503))
+            registro.enviados.append(endpoint)
+
+        monkeypatch.setattr(push_service, 'webpush', webpush_falso)
+        monkeypatch.setattr(PushSubscription, 'deactivate_endpoints', classmethod(
+            lambda cls, endpoints: registro.desactivados.append(list(endpoints))))
+        with app.app_context():
+            yield registro
+
+    @staticmethod
+    def _subs(*nombres):
+        return [
+            PushSubscription(endpoint=f'https://push.example.com/{nombre}',
+                             p256dh='p', auth='a')
+            for nombre in nombres
+        ]
+
+    def test_envia_a_todas_en_el_pool(self, contexto):
+        """Cada suscripción se envía desde un hilo del pool."""
+        subs = self._subs('uno', 'dos', 'tres')
+        assert PushService._send_to_subs(subs, 'Hola', 'Cuerpo', '/') == 3
+        assert sorted(contexto.enviados) == sorted(s.endpoint for s in subs)
+        assert all(h.startswith('webpush') for h in contexto.hilos)
+
+    def test_muertos_se_desactivan_juntos(self, contexto):
+        """404/410 se desactivan en una sola llamada; un 503 no."""
+        subs = self._subs('uno', 'muerto', 'caido')
+        subs.append(PushSubscription(endpoint='https://otro.example/muerto',
+                                     p256dh='p', auth='a'))
+
+        assert PushService._send_to_subs(subs, 'Hola', 'Cuerpo', '/') == 1
+        assert len(contexto.desactivados) == 1
+        assert sorted(contexto.desactivados[0]) == [
+            'https://otro.example/muerto', 'https://push.example.com/muerto'
+        ]
+
+    def test_fallas_transitorias_se_informan(self, contexto):
+        """Un 503 cuenta como fallido (reintentable); un 410 no."""
+        assert PushService._deliver(self._subs('uno', 'caido', 'muerto'),
+                                    'T', 'B', '/') == (1, 1)
+
+    def test_sin_vapid_todo_es_fallido(self, contexto):
+        current_app.config['VAPID_PRIVATE_KEY'] = None
+        assert PushService._deliver(self._subs('a', 'b'), 'T', 'B', '/') == (0, 2)
+
+    def test_clave_vapid_se_parsea_una_vez(self, contexto, monkeypatch):
+        """Varios envíos usan el mismo objeto de clave."""
+        PushService._vapid_key.cache_clear()
+        parseos = []
+        original = Vapid01.from_raw
+
+        def contar(raw):
+            parseos.append(raw)
+            return original(raw)
+
+        monkeypatch.setattr(push_service.Vapid01, 'from_raw', contar)
+        PushService._send_to_subs(self._subs('a', 'b'), 'T', 'B', '/')
+        PushService._send_to_subs(self._subs('c'), 'T', 'B', '/')
+        assert len(parseos) == 1 and len(contexto.claves) == 1
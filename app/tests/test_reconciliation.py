@@ -4,12 +4,16 @@ Tests de la conciliación pago ↔ orden.
 Lo crítico: que NUNCA vincule cuando hay duda. Un falso positivo aquí significa
 dar por bueno un pago que no entró.
 """
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import Decimal
 from types import SimpleNamespace
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
+from app.services import nombres
+from app.services.asignacion import asignacion_maxima, componentes, peso_total
+from app.services.benchmark_nombres import BenchmarkNombres, pares_de_prueba
 from app.services.reconciliation_service import (
     ReconciliationService, UMBRAL_VINCULACION, MARGEN_EMPATE
 )
@@ -170,3 +174,146 @@ class TestReglasDeSeguridad:
         solo_monto, _ = ReconciliationService._puntuar_monto(
             hacer_pago(15.00), hacer_orden(15.00))
         assert solo_monto < UMBRAL_VINCULACION
+
+
+class TestFiltrosCandidatos:
+    """Los filtros duros viajan a SQL: solo llegan al puntaje órdenes plausibles."""
+
+    @staticmethod
+    def _sql(condicion) -> str:
+        return str(condicion.compile(
+            dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}
+        ))
+
+    def test_banda_de_monto_y_ventana(self):
+        filtros = ReconciliationService._filtros_candidatos(hacer_pago(15.00))
+        sql = [self._sql(f) for f in filtros]
+        assert sql[0] == "orders.status = 'PENDING'"
+        # mismo respaldo por nombre que _metodo_de_orden
+        assert sql[1] == (
+            "lower(coalesce(nullif(payment_methods.code, ''), payment_methods.name)) = 'paypal'"
+        )
+        assert sql[2] == (
+            "orders.created_at BETWEEN '2026-07-11 14:30:00' AND '2026-07-13 14:30:00'"
+        )
+        # bruto en [amount_usd - 0.01, amount_usd + 1.00]
+        assert sql[3] == "orders.amount_usd BETWEEN 14.00 AND 15.01"
+        # una orden ya vinculada a otro pago no vuelve a ser candidata
+        assert sql[4].startswith('NOT (EXISTS (SELECT *')
+
+    def test_sin_fecha_monto_o_metodo_no_consulta(self):
+        assert ReconciliationService._filtros_candidatos(hacer_pago(fecha=None)) is None
+        assert ReconciliationService._filtros_candidatos(hacer_pago(metodo=None)) is None
+        pago = hacer_pago()
+        pago.importe_bruto = None
+        assert ReconciliationService._filtros_candidatos(pago) is None
+        assert ReconciliationService.buscar_candidatos(pago) == []
+
+    def test_busqueda_inversa_desde_la_orden(self):
+        orden = hacer_orden(15.00)
+        orden.payment_method_from = SimpleNamespace(code='PAYPAL', name='PayPal')
+        sql = [self._sql(f) for f in ReconciliationService._filtros_pagos(orden)]
+        assert sql == [
+            'payments.order_id IS NULL',
+            "payments.metodo = 'paypal'",
+            "payments.fecha_pago BETWEEN '2026-07-11 13:45:00' AND '2026-07-13 13:45:00'",
+            'payments.importe_bruto BETWEEN 14.99 AND 16.00',
+        ]
+
+    def test_orden_sin_metodo_no_busca_pagos(self):
+        orden = hacer_orden()
+        orden.payment_method_from = None
+        assert ReconciliationService._filtros_pagos(orden) is None
+        assert ReconciliationService.buscar_pago_para_orden(orden) is None
+
+    def test_la_banda_coincide_con_el_puntaje_de_monto(self):
+        """Toda orden que puntúa por monto cae dentro de la banda SQL."""
+        pago = hacer_pago(15.00)
+        for amount in ('14.00', '14.87', '14.99', '15.00', '15.01'):
+            puntos, _ = ReconciliationService._puntuar_monto(pago, hacer_orden(amount))
+            assert puntos > 0
+            assert Decimal('14.00') <= Decimal(amount) <= Decimal('15.01')
+
+
+def candidato(reference, score):
+    """Candidato como lo arma buscar_candidatos."""
+    return {'order': SimpleNamespace(id=reference), 'reference': reference,
+            'score': score, 'motivos': []}
+
+
+class TestConciliacionPorLote:
+    """El lote se resuelve como asignación global, con las mismas reglas."""
+
+    def test_un_pago_sigue_las_reglas_de_siempre(self):
+        decidir = ReconciliationService.decidir_lote
+        claro, parejo, flojo = decidir([
+            [candidato('A', 100), candidato('B', 85)],
+            [candidato('C', 85), candidato('D', 78)],
+            [candidato('E', 70)],
+        ])
+        assert claro['resultado'] == 'vinculado'
+        assert claro['candidato']['reference'] == 'A'
+        # el segundo no llega al umbral, pero está a menos del margen
+        assert parejo['resultado'] == 'revision'
+        assert [c['reference'] for c in parejo['candidatos']] == ['C', 'D']
+        assert flojo == {'resultado': 'sin_candidatos', 'mejor_score': 70}
+
+    def test_el_pago_temprano_no_se_queda_con_la_orden_del_otro(self):
+        """Greedy: el primero toma A (90) y el segundo se queda sin nada."""
+        decisiones = ReconciliationService.decidir_lote([
+            [candidato('A', 90), candidato('B', 80)],
+            [candidato('A', 100)],
+        ])
+        assert [d['candidato']['reference'] for d in decisiones] == ['B', 'A']
+
+    def test_dos_pagos_parejos_por_la_misma_orden_van_a_revision(self):
+        decisiones = ReconciliationService.decidir_lote([
+            [candidato('A', 100)],
+            [candidato('A', 95)],
+        ])
+        assert [d['resultado'] for d in decisiones] == ['revision', 'revision']
+
+    def test_ganador_claro_de_una_orden_disputada(self):
+        decisiones = ReconciliationService.decidir_lote([
+            [candidato('A', 125)],
+            [candidato('A', 85)],
+            [],
+        ])
+        assert decisiones[0]['resultado'] == 'vinculado'
+        assert decisiones[1] == {'resultado': 'sin_candidatos', 'mejor_score': 85}
+        assert decisiones[2] == {'resultado': 'sin_candidatos'}
+
+    def test_asignacion_maxima(self):
+        pesos = {('p1', 'A'): 90, ('p1', 'B'): 80, ('p2', 'A'): 100, ('p3', 'C'): 85}
+        asignacion = asignacion_maxima(pesos)
+        assert asignacion == {'p1': 'B', 'p2': 'A', 'p3': 'C'}
+        assert peso_total(pesos, asignacion) == 265
+        assert sorted(map(sorted, componentes(list(pesos)))) == [['p1', 'p2'], ['p3']]
+
+
+class TestMotorDeNombres:
+    """El comparador con caché concuerda con el anterior en las franjas."""
+
+    def test_concordancia_con_el_comparador_anterior(self):
+        informe = BenchmarkNombres(pares_de_prueba(2000, semilla=11)).concordancia()
+        assert informe['concordancia'] >= 0.9
+        assert informe['saltos'] == 0
+
+    def test_grafias_que_suenan_igual(self):
+        assert nombres.similitud('Yusmary Vasquez', 'Yusmary Basquez') == 1.0
+        assert nombres.similitud('Jose Chavez', 'José Chábez') == 1.0
+        assert nombres.similitud('Villalobos Yelitza', 'Yelitsa Biyalobos') == 1.0
+        # la ll no es una l: parecido, no idéntico
+        assert nombres.similitud('Villalobos Yelitza', 'Yelitza Vilalobos') < 1.0
+
+    def test_cada_nombre_se_prepara_una_vez(self):
+        nombres.forma_nombre.cache_clear()
+        for titular in ('Jose Mora', 'Ana Gomez', 'Luis Barrios'):
+            ReconciliationService.similitud_nombres('Jose Mora', titular)
+        assert nombres.forma_nombre.cache_info().misses == 3
+
+    def test_calibracion_respeta_los_umbrales(self):
+        assert nombres._calibrar(nombres.DICE_ALTO) == pytest.approx(0.85)
+        assert nombres._calibrar(nombres.DICE_MEDIO) == pytest.approx(0.65)
+        assert nombres._calibrar(1.0) == pytest.approx(1.0)
+        assert nombres._calibrar(0.0) == 0.0
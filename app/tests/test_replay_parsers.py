@@ -0,0 +1,123 @@
+"""
+Tests del archivo de correos y del replay offline de los parsers.
+
+Puros: el archivo vive en tmp_path y la consulta de pagos se sustituye por
+un dict en memoria.
+"""
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+
+from app.models.payment import Payment, PaymentProvider
+from app.services.archivo_correos import ArchivoCorreos
+from app.services.replay_parsers import ReplayParsers
+
+BOA = 'customerservice@ealerts.bankofamerica.com'
+
+
+def _correo(message_id: str, subject: str, sender: str = BOA) -> dict:
+    return {
+        'message_id': message_id, 'subject': subject, 'sender': sender,
+        'to_raw': 'ceiba21@gmail.com', 'date': 'Mon, 08 Jun 2026 12:00:00 -0500',
+        'html_body': '<p>alerta</p>', 'imap_uid': '7',
+    }
+
+
+class TestArchivoCorreos:
+
+    def test_guarda_comprimido_por_hash_y_es_idempotente(self, tmp_path):
+        archivo = ArchivoCorreos(tmp_path)
+        correo = _correo('<a@boa>', 'Luis le envió $50.00')
+        assert archivo.guardar(correo) is True
+        assert archivo.guardar(correo) is False
+
+        clave = ArchivoCorreos.clave('<a@boa>')
+        ruta = tmp_path / clave[:2] / f'{clave}.json.gz'
+        assert json.loads(gzip.decompress(ruta.read_bytes())) == correo
+        assert archivo.leer(clave) == correo
+        assert [e['message_id'] for e in archivo.indice()] == ['<a@boa>']
+
+    def test_sin_message_id_no_se_archiva(self, tmp_path):
+        archivo = ArchivoCorreos(tmp_path)
+        assert archivo.guardar(_correo('', 'x')) is False
+        assert list(archivo.correos()) == []
+
+    def test_indice_tolera_linea_truncada_y_filtra_por_fecha(self, tmp_path):
+        archivo = ArchivoCorreos(tmp_path)
+        archivo.guardar_todos([_correo('<a@boa>', 'x'), _correo('<b@boa>', 'y')])
+        with open(tmp_path / ArchivoCorreos.INDICE, 'a') as f:
+            f.write('{"clave": "corta')
+        assert len(list(archivo.correos())) == 2
+        assert list(archivo.indice(desde='2999-01-01')) == []
+
+
+class TestReplayParsers:
+
+    @pytest.fixture
+    def archivo(self, tmp_path):
+        archivo = ArchivoCorreos(tmp_path)
+        archivo.guardar_todos([
+            _correo('<igual@boa>', 'Ana le envió $50.00'),
+            _correo('<cambia@boa>', 'Luis Barrios le envió $1,355.66'),
+            _correo('<nuevo@boa>', 'Eva le envió $10.00'),
+            _correo('<perdido@boa>', 'Su estado de cuenta está listo'),
+            _correo('<spam@x>', 'Hola', sender='x@example.com'),
+        ])
+        return archivo
+
+    @pytest.fixture
+    def pagos(self, monkeypatch):
+        def pago(id_, message_id, pagador, importe):
+            p = Payment(
+                email_message_id=message_id, metodo=PaymentProvider.ZELLE,
+                pagador_nombre=pagador, importe_bruto=importe, moneda='USD',
+                fecha_pago=datetime(2026, 6, 8, 17, 0), datos_extra={},
+            )
+            p.id = id_
+            return p
+
+        filas = {p.email_message_id: p for p in (
+            pago(1, '<igual@boa>', 'Ana', 50.0),
+            pago(2, '<cambia@boa>', 'Luis Barrios', 1355.0),
+            pago(3, '<perdido@boa>', 'Raul', 20.0),
+        )}
+        monkeypatch.setattr(
+            Payment, 'get_by_email_message_ids',
+            classmethod(lambda cls, ids: {m: filas[m] for m in ids if m in filas}),
+        )
+        return filas
+
+    def test_informe_contra_payments(self, archivo, pagos):
+        replay = ReplayParsers(archivo)
+        replay.TRAMO = 2        # varios tramos
+        informe = replay.correr()
+
+        assert informe['correos'] == 5
+        assert informe['iguales'] == 1
+        assert informe['ignorados'] == 1
+        assert [c['payment_id'] for c in informe['cambios']] == [2]
+        assert informe['cambios'][0]['diferencias'] == {
+            'importe_bruto': [1355.0, 1355.66]
+        }
+        assert [n['message_id'] for n in informe['nuevos']] == ['<nuevo@boa>']
+        assert informe['perdidos'] == [{
+            'message_id': '<perdido@boa>', 'payment_id': 3,
+            'motivo': 'no_reconocido',
+        }]
+
+    def test_en_paralelo_da_el_mismo_informe(self, archivo, pagos):
+        serie = ReplayParsers(archivo).correr()
+        paralelo = ReplayParsers(archivo, workers=2).correr()
+        serie.pop('segundos'), paralelo.pop('segundos')
+        assert paralelo == serie
+
+    def test_comparar_normaliza_decimal_y_datos_extra(self):
+        pago = Payment(metodo='paypal', importe_bruto=10, moneda='USD',
+                       datos_extra={'subtipo': 'ff', 'conciliado': True})
+        datos = {'metodo': 'paypal', 'importe_bruto': 10.0, 'moneda': None,
+                 'datos_extra': {'subtipo': 'gs'}}
+        assert ReplayParsers.comparar(pago, datos) == {
+            'datos_extra.subtipo': ['ff', 'gs']
+        }
@@ -0,0 +1,177 @@
+"""
+Tests del cliente saliente compartido de Telegram (TelegramSender).
+
+La planificación se prueba con un reloj falso; los envíos, con una sesión
+HTTP de juguete que responde como la Bot API. Sin red.
+"""
+import threading
+from collections import deque
+
+import pytest
+
+from app.channels.telegram_channel import TelegramChannel
+from app.telegram.bot import TelegramPublisher
+from app.telegram.sender import TelegramSender, TelegramSendError, TokenBucket, _Envio
+
+
+class _Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+class _Respuesta:
+    def __init__(self, cuerpo):
+        self._cuerpo = cuerpo
+
+    def json(self):
+        return self._cuerpo
+
+
+class _SesionFalsa:
+    """Devuelve las respuestas programadas, en orden; luego ok."""
+
+    def __init__(self, *respuestas):
+        self.respuestas = list(respuestas)
+        self.llamadas = []
+        self._lock = threading.Lock()
+
+    def post(self, url, data=None, files=None, timeout=None):
+        with self._lock:
+            self.llamadas.append((url.rsplit('/', 1)[1], data, files))
+            if self.respuestas:
+                return _Respuesta(self.respuestas.pop(0))
+        return _Respuesta({'ok': True, 'result': {'message_id': len(self.llamadas)}})
+
+
+def _encolar(sender, chat_id, n=1):
+    """Encolar sin arrancar el planificador (se despacha a mano)."""
+    for _ in range(n):
+        sender._colas.setdefault(str(chat_id), deque()).append(
+            _Envio(str(chat_id), 'sendMessage', {'chat_id': chat_id}, None)
+        )
+
+
+def _despachar(sender):
+    """Envíos que salen ya mismo (sin avanzar el reloj)."""
+    salidos = []
+    while True:
+        envio, _espera = sender._siguiente(sender.clock())
+        if envio is None:
+            return salidos
+        salidos.append(envio.chat_id)
+
+
+class TestTokenBucket:
+
+    def test_rafaga_y_ritmo(self):
+        bucket = TokenBucket(rate=2, capacity=2, now=0.0)
+        for _ in range(2):
+            assert bucket.wait_time(0.0) == 0
+            bucket.take(0.0)
+        assert bucket.wait_time(0.0) == pytest.approx(0.5)
+        assert bucket.wait_time(0.5) == 0
+
+    def test_pausa_por_retry_after(self):
+        bucket = TokenBucket(rate=1, capacity=1, now=0.0)
+        bucket.pause_until(5.0)
+        assert bucket.wait_time(1.0) == pytest.approx(4.0)
+        assert bucket.wait_time(5.0) == 0
+
+
+class TestPlanificacion:
+    """Límites de Telegram: 1 msg/s por chat, 30 msg/s en total."""
+
+    def test_un_mensaje_por_segundo_por_chat_sin_frenar_a_otros(self):
+        reloj = _Reloj()
+        sender = TelegramSender('T', session=_SesionFalsa(), clock=reloj)
+        _encolar(sender, 'A', 3)
+        _encolar(sender, 'B', 1)
+
+        assert _despachar(sender) == ['A', 'B']
+        _envio, espera = sender._siguiente(reloj())
+        assert espera == pytest.approx(1.0)
+
+        reloj.ahora += 1.0
+        assert _despachar(sender) == ['A']
+
+    def test_tope_global(self):
+        reloj = _Reloj()
+        sender = TelegramSender('T', session=_SesionFalsa(), clock=reloj)
+        for chat in range(35):
+            _encolar(sender, chat)
+
+        assert len(_despachar(sender)) == TelegramSender.GLOBAL_RATE
+        _envio, espera = sender._siguiente(reloj())
+        assert espera == pytest.approx(1 / TelegramSender.GLOBAL_RATE)
+
+
+class TestEnvio:
+    """Cola real (hilos) contra la sesión falsa."""
+
+    def test_submit_vuelve_al_instante_y_resuelve(self):
+        sesion = _SesionFalsa()
+        sender = TelegramSender('T', session=sesion)
+        futuro = sender.submit('sendMessage', {'chat_id': 1, 'text': 'hola',
+                                               'reply_markup': {'inline_keyboard': []}})
+        assert futuro.result(timeout=5) == {'message_id': 1}
+        metodo, datos, _ = sesion.llamadas[0]
+        assert metodo == 'sendMessage' and datos['reply_markup'] == '{"inline_keyboard": []}'
+
+    def test_429_espera_retry_after_y_reintenta(self):
+        sesion = _SesionFalsa({'ok': False, 'error_code': 429,
+                               'description': 'Too Many Requests',
+                               'parameters': {'retry_after': 0.05}})
+        sender = TelegramSender('T', session=sesion)
+        assert sender.call('sendMessage', {'chat_id': 9, 'text': 'x'}, timeout=5) == {
+            'message_id': 2
+        }
+        assert len(sesion.llamadas) == 2
+
+    def test_timeout_en_cola_cancela_el_envio(self):
+        """Si vence la espera con el chat en pausa, el mensaje no sale después."""
+        sesion = _SesionFalsa({'ok': False, 'error_code': 429,
+                               'description': 'Too Many Requests',
+                               'parameters': {'retry_after': 30}})
+        sender = TelegramSender('T', session=sesion)
+        with pytest.raises(TelegramSendError, match='cancelado'):
+            sender.call('sendMessage', {'chat_id': 9, 'text': 'x'}, timeout=0.2)
+
+        assert len(sesion.llamadas) == 1
+        assert not sender._colas.get('9')
+
+    def test_error_de_telegram(self):
+        sesion = _SesionFalsa({'ok': False, 'error_code': 403,
+                               'description': 'Forbidden: bot was blocked by the user'})
+        sender = TelegramSender('T', session=sesion)
+        with pytest.raises(TelegramSendError, match='blocked'):
+            sender.call('sendMessage', {'chat_id': 9, 'text': 'x'}, timeout=5)
+
+
+class TestUsuarios:
+    """TelegramChannel y TelegramPublisher usan el sender compartido."""
+
+    def test_canal_envia_por_el_sender(self, monkeypatch):
+        sesion = _SesionFalsa()
+        monkeypatch.setattr(TelegramSender, 'for_token', classmethod(
+            lambda cls, token: TelegramSender(token, session=sesion)))
+
+        canal = TelegramChannel({'bot_token': 'T'})
+        assert canal.send_message('555', '<b>hola</b>') == (True, '1')
+        assert sesion.llamadas[0][1] == {'chat_id': '555', 'text': '<b>hola</b>',
+                                         'parse_mode': 'HTML'}
+
+    def test_publicador_sube_la_imagen(self, monkeypatch, tmp_path):
+        sesion = _SesionFalsa()
+        monkeypatch.setattr(TelegramSender, 'for_token', classmethod(
+            lambda cls, token: TelegramSender(token, session=sesion)))
+        imagen = tmp_path / 'cotizaciones.png'
+        imagen.write_bytes(b'png')
+
+        resultado = TelegramPublisher('T', '@canal').publish_quotes_sync(str(imagen), 'Hoy')
+        assert resultado['success'] and resultado['message_id'] == 1
+        metodo, datos, archivos = sesion.llamadas[0]
+        assert metodo == 'sendPhoto' and datos['caption'] == 'Hoy'
+        assert archivos == {'photo': ('cotizaciones.png', b'png')}
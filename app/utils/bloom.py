@@ -0,0 +1,78 @@
+"""
+Filtro de Bloom en memoria (puro Python, sin dependencias).
+
+Responde "seguro que NO está" o "puede que esté". Sirve para que las consultas
+negativas —la inmensa mayoría— no lleguen a PostgreSQL: solo ante un "puede
+que esté" se confirma contra la base de datos. Nunca da falsos negativos.
+"""
+import hashlib
+import math
+from typing import Iterable
+
+
+class BloomFilter:
+    """Filtro de Bloom con doble hashing sobre blake2b.
+
+    Attributes:
+        num_bits: Tamaño del arreglo de bits.
+        num_hashes: Cantidad de posiciones que marca cada elemento.
+        cantidad: Elementos agregados.
+    """
+
+    def __init__(self, capacidad: int, tasa_falsos_positivos: float = 0.01) -> None:
+        """
+        Args:
+            capacidad: Cantidad esperada de elementos (se usa al menos 1).
+            tasa_falsos_positivos: Probabilidad de falso positivo deseada.
+        """
+        capacidad = max(int(capacidad), 1)
+        bits = -capacidad * math.log(tasa_falsos_positivos) / (math.log(2) ** 2)
+        self.num_bits = max(int(math.ceil(bits)), 64)
+        self.num_hashes = max(int(round(self.num_bits / capacidad * math.log(2))), 1)
+        self.cantidad = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    @classmethod
+    def desde(
+        cls,
+        elementos: Iterable[str],
+        tasa_falsos_positivos: float = 0.01
+    ) -> 'BloomFilter':
+        """Construye un filtro dimensionado para los elementos dados.
+
+        Args:
+            elementos: Cadenas a incluir.
+            tasa_falsos_positivos: Probabilidad de falso positivo deseada.
+
+        Returns:
+            BloomFilter con todos los elementos agregados.
+        """
+        lista = list(elementos)
+        filtro = cls(len(lista), tasa_falsos_positivos)
+        for elemento in lista:
+            filtro.agregar(elemento)
+        return filtro
+
+    def _posiciones(self, elemento: str):
+        """Posiciones de bit del elemento (doble hashing de Kirsch-Mitzenmacher)."""
+        digest = hashlib.blake2b(elemento.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def agregar(self, elemento: str) -> None:
+        """Agrega un elemento al filtro."""
+        for pos in self._posiciones(elemento):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.cantidad += 1
+
+    def __contains__(self, elemento: str) -> bool:
+        """False = seguro que no está; True = puede que esté."""
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7))
+            for pos in self._posiciones(elemento)
+        )
+
+    def __len__(self) -> int:
+        return self.cantidad
@@ -0,0 +1,133 @@
+"""
+Normalización de identificadores de personas (teléfono, email, DNI, Telegram).
+
+Un mismo dato llega escrito de muchas formas: "0414-123.45.67", "+58 414
+1234567" y "584141234567" son el mismo teléfono. Comparar el texto crudo deja
+pasar las variantes de formato, así que todo lo que se compara (blacklist,
+verificación de fraude) pasa antes por estas funciones y se guarda en su forma
+canónica.
+"""
+import re
+from typing import Optional, Union
+
+# Prefijo internacional que se asume cuando el número viene sin código de país
+# (la mayoría de los clientes son de Venezuela). Un número colombiano escrito
+# sin +57 no se puede distinguir de uno venezolano: se normaliza como +58.
+PREFIJO_PAIS_DEFECTO = '58'
+
+# Dominios que son alias de otro: se reescriben al canónico.
+_ALIAS_DOMINIO = {
+    'googlemail.com': 'gmail.com',
+}
+
+# Dominios donde los puntos de la parte local no cuentan (j.mora == jmora).
+_DOMINIOS_SIN_PUNTOS = frozenset({'gmail.com'})
+
+# Prefijos de tipo de documento: V-/E-/J- (Venezuela), CC/CE (Colombia),
+# C.I., DNI, RIF, pasaporte... Solo se quitan si van seguidos de dígitos.
+_PREFIJO_DNI_RE = re.compile(
+    r'^(?:PASAPORTE|DNI|RIF|NIT|PAS|CI|CC|CE|[VEJGP])(?=\d)'
+)
+
+
+def normalizar_telefono(
+    telefono: Optional[str],
+    prefijo_pais: str = PREFIJO_PAIS_DEFECTO
+) -> Optional[str]:
+    """Lleva un teléfono a formato E.164 (``+584141234567``).
+
+    Reglas:
+        - ``+`` o ``00`` al inicio: ya trae código de país.
+        - ``0`` al inicio: número nacional con prefijo troncal; se quita el 0
+          y se antepone ``prefijo_pais``.
+        - 10 dígitos o menos sin prefijo: número nacional sin el 0.
+        - Más de 10 dígitos: se asume que ya trae el código de país.
+
+    Args:
+        telefono: Teléfono tal como lo escribió el operador o el cliente.
+        prefijo_pais: Código de país a usar cuando el número no lo trae.
+
+    Returns:
+        Teléfono en E.164, o None si no contiene dígitos.
+    """
+    if not telefono:
+        return None
+    texto = str(telefono).strip()
+    digitos = re.sub(r'\D', '', texto)
+    if not digitos:
+        return None
+
+    if texto.startswith('+'):
+        pass
+    elif digitos.startswith('00'):
+        digitos = digitos[2:]
+    elif digitos.startswith('0'):
+        digitos = prefijo_pais + digitos.lstrip('0')
+    elif len(digitos) <= 10:
+        digitos = prefijo_pais + digitos
+
+    return f'+{digitos}' if digitos else None
+
+
+def normalizar_email(email: Optional[str]) -> Optional[str]:
+    """Forma canónica de un email.
+
+    Minúsculas, sin la etiqueta ``+algo`` de la parte local, con los alias de
+    dominio resueltos (googlemail → gmail) y, en Gmail, sin puntos en la parte
+    local. ``J.Mora+ceiba@GoogleMail.com`` queda como ``jmora@gmail.com``.
+
+    Args:
+        email: Dirección de correo.
+
+    Returns:
+        Email canónico, o None si viene vacío.
+    """
+    if not email:
+        return None
+    texto = str(email).strip().lower()
+    if '@' not in texto:
+        return texto or None
+
+    local, dominio = texto.rsplit('@', 1)
+    dominio = _ALIAS_DOMINIO.get(dominio, dominio)
+    local = local.split('+', 1)[0]
+    if dominio in _DOMINIOS_SIN_PUNTOS:
+        local = local.replace('.', '')
+    return f'{local}@{dominio}'
+
+
+def normalizar_dni(dni: Optional[str]) -> Optional[str]:
+    """Documento de identidad sin prefijo de tipo, signos ni ceros a la izquierda.
+
+    ``V-12.345.678``, ``C.I. 12345678`` y ``12345678`` quedan como
+    ``12345678``. Los pasaportes alfanuméricos conservan sus letras internas.
+
+    Args:
+        dni: Documento tal como se escribió.
+
+    Returns:
+        Documento normalizado, o None si no queda nada.
+    """
+    if not dni:
+        return None
+    texto = re.sub(r'[^0-9A-Z]', '', str(dni).upper())
+    texto = _PREFIJO_DNI_RE.sub('', texto)
+    texto = texto.lstrip('0')
+    return texto or None
+
+
+def normalizar_telegram_id(telegram_id: Union[int, str, None]) -> Optional[str]:
+    """ID de Telegram como texto de dígitos (``'123456789'``).
+
+    Args:
+        telegram_id: ID numérico o texto.
+
+    Returns:
+        ID en texto, o None si no es un número válido.
+    """
+    if telegram_id is None or telegram_id == '':
+        return None
+    try:
+        return str(int(str(telegram_id).strip()))
+    except ValueError:
+        return None
@@ -0,0 +1,191 @@
+"""
+Lectura de respuestas IMAP FETCH (puro Python, sin dependencias).
+
+imaplib devuelve las respuestas a medio parsear: una lista donde cada literal
+``{n}`` llega como tupla (texto previo, bytes) y el resto como bytes sueltos.
+Aquí se reconstruye cada mensaje como un dict de atributos (UID, BODYSTRUCTURE,
+BODY[...]) y se ubica la parte text/html dentro de un BODYSTRUCTURE, para poder
+pedir solo esa sección en vez del mensaje completo.
+"""
+import base64
+import quopri
+from typing import Iterator, List, Optional, Tuple, Union
+
+# Valor de un atributo FETCH: átomo/cadena, literal, NIL o lista anidada
+Valor = Union[str, bytes, None, list]
+
+
+def _segmentos(data: list) -> Iterator[Union[str, bytes]]:
+    """Aplana la lista de imaplib en texto (str) y literales (bytes)."""
+    for item in data:
+        if isinstance(item, tuple):
+            yield item[0].decode('utf-8', errors='replace')
+            yield item[1]
+        elif isinstance(item, bytes):
+            yield item.decode('utf-8', errors='replace')
+
+
+def _tokens(data: list) -> Iterator[Valor]:
+    """
+    Tokeniza la respuesta: '(' y ')', átomos, cadenas entre comillas, NIL y
+    literales. Un átomo con corchetes (``BODY[HEADER.FIELDS (FROM)]``) es un
+    solo token aunque tenga espacios y paréntesis adentro.
+    """
+    for segmento in _segmentos(data):
+        if isinstance(segmento, bytes):
+            yield segmento
+            continue
+        i, n = 0, len(segmento)
+        while i < n:
+            c = segmento[i]
+            if c in ' \r\n':
+                i += 1
+            elif c in '()':
+                yield c
+                i += 1
+            elif c == '"':
+                j, partes = i + 1, []
+                while j < n and segmento[j] != '"':
+                    if segmento[j] == '\\' and j + 1 < n:
+                        j += 1
+                    partes.append(segmento[j])
+                    j += 1
+                yield ''.join(partes)
+                i = j + 1
+            elif c == '{':
+                # Marcador de literal: el siguiente segmento trae los bytes
+                i = segmento.index('}', i) + 1
+            else:
+                j, profundidad = i, 0
+                while j < n:
+                    if segmento[j] == '[':
+                        profundidad += 1
+                    elif segmento[j] == ']':
+                        profundidad -= 1
+                    elif profundidad == 0 and segmento[j] in ' ()\r\n':
+                        break
+                    j += 1
+                atomo = segmento[i:j]
+                yield None if atomo.upper() == 'NIL' else atomo
+                i = j
+
+
+def _lista(tokens: Iterator[Valor]) -> list:
+    """Consume tokens hasta el ')' que cierra la lista actual."""
+    resultado = []
+    for token in tokens:
+        if token == ')':
+            return resultado
+        resultado.append(_lista(tokens) if token == '(' else token)
+    raise ValueError("Respuesta FETCH truncada: falta ')'")
+
+
+def parsear_fetch(data: list) -> List[dict]:
+    """
+    Convierte la respuesta de un UID FETCH de varios mensajes en dicts.
+
+    Args:
+        data: Segundo elemento de lo que devuelve ``imaplib.uid('FETCH', ...)``.
+
+    Returns:
+        Un dict por mensaje con las claves en mayúsculas, p. ej.
+        ``{'UID': '345', 'BODYSTRUCTURE': [...], 'BODY[1.2]': b'...'}``.
+
+    Raises:
+        ValueError: Si la respuesta está mal formada.
+    """
+    mensajes = []
+    tokens = _tokens(data)
+    for token in tokens:
+        if token != '(':
+            continue  # número de secuencia del mensaje
+        atributos = _lista(tokens)
+        if len(atributos) % 2:
+            raise ValueError(f"Atributos FETCH impares: {atributos!r}")
+        mensajes.append({
+            str(atributos[k]).upper(): atributos[k + 1]
+            for k in range(0, len(atributos), 2)
+        })
+    return mensajes
+
+
+def _texto(valor: Valor) -> str:
+    """Valor escalar de BODYSTRUCTURE como str en minúsculas ('' si es NIL)."""
+    if isinstance(valor, bytes):
+        valor = valor.decode('utf-8', errors='replace')
+    return (valor or '').lower() if isinstance(valor, str) else ''
+
+
+def buscar_parte_html(
+    estructura: list,
+    seccion: str = ''
+) -> Optional[Tuple[str, str, Optional[str]]]:
+    """
+    Busca la primera parte text/html de un BODYSTRUCTURE (mismo orden que
+    ``Message.walk()``: en profundidad).
+
+    Args:
+        estructura: BODYSTRUCTURE ya parseado (lista anidada).
+        seccion: Número de sección de `estructura` ('' en la raíz).
+
+    Returns:
+        (sección, codificación de transferencia, charset) o None si no hay
+        parte HTML. Un mensaje que no es multipart es la sección '1'.
+    """
+    if not estructura:
+        return None
+
+    if isinstance(estructura[0], list):
+        # Multipart: las partes hijas van primero; el subtipo corta la lista
+        hijas = []
+        for parte in estructura:
+            if not isinstance(parte, list):
+                break
+            hijas.append(parte)
+        for numero, hija in enumerate(hijas, start=1):
+            encontrada = buscar_parte_html(
+                hija, f'{seccion}.{numero}' if seccion else str(numero)
+            )
+            if encontrada:
+                return encontrada
+        return None
+
+    if _texto(estructura[0]) != 'text' or _texto(estructura[1]) != 'html':
+        return None
+
+    charset = None
+    parametros = estructura[2] if len(estructura) > 2 else None
+    if isinstance(parametros, list):
+        for k in range(0, len(parametros) - 1, 2):
+            if _texto(parametros[k]) == 'charset':
+                charset = _texto(parametros[k + 1]) or None
+    codificacion = _texto(estructura[5]) if len(estructura) > 5 else ''
+    return seccion or '1', codificacion or '7bit', charset
+
+
+def decodificar_parte(
+    contenido: bytes,
+    codificacion: str,
+    charset: Optional[str]
+) -> str:
+    """
+    Deshace la codificación de transferencia y el charset de una parte.
+
+    Args:
+        contenido: Bytes de la sección tal como los entrega BODY[n].
+        codificacion: 'base64', 'quoted-printable', '7bit', '8bit'...
+        charset: Charset declarado (None = utf-8).
+
+    Returns:
+        El texto de la parte (los bytes inválidos se reemplazan).
+    """
+    codificacion = (codificacion or '').lower()
+    if codificacion == 'base64':
+        contenido = base64.b64decode(contenido)  # ignora saltos de línea
+    elif codificacion == 'quoted-printable':
+        contenido = quopri.decodestring(contenido)
+    try:
+        return contenido.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        # Charset desconocido (p. ej. 'unknown-8bit'): utf-8 tolerante
+        return contenido.decode('utf-8', errors='replace')
@@ -0,0 +1,26 @@
+"""
+Configuración de Gunicorn (se carga sola desde el directorio de trabajo).
+
+El chat web mantiene abierta una conexión SSE por visitante (/chat/stream).
+Con workers ``sync`` cada stream tomaría un worker entero, y los 3 workers se
+agotarían con 3 visitantes. ``gthread`` atiende cada conexión en un hilo del
+worker: un stream ocioso solo espera en Redis (sin conexión de BD tomada) y
+se cierra a los 5 min (ChatService.STREAM_MAX_SECONDS) para que el navegador
+reconecte. No requiere dependencias extra ni monkeypatching (gevent), que
+chocaría con el bot de Telegram y APScheduler.
+
+Capacidad: workers × threads conexiones simultáneas entre streams y
+peticiones normales.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+# Con gthread el timeout vigila el latido del worker, no la duración de cada
+# petición: un stream largo no lo dispara.
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
@@ -0,0 +1,53 @@
+"""
+Benchmark del comparador de nombres de la conciliación.
+
+Mide app/services/nombres.py contra el comparador anterior (SequenceMatcher)
+sobre un corpus sintético reproducible: pares/segundo en una matriz
+pagadores × titulares como la de un lote, y concordancia por franja con los
+umbrales 0.85 / 0.65. Sale con código 1 si la concordancia baja de la mínima
+o si algún par salta de "coincide" a "nada" (o al revés). Corre offline.
+
+Uso:
+    python scripts/bench_nombres.py
+    python scripts/bench_nombres.py --pares=20000 --semilla=3 --minima=0.9
+"""
+import json
+import os
+import sys
+
+# Permitir importar el paquete `app` al correr el script desde la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.benchmark_nombres import BenchmarkNombres, pares_de_prueba
+
+CONCORDANCIA_MINIMA = 0.9
+
+
+def _opcion(nombre: str, por_defecto=None):
+    """Valor de --nombre=valor en la línea de comandos."""
+    for arg in sys.argv[1:]:
+        if arg.startswith(f'--{nombre}='):
+            return arg.split('=', 1)[1]
+    return por_defecto
+
+
+def main() -> int:
+    """Corre el benchmark, lo imprime y valida la concordancia."""
+    pares = pares_de_prueba(int(_opcion('pares', 5000)), int(_opcion('semilla', 7)))
+    minima = float(_opcion('minima', CONCORDANCIA_MINIMA))
+
+    informe = BenchmarkNombres(pares).correr()
+    print(json.dumps(informe, indent=2))
+
+    concordancia = informe['concordancia']
+    if concordancia['saltos'] or concordancia['concordancia'] < minima:
+        print(f"REGRESIÓN: concordancia {concordancia['concordancia']:.1%} "
+              f"(mínima {minima:.0%}), {concordancia['saltos']} saltos de franja")
+        return 1
+    print(f"OK: concordancia {concordancia['concordancia']:.1%}, "
+          f"{informe['velocidad']['aceleracion']}x más rápido con caché")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+"""
+Benchmark de los parsers de correos sobre el corpus anonimizado.
+
+Mide cada parser y ParserRegistry.parse de punta a punta (correos/segundo,
+latencia p50/p99, memoria pico) y lo compara con la línea base guardada en
+app/tests/corpus/bench_parsers_baseline.json. Sale con código 1 si alguna
+métrica empeoró más que la tolerancia. Corre offline: no usa Gmail ni la BD.
+
+La línea base depende de la máquina: se guarda en el Raspberry de producción
+(o donde se vaya a comparar) con --guardar-baseline, y se vuelve a guardar
+solo cuando un cambio de rendimiento es intencional.
+
+Uso:
+    python scripts/bench_parsers.py
+    python scripts/bench_parsers.py --iteraciones=50 --tolerancia=0.4
+    python scripts/bench_parsers.py --guardar-baseline
+"""
+import json
+import os
+import sys
+
+# Permitir importar el paquete `app` al correr el script desde la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.parsers.benchmark import BASELINE, BenchmarkParsers, cargar_corpus
+
+
+def _opcion(nombre: str, por_defecto=None):
+    """Valor de --nombre=valor en la línea de comandos."""
+    for arg in sys.argv[1:]:
+        if arg.startswith(f'--{nombre}='):
+            return arg.split('=', 1)[1]
+    return por_defecto
+
+
+def main() -> int:
+    """Corre el benchmark, lo imprime y lo compara con la línea base."""
+    iteraciones = int(_opcion('iteraciones', BenchmarkParsers.ITERACIONES))
+    tolerancia = float(_opcion('tolerancia', BenchmarkParsers.TOLERANCIA))
+
+    corpus = cargar_corpus()
+    print(f"{len(corpus)} correos en el corpus, {iteraciones} iteraciones")
+    actual = BenchmarkParsers(corpus, iteraciones=iteraciones).correr()
+
+    print(f"{'':<16}{'correos/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'pico KB':>10}")
+    for nombre, m in actual['resultados'].items():
+        print(f"{nombre:<16}{m['correos_por_segundo']:>12}{m['p50_ms']:>10}"
+              f"{m['p99_ms']:>10}{m['memoria_pico_kb']:>10}")
+
+    if '--guardar-baseline' in sys.argv[1:]:
+        with open(BASELINE, 'w', encoding='utf-8') as f:
+            json.dump(actual, f, indent=2)
+            f.write('\n')
+        print(f"Línea base guardada en {BASELINE}")
+        return 0
+
+    if not BASELINE.exists():
+        print("Sin línea base: correr con --guardar-baseline para crearla")
+        return 0
+    with open(BASELINE, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('entorno') != actual['entorno']:
+        print(f"AVISO: la línea base es de otro entorno ({baseline.get('entorno')}); "
+              f"la comparación es orientativa")
+
+    regresiones = BenchmarkParsers.comparar(actual, baseline, tolerancia)
+    if not regresiones:
+        print(f"Sin regresiones respecto de la línea base (tolerancia {tolerancia:.0%})")
+        return 0
+    print("REGRESIONES:")
+    for regresion in regresiones:
+        print(f"  - {regresion}")
+    return 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
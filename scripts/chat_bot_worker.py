@@ -0,0 +1,69 @@
+"""
+Worker de los turnos del bot del chat web (cola en Redis).
+
+Saca de la cola los mensajes de clientes que el bot debe contestar y corre
+su turno fuera del request HTTP, en orden estricto dentro de cada
+conversación y en paralelo entre conversaciones. Ver ChatBotQueue.
+
+Mientras no corre (sin latido en Redis), el chat web contesta dentro del
+request como siempre: se puede detener sin perder respuestas.
+
+Uso manual:
+    python scripts/chat_bot_worker.py
+    python scripts/chat_bot_worker.py --hilos=8
+
+En el Raspberry, como servicio systemd:
+    [Service]
+    ExecStart=/var/www/cotizaciones/venv/bin/python \\
+        /var/www/cotizaciones/scripts/chat_bot_worker.py --hilos=4
+    Restart=always
+    User=webmaster
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+
+# Permitir importar el paquete `app` al correr el script desde la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import db
+from app.services.chat_bot_queue import ChatBotQueue
+from app.services.chat_service import ChatService
+
+
+def _opcion(nombre: str, por_defecto=None):
+    """Valor de --nombre=valor en la línea de comandos."""
+    for arg in sys.argv[1:]:
+        if arg.startswith(f'--{nombre}='):
+            return arg.split('=', 1)[1]
+    return por_defecto
+
+
+def main() -> None:
+    """Atiende la cola hasta recibir SIGTERM/SIGINT."""
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
+    app = create_app()
+    detener = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: detener.set())
+    signal.signal(signal.SIGINT, lambda *_: detener.set())
+
+    def procesar(conversation_id: int, turno: dict) -> None:
+        # Cada turno en su propio contexto: la sesión de BD es por hilo y no
+        # se arrastra entre turnos
+        with app.app_context():
+            try:
+                ChatService.process_bot_turn(conversation_id, turno)
+            finally:
+                db.session.remove()
+
+    with app.app_context():
+        ChatBotQueue(procesar, hilos=int(_opcion('hilos', 4))).correr(detener)
+
+
+if __name__ == '__main__':
+    main()
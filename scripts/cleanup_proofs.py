@@ -9,6 +9,10 @@ el clip del chat.
 Los comprobantes que SÍ pertenecen a una orden NUNCA se borran: son evidencia
 de pago y su retención es una decisión de negocio, no de mantenimiento.
 
+Recorre el índice ``proof_files`` (ProofFile, por antigüedad) en vez del
+directorio, y borra cada huérfano junto con su miniatura. Los archivos
+anteriores al índice se indexan con scripts/migrate_proof_files.py.
+
 Uso:
     python scripts/cleanup_proofs.py --dry-run     # solo listar (recomendado la primera vez)
     python scripts/cleanup_proofs.py               # borrar huérfanos de más de 7 días
@@ -17,15 +21,16 @@ Uso:
 import argparse
 import os
 import sys
-import time
+from datetime import datetime, timedelta
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from app import create_app
 from app.models.order import Order
+from app.models.proof_file import ProofFile
+from app.services.proof_storage import ProofStorage
 
-PROOFS_DIR = os.path.join('app', 'static', 'proofs')
 DEFAULT_DAYS = 7
 
 
@@ -60,35 +65,23 @@ def main() -> int:
 
     app = create_app()
     with app.app_context():
-        if not os.path.isdir(PROOFS_DIR):
-            print(f"ℹ️  No existe {PROOFS_DIR}: nada que limpiar.")
-            return 0
-
         en_uso = _referenciados()
-        limite = time.time() - (args.days * 86400)
+        limite = datetime.utcnow() - timedelta(days=args.days)
 
         borrados, liberado, conservados = 0, 0, 0
 
-        for nombre in os.listdir(PROOFS_DIR):
-            ruta = os.path.join(PROOFS_DIR, nombre)
-            if not os.path.isfile(ruta) or nombre == '.gitkeep':
-                continue
-
-            if nombre in en_uso:
+        for proof in ProofFile.get_older_than(limite):
+            if proof.filename in en_uso:
                 conservados += 1
                 continue
 
-            if os.path.getmtime(ruta) > limite:
-                continue  # huérfano, pero aún reciente
-
-            tamano = os.path.getsize(ruta)
             if args.dry_run:
-                print(f"[dry-run] borraría: {nombre} ({_humano(tamano)})")
+                print(f"[dry-run] borraría: {proof.filename} ({_humano(proof.size)})")
             else:
-                os.remove(ruta)
-                print(f"🗑️  borrado: {nombre} ({_humano(tamano)})")
+                ProofStorage.delete(proof)
+                print(f"🗑️  borrado: {proof.filename} ({_humano(proof.size)})")
             borrados += 1
-            liberado += tamano
+            liberado += proof.size
 
         accion = 'se borrarían' if args.dry_run else 'borrados'
         print(
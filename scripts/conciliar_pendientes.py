@@ -0,0 +1,51 @@
+"""
+Barrido nocturno de conciliación de pagos sin orden.
+
+Concilia como un solo lote (asignación global, ver
+ReconciliationService.conciliar_lote) los pagos de los últimos días que
+siguen sin orden vinculada: los que llegaron antes que su orden, o cuya
+orden candidata quedó libre después. No toca los pagos en REVISION ni los
+ya PAGADOS.
+
+Uso manual:
+    python scripts/conciliar_pendientes.py
+    python scripts/conciliar_pendientes.py --dias=7
+
+Cron en el Raspberry (todas las noches, con flock para no solapar):
+    30 3 * * * /usr/bin/flock -n /tmp/ceiba21_conciliar.lock \\
+        /var/www/cotizaciones/venv/bin/python \\
+        /var/www/cotizaciones/scripts/conciliar_pendientes.py \\
+        >> /home/webmaster/logs/conciliacion.log 2>&1
+"""
+import os
+import sys
+from datetime import datetime
+
+# Permitir importar el paquete `app` al correr el script desde la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.reconciliation_service import ReconciliationService
+
+
+def _opcion(nombre: str, por_defecto=None):
+    """Valor de --nombre=valor en la línea de comandos."""
+    for arg in sys.argv[1:]:
+        if arg.startswith(f'--{nombre}='):
+            return arg.split('=', 1)[1]
+    return por_defecto
+
+
+def main() -> int:
+    """Barre los pagos sin orden y reporta el resultado por stdout."""
+    dias = int(_opcion('dias', 3))
+    app = create_app()
+    with app.app_context():
+        conteo = ReconciliationService.conciliar_pendientes(dias=dias)
+    marca = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[{marca}] Barrido de conciliación ({dias} días): {conteo or 'sin pagos'}")
+    return 1 if conteo.get('error') else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
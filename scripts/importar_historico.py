@@ -1,18 +1,31 @@
 """
 Importación histórica one-time de pagos desde una fecha (PayPal, Zelle, Wise).
 
-CORRER POR TERMINAL, no por el dashboard. Un backfill de cientos de correos
-descarga cada correo por IMAP uno a uno y tarda varios minutos, lo que excede el
-timeout de Gunicorn (120s) y mata al worker a mitad del proceso (WORKER TIMEOUT),
-dejando la importación incompleta. Por terminal no hay timeout.
+Hace lo mismo que el botón "Importar desde" del dashboard y comparte su
+checkpoint: procesa TODOS los correos (leídos y no leídos) de las fuentes
+activas desde la fecha dada y los marca como leídos. Es dedup-safe: los pagos
+ya existentes (por message_id / transaction_id) se cuentan como duplicados, no
+se re-insertan.
 
-Hace lo mismo que el botón "Importar desde" del dashboard: procesa TODOS los
-correos (leídos y no leídos) de las fuentes activas desde la fecha dada y los
-marca como leídos. Es dedup-safe: los pagos ya existentes (por message_id /
-transaction_id) se cuentan como duplicados, no se re-insertan.
+El dashboard trabaja como mucho TIEMPO_IMPORT_HTTP segundos por llamada (para
+no chocar con el timeout de Gunicorn) y el navegador encadena llamadas hasta
+terminar. Por terminal no hay tope: conviene para backfills de meses o si no
+se quiere dejar la pestaña abierta. Una importación empezada en uno se puede
+terminar en el otro.
+
+Es reanudable: avanza por tramos de UID y guarda un checkpoint tras cada uno
+(tabla ingestion_checkpoints). Si se interrumpe, volver a correr el mismo
+comando retoma donde quedó; --desde-cero lo ignora. Los correos que fallaron
+quedan pendientes en el checkpoint y se reintentan al final del recorrido.
+
+El parseo HTML (CPU) se reparte en --workers procesos (por defecto uno por
+núcleo: 4 en el Pi 5); la dedup y los INSERT siguen en el proceso principal
+y en orden de UID, así que el resultado es idéntico al de una corrida en serie.
 
 Uso:
     python scripts/importar_historico.py 2026-06-01
+    python scripts/importar_historico.py 2026-06-01 --desde-cero
+    python scripts/importar_historico.py 2026-06-01 --workers=2
 """
 import os
 import sys
@@ -27,28 +40,34 @@ from app.services.unified_ingestion_service import UnifiedIngestionService
 
 def main() -> None:
     """Importa el histórico desde la fecha pasada como argumento (YYYY-MM-DD)."""
-    if len(sys.argv) != 2:
-        print("Uso: python scripts/importar_historico.py YYYY-MM-DD")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    workers = os.cpu_count() or 1
+    for opcion in sys.argv[1:]:
+        if opcion.startswith('--workers='):
+            workers = int(opcion.split('=', 1)[1])
+    if len(args) != 1:
+        print("Uso: python scripts/importar_historico.py YYYY-MM-DD "
+              "[--desde-cero] [--workers=N]")
         print("Ejemplo: python scripts/importar_historico.py 2026-06-01")
         sys.exit(1)
 
-    desde_iso = sys.argv[1]
+    desde_iso = args[0]
     try:
-        dt = datetime.strptime(desde_iso, '%Y-%m-%d')
+        datetime.strptime(desde_iso, '%Y-%m-%d')
     except ValueError:
         print(f"Fecha inválida: '{desde_iso}'. Formato esperado: YYYY-MM-DD")
         sys.exit(1)
 
-    desde_imap = dt.strftime('%d-%b-%Y')  # '01-Jun-2026'
-
     app = create_app()
     with app.app_context():
-        print(f"Importando correos desde {desde_iso} ({desde_imap})...")
-        print("Puede tardar varios minutos según el volumen. No interrumpas.")
-        service = UnifiedIngestionService()
-        resultado = service.procesar_desde_fecha(desde_imap, web_user_id=None)
+        print(f"Importando correos desde {desde_iso}...")
+        print("Puede tardar varios minutos; si se corta, volver a correr retoma.")
+        service = UnifiedIngestionService(parse_workers=workers)
+        resultado = service.procesar_desde_fecha(
+            desde_iso, web_user_id=None, reanudar='--desde-cero' not in sys.argv
+        )
         print(resultado.get('mensaje', resultado))
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,75 @@
+"""
+Daemon de ingesta por IMAP IDLE: reemplaza al cron de run_ingesta.py.
+
+Un proceso de larga vida con una sola sesión IMAP: procesa cada pago en
+cuanto Gmail avisa del correo (segundos, no hasta 5 minutos), reemite IDLE
+antes del corte de 29 minutos de Gmail, reconecta con backoff y cae a
+polling si el servidor no soporta IDLE. Ver IngestaDaemon.
+
+Uso manual:
+    python scripts/ingesta_daemon.py            # IDLE
+    python scripts/ingesta_daemon.py --polling  # forzar polling (cada 5 min)
+
+En el Raspberry, como servicio systemd (y QUITAR la línea de run_ingesta.py
+del crontab: ambos competirían por los mismos correos UNSEEN):
+    [Service]
+    ExecStart=/var/www/cotizaciones/venv/bin/python \\
+        /var/www/cotizaciones/scripts/ingesta_daemon.py
+    Restart=always
+    User=webmaster
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+from datetime import datetime
+
+# Permitir importar el paquete `app` al correr el script desde la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import db
+from app.services.gmail_service import GmailService
+from app.services.ingesta_daemon import IngestaDaemon
+from app.services.unified_ingestion_service import UnifiedIngestionService
+
+
+def main() -> None:
+    """Arranca el daemon hasta recibir SIGTERM/SIGINT."""
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
+    app = create_app()
+    detener = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: detener.set())
+    signal.signal(signal.SIGINT, lambda *_: detener.set())
+
+    with app.app_context():
+        gmail = GmailService()
+
+        def procesar() -> bool:
+            """Una corrida; True si quedó backlog y la corrida avanzó."""
+            try:
+                resultado = UnifiedIngestionService(gmail=gmail).procesar_nuevos_pagos(
+                    web_user_id=None
+                )
+                marca = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                print(f"[{marca}] {resultado.get('mensaje', resultado)}", flush=True)
+                # Sin avance (todo error) se volverían a bajar los mismos correos
+                avance = sum(
+                    resultado.get(k, 0)
+                    for k in ('procesados', 'duplicados', 'no_reconocidos')
+                )
+                return bool(resultado.get('quedan')) and avance > 0
+            finally:
+                # Proceso de larga vida: no arrastrar la sesión entre corridas
+                db.session.remove()
+
+        IngestaDaemon(
+            gmail, procesar, forzar_polling='--polling' in sys.argv[1:]
+        ).correr(detener)
+
+
+if __name__ == '__main__':
+    main()
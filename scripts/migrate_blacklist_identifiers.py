@@ -0,0 +1,38 @@
+"""
+Migración: índice normalizado de identificadores de la blacklist.
+
+Crea la tabla blacklist_identifiers (teléfono E.164, email canónico, DNI sin
+prefijo, telegram_id y user_id, con un índice (tipo, valor)) y la puebla a
+partir de los reportes existentes. Al terminar incrementa la versión del
+filtro en Redis para que cada worker reconstruya el suyo.
+
+Idempotente: regenera las filas de cada reporte.
+
+Ejecutar en dev y en prod:
+    python scripts/migrate_blacklist_identifiers.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.models import db
+from app.models.blacklist import BlacklistIdentifier
+from app.services.blacklist_service import BlacklistService
+
+
+def main() -> int:
+    """Crear la tabla y reconstruir el índice normalizado. Idempotente."""
+    app = create_app()
+    with app.app_context():
+        BlacklistIdentifier.__table__.create(bind=db.engine, checkfirst=True)
+        print("OK: tabla blacklist_identifiers")
+        total = BlacklistService.rebuild_identifier_index()
+        print(f"OK: {total} reportes indexados")
+    print("✅ Migración del índice de blacklist completada.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,44 @@
+"""
+Migración: índices del delta del panel de chat.
+
+El panel del operador (/dashboard/chat) ya no recarga las 50 conversaciones
+en cada refresco: pide solo las modificadas desde su último cursor
+(ChatService.sync_conversations). Estos índices resuelven esa consulta
+(updated_at > cursor) y la suma de no leídos (parcial: solo conversaciones
+con alguno) sin recorrer la tabla.
+
+Idempotente. Ejecutar en dev y en prod:
+    python scripts/migrate_chat_sync_indexes.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from app import create_app
+from app.models import db
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_chat_conversations_updated_at "
+    "ON chat_conversations (updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_chat_conversations_unread "
+    "ON chat_conversations (unread_for_operator) WHERE unread_for_operator > 0",
+]
+
+
+def main() -> int:
+    """Crear los índices del delta del panel de chat. Idempotente."""
+    app = create_app()
+    with app.app_context():
+        with db.engine.begin() as conn:
+            for stmt in STATEMENTS:
+                conn.execute(text(stmt))
+                print(f"OK: {stmt}")
+    print("✅ Migración de índices del panel de chat completada.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+"""
+Migración: tabla ingestion_checkpoints (importación histórica reanudable).
+
+Guarda, por fecha de inicio, hasta qué UID IMAP (y con qué UIDVALIDITY) llegó
+la importación histórica, junto con sus contadores y los UID que fallaron
+(columnas ``pendientes`` y ``pendientes_con_error``, que se agregan si la
+tabla es anterior). El dashboard
+la consulta para mostrar el progreso.
+
+Idempotente.
+
+Ejecutar en dev y en prod:
+    python scripts/migrate_ingestion_checkpoints.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from app import create_app
+from app.models import db
+from app.models.ingestion_checkpoint import IngestionCheckpoint
+
+STATEMENTS = [
+    "ALTER TABLE ingestion_checkpoints "
+    "ADD COLUMN IF NOT EXISTS pendientes JSON NOT NULL DEFAULT '[]'",
+    "ALTER TABLE ingestion_checkpoints "
+    "ADD COLUMN IF NOT EXISTS pendientes_con_error JSON NOT NULL DEFAULT '[]'",
+]
+
+
+def main() -> int:
+    """Crear la tabla de checkpoints (o agregarle los pendientes). Idempotente."""
+    app = create_app()
+    with app.app_context():
+        IngestionCheckpoint.__table__.create(bind=db.engine, checkfirst=True)
+        print("OK: tabla ingestion_checkpoints")
+        with db.engine.begin() as conn:
+            for stmt in STATEMENTS:
+                conn.execute(text(stmt))
+                print(f"OK: {stmt}")
+    print("✅ Migración de checkpoints de importación completada.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,34 @@
+"""
+Migración: tabla ingestion_runs (métricas por corrida de ingesta).
+
+Una fila por corrida con su duración, el tiempo de cada etapa (búsqueda
+IMAP, descarga, parseo, dedup, cotización, guardado, conciliación) y sus
+contadores. La lee el dashboard /dashboard/pagos/ingestas.
+
+Idempotente: no hace nada si la tabla ya existe.
+
+Ejecutar en dev y en prod:
+    python scripts/migrate_ingestion_runs.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.models import db
+from app.models.ingestion_run import IngestionRun
+
+
+def main() -> int:
+    """Crear la tabla de corridas de ingesta. Idempotente."""
+    app = create_app()
+    with app.app_context():
+        IngestionRun.__table__.create(bind=db.engine, checkfirst=True)
+        print("OK: tabla ingestion_runs")
+    print("✅ Migración de métricas de ingesta completada.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
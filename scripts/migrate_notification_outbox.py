@@ -0,0 +1,35 @@
+"""
+Migración: tabla notification_outbox (bandeja de salida de notificaciones).
+
+Las notificaciones de cambio de estado de las órdenes se guardan aquí en el
+mismo commit que la orden y las envía scripts/notification_dispatcher.py.
+Incluye el índice parcial de pendientes que usa el dispatcher para tomar
+cada lote.
+
+Idempotente: no hace nada si la tabla ya existe.
+
+Ejecutar en dev y en prod:
+    python scripts/migrate_notification_outbox.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.models import db
+from app.models.notification_outbox import NotificationOutbox
+
+
+def main() -> int:
+    """Crear la tabla de la outbox. Idempotente."""
+    app = create_app()
+    with app.app_context():
+        NotificationOutbox.__table__.create(bind=db.engine, checkfirst=True)
+        print("OK: tabla notification_outbox")
+    print("✅ Migración de la outbox de notificaciones completada.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
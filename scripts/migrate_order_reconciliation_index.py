@@ -0,0 +1,41 @@
+"""
+Migración: índice de la búsqueda de candidatos de la conciliación.
+
+ReconciliationService.buscar_candidatos filtra en SQL por estado, método de
+origen, ventana de 24 h y banda de monto. Este índice compuesto
+(status, payment_method_from_id, created_at, amount_usd) la resuelve sin
+recorrer todas las órdenes pendientes.
+
+Idempotente. Ejecutar en dev y en prod:
+    python scripts/migrate_order_reconciliation_index.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from app import create_app
+from app.models import db
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_orders_conciliacion ON orders "
+    "(status, payment_method_from_id, created_at, amount_usd)",
+]
+
+
+def main() -> int:
+    """Crear el índice de conciliación en orders. Idempotente."""
+    app = create_app()
+    with app.app_context():
+        with db.engine.begin() as conn:
+            for stmt in STATEMENTS:
+                conn.execute(text(stmt))
+                print(f"OK: {stmt}")
+    print("✅ Migración del índice de conciliación completada.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
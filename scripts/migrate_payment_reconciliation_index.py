@@ -0,0 +1,43 @@
+"""
+Migración: índice de pagos sin orden para la conciliación inversa.
+
+ReconciliationService.buscar_pago_para_orden (al recibir el comprobante de
+una orden) busca en SQL pagos sin orden del mismo método, dentro de las
+24 h de la orden y en la banda de monto. Este índice parcial
+(metodo, fecha_pago, importe_bruto) WHERE order_id IS NULL la resuelve
+leyendo solo esos pagos, aunque una importación histórica deje miles de
+pagos sin orden en la tabla.
+
+Idempotente. Ejecutar en dev y en prod:
+    python scripts/migrate_payment_reconciliation_index.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from app import create_app
+from app.models import db
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_payments_sin_orden ON payments "
+    "(metodo, fecha_pago, importe_bruto) WHERE order_id IS NULL",
+]
+
+
+def main() -> int:
+    """Crear el índice parcial de pagos sin orden. Idempotente."""
+    app = create_app()
+    with app.app_context():
+        with db.engine.begin() as conn:
+            for stmt in STATEMENTS:
+                conn.execute(text(stmt))
+                print(f"OK: {stmt}")
+    print("✅ Migración del índice de pagos sin orden completada.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
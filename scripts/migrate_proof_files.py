@@ -0,0 +1,40 @@
+"""
+Migración: índice de comprobantes (tabla proof_files).
+
+Los comprobantes nuevos se guardan deduplicados por SHA-256 y con una fila en
+proof_files (ProofStorage). Esta migración crea la tabla e indexa los
+archivos que ya estaban en ``app/static/proofs/`` (con su fecha de archivo
+como antigüedad), generando de paso sus miniaturas WebP. A partir de ahí
+scripts/cleanup_proofs.py trabaja sobre el índice.
+
+Idempotente: solo indexa los archivos que aún no tienen fila, así que
+también sirve para recoger alguno cuyo indexado falló.
+
+Ejecutar en dev y en prod:
+    python scripts/migrate_proof_files.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.models import db
+from app.models.proof_file import ProofFile
+from app.services.proof_storage import ProofStorage
+
+
+def main() -> int:
+    """Crear la tabla e indexar los comprobantes existentes. Idempotente."""
+    app = create_app()
+    with app.app_context():
+        ProofFile.__table__.create(bind=db.engine, checkfirst=True)
+        print("OK: tabla proof_files")
+        indexados, miniaturas = ProofStorage.index_existing()
+        print(f"OK: {indexados} comprobantes indexados, {miniaturas} miniaturas generadas")
+    print("✅ Migración del índice de comprobantes completada.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
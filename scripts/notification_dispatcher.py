@@ -0,0 +1,76 @@
+"""
+Dispatcher de la bandeja de salida de notificaciones (notification_outbox).
+
+Envía lo que los cambios de estado de las órdenes dejaron en la outbox
+(Telegram / WhatsApp / Web Push), por lotes, con reintentos con backoff
+exponencial y un tope de envíos simultáneos por canal. Ver
+NotificationDispatcher.
+
+Mientras no corre, las notificaciones esperan en la outbox: no se pierden,
+salen cuando arranca. Se pueden correr varios (las filas se toman con
+SKIP LOCKED).
+
+Uso manual:
+    python scripts/notification_dispatcher.py
+    python scripts/notification_dispatcher.py --lote=100
+
+En el Raspberry, como servicio systemd:
+    [Service]
+    ExecStart=/var/www/cotizaciones/venv/bin/python \\
+        /var/www/cotizaciones/scripts/notification_dispatcher.py
+    Restart=always
+    User=webmaster
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+from contextlib import contextmanager
+
+# Permitir importar el paquete `app` al correr el script desde la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import db
+from app.services.notification_dispatcher import NotificationDispatcher
+from app.services.notification_service import NotificationService
+
+
+def _opcion(nombre: str, por_defecto=None):
+    """Valor de --nombre=valor en la línea de comandos."""
+    for arg in sys.argv[1:]:
+        if arg.startswith(f'--{nombre}='):
+            return arg.split('=', 1)[1]
+    return por_defecto
+
+
+def main() -> None:
+    """Drena la outbox hasta recibir SIGTERM/SIGINT."""
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
+    app = create_app()
+    detener = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: detener.set())
+    signal.signal(signal.SIGINT, lambda *_: detener.set())
+
+    @contextmanager
+    def contexto():
+        # Cada envío en su propio contexto: la sesión de BD es por hilo y no
+        # se arrastra entre envíos
+        with app.app_context():
+            try:
+                yield
+            finally:
+                db.session.remove()
+
+    dispatcher = NotificationDispatcher(NotificationService.outbox_senders(),
+                                        contexto=contexto)
+    dispatcher.LOTE = int(_opcion('lote', NotificationDispatcher.LOTE))
+    with app.app_context():
+        dispatcher.correr(detener)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Replay offline de los parsers sobre el archivo de correos.
+
+Tras arreglar un parser, re-parsea los correos ya descargados (el archivo de
+ARCHIVO_CORREOS_DIR, ver ArchivoCorreos) con el código ACTUAL y muestra en
+qué difiere de lo guardado en `payments`. No baja nada de Gmail ni escribe en
+la base de datos: solo informa, para decidir qué corregir.
+
+El parseo se reparte en --workers procesos (por defecto uno por núcleo).
+
+Uso:
+    python scripts/replay_parsers.py
+    python scripts/replay_parsers.py --desde=2026-06-01
+    python scripts/replay_parsers.py --workers=2 --json=replay.json
+    python scripts/replay_parsers.py --max=50     # ejemplos por categoría
+"""
+import json
+import os
+import sys
+from datetime import datetime
+
+# Permitir importar el paquete `app` al correr el script desde la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.archivo_correos import ArchivoCorreos
+from app.services.replay_parsers import ReplayParsers
+
+
+def _opcion(nombre: str, por_defecto=None):
+    """Valor de --nombre=valor en la línea de comandos."""
+    for arg in sys.argv[1:]:
+        if arg.startswith(f'--{nombre}='):
+            return arg.split('=', 1)[1]
+    return por_defecto
+
+
+def main() -> int:
+    """Re-parsea el archivo y muestra el diff contra `payments`."""
+    desde = _opcion('desde')
+    if desde:
+        try:
+            datetime.strptime(desde, '%Y-%m-%d')
+        except ValueError:
+            print(f"Fecha inválida: '{desde}'. Formato esperado: YYYY-MM-DD")
+            return 1
+    workers = int(_opcion('workers', os.cpu_count() or 1))
+    maximo = int(_opcion('max', 20))
+    salida_json = _opcion('json')
+
+    app = create_app()
+    with app.app_context():
+        archivo = ArchivoCorreos.desde_config()
+        if archivo is None:
+            print("ARCHIVO_CORREOS_DIR está vacío: no hay archivo que re-parsear")
+            return 1
+        print(f"Re-parseando {archivo.directorio} con {workers} procesos...")
+        informe = ReplayParsers(archivo, workers=workers).correr(desde)
+
+    print(
+        f"{informe['correos']} correos en {informe['segundos']}s: "
+        f"{informe['iguales']} iguales, {len(informe['cambios'])} con cambios, "
+        f"{len(informe['nuevos'])} nuevos, {len(informe['perdidos'])} perdidos, "
+        f"{informe['ignorados']} ignorados ({informe['errores']} errores de parseo)"
+    )
+    for cambio in informe['cambios'][:maximo]:
+        print(f"\n~ Pago #{cambio['payment_id']} ({cambio['message_id']})")
+        for campo, (antes, ahora) in cambio['diferencias'].items():
+            print(f"    {campo}: {antes!r} -> {ahora!r}")
+    for nuevo in informe['nuevos'][:maximo]:
+        print(f"+ {nuevo['metodo']} {nuevo['importe_bruto']} {nuevo['moneda']} "
+              f"({nuevo['message_id']})")
+    for perdido in informe['perdidos'][:maximo]:
+        print(f"- Pago #{perdido['payment_id']}: {perdido['motivo']} "
+              f"({perdido['message_id']})")
+
+    if salida_json:
+        with open(salida_json, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+        print(f"\nInforme completo en {salida_json}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())